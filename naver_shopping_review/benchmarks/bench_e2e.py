@@ -0,0 +1,103 @@
+"""
+로컬 mock 서버(`mock_server.MockNaverServer`)를 대상으로 `NaverShoppingReviewGetter.run`을 처음부터 끝까지 실행하여,
+엔진과 max_workers 설정별 초당 리뷰 수, 요청 지연시간의 p95, CPU 사용시간, 최대 RSS를 비교한다.
+
+설정마다 새 프로세스(spawn)에서 실행하므로 최대 RSS와 CPU 사용시간이 설정끼리 섞이지 않으며, mock 서버는 부모 프로세스에서 실행된다.
+프록시 없이(`NoProxyPool`) 요청하고, rate limiter는 `--rate`로 고정하여 크롤러 자체의 처리량을 측정한다.
+
+실행 예시
+```
+python crawling/naver_shopping_review/benchmarks/bench_e2e.py --engines thread,async,stream --max_workers 4,16 --latency 0.02
+```
+"""
+
+# root경로를 추가
+import os, sys
+sys.path.append(os.path.abspath(''))
+
+# crawling
+from crawling.naver_shopping_review.benchmarks.mock_server import MockNaverServer
+
+# parallel
+import multiprocessing as mp
+
+# default
+import argparse
+import resource
+import shutil
+import time
+
+def _run_config(search_url: str, review_url: str, engine: str, max_workers: int, n_page: int, max_review_page: int, rate: float, results: mp.Queue) -> None:
+    """새 프로세스에서 설정 하나로 getter를 실행하고, 측정결과를 results에 넣는다."""
+
+    from crawling.naver_shopping_review.pipeline import NaverShoppingReviewGetter
+    from crawling.naver_shopping_review.utils import NoProxyPool
+    from crawling.naver_shopping_review.utils.ratelimit import AdaptiveRateLimiter
+    from crawling.naver_shopping_review.utils.metrics import METRICS
+
+    getter = NaverShoppingReviewGetter(f'benchmark{engine}{max_workers}', n_page, max_review_page, max_workers, engine, proxy_pool=NoProxyPool())
+    rate_limiter = AdaptiveRateLimiter(initial_rate=rate, max_rate=rate, proxy_rate=rate, proxy_max_rate=rate)
+    for extractor, url in ((getter.product_extractor, search_url), (getter.review_extractor, review_url)):
+        extractor.url = url
+        extractor.rate_limiter = rate_limiter
+
+    METRICS.reset()
+    s, s_cpu = time.perf_counter(), time.process_time()
+    getter.run()
+    elapsed, cpu = time.perf_counter()-s, time.process_time()-s_cpu
+
+    snapshot = METRICS.snapshot()
+    latencies = [h for name, h in snapshot['histograms'].items() if name.startswith('request_seconds')]
+    requests_total = sum(v for name, v in snapshot['counters'].items() if name.startswith('requests_total'))
+    failures = sum(v for name, v in snapshot['counters'].items() if name.startswith('proxy_failures_total'))
+    shutil.rmtree(getter.save_dir, ignore_errors=True)
+
+    results.put({
+        'engine': engine,
+        'max_workers': max_workers,
+        'reviews': snapshot['counters'].get('rows_written_total', 0),
+        'elapsed': elapsed,
+        'cpu': cpu,
+        'p95': max((h['p95'] for h in latencies), default=0.0),
+        'requests': requests_total,
+        'failures': failures,
+        'peak_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, # linux는 KB 단위
+    })
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="End-to-end crawling benchmark with a local mock server")
+    parser.add_argument('--engines', type=str, default='thread,async,stream', help="비교할 엔진을 ','로 나눠서 입력하세요.")
+    parser.add_argument('--max_workers', type=str, default='4,16', help="비교할 max_workers를 ','로 나눠서 입력하세요.")
+    parser.add_argument('--n_page', type=int, default=1, help="상품 페이지 수를 입력하세요.")
+    parser.add_argument('--max_review_page', type=int, default=10, help="상품별 최대 리뷰페이지 수를 입력하세요.")
+    parser.add_argument('--review_pages', type=int, default=10, help="mock 서버의 상품별 리뷰페이지 수를 입력하세요.")
+    parser.add_argument('--latency', type=float, default=0.02, help="mock 서버의 평균 응답 지연시간(초)을 입력하세요.")
+    parser.add_argument('--error_rate', type=float, default=0.0, help="mock 서버의 500 응답 비율을 입력하세요.")
+    parser.add_argument('--block_rate', type=float, default=0.0, help="mock 서버의 403(IP 차단) 응답 비율을 입력하세요.")
+    parser.add_argument('--rate', type=float, default=1000.0, help="고정할 초당 요청 수를 입력하세요.")
+    args = parser.parse_args()
+
+    engines = args.engines.replace(' ','').split(',')
+    max_workers_list = [int(n) for n in args.max_workers.split(',')]
+
+    ctx = mp.get_context('spawn')
+    rows = []
+    with MockNaverServer(latency=args.latency, error_rate=args.error_rate, block_rate=args.block_rate, review_pages=args.review_pages) as server:
+        print(f'[mock] {server.base_url}, latency={args.latency}, error_rate={args.error_rate}, block_rate={args.block_rate}')
+        for engine in engines:
+            for max_workers in max_workers_list:
+                results = ctx.Queue()
+                process = ctx.Process(
+                    target=_run_config,
+                    args=(server.search_url, server.review_url, engine, max_workers, args.n_page, args.max_review_page, args.rate, results),
+                )
+                process.start()
+                rows.append(results.get())
+                process.join()
+
+    print(f"{'engine':<8}{'workers':>8}{'reviews':>10}{'elapsed(s)':>12}{'reviews/s':>12}{'p95(ms)':>10}{'cpu(s)':>9}{'cpu%':>7}{'rss(MB)':>9}{'requests':>10}{'failures':>10}")
+    for row in rows:
+        print(
+            f"{row['engine']:<8}{row['max_workers']:>8}{row['reviews']:>10,}{row['elapsed']:>12.2f}{row['reviews']/row['elapsed']:>12,.1f}"
+            f"{row['p95']*1000:>10.1f}{row['cpu']:>9.2f}{row['cpu']/row['elapsed']*100:>7.0f}{row['peak_rss']:>9.1f}{row['requests']:>10,}{row['failures']:>10,}"
+        )
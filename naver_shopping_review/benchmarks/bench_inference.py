@@ -0,0 +1,130 @@
+"""
+리뷰 문장 분류의 CPU 처리량(문장/초)을 비교한다.
+- notebook : `modeling.ipynb`의 classify_sentences와 같이, 문장마다 한 번씩 모델을 실행한다. (`--baseline_sentences`개만 실행하여 환산)
+- fixed : 입력 순서대로 `--batch_size`개씩 묶어서, 배치 안의 가장 긴 문장으로 padding한다. (DataCollatorWithPadding과 같은 방식)
+- dynamic : `ReviewClassifier`의 동적 배치로, 토큰 길이로 정렬하여 토큰 수 기준으로 묶는다.
+  `--modes`에 backend:quantize:n_workers 형식으로 비교할 설정을 입력한다. ex) torch:int8:1, onnx:fp32:2
+
+`--checkpoint`를 입력하지 않으면, gogamza/kobart-base-v1과 같은 크기(d_model=768, encoder/decoder 6층)의
+무작위 가중치 모델과 합성 문장으로 학습한 tokenizer를 임시 checkpoint로 만들어서 측정한다. (처리량은 가중치와 관계없다.)
+torch, transformers, onnxruntime이 필요하다.
+
+실행 예시
+```
+python crawling/naver_shopping_review/benchmarks/bench_inference.py --n_sentences 1000 --modes torch:fp32:1,torch:int8:1,onnx:fp32:1,onnx:int8:1,onnx:int8:2
+```
+"""
+
+# root경로를 추가
+import os, sys
+sys.path.append(os.path.abspath(''))
+
+# crawling
+from crawling.naver_shopping_review.utils.inference import ReviewClassifier, _pad, _softmax
+
+# default
+import argparse
+import tempfile
+import time
+import numpy as np
+
+FRAGMENTS = [
+    '배송이 빠르고', '포장이 꼼꼼해요', '효과는 좀 더 먹어봐야 알 것 같아요', '가격 대비 양이 많아서 만족합니다',
+    '캡슐이 작아서 삼키기 편해요', '냄새가 조금 나지만 괜찮아요', '부모님 선물로 샀는데 좋아하세요', '재구매 의사 있습니다',
+    '유통기한도 넉넉하고', '아침마다 챙겨먹기 좋아요', '할인할 때 사서 저렴하게 구매했어요', '속이 편안해진 느낌이에요',
+]
+LABELS = ['만족도', '가격', '사용감', '효과']
+
+def make_sentences(n_sentences: int, seed: int = 0) -> list[str]:
+    """조각 1~12개로 이루어진, 길이가 다양한 합성 리뷰 문장을 만든다."""
+
+    rng = np.random.default_rng(seed)
+    n_fragments = np.minimum(rng.geometric(0.35, n_sentences), 12)
+    return [' '.join(rng.choice(FRAGMENTS, n)) + '.' for n in n_fragments]
+
+def make_checkpoint(checkpoint_dir: str, sentences: list[str]) -> None:
+    """kobart-base-v1과 같은 크기의 무작위 가중치 BartForSequenceClassification과, 합성 문장으로 학습한 tokenizer를 저장한다."""
+
+    from tokenizers import Tokenizer, models, pre_tokenizers, trainers
+    from transformers import BartConfig, BartForSequenceClassification, PreTrainedTokenizerFast
+
+    special_tokens = ['<s>', '</s>', '<unk>', '<pad>', '<mask>']
+    tokenizer = Tokenizer(models.BPE(unk_token='<unk>'))
+    tokenizer.pre_tokenizer = pre_tokenizers.Metaspace()
+    tokenizer.train_from_iterator(sentences, trainers.BpeTrainer(vocab_size=2000, special_tokens=special_tokens))
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=tokenizer, bos_token='<s>', eos_token='</s>', unk_token='<unk>', pad_token='<pad>', mask_token='<mask>')
+    tokenizer.save_pretrained(checkpoint_dir)
+
+    config = BartConfig(
+        vocab_size=30000, d_model=768, encoder_layers=6, decoder_layers=6, encoder_attention_heads=16, decoder_attention_heads=16,
+        encoder_ffn_dim=3072, decoder_ffn_dim=3072, max_position_embeddings=1026,
+        bos_token_id=tokenizer.bos_token_id, eos_token_id=tokenizer.eos_token_id, pad_token_id=tokenizer.pad_token_id,
+        decoder_start_token_id=tokenizer.eos_token_id, forced_eos_token_id=tokenizer.eos_token_id,
+        num_labels=len(LABELS), id2label=dict(enumerate(LABELS)), label2id={label:i for i, label in enumerate(LABELS)},
+    )
+    BartForSequenceClassification(config).save_pretrained(checkpoint_dir)
+
+def run_notebook(classifier: ReviewClassifier, sentences: list[str]) -> float:
+    """문장마다 한 번씩 모델을 실행하고, 걸린 시간(초)을 반환한다."""
+
+    s = time.perf_counter()
+    for input_ids in classifier.tokenize(sentences):
+        _softmax(classifier._model(*_pad([input_ids], classifier.pad_token_id)))
+    return time.perf_counter() - s
+
+def run_fixed(classifier: ReviewClassifier, sentences: list[str], batch_size: int) -> tuple[float, float]:
+    """입력 순서대로 batch_size개씩 묶어서 실행하고, (걸린 시간(초), padding 비율)을 반환한다."""
+
+    s = time.perf_counter()
+    input_ids = classifier.tokenize(sentences)
+    n_tokens = n_padded = 0
+    for i in range(0, len(input_ids), batch_size):
+        ids, mask = _pad(input_ids[i:i+batch_size], classifier.pad_token_id)
+        _softmax(classifier._model(ids, mask))
+        n_tokens, n_padded = n_tokens+mask.sum(), n_padded+mask.size
+    return time.perf_counter() - s, 1-n_tokens/n_padded
+
+def dynamic_padding(classifier: ReviewClassifier, sentences: list[str]) -> float:
+    """동적 배치의 padding 비율."""
+
+    n_tokens = n_padded = 0
+    for _, (_, mask) in classifier.iter_batches(classifier.tokenize(sentences)):
+        n_tokens, n_padded = n_tokens+mask.sum(), n_padded+mask.size
+    return 1-n_tokens/n_padded
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="CPU batch inference benchmark")
+    parser.add_argument('--checkpoint', type=str, default=None, help="모델 checkpoint 폴더를 입력하세요. 입력하지 않으면 무작위 가중치 모델을 만듭니다.")
+    parser.add_argument('--n_sentences', type=int, default=1000, help="합성 문장 수를 입력하세요.")
+    parser.add_argument('--baseline_sentences', type=int, default=100, help="notebook 방식으로 처리할 문장 수를 입력하세요.")
+    parser.add_argument('--batch_size', type=int, default=32, help="fixed 방식의 배치 크기를 입력하세요.")
+    parser.add_argument('--modes', type=str, default='torch:fp32:1,torch:int8:1,onnx:fp32:1,onnx:int8:1', help="dynamic 방식으로 비교할 backend:quantize:n_workers를 ','로 나눠서 입력하세요.")
+    args = parser.parse_args()
+
+    sentences = make_sentences(args.n_sentences)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        checkpoint_dir = args.checkpoint
+        if checkpoint_dir is None:
+            checkpoint_dir = os.path.join(tmp_dir, 'checkpoint')
+            make_checkpoint(checkpoint_dir, sentences)
+
+        with ReviewClassifier(checkpoint_dir) as classifier:
+            lengths = [len(ids) for ids in classifier.tokenize(sentences)]
+            print(f'[sentences] {len(sentences):,}, tokens: mean={np.mean(lengths):.1f}, max={max(lengths)}, cpu_count={os.cpu_count()}')
+            print(f"  {'mode':<20}{'sentences/s':>12}{'elapsed(s)':>12}{'padding':>10}")
+
+            elapsed = run_notebook(classifier, sentences[:args.baseline_sentences]) / min(args.baseline_sentences, len(sentences)) * len(sentences)
+            print(f"  {'notebook':<20}{len(sentences)/elapsed:>12.1f}{elapsed:>12.2f}{0:>10.1%}  (estimated from {args.baseline_sentences} sentences)")
+
+            elapsed, padding = run_fixed(classifier, sentences, args.batch_size)
+            print(f"  {f'fixed(batch={args.batch_size})':<20}{len(sentences)/elapsed:>12.1f}{elapsed:>12.2f}{padding:>10.1%}")
+            padding = dynamic_padding(classifier, sentences)
+
+        for mode in args.modes.replace(' ','').split(','):
+            backend, precision, n_workers = mode.split(':')
+            with ReviewClassifier(checkpoint_dir, backend=backend, quantize=precision=='int8', n_workers=int(n_workers)) as classifier:
+                classifier.predict(sentences[:classifier.max_batch_size*int(n_workers)]) # 모델 불러오기, ONNX 내보내기, worker 시작은 제외
+                s = time.perf_counter()
+                classifier.predict(sentences)
+                elapsed = time.perf_counter() - s
+            print(f"  {f'dynamic({mode})':<20}{len(sentences)/elapsed:>12.1f}{elapsed:>12.2f}{padding:>10.1%}")
@@ -0,0 +1,59 @@
+"""
+저장된 검색결과 HTML fixture로 상품 페이지의 JSON 추출 방식별 파싱시간과 최대 메모리 사용량을 비교한다.
+기존 방식(BeautifulSoup으로 HTML 전체를 파싱한 후 마지막 script 태그를 json.loads)과,
+`__NEXT_DATA__` script 태그만 byte 단위로 잘라서 파싱하는 fast path(orjson이 있으면 orjson)를 비교한다.
+
+실행 예시
+```
+python crawling/naver_shopping_review/benchmarks/bench_product_parse.py --repeat 50
+```
+"""
+
+# root경로를 추가
+import os, sys
+sys.path.append(os.path.abspath(''))
+
+# crawling
+from crawling.naver_shopping_review.utils.crawl import _extract_next_data, _parse_next_data_slow, json_loads
+
+# default
+from typing import Callable
+import argparse
+import time
+import tracemalloc
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+FIXTURES = ['search_page.html']
+
+def _measure(parser: Callable, data: bytes|str, repeat: int) -> tuple[float, float, int]:
+    """parser를 repeat번 실행하여 (1회 평균 파싱시간(ms), 1회 최대 메모리(MB), 상품 수)를 반환한다."""
+
+    s = time.perf_counter()
+    for _ in range(repeat):
+        json_data = parser(data)
+    elapsed = (time.perf_counter()-s) / repeat * 1000
+
+    tracemalloc.start()
+    json_data = parser(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    n = len(json_data['props']['pageProps']['initialState']['products']['list'])
+    return elapsed, peak / 1024**2, n
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Product page parser benchmark")
+    parser.add_argument('--repeat', type=int, default=50, help="parser별 반복 횟수를 입력하세요.")
+    args = parser.parse_args()
+
+    print(f'[decoder] {json_loads.__module__}')
+
+    for fixture in FIXTURES:
+        with open(os.path.join(FIXTURE_DIR, fixture), 'rb') as f:
+            content = f.read()
+        text = content.decode('utf-8')
+        print(f'[{fixture}] {len(content)/1024:.1f} KB')
+
+        for name, func, data in [('beautifulsoup', _parse_next_data_slow, text), ('fast-path', _extract_next_data, content)]:
+            elapsed, peak, n = _measure(func, data, args.repeat)
+            print(f'  {name:<13}: {elapsed:8.2f} ms, peak={peak:7.2f} MB ({n} items)')
@@ -0,0 +1,71 @@
+"""
+저장된 HTML fixture로 프록시 사이트 parser의 파싱시간을 비교한다.
+기존 `_get_proxies_1`의 파싱 방식(행마다 테이블 전체를 다시 select)과, `PROXY_SOURCES`에 등록된 single-pass parser를 비교한다.
+
+실행 예시
+```
+python crawling/naver_shopping_review/benchmarks/bench_proxy_sources.py --repeat 20
+```
+"""
+
+# root경로를 추가
+import os, sys
+sys.path.append(os.path.abspath(''))
+
+# crawling
+from crawling.naver_shopping_review.utils import PROXY_SOURCES, lxml_html
+
+# default
+from typing import Callable
+from bs4 import BeautifulSoup as bs
+import argparse
+import time
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+FIXTURES = {
+    'free-proxy-list': 'free_proxy_list.html',
+    'proxyscrape': 'proxyscrape.txt',
+}
+
+def _legacy_parse_free_proxy_list(text: str) -> list[str]:
+    """기존 `_get_proxies_1`의 파싱 방식으로, 행마다 테이블 전체를 다시 select한다."""
+
+    soup = bs(text,'html.parser')
+    proxies_length = len(soup.select('table.table.table-striped.table-bordered > tbody > tr'))
+
+    proxies_url = []
+    for index in range(proxies_length):
+        proxies = soup.select('table.table.table-striped.table-bordered > tbody > tr')
+        port = proxies[index].select('td')[1].text.strip()
+        ip = proxies[index].select('td')[0].text.strip()
+        proxies_url.append(f'{ip}:{port}')
+
+    return proxies_url
+
+def _measure(parser: Callable, text: str, repeat: int) -> tuple[float, int]:
+    """parser를 repeat번 실행하여 (1회 평균 파싱시간(ms), 파싱된 프록시 수)를 반환한다."""
+
+    s = time.perf_counter()
+    for _ in range(repeat):
+        proxies = list(parser(text))
+    return (time.perf_counter()-s) / repeat * 1000, len(proxies)
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Proxy source parser benchmark")
+    parser.add_argument('--repeat', type=int, default=20, help="parser별 반복 횟수를 입력하세요.")
+    args = parser.parse_args()
+
+    print(f'[backend] {"lxml" if lxml_html is not None else "html.parser"}')
+
+    with open(os.path.join(FIXTURE_DIR, FIXTURES['free-proxy-list']), 'r') as f:
+        text = f.read()
+    elapsed, n = _measure(_legacy_parse_free_proxy_list, text, args.repeat)
+    print(f'[free-proxy-list] legacy      : {elapsed:8.2f} ms ({n} proxies)')
+
+    for name, source in PROXY_SOURCES.items():
+        if name not in FIXTURES:
+            continue
+        with open(os.path.join(FIXTURE_DIR, FIXTURES[name]), 'r') as f:
+            text = f.read()
+        elapsed, n = _measure(source['parser'], text, args.repeat)
+        print(f'[{name}] single-pass : {elapsed:8.2f} ms ({n} proxies)')
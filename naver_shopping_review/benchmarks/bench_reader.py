@@ -0,0 +1,170 @@
+"""
+여러 키워드의 실행폴더에 저장된 합성 리뷰로, 리뷰를 모두 읽어서 합치는 방식과 `ReviewReader`로 나눠서 읽는 방식의 최대 RSS와 처리시간을 비교한다.
+- notebook : `modeling.ipynb`와 같이, 리뷰 파일을 thread로 모두 pd.read_parquet한 뒤 키워드별로 concat하고, 다시 전체를 concat한다.
+- reader : `ReviewReader`로 필요한 컬럼만 `--max_memory` 한도 안에서 배치로 읽는다. (memory_map=True/False)
+
+두 방식 모두 키워드별 리뷰 수, 평균 리뷰점수, 리뷰 본문의 전체 길이를 계산하여 결과가 같은지 확인하며,
+합성 리뷰 생성과 방식마다 새 프로세스(spawn)에서 실행하므로 최대 RSS가 섞이지 않는다.
+
+실행 예시
+```
+python crawling/naver_shopping_review/benchmarks/bench_reader.py --n_keywords 4 --n_files 100 --rows_per_file 1000 --max_memory 64
+```
+"""
+
+# root경로를 추가
+import os, sys
+sys.path.append(os.path.abspath(''))
+
+# crawling
+from crawling.naver_shopping_review.utils.reader import ReviewReader
+from crawling.naver_shopping_review.utils.schema import PRODUCT_SCHEMA, REVIEW_SCHEMA
+
+# parallel
+from concurrent.futures import ThreadPoolExecutor
+import multiprocessing as mp
+
+# default
+import argparse
+import datetime
+import glob
+import resource
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+FRAGMENTS = [
+    '배송이 빠르고 포장이 꼼꼼해요.', '효과는 좀 더 먹어봐야 알 것 같아요.', '가격 대비 양이 많아서 만족합니다.',
+    '캡슐이 작아서 삼키기 편해요.', '냄새가 조금 나지만 괜찮아요.', '부모님 선물로 샀는데 좋아하세요.', '재구매 의사 있습니다.',
+    '유통기한도 넉넉하고 아침마다 챙겨먹기 좋아요.', '할인할 때 사서 저렴하게 구매했어요.', '한 달 정도 먹었는데 속이 편안해진 느낌이에요.',
+]
+
+def make_runs(result_dir: str, n_keywords: int, n_files: int, rows_per_file: int, seed: int = 0, results: mp.Queue = None) -> int:
+    """키워드별 실행폴더에 상품정보 파일과, 리뷰 본문이 문장 5~40개인 리뷰 파일을 저장하고, 저장한 리뷰 수를 반환한다. (results가 있으면 넣는다.)"""
+
+    rng = np.random.default_rng(seed)
+    fragments = np.array(FRAGMENTS, dtype=object)
+    start = int(datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc).timestamp()*1000)
+    review_id = 0
+    for k in range(n_keywords):
+        run_dir = os.path.join(result_dir, f'20240701_keyword{k}_5_100')
+        os.makedirs(run_dir, exist_ok=True)
+        pq.write_table(PRODUCT_SCHEMA.empty_table(), os.path.join(run_dir, 'product_page5.parquet'))
+
+        for i in range(n_files):
+            n = rows_per_file
+            contents = [' '.join(fragments[rng.integers(0, len(fragments), m)]) for m in rng.integers(5, 41, n)]
+            columns = {
+                'id': pa.array(np.arange(review_id, review_id+n), pa.int64()),
+                'reviewScore': pa.array(rng.integers(1, 6, n), pa.int8()),
+                'reviewContent': pa.array(contents, pa.string()),
+                'createDate': pa.array(start + rng.integers(0, 180*86400*1000, n), pa.int64()).cast(REVIEW_SCHEMA.field('createDate').type),
+                'productName': pa.array([f'상품 {i} 프리미엄 기획세트 대용량']*n, pa.string()),
+                'product_ranking': pa.array(np.full(n, i+1), pa.int32()),
+                'review_ranking': pa.array(np.arange(1, n+1), pa.int32()),
+            }
+            table = pa.Table.from_arrays(
+                [columns[field.name] if field.name in columns else pa.nulls(n, field.type) for field in REVIEW_SCHEMA],
+                schema=REVIEW_SCHEMA,
+            )
+            pq.write_table(table, os.path.join(run_dir, f'review_product{i+1}.parquet'), row_group_size=rows_per_file)
+            review_id += n
+
+    if results is not None:
+        results.put(review_id)
+    return review_id
+
+def run_notebook(result_dir: str) -> dict:
+    """`modeling.ipynb`와 같이 모든 리뷰 파일을 읽어서 합친 뒤 집계한다."""
+
+    df = []
+    for run_dir in sorted(glob.glob(os.path.join(result_dir, '*/'))):
+        collected_date, keyword, page, max_review_page = os.path.basename(os.path.normpath(run_dir)).split('_')
+        review_paths = glob.glob(os.path.join(run_dir, 'review_product*.parquet'))
+        with ThreadPoolExecutor(os.cpu_count()) as executor:
+            d = pd.concat(list(executor.map(pd.read_parquet, review_paths)), axis=0)
+        d.insert(0, 'keyword', keyword)
+        d.insert(1, 'collected_date', collected_date)
+        df.append(d)
+    df = pd.concat(df, axis=0)
+
+    grouped = df.groupby('keyword')
+    return {
+        'count': grouped.size().to_dict(),
+        'score': grouped['reviewScore'].sum().astype(int).to_dict(),
+        'length': grouped['reviewContent'].apply(lambda x: int(x.str.len().sum())).to_dict(),
+    }
+
+def run_reader(result_dir: str, max_memory: int, memory_map: bool) -> dict:
+    """`ReviewReader`로 필요한 컬럼만 배치로 읽으면서 집계한다."""
+
+    reader = ReviewReader(result_dir, columns=['keyword','reviewScore','reviewContent'], max_memory=max_memory, memory_map=memory_map)
+    count, score, length = {}, {}, {}
+    for batch in reader:
+        keywords = batch.column('keyword').dictionary_encode()
+        index = keywords.indices.to_numpy()
+        scores = batch.column('reviewScore').to_numpy(zero_copy_only=False).astype(np.int64)
+        lengths = pc.utf8_length(batch.column('reviewContent')).to_numpy(zero_copy_only=False).astype(np.int64)
+        for i, keyword in enumerate(keywords.dictionary.to_pylist()):
+            mask = index==i
+            count[keyword] = count.get(keyword, 0) + int(mask.sum())
+            score[keyword] = score.get(keyword, 0) + int(scores[mask].sum())
+            length[keyword] = length.get(keyword, 0) + int(lengths[mask].sum())
+    return {'count': count, 'score': score, 'length': length, 'batch_size': reader.batch_size}
+
+def _run_method(method: str, result_dir: str, max_memory: int, results: mp.Queue) -> None:
+    """새 프로세스에서 방식 하나로 집계하고, 측정결과를 results에 넣는다. (모듈 import 이후의 RSS를 기준으로 한다.)"""
+
+    base_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    s = time.perf_counter()
+    if method=='notebook':
+        result = run_notebook(result_dir)
+    else:
+        result = run_reader(result_dir, max_memory, memory_map=method=='reader(mmap)')
+    elapsed = time.perf_counter() - s
+
+    results.put({
+        'method': method,
+        'elapsed': elapsed,
+        'base_rss': base_rss,
+        'peak_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, # linux는 KB 단위
+        'result': result,
+    })
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Streaming reader memory benchmark")
+    parser.add_argument('--n_keywords', type=int, default=4, help="키워드(실행폴더) 수를 입력하세요.")
+    parser.add_argument('--n_files', type=int, default=100, help="키워드별 리뷰 파일 수를 입력하세요.")
+    parser.add_argument('--rows_per_file', type=int, default=1000, help="리뷰 파일별 리뷰 수를 입력하세요.")
+    parser.add_argument('--max_memory', type=int, default=64, help="ReviewReader의 메모리 한도(MB)를 입력하세요.")
+    parser.add_argument('--methods', type=str, default='notebook,reader(mmap),reader', help="비교할 방식을 ','로 나눠서 입력하세요.")
+    args = parser.parse_args()
+
+    # 자식 프로세스는 부모 프로세스의 최대 RSS를 이어받으므로, 합성 리뷰도 새 프로세스에서 만든다.
+    ctx = mp.get_context('spawn')
+    with tempfile.TemporaryDirectory() as result_dir:
+        results = ctx.Queue()
+        process = ctx.Process(target=make_runs, args=(result_dir, args.n_keywords, args.n_files, args.rows_per_file), kwargs={'results': results})
+        process.start()
+        n_reviews = results.get()
+        process.join()
+        size = sum(os.path.getsize(path) for path in glob.glob(os.path.join(result_dir, '*', '*.parquet')))
+        print(f'[reviews] {n_reviews:,} rows, {args.n_keywords} keywords, parquet {size/1024**2:.1f} MB, max_memory={args.max_memory} MB')
+
+        rows = []
+        for method in args.methods.replace(' ','').split(','):
+            results = ctx.Queue()
+            process = ctx.Process(target=_run_method, args=(method, result_dir, args.max_memory*1024**2, results))
+            process.start()
+            rows.append(results.get())
+            process.join()
+
+    expected = {key: rows[0]['result'][key] for key in ('count','score','length')}
+    print(f"  {'method':<14}{'elapsed(s)':>12}{'peak rss(MB)':>14}{'(+ from base)':>15}{'batch_size':>12}{'same':>6}")
+    for row in rows:
+        same = all(row['result'][key]==expected[key] for key in expected)
+        print(f"  {row['method']:<14}{row['elapsed']:>12.2f}{row['peak_rss']:>14.1f}{row['peak_rss']-row['base_rss']:>15.1f}{row['result'].get('batch_size','-'):>12}{str(same):>6}")
@@ -0,0 +1,80 @@
+"""
+프록시별 pooled session(keep-alive) 적용 전후의 초당 요청 수를 로컬 stub 서버로 비교한다.
+
+실행 예시
+```
+python crawling/naver_shopping_review/benchmarks/bench_session.py --n_requests 2000 --max_workers 12
+```
+"""
+
+# root경로를 추가
+import os, sys
+sys.path.append(os.path.abspath(''))
+
+# crawling
+from crawling.naver_shopping_review.utils import ProxyPool
+from crawling.naver_shopping_review.utils.extractor import PooledSessionExtractor, REVIEW_COOKIES, REVIEW_HEADERS
+
+# parallel
+from concurrent.futures import ThreadPoolExecutor
+
+# default
+from typing import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import threading
+import time
+import requests
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """keep-alive를 지원하는 HTTP/1.1 stub 서버의 handler."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    body = b'{"contents": [], "totalPages": 1}'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+def _measure(get: Callable, url: str, n_requests: int, max_workers: int) -> float:
+    """입력된 get 함수로 n_requests번 요청을 보내고, 초당 요청 수를 반환한다."""
+
+    s = time.time()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(lambda _: get(url).status_code, range(n_requests)))
+    return n_requests / (time.time() - s)
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Pooled session benchmark")
+    parser.add_argument('--n_requests', type=int, default=2000, help="방식별로 보낼 요청 수를 입력하세요.")
+    parser.add_argument('--max_workers', type=int, default=os.cpu_count()//2, help="요청을 보낼 thread 수를 입력하세요.")
+    parser.add_argument('--pool_size', type=int, default=10, help="session의 최대 커넥션 수를 입력하세요.")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/i/v1/contents/reviews/query-pages'
+
+    # before : 요청마다 module-level requests.get (매번 새 커넥션)
+    before = _measure(
+        lambda url: requests.get(url, headers=dict(REVIEW_HEADERS), cookies=dict(REVIEW_COOKIES)),
+        url, args.n_requests, args.max_workers,
+    )
+
+    # after : 프록시별 pooled session (keep-alive)
+    extractor = PooledSessionExtractor(REVIEW_COOKIES, REVIEW_HEADERS, pool_size=args.pool_size, proxy_pool=ProxyPool(proxies=[]))
+    session = extractor._get_session(None)
+    after = _measure(session.get, url, args.n_requests, args.max_workers)
+
+    server.shutdown()
+
+    print(f'[before] requests.get    : {before:,.1f} req/s')
+    print(f'[after ] pooled session  : {after:,.1f} req/s')
+    print(f'[speed up] x{after/before:.2f}')
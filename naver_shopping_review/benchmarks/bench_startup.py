@@ -0,0 +1,141 @@
+"""
+`run.py`를 실행한 시점부터 첫 요청이 나가기까지의 시간(시작시간)을 로컬 mock 서버(`mock_server.MockNaverServer`)로 측정한다.
+mock 서버가 첫 요청을 받은 시각과 `run.py` 프로세스를 시작한 시각의 차이를 시작시간으로 보며, `--repeat`번 실행하여 최소값과 중앙값을 출력한다.
+
+함께 user-agent를 뽑는 비용을 `fake_useragent.UserAgent`와 `UserAgentPool`로 비교하고,
+`--proxy`이면 `ProxyPool`의 생성시간을 lazy=True/False로 비교한다. (프록시 사이트에 요청하므로 네트워크가 필요하다.)
+
+실행 예시
+```
+python crawling/naver_shopping_review/benchmarks/bench_startup.py --repeat 5
+```
+"""
+
+# root경로를 추가
+import os, sys
+sys.path.append(os.path.abspath(''))
+
+# crawling
+from crawling.naver_shopping_review.benchmarks.mock_server import MockNaverServer
+from crawling.naver_shopping_review.utils.useragent import UserAgentPool
+
+# default
+import argparse
+import glob
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+RUN_PATH = 'crawling/naver_shopping_review/run.py'
+
+def measure_run_startup(server: MockNaverServer, engine: str) -> tuple[float, float]:
+    """
+    `run.py`를 mock 서버를 대상으로 한 번 실행하여, (첫 요청까지의 시간, 전체 실행시간)(초)를 가져온다.
+
+    Args:
+        server (MockNaverServer): 실행 중인 mock 서버.
+        engine (str): `run.py`의 리뷰 크롤링 엔진.
+
+    Returns:
+        tuple[float, float]: (첫 요청까지의 시간, 전체 실행시간).
+    """
+
+    keyword = f'benchmarkstartup{engine}'
+    server.first_request_at = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        command = [
+            sys.executable, RUN_PATH,
+            '--keywords', keyword, '--n_page', '1', '--max_review_page', '1', '--engine', engine, '--max_workers', '4',
+            '--no_proxy', '--cache_ttl', '0',
+            '--search_url', server.search_url, '--review_url', server.review_url,
+            '--metrics_path', os.path.join(tmp_dir, 'metrics.jsonl'),
+            '--dead_letter_path', os.path.join(tmp_dir, 'dead_letters.jsonl'),
+        ]
+        s = time.time()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elapsed = time.time() - s
+
+    for save_dir in glob.glob(f'crawling/naver_shopping_review/.result/*_{keyword}_1_1/'):
+        shutil.rmtree(save_dir, ignore_errors=True)
+
+    if server.first_request_at is None:
+        raise RuntimeError('run.py did not send any request')
+    return server.first_request_at-s, elapsed
+
+def measure_user_agent(n_draws: int) -> list[tuple[str, float, float]]:
+    """
+    user-agent를 만드는 시간과 한 번 뽑는 시간을 `fake_useragent.UserAgent`, `UserAgentPool`(저장된 목록)로 비교한다.
+
+    Returns:
+        list[tuple[str, float, float]]: (방식, 생성시간(초), 한 번 뽑는 시간(초)) 리스트.
+    """
+
+    rows = []
+
+    s = time.perf_counter()
+    from fake_useragent import UserAgent
+    ua = UserAgent()
+    init = time.perf_counter() - s
+    s = time.perf_counter()
+    for _ in range(n_draws):
+        str(ua.random)
+    rows.append(('fake_useragent', init, (time.perf_counter()-s)/n_draws))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'user_agents.json')
+        UserAgentPool(path).refresh()
+
+        s = time.perf_counter()
+        pool = UserAgentPool(path)
+        len(pool)
+        init = time.perf_counter() - s
+        s = time.perf_counter()
+        for _ in range(n_draws):
+            str(pool.random)
+        rows.append(('UserAgentPool', init, (time.perf_counter()-s)/n_draws))
+
+    return rows
+
+def measure_proxy_pool() -> list[tuple[str, float]]:
+    """
+    `ProxyPool`의 생성시간을 lazy=False(생성자에서 프록시 목록을 가져옴)와 lazy=True(백그라운드에서 가져옴)로 비교한다.
+
+    Returns:
+        list[tuple[str, float]]: (방식, 생성시간(초)) 리스트.
+    """
+
+    from crawling.naver_shopping_review.utils import ProxyPool
+
+    rows = []
+    for lazy in (False, True):
+        s = time.perf_counter()
+        ProxyPool(verify=True, lazy=lazy)
+        rows.append((f'ProxyPool(lazy={lazy})', time.perf_counter()-s))
+    return rows
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Startup time benchmark with a local mock server")
+    parser.add_argument('--engines', type=str, default='thread,async,stream', help="비교할 엔진을 ','로 나눠서 입력하세요.")
+    parser.add_argument('--repeat', type=int, default=3, help="엔진별 실행 횟수를 입력하세요.")
+    parser.add_argument('--n_draws', type=int, default=2000, help="user-agent를 뽑을 횟수를 입력하세요.")
+    parser.add_argument('--proxy', action='store_true', help="ProxyPool의 생성시간도 측정합니다. (네트워크 필요)")
+    args = parser.parse_args()
+
+    print(f"{'engine':<8}{'first request(s)':>18}{'(median)':>10}{'total(s)':>10}")
+    with MockNaverServer(review_pages=1) as server:
+        for engine in args.engines.replace(' ','').split(','):
+            runs = [measure_run_startup(server, engine) for _ in range(args.repeat)]
+            first = [run[0] for run in runs]
+            print(f"{engine:<8}{min(first):>18.3f}{statistics.median(first):>10.3f}{statistics.median(run[1] for run in runs):>10.3f}")
+
+    print()
+    print(f"{'user-agent':<16}{'init(ms)':>10}{'draw(us)':>10}")
+    for name, init, draw in measure_user_agent(args.n_draws):
+        print(f"{name:<16}{init*1000:>10.2f}{draw*1e6:>10.2f}")
+
+    if args.proxy:
+        print()
+        for name, elapsed in measure_proxy_pool():
+            print(f"{name:<24}{elapsed:>10.3f}s")
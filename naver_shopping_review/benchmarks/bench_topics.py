@@ -0,0 +1,92 @@
+"""
+합성 리뷰 데이터로 토픽 문장 추출의 처리시간을 비교한다.
+기존 방식(`modeling.ipynb`: 문자열로 저장된 reviewTopics를 행마다 json.loads한 뒤 문장을 자르고, 리뷰마다 DataFrame을 만들어서 concat)과,
+`utils.topics.extract_topic_sentences`(reviewTopics 배열을 그대로 펼치고 모든 문장을 한 번에 자름)를 비교한다.
+기존 방식은 `--baseline_rows`개만 실행하여 전체 리뷰 수로 환산한다.
+
+실행 예시
+```
+python crawling/naver_shopping_review/benchmarks/bench_topics.py --n_rows 1000000 --n_jobs 1,4
+```
+"""
+
+# root경로를 추가
+import os, sys
+sys.path.append(os.path.abspath(''))
+
+# crawling
+from crawling.naver_shopping_review.utils.schema import REVIEW_SCHEMA
+from crawling.naver_shopping_review.utils.topics import extract_topic_sentences
+
+# default
+import argparse
+import json
+import time
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+SENTENCES = [
+    '배송이 빠르고 포장이 꼼꼼해요. ',
+    '효과는 좀 더 먹어봐야 알 것 같아요. ',
+    '가격 대비 양이 많아서 만족합니다. ',
+    '캡슐이 작아서 삼키기 편해요. ',
+    '냄새가 조금 나지만 괜찮아요. ',
+]
+TOPICS = [('delivery', '배송'), ('effect', '효과'), ('price', '가격'), ('size', '크기'), ('smell', '냄새')]
+
+def make_reviews(n_rows: int, seed: int = 0) -> pa.Table:
+    """문장 1~5개로 이루어진 리뷰와, 문장마다 토픽 위치를 가진 합성 리뷰 테이블을 만든다."""
+
+    rng = np.random.default_rng(seed)
+    contents, topics = [], []
+    for n in rng.integers(1, 6, n_rows):
+        idx = rng.choice(len(SENTENCES), n, replace=False)
+        content, review_topics = '', []
+        for i in idx:
+            review_topics.append({'topicCode': TOPICS[i][0], 'topicCodeName': TOPICS[i][1], 'patternStartNo': len(content), 'patternEndNo': len(content)+len(SENTENCES[i])-2})
+            content += SENTENCES[i]
+        contents.append(content)
+        topics.append(review_topics)
+
+    schema = pa.schema([REVIEW_SCHEMA.field('id'), REVIEW_SCHEMA.field('reviewContent'), REVIEW_SCHEMA.field('reviewTopics')])
+    return pa.Table.from_pydict({'id': np.arange(n_rows), 'reviewContent': contents, 'reviewTopics': topics}, schema=schema)
+
+def baseline(df: pd.DataFrame) -> pd.DataFrame:
+    """`modeling.ipynb`의 extract_topic_sentences, melt_by_topic_sentence와 같은 방식."""
+
+    def extract(review_content, review_topics):
+        review_topics = json.loads(review_topics.replace("\'", "\""))
+        topic_info = [list(topic.values()) for topic in review_topics]
+        topic_text = [review_content[info[2]:info[3]+1] for info in topic_info]
+        return np.concatenate([np.array(topic_info)[:,:2].tolist(), np.expand_dims(topic_text, axis=1)], axis=1).tolist()
+
+    topic_sentences = df.apply(lambda x: extract(x['reviewContent'], x['reviewTopics']), axis=1)
+    return pd.concat([
+        pd.DataFrame(topic_sentences.values[i], columns=['topic_eng','topic_kor','topic_sentence'], index=[df.index[i]]*len(topic_sentences.values[i]))
+        for i in range(len(df))
+    ])
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Topic sentence extraction benchmark")
+    parser.add_argument('--n_rows', type=int, default=1_000_000, help="합성 리뷰 수를 입력하세요.")
+    parser.add_argument('--baseline_rows', type=int, default=20_000, help="기존 방식으로 처리할 리뷰 수를 입력하세요.")
+    parser.add_argument('--n_jobs', type=str, default='1,4', help="비교할 프로세스 수를 ','로 나눠서 입력하세요.")
+    args = parser.parse_args()
+
+    reviews = make_reviews(args.n_rows)
+    print(f'[reviews] {reviews.num_rows:,} rows, {reviews.nbytes/1024**2:.1f} MB')
+
+    # 기존 방식은 문자열(str(list))로 저장된 reviewTopics를 사용한다.
+    sample = reviews.slice(0, args.baseline_rows).to_pandas()
+    sample['reviewTopics'] = sample['reviewTopics'].map(lambda topics: str([dict(topic) for topic in topics]))
+    s = time.perf_counter()
+    melted = baseline(sample)
+    elapsed = time.perf_counter() - s
+    print(f"  {'baseline':<14}: {elapsed/len(sample)*reviews.num_rows:8.2f} s (estimated from {len(sample):,} rows, {len(melted):,} topic rows)")
+
+    for n_jobs in [int(n) for n in args.n_jobs.split(',')]:
+        s = time.perf_counter()
+        exploded = extract_topic_sentences(reviews, n_jobs=n_jobs)
+        elapsed = time.perf_counter() - s
+        print(f"  {f'n_jobs={n_jobs}':<14}: {elapsed:8.2f} s ({exploded.num_rows:,} topic rows, {reviews.num_rows/elapsed:,.0f} reviews/s)")
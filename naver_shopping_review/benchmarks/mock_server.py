@@ -0,0 +1,231 @@
+"""
+네이버쇼핑 검색결과 페이지(`search/all`)와 리뷰 API(`contents/reviews/query-pages`)를 흉내내는 로컬 mock 서버를 제공한다.
+응답 지연시간, 에러(500) 비율, IP 차단(403) 비율, 상품별 리뷰페이지 수를 설정할 수 있어, 네이버에 요청하지 않고 처리량을 측정할 수 있다.
+
+- GET  /search/all?query=...&pagingIndex=n : `__NEXT_DATA__` script 태그에 상품 목록 JSON을 넣은 HTML로, 페이지마다 광고상품이 섞여 있다.
+- POST /i/v1/contents/reviews/query-pages : {'totalPages', 'contents'} JSON으로, 페이지당 20개의 리뷰를 준다.
+
+실행 예시
+```
+python crawling/naver_shopping_review/benchmarks/mock_server.py --port 8765 --latency 0.05 --block_rate 0.01
+```
+"""
+
+# default
+from typing import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import argparse
+import json
+import random
+import threading
+import time
+
+PAGE_SIZE = 40          # 검색결과 페이지당 상품 수 (광고 제외).
+REVIEW_PAGE_SIZE = 20   # 리뷰페이지당 리뷰 수.
+
+class MockNaverServer:
+    """네이버쇼핑 검색결과 페이지와 리뷰 API를 흉내내는 로컬 HTTP 서버."""
+
+    def __init__(self,
+                 host: str = '127.0.0.1',
+                 port: int = 0,
+                 latency: float = 0.0,
+                 error_rate: float = 0.0,
+                 block_rate: float = 0.0,
+                 review_pages: int = 10,
+                 ads_per_page: int = 5,
+                 seed: int = 0) -> None:
+        """
+        MockNaverServer의 생성자.
+
+        Args:
+            host (str, optional): 서버 주소. default='127.0.0.1'.
+            port (int, optional): 서버 포트로, 0이면 비어있는 포트를 사용한다. default=0.
+            latency (float, optional): 평균 응답 지연시간(초)으로, 실제 지연시간은 0.5~1.5배 사이에서 무작위로 정한다. default=0.0.
+            error_rate (float, optional): 500 응답의 비율. default=0.0.
+            block_rate (float, optional): 403(IP 차단) 응답의 비율. default=0.0.
+            review_pages (int, optional): 상품별 리뷰페이지 수로, 상품의 reviewCount는 review_pages*20이 된다. default=10.
+            ads_per_page (int, optional): 검색결과 페이지마다 섞을 광고상품 수. default=5.
+            seed (int, optional): 지연시간과 에러를 정하는 난수의 seed. default=0.
+        """
+
+        self.latency = latency
+        self.error_rate = error_rate
+        self.block_rate = block_rate
+        self.review_pages = review_pages
+        self.ads_per_page = ads_per_page
+
+        self.n_requests = 0
+        self.first_request_at = None    # 첫 요청을 받은 시각(time.time()).
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def search_url(self) -> str:
+        return self.base_url + '/search/all'
+
+    @property
+    def review_url(self) -> str:
+        return self.base_url + '/i/v1/contents/reviews/query-pages'
+
+    def start(self) -> 'MockNaverServer':
+        """서버를 background thread로 시작한다."""
+
+        threading.Thread(target=self._server.serve_forever, name='mock-naver-server', daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        """서버를 종료한다."""
+
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _fault(self) -> tuple[float, int]:
+        """요청 하나의 (지연시간, 상태코드)를 정한다."""
+
+        with self._lock:
+            self.n_requests += 1
+            if self.first_request_at is None:
+                self.first_request_at = time.time()
+            delay = self.latency * self._random.uniform(0.5, 1.5)
+            r = self._random.random()
+        if r<self.block_rate:
+            return delay, 403
+        if r<self.block_rate+self.error_rate:
+            return delay, 500
+        return delay, 200
+
+    def search_page(self, query: str, page: int) -> bytes:
+        """검색결과 페이지의 HTML을 만든다. 광고상품은 adId가 있고 순위가 페이지 범위 밖이다."""
+
+        items = []
+        for i in range(PAGE_SIZE):
+            rank = (page-1)*PAGE_SIZE + i + 1
+            items.append({'item': self._product(query, rank, rank)})
+        for i in range(self.ads_per_page):
+            ad = self._product(query, 10_000+i, 1_000_000+page*100+i)
+            ad['adId'] = f'nad-{page}-{i}'
+            items.insert(i*(PAGE_SIZE//max(self.ads_per_page, 1)), {'item': ad})
+
+        next_data = {'props': {'pageProps': {'initialState': {'products': {'list': items, 'total': 10_000}}}}}
+        return (
+            '<!DOCTYPE html><html><head><title>mock</title></head><body><div id="__next"></div>'
+            '<script id="__NEXT_DATA__" type="application/json">'
+            + json.dumps(next_data, ensure_ascii=False)
+            + '</script></body></html>'
+        ).encode('utf-8')
+
+    def _product(self, query: str, rank: int, product_no: int) -> dict:
+        return {
+            'rank': rank,
+            'id': str(80_000_000_000+product_no),
+            'productTitle': f'{query} 상품 {product_no}',
+            'price': 10_000 + product_no % 1000 * 10,
+            'reviewCount': self.review_pages * REVIEW_PAGE_SIZE,
+            'scoreInfo': 4.8,
+            'mallName': f'mall{product_no}',
+            'mallPcUrl': f'https://smartstore.naver.com/mall{product_no}',
+            'mallProductUrl': f'https://smartstore.naver.com/main/products/{5_000_000_000+product_no}',
+            'mallProductId': str(5_000_000_000+product_no),
+            'originalMallProductId': str(4_000_000_000+product_no),
+            'mallInfoCache': {'npaySellerNo': str(500_000_000+product_no), 'mallName': f'mall{product_no}'},
+        }
+
+    def review_page(self, payload: dict) -> bytes:
+        """리뷰 API의 JSON 응답을 만든다."""
+
+        page = int(payload.get('page', 1))
+        origin_product_no = str(payload.get('originProductNo'))
+        contents = []
+        if page<=self.review_pages:
+            for i in range(REVIEW_PAGE_SIZE):
+                n = (page-1)*REVIEW_PAGE_SIZE + i
+                contents.append({
+                    'id': int(origin_product_no[-6:] or 0)*100_000 + n,
+                    'reviewScore': 5 - n % 3,
+                    'reviewContent': f'리뷰 {n}. 배송이 빠르고 포장이 꼼꼼해요. 효과는 좀 더 먹어봐야 알 것 같아요.',
+                    'createDate': '2024-06-{:02d}T12:00:00.000+00:00'.format(28 - n % 28),
+                    'originProductNo': origin_product_no,
+                    'checkoutMerchantNo': int(payload.get('checkoutMerchantNo') or 0),
+                    'reviewTopics': [{'topicCode': 'delivery', 'topicCodeName': '배송', 'patternStartNo': 0, 'patternEndNo': 10}],
+                })
+
+        return json.dumps({'totalPages': self.review_pages, 'page': page, 'contents': contents}, ensure_ascii=False).encode('utf-8')
+
+    def _make_handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def _respond(self, status: int, body: bytes, content_type: str) -> None:
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _handle(self, build: Callable[[], bytes], content_type: str) -> None:
+                delay, status = server._fault()
+                if delay>0:
+                    time.sleep(delay)
+                if status!=200:
+                    self._respond(status, b'{}', 'application/json')
+                else:
+                    self._respond(200, build(), content_type)
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path!='/search/all':
+                    return self._respond(404, b'', 'text/plain')
+                params = parse_qs(url.query)
+                query = params.get('query', [''])[0]
+                page = int(params.get('pagingIndex', ['1'])[0])
+                self._handle(lambda: server.search_page(query, page), 'text/html; charset=utf-8')
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if urlsplit(self.path).path!='/i/v1/contents/reviews/query-pages':
+                    return self._respond(404, b'', 'text/plain')
+                payload = json.loads(body or b'{}')
+                self._handle(lambda: server.review_page(payload), 'application/json;charset=UTF-8')
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Mock Naver Shopping server")
+    parser.add_argument('--host', type=str, default='127.0.0.1', help="서버 주소를 입력하세요.")
+    parser.add_argument('--port', type=int, default=8765, help="서버 포트를 입력하세요.")
+    parser.add_argument('--latency', type=float, default=0.0, help="평균 응답 지연시간(초)을 입력하세요.")
+    parser.add_argument('--error_rate', type=float, default=0.0, help="500 응답의 비율을 입력하세요.")
+    parser.add_argument('--block_rate', type=float, default=0.0, help="403(IP 차단) 응답의 비율을 입력하세요.")
+    parser.add_argument('--review_pages', type=int, default=10, help="상품별 리뷰페이지 수를 입력하세요.")
+    parser.add_argument('--ads_per_page', type=int, default=5, help="검색결과 페이지마다 섞을 광고상품 수를 입력하세요.")
+    args = parser.parse_args()
+
+    server = MockNaverServer(args.host, args.port, args.latency, args.error_rate, args.block_rate, args.review_pages, args.ads_per_page)
+    print(f'[mock] search={server.search_url}, review={server.review_url}')
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,340 @@
+"""
+네이버쇼핑 리뷰데이터 수집과 관련하여, `.result/{수집일자}_{키워드}_{상품페이지수}_{최대리뷰페이지수}/`에 저장된 실행결과를
+키워드, 수집일자로 나눈 Hive 파티션(`keyword=/date=/`)의 데이터셋으로 합치는(compaction) 함수를 제공한다.
+
+- reviews/keyword={키워드}/date={수집일자}/part-0.parquet : 리뷰 id로 중복을 제거하고 정렬하여, row group별 id 통계로 필터를 적용할 수 있다.
+- products/keyword={키워드}/date={수집일자}/part-0.parquet : 상품 id로 중복을 제거하고 상품순위로 정렬한다.
+- _runs.parquet : 합친 실행결과의 목록(실행폴더, 키워드, 수집일자, 파일 수, 행 수, checkpoint 요약 등)으로, 다시 실행하면 이미 합친 실행결과는 건너뛴다.
+  단, 합친 뒤에 리뷰 파일 수가 바뀐 실행폴더(같은 날 다시 실행한 incremental 수집 등)는 다시 합친다.
+
+`pyarrow.dataset.dataset(DATASET_DIR + 'reviews', partitioning=PARTITIONING)`으로 읽으면, 필요한 파티션과 컬럼만 읽을 수 있다.
+
+함수 목록
+1. `parse_run_dir`
+    실행폴더 이름에서 수집일자, 키워드, 상품페이지수, 최대리뷰페이지수를 가져온다.
+2. `find_runs`
+    합칠 수 있는(완료된) 실행폴더 목록을 가져온다. 수집 중이거나 중단된 실행폴더와 읽을 수 없는 파일은 제외한다.
+3. `compact_partition`
+    하나의 파티션에 기존 데이터와 새로운 파일들을 합쳐서, 중복을 제거하고 정렬하여 다시 저장한다.
+4. `compact`
+    완료된 실행결과를 키워드, 수집일자 파티션의 데이터셋으로 합치고, 실행결과 목록을 갱신한다.
+
+변수 목록
+1. `PARTITIONING`
+    데이터셋을 읽을 때 사용할 Hive 파티션 스키마로, keyword와 date는 문자열이다.
+
+실행 예시
+```
+python crawling/naver_shopping_review/compact.py --keywords 오메가3,밀크씨슬
+```
+"""
+
+# root경로를 추가
+import os, sys
+sys.path.append(os.path.abspath(''))
+
+# crawling
+from crawling.naver_shopping_review.utils.checkpoint import CheckpointManifest, read_complete_marker
+from crawling.naver_shopping_review.utils.crawl import get_review_tasks, preprocess_products_info
+from crawling.naver_shopping_review.utils.schema import PRODUCT_SCHEMA, REVIEW_SCHEMA
+from crawling.naver_shopping_review.utils.writer import ROW_GROUP_SIZE
+
+# default
+from typing import Callable
+from urllib.parse import quote
+import argparse
+import datetime
+import glob
+import shutil
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# global setting
+RESULT_DIR = 'crawling/naver_shopping_review/.result/'      # 실행결과 저장폴더.
+DATASET_DIR = 'crawling/naver_shopping_review/.dataset/'    # 합친 데이터셋 저장폴더.
+RUNS_INDEX = '_runs.parquet'                                # 데이터셋 폴더 안의 실행결과 목록 파일로, '_'로 시작하므로 데이터셋을 읽을 때 제외된다.
+PART_NAME = 'part-0.parquet'                                # 파티션별 파일 이름.
+
+PARTITIONING = ds.partitioning(pa.schema([('keyword', pa.string()), ('date', pa.string())]), flavor='hive')
+
+RUNS_SCHEMA = pa.schema([
+    ('run', pa.string()),
+    ('keyword', pa.string()),
+    ('date', pa.string()),
+    ('n_page', pa.int32()),
+    ('max_review_page', pa.int32()),
+    ('n_review_files', pa.int32()),
+    ('n_reviews', pa.int64()),
+    ('n_products', pa.int64()),
+    ('done_pages', pa.int64()),
+    ('failed_pages', pa.int64()),
+    ('compacted_at', pa.timestamp('s')),
+])
+
+def parse_run_dir(run_dir: str) -> dict|None:
+    """
+    실행폴더 이름에서 수집일자, 키워드, 상품페이지수, 최대리뷰페이지수를 가져온다. 키워드에 '_'가 있어도 앞뒤에서 나눠서 가져온다.
+
+    Args:
+        run_dir (str): 실행폴더 경로. ex) 'crawling/naver_shopping_review/.result/20240701_선크림_5_100/'
+
+    Returns:
+        dict|None: {'run','keyword','date','n_page','max_review_page'}로, 형식이 맞지 않으면 None.
+    """
+
+    run = os.path.basename(os.path.normpath(run_dir))
+    try:
+        nowdate, rest = run.split('_', 1)
+        keyword, n_page, max_review_page = rest.rsplit('_', 2)
+        date = datetime.datetime.strptime(nowdate, '%Y%m%d').strftime('%Y-%m-%d')
+        return {'run':run, 'keyword':keyword, 'date':date, 'n_page':int(n_page), 'max_review_page':int(max_review_page)}
+    except ValueError:
+        return None
+
+def _is_readable(path: str) -> bool:
+    """Parquet 파일의 footer를 읽을 수 있는지 여부로, 쓰는 중에 종료된 파일은 footer가 없어서 읽을 수 없다."""
+
+    try:
+        pq.ParquetFile(path).close()
+        return True
+    except (OSError, pa.ArrowException):
+        return False
+
+def find_runs(result_dir: str = RESULT_DIR,
+              keywords: list[str]|None = None,
+              allow_failed: bool = False,
+              trace_func: Callable|None = None) -> list[dict]:
+    """
+    합칠 수 있는(완료된) 실행폴더 목록을 가져온다. 다음 실행폴더는 완료되지 않은 것으로 보고 제외한다.
+    - 상품정보 파일이 없거나 읽을 수 없는 실행폴더
+    - checkpoint도 완료 marker(분산 크롤링의 coordinator가 모든 작업이 끝난 뒤 남긴다)도 없는 실행폴더
+    - checkpoint에 결과가 기록되지 않은(수집 중이거나 중단된) 리뷰페이지나, 수집을 시작하지 않은 상품이 있는 실행폴더
+    - checkpoint나 완료 marker에 실패한 리뷰페이지(작업)가 있는 실행폴더 (allow_failed=False)
+    읽을 수 없는 리뷰 파일(이전 실행에서 쓰는 중에 종료된 파일)은 리뷰 파일 목록에서 제외하고 'invalid_paths'에 넣는다.
+
+    Args:
+        result_dir (str, optional): 실행결과 저장폴더. default=RESULT_DIR.
+        keywords (list[str]|None, optional): 합칠 키워드 목록으로, None이면 모든 키워드를 합친다. default=None.
+        allow_failed (bool, optional): 실패한 리뷰페이지가 있는 실행폴더도 합칠지 여부. default=False.
+        trace_func (Callable|None, optional): 제외한 실행폴더와 파일을 출력 할 함수로, None이면 출력하지 않는다. default=None.
+
+    Returns:
+        list[dict]: `parse_run_dir`의 결과에 {'path','review_paths','product_paths','invalid_paths','done_pages','failed_pages'}를 추가한 리스트.
+    """
+
+    trace_func = trace_func if trace_func is not None else (lambda *args: None)
+
+    runs = []
+    for path in sorted(glob.glob(os.path.join(result_dir, '*/'))):
+        run = parse_run_dir(path)
+        if run is None or (keywords is not None and run['keyword'] not in keywords):
+            continue
+
+        product_paths = sorted(glob.glob(os.path.join(path, 'product_page*.parquet')))
+        review_paths = sorted(glob.glob(os.path.join(path, 'review_*.parquet')))
+        if len(product_paths)==0:
+            continue
+        if not all(_is_readable(product_path) for product_path in product_paths):
+            trace_func(f'[find_runs] {run["run"]}, skipped (unreadable product file)')
+            continue
+
+        # checkpoint가 있으면, 모든 상품의 모든 리뷰페이지에 결과가 기록되어야 완료된 것으로 본다.
+        # checkpoint를 쓰지 않는 분산 크롤링은 coordinator가 모든 작업이 끝난 뒤 남기는 완료 marker가 있어야 완료된 것으로 본다.
+        summary, unplanned = read_complete_marker(path), 0
+        if os.path.exists(os.path.join(path, 'checkpoint.sqlite')):
+            with CheckpointManifest(os.path.join(path, 'checkpoint.sqlite')) as checkpoint:
+                summary = checkpoint.summary()
+                recorded = checkpoint.products()
+            products_info = pa.concat_tables([pq.read_table(product_path) for product_path in product_paths], promote_options='default')
+            unplanned = len({task.product_ranking for task in get_review_tasks(preprocess_products_info(products_info))} - recorded)
+        elif summary is None:
+            trace_func(f'[find_runs] {run["run"]}, skipped (in progress or interrupted: no checkpoint or complete marker)')
+            continue
+        if summary.get('pending', 0)>0 or unplanned>0:
+            trace_func(f'[find_runs] {run["run"]}, skipped (in progress or interrupted: pending pages={summary.get("pending", 0)}, products not started={unplanned})')
+            continue
+        if summary.get('failed', 0)>0 and not allow_failed:
+            trace_func(f'[find_runs] {run["run"]}, skipped (failed pages={summary["failed"]})')
+            continue
+
+        invalid_paths = [review_path for review_path in review_paths if not _is_readable(review_path)]
+        if len(invalid_paths)>0:
+            trace_func(f'[find_runs] {run["run"]}, unreadable review files excluded: {invalid_paths}')
+
+        runs.append({
+            **run,
+            'path': path,
+            'review_paths': [review_path for review_path in review_paths if review_path not in invalid_paths],
+            'product_paths': product_paths,
+            'invalid_paths': invalid_paths,
+            'done_pages': summary.get('done', 0),
+            'failed_pages': summary.get('failed', 0),
+        })
+
+    return runs
+
+def _conform(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """table을 schema의 컬럼 순서와 타입으로 맞추며, 없는 컬럼은 null로 채운다."""
+
+    columns = [
+        table[field.name].cast(field.type) if field.name in table.column_names else pa.nulls(table.num_rows, field.type)
+        for field in schema
+    ]
+    return pa.Table.from_arrays(columns, schema=schema)
+
+def _deduplicate(table: pa.Table, key: str, sort_keys: list[tuple[str, str]]) -> pa.Table:
+    """sort_keys로 정렬한 뒤, key가 같은 행은 처음 나온 행만 남긴다. key가 null인 행은 제거한다."""
+
+    table = table.filter(pc.is_valid(table[key])).sort_by(sort_keys)
+    if table.num_rows==0:
+        return table
+
+    values = table[key].to_numpy(zero_copy_only=False)
+    keep = np.ones(len(values), dtype=bool)
+    if sort_keys[0][0]==key:
+        keep[1:] = values[1:]!=values[:-1]
+    else:
+        _, first = np.unique(values, return_index=True)
+        keep[:] = False
+        keep[first] = True
+    return table.filter(pa.array(keep))
+
+def compact_partition(partition_dir: str,
+                      paths: list[str],
+                      schema: pa.Schema,
+                      key: str,
+                      sort_keys: list[tuple[str, str]],
+                      row_group_size: int = ROW_GROUP_SIZE) -> int:
+    """
+    하나의 파티션에 기존 데이터와 새로운 파일들을 합쳐서, key로 중복을 제거하고 sort_keys로 정렬하여 다시 저장한다.
+    임시파일에 모두 쓴 뒤 교체하므로, 중간에 실패해도 기존 데이터는 남는다.
+
+    Args:
+        partition_dir (str): 파티션 폴더. ex) '.dataset/reviews/keyword=.../date=2024-07-01/'
+        paths (list[str]): 합칠 parquet 파일 경로 리스트.
+        schema (pa.Schema): 저장할 스키마로, 파티션 컬럼(keyword, date)은 포함하지 않는다.
+        key (str): 중복을 판단할 컬럼.
+        sort_keys (list[tuple[str, str]]): 정렬기준으로, 처음 나온 행을 남긴다.
+        row_group_size (int, optional): row group의 최대 행 수. default=ROW_GROUP_SIZE.
+
+    Returns:
+        int: 저장한 행 수.
+    """
+
+    part_path = os.path.join(partition_dir, PART_NAME)
+    sources = ([part_path] if os.path.exists(part_path) else []) + list(paths)
+    tables = [_conform(pq.read_table(path), schema) for path in sources]
+    table = pa.concat_tables(tables) if len(tables)>0 else schema.empty_table()
+    table = _deduplicate(table, key, sort_keys)
+
+    os.makedirs(partition_dir, exist_ok=True)
+    tmp_path = os.path.join(partition_dir, f'.{PART_NAME}.tmp{os.getpid()}')
+    pq.write_table(table, tmp_path, row_group_size=row_group_size)
+    os.replace(tmp_path, part_path)
+
+    return table.num_rows
+
+def _partition_dir(dataset_dir: str, name: str, keyword: str, date: str) -> str:
+    """파티션 폴더로, 키워드는 pyarrow가 읽을 때 되돌리는 URI 인코딩으로 저장한다."""
+
+    return os.path.join(dataset_dir, name, f'keyword={quote(keyword, safe="")}', f'date={date}', '')
+
+def _load_runs_index(dataset_dir: str) -> pa.Table:
+    path = os.path.join(dataset_dir, RUNS_INDEX)
+    return pq.read_table(path) if os.path.exists(path) else RUNS_SCHEMA.empty_table()
+
+def compact(result_dir: str = RESULT_DIR,
+            dataset_dir: str = DATASET_DIR,
+            keywords: list[str]|None = None,
+            force: bool = False,
+            allow_failed: bool = False,
+            remove: bool = False,
+            trace_func: Callable = print) -> pa.Table:
+    """
+    완료된 실행결과를 키워드, 수집일자 파티션의 데이터셋으로 합치고, 실행결과 목록(`_runs.parquet`)을 갱신한다.
+    파티션(키워드, 수집일자)별로 기존 데이터와 그 파티션의 실행결과만 읽으므로, 메모리는 가장 큰 파티션만큼만 사용한다.
+
+    Args:
+        result_dir (str, optional): 실행결과 저장폴더. default=RESULT_DIR.
+        dataset_dir (str, optional): 합친 데이터셋 저장폴더. default=DATASET_DIR.
+        keywords (list[str]|None, optional): 합칠 키워드 목록으로, None이면 모든 키워드를 합친다. default=None.
+        force (bool, optional): 실행결과 목록에 있는(이미 합친) 실행폴더도 다시 합칠지 여부로, False여도 합친 뒤에 리뷰 파일 수가 바뀐 실행폴더는 다시 합친다. default=False.
+        allow_failed (bool, optional): 실패한 리뷰페이지가 있는 실행폴더도 합칠지 여부. default=False.
+        remove (bool, optional): 합친 실행폴더를 삭제할지 여부. default=False.
+        trace_func (Callable, optional): 진행 경과를 출력 할 함수. default=print.
+
+    Returns:
+        pa.Table: 갱신된 실행결과 목록.
+    """
+
+    index = _load_runs_index(dataset_dir)
+    compacted = dict(zip(index['run'].to_pylist(), index['n_review_files'].to_pylist()))
+    runs = [run for run in find_runs(result_dir, keywords, allow_failed, trace_func) if force or compacted.get(run['run'])!=len(run['review_paths'])]
+
+    # 파티션(키워드, 수집일자)별로 실행결과를 모은다.
+    partitions = {}
+    for run in runs:
+        partitions.setdefault((run['keyword'], run['date']), []).append(run)
+
+    now = datetime.datetime.now().replace(microsecond=0)
+    rows = []
+    for i, ((keyword, date), partition_runs) in enumerate(sorted(partitions.items())):
+        n_reviews = compact_partition(
+            _partition_dir(dataset_dir, 'reviews', keyword, date),
+            [path for run in partition_runs for path in run['review_paths']],
+            REVIEW_SCHEMA, 'id', [('id','ascending'), ('product_ranking','ascending')],
+        )
+        n_products = compact_partition(
+            _partition_dir(dataset_dir, 'products', keyword, date),
+            [path for run in partition_runs for path in run['product_paths']],
+            PRODUCT_SCHEMA, 'id', [('rank','ascending'), ('id','ascending')],
+        )
+        trace_func(f'[compact] {i+1}/{len(partitions)}, keyword={keyword}, date={date}, runs={len(partition_runs)}, {n_reviews=:,}, {n_products=:,}')
+
+        for run in partition_runs:
+            rows.append({
+                'run': run['run'],
+                'keyword': keyword,
+                'date': date,
+                'n_page': run['n_page'],
+                'max_review_page': run['max_review_page'],
+                'n_review_files': len(run['review_paths']),
+                'n_reviews': sum(pq.ParquetFile(path).metadata.num_rows for path in run['review_paths']),
+                'n_products': sum(pq.ParquetFile(path).metadata.num_rows for path in run['product_paths']),
+                'done_pages': run['done_pages'],
+                'failed_pages': run['failed_pages'],
+                'compacted_at': now,
+            })
+
+    # 실행결과 목록 갱신 (다시 합친 실행폴더는 새로운 기록으로 바꾼다)
+    if len(rows)>0:
+        updated = set(row['run'] for row in rows)
+        index = index.filter(pc.invert(pc.is_in(index['run'], pa.array(list(updated), pa.string()))))
+        index = pa.concat_tables([index.cast(RUNS_SCHEMA), pa.Table.from_pylist(rows, schema=RUNS_SCHEMA)]).sort_by([('keyword','ascending'), ('date','ascending'), ('run','ascending')])
+        os.makedirs(dataset_dir, exist_ok=True)
+        tmp_path = os.path.join(dataset_dir, f'.{RUNS_INDEX}.tmp{os.getpid()}')
+        pq.write_table(index, tmp_path)
+        os.replace(tmp_path, os.path.join(dataset_dir, RUNS_INDEX))
+
+    if remove:
+        for run in runs:
+            shutil.rmtree(run['path'], ignore_errors=True)
+
+    trace_func(f'[compact] runs={len(runs)}, partitions={len(partitions)}, indexed={index.num_rows}')
+    return index
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Compact crawling results into a partitioned dataset")
+    parser.add_argument('--keywords', type=str, default=None, help="합칠 키워드명을 ','로 나눠서 입력하세요. 입력하지 않으면 모든 키워드를 합칩니다.")
+    parser.add_argument('--result_dir', type=str, default=RESULT_DIR, help="실행결과 저장폴더를 입력하세요.")
+    parser.add_argument('--dataset_dir', type=str, default=DATASET_DIR, help="합친 데이터셋 저장폴더를 입력하세요.")
+    parser.add_argument('--force', action='store_true', help="이미 합친 실행폴더도 다시 합칩니다.")
+    parser.add_argument('--allow_failed', action='store_true', help="실패한 리뷰페이지가 있는 실행폴더도 합칩니다.")
+    parser.add_argument('--remove', action='store_true', help="합친 실행폴더를 삭제합니다.")
+    args = parser.parse_args()
+
+    keywords = args.keywords.replace(' ','').split(',') if args.keywords else None
+    compact(args.result_dir, args.dataset_dir, keywords, args.force, args.allow_failed, args.remove)
@@ -0,0 +1,296 @@
+"""
+네이버쇼핑 리뷰데이터 수집과 관련하여, 공유 work queue를 사용하는 분산 크롤링의 coordinator와 worker를 제공한다.
+
+coordinator가 (키워드, 상품 페이지) 작업을 queue에 넣으면, 여러 프로세스/호스트의 worker가 작업을 가져가서 크롤링한다.
+- listing: 상품 페이지를 크롤링하여 저장하고, 상품별 product 작업을 넣는다.
+- product: 첫번째 리뷰페이지로 마지막 리뷰페이지를 탐색하여 저장하고, 나머지 review 작업을 넣는다.
+- review: 리뷰페이지를 크롤링하여 저장한다.
+worker는 결과를 파일에 저장하고 파일이 닫힌 뒤에 완료를 보고하므로, worker가 중간에 종료되어도 작업은 lease가 끝난 뒤 다른 worker가 다시 가져간다.
+
+클래스 목록
+1. `DistributedWorker`
+    work queue에서 작업을 가져와 크롤링하고, 결과를 저장한 뒤 완료를 보고하는 worker.
+
+함수 목록
+1. `enqueue_keywords`
+    키워드별 상품 페이지 작업을 work queue에 넣고, 키워드별 저장폴더를 반환한다.
+2. `wait_until_drained`
+    work queue의 모든 작업이 끝날 때까지 진행상황을 출력하며 기다린다.
+3. `mark_complete`
+    모든 작업이 끝난 저장폴더에 작업 결과 요약을 완료 marker로 남겨서, compact가 완료된 실행폴더로 합칠 수 있게 한다.
+"""
+
+# root경로를 추가
+import os, sys
+sys.path.append(os.path.abspath(''))
+
+# crawling
+from crawling.naver_shopping_review.utils import ProxyPool
+from crawling.naver_shopping_review.utils.extractor import NaverShoppingExtractor, NaverShoppingReviewExtractor
+from crawling.naver_shopping_review.utils.crawl import product_response_to_data, add_keyword_column, preprocess_products_info, get_review_tasks, plan_last_page, REVIEW_PAGE_SIZE
+from crawling.naver_shopping_review.utils.schema import REVIEW_SCHEMA, reviews_to_record_batch
+from crawling.naver_shopping_review.utils.checkpoint import COMPLETE_MARKER, write_complete_marker
+from crawling.naver_shopping_review.utils.metrics import METRICS
+from crawling.naver_shopping_review.utils.workqueue import WorkQueue, LEASE_SECONDS
+from crawling.naver_shopping_review.utils.writer import BufferedParquetWriter
+
+# parallel
+from concurrent.futures import ThreadPoolExecutor
+
+# default
+from typing import Callable
+import datetime
+import socket
+import time
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# global setting
+LEASE_BATCH_SIZE = 50   # worker가 한 번에 가져갈 작업 수로, 한 번에 가져간 작업의 리뷰는 저장폴더별로 하나의 파일에 저장된다.
+POLL_INTERVAL = 5.0     # 가져갈 작업이 없을 때 다시 확인하기까지 기다리는 시간(초).
+
+def enqueue_keywords(queue: WorkQueue, keywords: list[str], n_page: int, max_review_page: int = 100) -> dict[str, str]:
+    """
+    키워드별 상품 페이지 작업을 work queue에 넣고, 키워드별 저장폴더를 반환한다.
+    같은 작업은 한 번만 들어가므로, coordinator를 다시 실행해도 작업이 중복되지 않는다.
+
+    Args:
+        queue (WorkQueue): 작업을 넣을 work queue.
+        keywords (list[str]): 수집 대상 키워드 리스트.
+        n_page (int): 키워드별로 수집할 상품 페이지 수.
+        max_review_page (int, optional): 상품별로 리뷰를 가져올 최대 페이지 수로, 1000을 넘길 수 없다. default=100.
+
+    Returns:
+        dict[str, str]: 키워드를 key로, 저장폴더를 value로 가지는 딕셔너리.
+    """
+
+    assert max_review_page<=1000, "maximum review page is 1000."
+
+    nowdate = datetime.datetime.now().strftime('%Y%m%d')
+    save_dirs = {keyword: f'crawling/naver_shopping_review/.result/{nowdate}_{keyword}_{n_page}_{max_review_page}/' for keyword in keywords}
+
+    # 다시 실행하면 작업이 끝날 때까지 수집 중인 저장폴더이므로, 이전 실행의 완료 marker를 지운다.
+    for save_dir in save_dirs.values():
+        if os.path.exists(save_dir + COMPLETE_MARKER):
+            os.remove(save_dir + COMPLETE_MARKER)
+
+    queue.put([
+        ('listing', f'listing:{save_dirs[keyword]}:{page}', {'keyword':keyword, 'page':page, 'save_dir':save_dirs[keyword], 'max_review_page':max_review_page})
+        for keyword in keywords
+        for page in range(1,n_page+1)
+    ])
+
+    return save_dirs
+
+def wait_until_drained(queue: WorkQueue, trace_func: Callable = print, poll_interval: float = POLL_INTERVAL) -> dict[str, int]:
+    """
+    work queue의 모든 작업이 끝날 때까지 진행상황을 출력하며 기다린다.
+
+    Args:
+        queue (WorkQueue): 기다릴 work queue.
+        trace_func (Callable, optional): 진행 경과를 출력 할 함수. default=print.
+        poll_interval (float, optional): 진행상황을 확인하는 간격(초). default=POLL_INTERVAL.
+
+    Returns:
+        dict[str, int]: 마지막으로 확인한 상태별 작업 수.
+    """
+
+    while True:
+        stats = queue.stats()
+        trace_func(f'[queue] {stats}')
+        if stats.get('pending', 0)==0 and stats.get('leased', 0)==0:
+            return stats
+        time.sleep(poll_interval)
+
+def mark_complete(queue: WorkQueue, save_dirs: list[str], trace_func: Callable = print) -> dict[str, dict[str, int]]:
+    """
+    모든 작업이 끝난 저장폴더에 작업 결과 요약을 완료 marker로 남겨서, compact가 완료된 실행폴더로 합칠 수 있게 한다.
+    worker는 checkpoint를 쓰지 않으므로, marker가 없는 저장폴더는 수집 중이거나 중단된 것으로 본다.
+
+    Args:
+        queue (WorkQueue): 작업이 끝난 work queue.
+        save_dirs (list[str]): `enqueue_keywords`가 반환한 저장폴더 리스트.
+        trace_func (Callable, optional): 진행 경과를 출력 할 함수. default=print.
+
+    Returns:
+        dict[str, dict[str, int]]: 저장폴더를 key로, 상태('done','failed','pending')별 작업 수를 value로 가지는 딕셔너리.
+    """
+
+    summaries = {}
+    for save_dir in save_dirs:
+        # 작업의 key는 '{kind}:{save_dir}:...'이다.
+        stats = queue.stats(key_contains=f':{save_dir}:')
+        if stats.get('pending', 0)>0 or stats.get('leased', 0)>0:
+            trace_func(f'[coordinator] {save_dir}, not complete: {stats}')
+            continue
+        summaries[save_dir] = {'done': stats.get('done', 0), 'failed': stats.get('failed', 0), 'pending': 0}
+        write_complete_marker(save_dir, summaries[save_dir])
+        trace_func(f'[coordinator] {save_dir}, complete: {summaries[save_dir]}')
+    return summaries
+
+class DistributedWorker:
+    """
+    work queue에서 작업을 가져와 크롤링하고, 결과를 저장한 뒤 완료를 보고하는 worker.
+
+    worker마다 자신의 프록시 풀과 extractor를 가지며, 한 번에 가져간 작업의 리뷰는 저장폴더별로
+    'review_{worker_id}_{n}.parquet' 파일 하나에 저장된다. 상품순위는 검색결과의 순위(`rank`)를 사용한다.
+    """
+
+    def __init__(self,
+                 queue: WorkQueue,
+                 worker_id: str|None = None,
+                 max_workers: int = os.cpu_count()//2,
+                 batch_size: int = LEASE_BATCH_SIZE,
+                 lease_seconds: float = LEASE_SECONDS,
+                 trace_func: Callable = print,
+                 proxy_pool: ProxyPool|None = None) -> None:
+        """
+        DistributedWorker의 생성자.
+
+        Args:
+            queue (WorkQueue): 작업을 가져올 work queue.
+            worker_id (str|None, optional): worker 이름으로, None이면 '{hostname}-{pid}'. default=None.
+            max_workers (int, optional): 가져간 작업을 동시에 처리할 thread 수. default=os.cpu_count()//2.
+            batch_size (int, optional): 한 번에 가져갈 작업 수. default=LEASE_BATCH_SIZE.
+            lease_seconds (float, optional): 가져간 작업의 lease 시간(초)으로, 한 번에 가져간 작업을 처리하는 시간보다 길어야 한다. default=LEASE_SECONDS.
+            trace_func (Callable, optional): 진행 경과를 출력 할 함수. default=print.
+            proxy_pool (ProxyPool|None, optional): 사용할 프록시 풀. None이면 새로 만든다. default=None.
+        """
+
+        self.queue = queue
+        self.worker_id = worker_id if worker_id is not None else f'{socket.gethostname()}-{os.getpid()}'
+        self.max_workers = max(max_workers, 1)
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.trace_func = trace_func
+
+        self.proxy_pool = proxy_pool if proxy_pool is not None else ProxyPool(verify=True)
+        self.product_extractor = NaverShoppingExtractor(proxy_pool=self.proxy_pool)
+        self.review_extractor = NaverShoppingReviewExtractor(proxy_pool=self.proxy_pool)
+
+        # 경로 포맷이 '{}'이므로 key가 곧 저장경로이며, 파일이 닫히면 그 파일에 저장된 작업의 완료를 보고한다.
+        self.writer = BufferedParquetWriter('{}', REVIEW_SCHEMA, on_close=self._ack, overwrite=False)
+        self._part = 0
+
+    def run(self, exit_when_drained: bool = True) -> None:
+        """
+        작업을 가져와 처리하는 것을 반복한다.
+
+        Args:
+            exit_when_drained (bool, optional): True이면 queue에 대기 중이거나 진행 중인 작업이 없을 때 종료한다. default=True.
+
+        Returns:
+            None.
+        """
+
+        self.trace_func(f'[worker] {self.worker_id} 시작')
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                units = self.queue.lease(self.worker_id, self.batch_size, self.lease_seconds)
+                if len(units)==0:
+                    if exit_when_drained and self.queue.is_drained():
+                        break
+                    time.sleep(POLL_INTERVAL)
+                    continue
+
+                s = time.time()
+                self._part += 1
+                paths = set(executor.map(self._process, units))
+
+                # 가져간 작업의 리뷰를 모두 저장했으므로 파일을 닫고 완료 보고
+                for path in paths - {None}:
+                    self.writer.finish(path)
+                self.trace_func(f'[worker] {self.worker_id} {len(units)} units, {time.time()-s:.2f}s, {self.queue.stats()}')
+
+        self.writer.close()
+        self.trace_func(f'[worker] {self.worker_id} 종료')
+
+    def _process(self, unit: tuple[int, str, dict]) -> str|None:
+        """작업 하나를 처리하고, 리뷰를 저장한 경로를 반환한다. 리뷰를 저장하지 않은 작업은 바로 완료를 보고한다."""
+
+        id, kind, payload = unit
+        try:
+            if kind=='listing':
+                self._process_listing(payload)
+            elif kind=='product':
+                return self._process_reviews(id, payload, probe=True)
+            elif kind=='review':
+                return self._process_reviews(id, payload, probe=False)
+            else:
+                raise ValueError(f'unknown unit kind: {kind}')
+        except Exception as e:
+            self.trace_func(f"An error occurred: [{kind}] {payload.get('keyword')}, {e}")
+            if not self.queue.nack(self.worker_id, id, e):
+                self._lost([id])
+            return None
+
+        self._ack(None, [id])
+        return None
+
+    def _ack(self, path: str|None, ids: list[int]) -> None:
+        """작업들의 완료를 보고하고, lease를 잃어 완료되지 않은 작업이 있으면 알린다."""
+
+        ids = list(ids)
+        if self.queue.ack(self.worker_id, ids)<len(ids):
+            self._lost(ids)
+
+    def _lost(self, ids: list[int]) -> None:
+        """lease가 끝나 다른 worker가 다시 가져간 작업으로, 그 worker의 보고를 따르므로 여기서는 기록만 한다."""
+
+        METRICS.inc('errors_total', stage='lease_lost')
+        self.trace_func(f'[worker] {self.worker_id} ids={ids} 중 lease를 잃은 작업이 있습니다.')
+
+    def _process_listing(self, payload: dict) -> None:
+        """상품 페이지를 크롤링하여 저장하고, 상품별 product 작업을 넣는다."""
+
+        keyword, page, save_dir = payload['keyword'], payload['page'], payload['save_dir']
+
+        response = self.product_extractor.crawl(keyword, page)
+        products_info = add_keyword_column(pa.Table.from_batches([product_response_to_data(response, page)]), keyword)
+
+        os.makedirs(save_dir, exist_ok=True)
+        pq.write_table(products_info, f'{save_dir}product_page{page}.parquet')
+
+        self.queue.put([
+            (
+                'product',
+                f'product:{save_dir}:{task.product_ranking}',
+                {
+                    'keyword': keyword,
+                    'rank': task.product_ranking,
+                    'review_args': list(task.review_args),
+                    'review_count': task.review_count,
+                    'save_dir': save_dir,
+                    'max_review_page': payload['max_review_page'],
+                },
+            )
+            for task in get_review_tasks(preprocess_products_info(products_info))
+        ])
+
+    def _process_reviews(self, id: int, payload: dict, probe: bool) -> str:
+        """
+        리뷰페이지를 크롤링하여 writer에 넣는다.
+        probe이면 첫번째 리뷰페이지를 크롤링하여 마지막 리뷰페이지를 탐색(reviewCount를 알면 그 값으로 계산)하고, 나머지 페이지의 review 작업을 넣는다.
+        첫번째 리뷰페이지의 리뷰가 20개보다 적으면 나머지 페이지는 넣지 않는다.
+        """
+
+        rank, save_dir, review_args = payload['rank'], payload['save_dir'], tuple(payload['review_args'])
+        page = 1 if probe else payload['page']
+
+        response = self.review_extractor.crawl(*review_args, page)
+        json_data = response.json()
+
+        if probe:
+            last_page = plan_last_page(payload.get('review_count'), payload['max_review_page'])
+            if last_page is None:
+                last_page = min(json_data['totalPages'], 1000, payload['max_review_page']) # 최대 1,000페이지까지만 크롤링 가능
+            if len(json_data.get('contents') or [])<REVIEW_PAGE_SIZE:
+                last_page = 1
+            self.queue.put([
+                ('review', f'review:{save_dir}:{rank}:{p}', {**payload, 'page':p})
+                for p in range(2,last_page+1)
+            ])
+
+        path = f'{save_dir}review_{self.worker_id}_{self._part}.parquet'
+        self.writer.write(path, reviews_to_record_batch(json_data['contents'], rank, (page-1)*REVIEW_PAGE_SIZE+1), tag=id)
+        return path
@@ -2,7 +2,14 @@
 네이버쇼핑 리뷰데이터 수집과 관련하여, 파이프라인 함수와 클래스를 제공한다.
 
 클래스 목록
+1. `NaverShoppingReviewGetter`
+    네이버쇼핑 리뷰데이터를 수집한다.
 
+함수 목록
+1. `run_async`
+    여러 키워드의 NaverShoppingReviewGetter를 하나의 asyncio 엔진으로 실행하여, 모든 키워드의 상품 페이지와 리뷰페이지를 동시에 크롤링한다.
+2. `run_stream`
+    여러 키워드의 NaverShoppingReviewGetter를 list → discover → fetch → parse → write stage 파이프라인으로 실행한다.
 """
 
 # root경로를 추가
@@ -13,11 +20,20 @@ sys.path.append(os.path.abspath(''))
 from lib.python.log import get_logger
 
 # crawling
-from crawling.naver_shopping_review.utils.crawl import get_products_info, get_reviews
+from crawling.naver_shopping_review.utils.crawl import get_products_info, get_reviews, get_new_reviews, get_review_tasks, preprocess_products_info
+from crawling.naver_shopping_review.utils import ProxyPool
+from crawling.naver_shopping_review.utils.extractor import NaverShoppingExtractor, NaverShoppingReviewExtractor
+from crawling.naver_shopping_review.utils.engine import AsyncReviewEngine, KeywordJob
+from crawling.naver_shopping_review.utils.stages import StreamingReviewEngine, DISCOVER_WORKERS, PARSE_WORKERS, QUEUE_SIZE, LIST_WORKERS
+from crawling.naver_shopping_review.utils.checkpoint import CheckpointManifest
+from crawling.naver_shopping_review.utils.cache import ResponseCache
 
 # default
 import datetime
+import glob
 import logging
+import shutil
+import pyarrow.parquet as pq
 
 # 기본과 라이브러리의 로거를 가져와서 로그 레벨을 재설정
 logging.getLogger("requests").setLevel(logging.WARNING)
@@ -28,7 +44,7 @@ logging.getLogger("seleniumwire").setLevel(logging.WARNING)
 class NaverShoppingReviewGetter:
     """네이버쇼핑 리뷰데이터를 수집한다."""
     
-    def __init__(self, keyword: str, n_page: int, max_review_page: int = 100, max_workers: int = os.cpu_count()//2) -> None:
+    def __init__(self, keyword: str, n_page: int, max_review_page: int = 100, max_workers: int = os.cpu_count()//2, engine: str = 'thread', partition_by: str = 'product', resume: bool = False, incremental: bool = False, proxy_pool: ProxyPool|None = None, cache: ResponseCache|None = None) -> None:
         """
         NaverShoppingReviewGetter의 생성자.
         
@@ -37,14 +53,34 @@ class NaverShoppingReviewGetter:
             n_page (int): 수집 대상 페이지수.
             max_review_page (int, optional): 리뷰를 가져올 최대 페이지 수로, 1000을 넘길 수 없다. default=100.
             max_workers (int, optional): 병렬 처리를 위한 최대 worker의 수. default=os.cpu_count()//2.
+            engine (str, optional): 리뷰 크롤링 엔진으로, 'thread'(상품별 ThreadPoolExecutor), 'async'(전역 asyncio 요청 풀),
+                'stream'(list → discover → fetch → parse → write stage 파이프라인) 중 하나. default='thread'.
+            partition_by (str, optional): 리뷰 파일의 저장단위로, 'product'(상품별 파일) 또는 'keyword'(키워드별 파일) 중 하나. default='product'.
+            resume (bool, optional): True이면 같은 설정의 가장 최근 저장폴더를 이어서 사용하고, checkpoint에서 완료된 리뷰페이지는 건너뛴다.
+                이전 실행이 쓰는 중에 종료된 리뷰 파일은 저장폴더의 '.unfinished/'로 옮긴다. False이면 오늘자 저장폴더를 지우고 새로 수집한다. default=False.
+            incremental (bool, optional): True이면 리뷰를 최신순으로 가져오면서, 이전 실행에서 수집한 리뷰에 도달하면 중단하여
+                새로운 리뷰만 저장한다. 이전 실행의 리뷰는 다시 수집하지 않으므로, 오늘자 저장폴더를 지우거나 기존 리뷰 파일을 덮어쓰지 않는다.
+                engine='thread'에서만 사용할 수 있다. default=False.
+            proxy_pool (ProxyPool|None, optional): 사용할 프록시 풀로, 여러 키워드의 getter에 같은 풀을 넣으면 프록시 목록을 다시 가져오지 않는다.
+                None이면 새로 만든다. default=None.
+            cache (ResponseCache|None, optional): 상품 페이지와 리뷰페이지 응답을 재사용할 응답 캐시로, 여러 키워드의 getter에 같은 캐시를 넣으면
+                키워드 사이에 겹치는 상품의 리뷰페이지는 한 번만 요청한다. incremental이면 리뷰페이지에는 사용하지 않는다.
+                None이면 캐시를 사용하지 않는다. default=None.
         """
         
         assert max_review_page<=1000, "maximum review page is 1000."
+        assert engine in ('thread','async','stream'), "engine must be one of ('thread','async','stream')."
+        assert partition_by in ('product','keyword'), "partition_by must be one of ('product','keyword')."
+        assert not (incremental and engine!='thread'), "incremental mode supports engine='thread' only."
 
         self.keyword = keyword
         self.n_page = n_page
         self.max_review_page = max_review_page
         self.max_workers = max_workers
+        self.engine = engine
+        self.partition_by = partition_by
+        self.resume = resume
+        self.incremental = incremental
 
         self.start_datetime = datetime.datetime.now()
 
@@ -56,25 +92,212 @@ class NaverShoppingReviewGetter:
         self.logger = get_logger(save_path=self.log_path)
         self.trace_func = self.logger.info
 
-        # 리뷰 저장경로
+        # 리뷰 저장경로 (resume이면 같은 설정의 가장 최근 저장폴더를 이어서 사용)
         self.save_dir = f'crawling/naver_shopping_review/.result/{nowdate}_{keyword}_{n_page}_{max_review_page}/'
-        os.system(f'rm -rf {self.save_dir}')
+        if resume:
+            # 'YYYYMMDD_' 접두어로 고정하여, '{다른키워드}_{keyword}'처럼 끝이 같은 키워드의 저장폴더는 가져오지 않는다.
+            save_dirs = sorted(glob.glob(f'crawling/naver_shopping_review/.result/{"[0-9]"*8}_{glob.escape(keyword)}_{n_page}_{max_review_page}/'))
+            if len(save_dirs)>0:
+                self.save_dir = save_dirs[-1]
+        elif not incremental:
+            # incremental은 이전 실행에서 수집한 리뷰를 high-water mark로 건너뛰므로, 저장폴더를 지우면 그 리뷰를 잃는다.
+            shutil.rmtree(self.save_dir, ignore_errors=True)
 
         self.product_save_path_format = self.save_dir + 'product_page{}.parquet'
-        self.review_save_path_format = self.save_dir + 'review_product{}_page{}.parquet'
+        self.review_save_path_format = self.save_dir + ('review_product{}.parquet' if partition_by=='product' else 'review_product_all.parquet')
         os.makedirs(self.save_dir, exist_ok=True)
 
+        # (상품순위, 리뷰페이지) 단위의 수집 결과 기록
+        self.checkpoint = CheckpointManifest(self.save_dir + 'checkpoint.sqlite')
+        if resume and not incremental:
+            self.quarantine_unfinished()
+
+        # 상품정보, 리뷰 extractor는 하나의 프록시 풀을 공유한다.
+        self.proxy_pool = proxy_pool if proxy_pool is not None else ProxyPool(verify=True)
+        # 응답 캐시도 공유하며, incremental은 새로운 리뷰를 확인해야 하므로 리뷰페이지에는 캐시를 사용하지 않는다.
+        self.cache = cache
+        self.product_extractor = NaverShoppingExtractor(proxy_pool=self.proxy_pool, cache=cache)
+        self.review_extractor = NaverShoppingReviewExtractor(proxy_pool=self.proxy_pool, cache=None if incremental else cache)
+
+    def quarantine_unfinished(self):
+        """
+        이전 실행이 쓰는 중에 종료되어 checkpoint에 완료로 기록되지 않은 리뷰 파일을 저장폴더의 '.unfinished/'로 옮긴다.
+        이 파일의 리뷰페이지는 다시 수집되므로, 옮기지 않으면 reader와 compact에서 footer가 없는 파일이나 중복된 리뷰를 읽게 된다.
+        """
+
+        done = {os.path.normpath(path) for path in self.checkpoint.paths()}
+        unfinished = [path for path in sorted(glob.glob(self.save_dir + 'review_*.parquet')) if os.path.normpath(path) not in done]
+        if len(unfinished)==0:
+            return
+
+        quarantine_dir = self.save_dir + '.unfinished/'
+        os.makedirs(quarantine_dir, exist_ok=True)
+        for path in unfinished:
+            os.replace(path, quarantine_dir + f'{int(self.start_datetime.timestamp())}_' + os.path.basename(path))
+        self.trace_func(f'[resume] 완료되지 않은 리뷰 파일 {len(unfinished)}개를 {quarantine_dir}로 옮겼습니다.')
+
+    def requeue_dead_letters(self, records: list[dict]) -> int:
+        """
+        재시도를 포기한 리뷰페이지 요청(dead-letter) 중 이 저장폴더의 상품에 해당하는 페이지를 checkpoint에 실패로 기록하여, 이어서 수집할 때 다시 수집한다.
+        프로세스가 dead-letter를 기록한 뒤 checkpoint에 기록하기 전에 종료되었거나, 마지막 리뷰페이지 탐색이 실패한 상품도 다시 수집된다.
+
+        Args:
+            records (list[dict]): `DeadLetterLog.load`로 가져온 기록 리스트.
+
+        Returns:
+            list[dict]: 다시 수집하기로 한 기록 리스트로, `DeadLetterLog.discard`로 dead-letter에서 지운다.
+        """
+
+        product_save_path = self.product_save_path_format.format(self.n_page)
+        if self.incremental or not os.path.exists(product_save_path):
+            return []
+
+        # 리뷰 API 인자(checkoutMerchantNo, mallProductId, originProductNo, mallPcUrl)로 상품순위를 찾는다.
+        ranks = {
+            tuple(str(arg) for arg in task.review_args): task.product_ranking
+            for task in get_review_tasks(preprocess_products_info(pq.read_table(product_save_path)))
+        }
+
+        requeued = []
+        for record in records:
+            if record['func']!='NaverShoppingReviewExtractor.crawl' or len(record['args'])<4:
+                continue
+            # 리뷰페이지는 위치 인자 또는 keyword 인자(page=...)로 전달된다.
+            page = record['args'][4] if len(record['args'])>=5 else (record.get('kwargs') or {}).get('page')
+            rank = ranks.get(tuple(str(arg) for arg in record['args'][:4]))
+            if rank is not None and page is not None:
+                self.checkpoint.mark_failed(rank, int(page), record['error'])
+                requeued.append(record)
+        if len(requeued)>0:
+            self.trace_func(f'[resume] dead-letter 리뷰페이지 {len(requeued)}개를 다시 수집합니다.')
+        return requeued
+
+    def run_products(self):
+        """
+        상품정보를 수집하여 저장하고, 수집한 상품정보를 반환한다.
+        resume이면서 저장된 상품정보가 있으면, 상품순위가 바뀌지 않도록 다시 수집하지 않고 저장된 상품정보를 사용한다.
+        """
+
+        products_info = self.load_products()
+        if products_info is not None:
+            return products_info
+
+        products_info = get_products_info(self.keyword, self.n_page, self.trace_func, self.product_extractor, min(self.max_workers, self.n_page))
+        self.save_products(products_info)
+
+        return products_info
+
+    def load_products(self):
+        """resume이면서 저장된 상품정보가 있으면 불러오고, 없으면 None을 반환한다."""
+
+        product_save_path = self.product_save_path_format.format(self.n_page)
+        if self.resume and os.path.exists(product_save_path):
+            self.trace_func(f'[resume] {self.save_dir}, {self.checkpoint.summary()}')
+            return pq.read_table(product_save_path)
+        return None
+
+    def save_products(self, products_info):
+        """수집한 상품정보를 저장한다."""
+
+        pq.write_table(products_info, self.product_save_path_format.format(self.n_page))
+
+    def run_reviews(self, products_info):
+        """입력된 상품정보에 대해 설정된 엔진으로 리뷰정보를 수집한다."""
+
+        if self.incremental:
+            # high-water mark는 수집일자를 뺀 저장폴더 이름으로 나누어, 다른 키워드나 설정의 저장폴더에 저장한 리뷰를 건너뛰지 않는다.
+            scope = f'{self.keyword}_{self.n_page}_{self.max_review_page}'
+            get_new_reviews(products_info, self.review_save_path_format, self.max_review_page, self.trace_func, self.max_workers, extractor=self.review_extractor, scope=scope, checkpoint=self.checkpoint)
+        elif self.engine=='async':
+            engine = AsyncReviewEngine(self.review_extractor, self.max_workers, self.trace_func, self.product_extractor)
+            engine.run([(products_info, self.review_save_path_format, self.checkpoint)], self.max_review_page)
+        elif self.engine=='stream':
+            engine = StreamingReviewEngine(self.review_extractor, self.max_workers, self.trace_func, self.product_extractor)
+            engine.run_keywords([KeywordJob(self.keyword, self.review_save_path_format, self.checkpoint, products_info)], self.n_page, self.max_review_page)
+        else:
+            get_reviews(products_info, self.review_save_path_format, self.max_review_page, self.trace_func, self.max_workers, self.checkpoint, self.review_extractor)
+
     def run(self):
+        # stream 엔진은 상품정보 수집과 리뷰정보 수집을 단계별로 나누지 않고 동시에 진행한다.
+        if self.engine=='stream':
+            return run_stream([self])
+
         # 상품정보 수집
-        products_info = get_products_info(self.keyword, self.n_page, self.trace_func)
-        products_info.to_parquet(self.product_save_path_format.format(self.n_page))
+        products_info = self.run_products()
 
         # 리뷰정보 수집
-        get_reviews(products_info, self.review_save_path_format, self.max_review_page, self.trace_func, self.max_workers)
+        self.run_reviews(products_info)
+
+        self.trace_runtime()
+
+    def trace_runtime(self):
+        """실행시간을 출력한다."""
 
         end_datetime = datetime.datetime.now()
         run_time = (end_datetime - self.start_datetime).seconds / 60
 
         self.trace_func(f'[실행시간] {self.start_datetime}')
         self.trace_func(f'[종료시간] {end_datetime}')
-        self.trace_func(f'[실행시간] {run_time:.2f} min')
\ No newline at end of file
+        self.trace_func(f'[실행시간] {run_time:.2f} min')
+        self.trace_func(f'[checkpoint] {self.checkpoint.summary()}')
+        if self.cache is not None:
+            self.trace_func(f'[cache] {self.cache.stats()}')
+
+def run_async(getters: list[NaverShoppingReviewGetter]) -> None:
+    """
+    여러 키워드의 NaverShoppingReviewGetter를 하나의 asyncio 엔진으로 실행하여, 모든 키워드의 상품 페이지와 리뷰페이지를 동시에 크롤링한다.
+    상품 페이지가 파싱되는 즉시 그 페이지의 상품들의 리뷰 크롤링이 시작되며, 모든 키워드가 첫번째 getter의 extractor와 프록시 풀을 공유한다.
+
+    Args:
+        getters (list[NaverShoppingReviewGetter]): 키워드별 NaverShoppingReviewGetter로 이루어진 리스트.
+            동시 요청 수, 상품 페이지 수, 최대 리뷰페이지 수는 첫번째 getter의 설정을 따른다.
+
+    Returns:
+        None.
+    """
+
+    jobs = [
+        KeywordJob(getter.keyword, getter.review_save_path_format, getter.checkpoint, getter.load_products(), getter.save_products)
+        for getter in getters
+    ]
+
+    engine = AsyncReviewEngine(getters[0].review_extractor, getters[0].max_workers, getters[0].trace_func, getters[0].product_extractor)
+    engine.run_keywords(jobs, getters[0].n_page, getters[0].max_review_page)
+
+    for getter in getters:
+        getter.trace_runtime()
+
+def run_stream(getters: list[NaverShoppingReviewGetter],
+               discover_workers: int|None = DISCOVER_WORKERS,
+               parse_workers: int = PARSE_WORKERS,
+               queue_size: int = QUEUE_SIZE,
+               list_workers: int = LIST_WORKERS) -> None:
+    """
+    여러 키워드의 NaverShoppingReviewGetter를 list → discover → fetch → parse → write stage 파이프라인으로 실행한다.
+    stage마다 worker 수와 bounded queue가 있어, 느린 stage가 앞 stage를 막거나 메모리를 무한정 사용하지 않는다.
+
+    Args:
+        getters (list[NaverShoppingReviewGetter]): 키워드별 NaverShoppingReviewGetter로 이루어진 리스트.
+            fetch worker 수(max_workers), 상품 페이지 수, 최대 리뷰페이지 수는 첫번째 getter의 설정을 따른다.
+        discover_workers (int|None, optional): 상품별 마지막 리뷰페이지를 탐색할 worker 수로, None이면 fetch worker 수와 같다. default=DISCOVER_WORKERS.
+        parse_workers (int, optional): 리뷰 JSON을 파싱할 worker 수. default=PARSE_WORKERS.
+        queue_size (int, optional): stage 사이 queue의 최대 항목 수. default=QUEUE_SIZE.
+        list_workers (int, optional): 상품 페이지를 크롤링할 worker 수. default=LIST_WORKERS.
+
+    Returns:
+        None.
+    """
+
+    jobs = [
+        KeywordJob(getter.keyword, getter.review_save_path_format, getter.checkpoint, getter.load_products(), getter.save_products)
+        for getter in getters
+    ]
+
+    engine = StreamingReviewEngine(
+        getters[0].review_extractor, getters[0].max_workers, getters[0].trace_func, getters[0].product_extractor,
+        discover_workers, parse_workers, queue_size, list_workers,
+    )
+    engine.run_keywords(jobs, getters[0].n_page, getters[0].max_review_page)
+
+    for getter in getters:
+        getter.trace_runtime()
\ No newline at end of file
@@ -3,10 +3,20 @@ import os, sys
 sys.path.append(os.path.abspath(''))
 
 # crawling
-from crawling.naver_shopping_review.pipeline import NaverShoppingReviewGetter
+from crawling.naver_shopping_review.pipeline import NaverShoppingReviewGetter, run_async, run_stream
+from crawling.naver_shopping_review.utils import ProxyPool, NoProxyPool
+from crawling.naver_shopping_review.utils.stages import DISCOVER_WORKERS, PARSE_WORKERS, QUEUE_SIZE, LIST_WORKERS
+from crawling.naver_shopping_review.utils.workqueue import open_queue
+from crawling.naver_shopping_review.utils.cache import ResponseCache, CACHE_TTL, CACHE_MAX_BYTES
+from crawling.naver_shopping_review.utils.metrics import MetricsReporter, start_prometheus_server, REPORT_INTERVAL
+from crawling.naver_shopping_review.utils.retry import RETRY_POLICY, DeadLetterLog, MAX_ATTEMPTS, DEAD_LETTER_PATH
+from crawling.naver_shopping_review.distributed import DistributedWorker, enqueue_keywords, wait_until_drained, mark_complete
+from crawling.naver_shopping_review.utils.extractor import SEARCH_URL, REVIEW_URL
 
 # default
 import argparse
+import atexit
+import datetime
 
 # set the argument parser
 parser = argparse.ArgumentParser(description="Naver Shopping Review Crawling")
@@ -14,6 +24,27 @@ parser.add_argument('--keywords', type=str, help="크롤링을 원하는 키워
 parser.add_argument('--n_page', type=int, default=1, help="크롤링을 원하는 상품의 페이지 수를 입력하세요.")
 parser.add_argument('--max_review_page', type=int, default=1, help="크롤링을 원하는 리뷰의 최대 페이지 수를 입력하세요.")
 parser.add_argument('--max_workers', type=int, default=os.cpu_count()//2, help="병렬 처리를 위한 최대 worker의 개수를 입력하세요.")
+parser.add_argument('--partition_by', type=str, default='product', choices=['product','keyword'], help="리뷰 파일의 저장단위를 입력하세요. 'product'는 상품별, 'keyword'는 키워드별로 하나의 Parquet 파일에 저장합니다.")
+parser.add_argument('--engine', type=str, default='thread', choices=['thread','async','stream'], help="리뷰 크롤링 엔진을 입력하세요. 'async'는 모든 키워드의 상품 페이지와 리뷰페이지 요청을 하나의 전역 요청 풀로 동시에 처리합니다. 'stream'은 list → discover → fetch → parse → write stage를 bounded queue로 연결하여 처리합니다.")
+parser.add_argument('--list_workers', type=int, default=LIST_WORKERS, help="[stream] 상품 페이지를 크롤링할 worker의 개수를 입력하세요.")
+parser.add_argument('--discover_workers', type=int, default=DISCOVER_WORKERS, help="[stream] 상품별 마지막 리뷰페이지를 탐색할 worker의 개수를 입력하세요. 입력하지 않으면 max_workers와 같습니다.")
+parser.add_argument('--parse_workers', type=int, default=PARSE_WORKERS, help="[stream] 리뷰 JSON을 파싱할 worker의 개수를 입력하세요.")
+parser.add_argument('--queue_size', type=int, default=QUEUE_SIZE, help="[stream] stage 사이 queue의 최대 항목 수를 입력하세요.")
+parser.add_argument('--role', type=str, default='local', choices=['local','coordinator','worker'], help="실행 역할을 입력하세요. 'coordinator'는 작업을 queue에 넣고 완료될 때까지 기다리며, 'worker'는 queue의 작업을 가져와 크롤링합니다.")
+parser.add_argument('--queue', type=str, default='sqlite://crawling/naver_shopping_review/.queue/queue.sqlite', help="[coordinator/worker] 분산 크롤링에 사용할 work queue의 URL을 입력하세요.")
+parser.add_argument('--worker_id', type=str, default=None, help="[worker] worker 이름을 입력하세요. 입력하지 않으면 '{hostname}-{pid}'를 사용합니다.")
+parser.add_argument('--incremental', action='store_true', help="리뷰를 최신순으로 가져오면서, 이전 실행에서 수집한 리뷰에 도달하면 중단하여 새로운 리뷰만 수집합니다. (engine='thread')")
+parser.add_argument('--cache_ttl', type=float, default=CACHE_TTL, help="응답 캐시의 유효시간(초)을 입력하세요. 같은 날 다시 실행하거나 여러 키워드에서 같은 상품이 검색되면 캐시된 응답을 사용합니다. 0이면 캐시를 사용하지 않습니다.")
+parser.add_argument('--cache_max_mb', type=int, default=CACHE_MAX_BYTES//1024**2, help="응답 캐시의 최대 크기(MB)를 입력하세요. 넘으면 가장 오래 사용하지 않은 응답부터 삭제합니다.")
+parser.add_argument('--metrics_path', type=str, default=None, help="metrics snapshot을 추가할 JSON Lines 파일 경로를 입력하세요. 입력하지 않으면 '.logs/crawling_naver_review_metrics_{실행시간}.jsonl'에 저장합니다.")
+parser.add_argument('--metrics_interval', type=float, default=REPORT_INTERVAL, help="metrics snapshot을 추가하는 간격(초)을 입력하세요.")
+parser.add_argument('--metrics_port', type=int, default=0, help="Prometheus text 형식으로 metrics를 내보낼 HTTP 포트를 입력하세요. 0이면 열지 않습니다.")
+parser.add_argument('--max_attempts', type=int, default=MAX_ATTEMPTS, help="요청별 최대 시도 횟수를 입력하세요. 넘으면 재시도를 포기하고 dead-letter 파일에 기록합니다.")
+parser.add_argument('--dead_letter_path', type=str, default=DEAD_LETTER_PATH, help="재시도를 포기한 요청을 기록할 JSON Lines 파일 경로를 입력하세요.")
+parser.add_argument('--no_proxy', action='store_true', help="프록시 없이 직접 요청합니다. (로컬 mock 서버 벤치마크 등)")
+parser.add_argument('--search_url', type=str, default=SEARCH_URL, help="상품 검색결과 페이지 URL을 입력하세요. (로컬 mock 서버 벤치마크 등)")
+parser.add_argument('--review_url', type=str, default=REVIEW_URL, help="리뷰 API URL을 입력하세요. (로컬 mock 서버 벤치마크 등)")
+parser.add_argument('--resume', action='store_true', help="중단된 크롤링을 이어서 진행합니다. 같은 설정의 가장 최근 저장폴더에서, 완료되지 않은 리뷰페이지와 재시도를 포기했던(dead-letter) 리뷰페이지만 수집합니다. coordinator는 실패한 작업을 다시 넣습니다.")
 
 # get argument from argment parset
 args = parser.parse_args()
@@ -21,11 +52,91 @@ keywords = args.keywords
 n_page = args.n_page
 max_review_page = args.max_review_page
 max_workers = args.max_workers
+engine = args.engine
+partition_by = args.partition_by
+resume = args.resume
+incremental = args.incremental
+list_workers = args.list_workers
+discover_workers = args.discover_workers
+parse_workers = args.parse_workers
+queue_size = args.queue_size
+role = args.role
+queue_url = args.queue
+worker_id = args.worker_id
+cache_ttl = args.cache_ttl
+cache_max_mb = args.cache_max_mb
+metrics_path = args.metrics_path or f'.logs/crawling_naver_review_metrics_{datetime.datetime.now().strftime("%Y%m%d_%H%M%S")}.jsonl'
+metrics_interval = args.metrics_interval
+metrics_port = args.metrics_port
+no_proxy = args.no_proxy
+max_attempts = args.max_attempts
+dead_letter_path = args.dead_letter_path
+search_url = args.search_url
+review_url = args.review_url
+
+def set_urls(obj) -> None:
+    """getter 또는 worker의 extractor가 요청할 URL을 바꾼다."""
+
+    obj.product_extractor.url = search_url
+    obj.review_extractor.url = review_url
 
 # run
 if __name__=='__main__':
+    # metrics : 일정 간격으로 snapshot을 파일에 추가하고, 종료할 때 마지막 snapshot을 추가한다.
+    reporter = MetricsReporter(metrics_path, metrics_interval)
+    reporter.start()
+    atexit.register(reporter.stop)
+    if metrics_port>0:
+        start_prometheus_server(metrics_port)
+
+    # 모든 extractor가 공유하는 재시도 정책
+    RETRY_POLICY.max_attempts = max_attempts
+    RETRY_POLICY.dead_letter = DeadLetterLog(dead_letter_path)
+
+    # resume이면 재시도를 포기했던 요청을 가져와서 다시 수집하고, 다시 수집하는 요청만 dead-letter에서 지운다(다시 실패하면 새로 기록된다).
+    dead_letters = RETRY_POLICY.dead_letter.load() if resume and role=='local' else []
+    if len(dead_letters)>0:
+        print(f'[resume] dead-letter {len(dead_letters)}개를 불러왔습니다.')
+
+    # 분산 크롤링 : coordinator는 작업을 넣고 기다리며, worker는 작업이 없어질 때까지 크롤링한다.
+    if role=='coordinator':
+        keywords = keywords.replace(' ','').split(',')
+        queue = open_queue(queue_url)
+        save_dirs = enqueue_keywords(queue, keywords, n_page, max_review_page)
+        print(f'[coordinator] {save_dirs}')
+        if resume:
+            # 재시도를 포기하여 실패한 작업을 다시 대기 상태로 둔다.
+            print(f'[coordinator] 실패한 작업 {queue.requeue_failed()}개를 다시 넣었습니다.')
+        wait_until_drained(queue)
+        mark_complete(queue, list(save_dirs.values()))
+        sys.exit(0)
+    elif role=='worker':
+        worker = DistributedWorker(open_queue(queue_url), worker_id, max_workers, proxy_pool=NoProxyPool() if no_proxy else None)
+        set_urls(worker)
+        worker.run()
+        sys.exit(0)
+
     keywords = keywords.replace(' ','').split(',')
-    for i, keyword in enumerate(keywords):
-        getter = NaverShoppingReviewGetter(keyword, n_page, max_review_page, max_workers)
-        getter.trace_func(f'[{str(i+1).zfill(len(str(len(keywords))))}/{len(keywords)}] {keyword}')
-        getter.run()
\ No newline at end of file
+
+    # 모든 키워드가 하나의 프록시 풀을 공유한다. 프록시 목록은 백그라운드에서 가져오므로, 그동안 getter를 만들고 첫 요청을 준비한다.
+    proxy_pool = NoProxyPool() if no_proxy else ProxyPool(verify=True)
+
+    # 모든 키워드가 하나의 응답 캐시를 공유하여, 키워드 사이에 겹치는 상품의 리뷰페이지는 한 번만 요청한다.
+    cache = ResponseCache(ttl=cache_ttl, max_bytes=cache_max_mb*1024**2) if cache_ttl>0 else None
+    if engine in ('async','stream'):
+        getters = [NaverShoppingReviewGetter(keyword, n_page, max_review_page, max_workers, engine, partition_by, resume, incremental, proxy_pool, cache) for keyword in keywords]
+        for getter in getters:
+            set_urls(getter)
+            RETRY_POLICY.dead_letter.discard(getter.requeue_dead_letters(dead_letters))
+        getters[0].trace_func(f'[{len(keywords)}] {",".join(keywords)}')
+        if engine=='async':
+            run_async(getters)
+        else:
+            run_stream(getters, discover_workers, parse_workers, queue_size, list_workers)
+    else:
+        for i, keyword in enumerate(keywords):
+            getter = NaverShoppingReviewGetter(keyword, n_page, max_review_page, max_workers, engine, partition_by, resume, incremental, proxy_pool, cache)
+            set_urls(getter)
+            RETRY_POLICY.dead_letter.discard(getter.requeue_dead_letters(dead_letters))
+            getter.trace_func(f'[{str(i+1).zfill(len(str(len(keywords))))}/{len(keywords)}] {keyword}')
+            getter.run()
\ No newline at end of file
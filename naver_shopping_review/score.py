@@ -0,0 +1,260 @@
+"""
+네이버쇼핑 리뷰데이터 수집과 관련하여, 수집한 리뷰를 `modeling.ipynb`에서 학습한 분류모델로 CPU에서 분류하여 저장하는 함수를 제공한다.
+
+- 입력 : `.result/`의 실행폴더(source='runs') 또는 `compact.py`로 합친 데이터셋(source='dataset')의 리뷰를 `ReviewReader`로 chunk_size개 이하씩 읽는다.
+- 분류 단위 : unit='topic'이면 리뷰의 토픽별 문장(`utils.topics`)을, unit='review'이면 리뷰 본문 전체를 분류한다.
+- 저장 : `.scores/{checkpoint 이름}/part-*.parquet`에 chunk마다 저장하며, 이미 저장된 리뷰 id는 다시 분류하지 않는다(`ScoreCache`).
+  토픽이 없거나 본문이 비어있는 리뷰도 label=null로 저장하여, 다시 실행할 때 건너뛴다.
+
+함수 목록
+1. `score`
+    리뷰를 분류하여 저장하고, 저장한 행 수를 반환한다.
+
+클래스 목록
+1. `ScoreCache`
+    모델별 점수 폴더의 part 파일에 저장된 리뷰 id를 가지고 있다가, 이미 분류한 리뷰를 제외하고 새로운 점수를 저장한다.
+
+실행 예시
+```
+python crawling/naver_shopping_review/score.py --checkpoint crawling/naver_shopping_review/.model_checkpoints/checkpoint-594 --keywords 유산균 --backend onnx --quantize --n_workers 2
+```
+"""
+
+# root경로를 추가
+import os, sys
+sys.path.append(os.path.abspath(''))
+
+# crawling
+from crawling.naver_shopping_review.compact import DATASET_DIR, RESULT_DIR
+from crawling.naver_shopping_review.utils.inference import MAX_TOKENS, ReviewClassifier
+from crawling.naver_shopping_review.utils.reader import MAX_MEMORY, ReviewReader
+from crawling.naver_shopping_review.utils.topics import extract_topic_sentences
+
+# default
+from typing import Callable
+import argparse
+import datetime
+import glob
+import time
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# global setting
+SCORE_DIR = 'crawling/naver_shopping_review/.scores/'   # 분류결과 저장폴더로, 모델(checkpoint 이름)별 폴더에 저장한다.
+CHUNK_SIZE = 20_000                                     # 한 번에 읽어서 분류하고 저장할 리뷰 수.
+
+SCORE_SCHEMA = pa.schema([
+    ('id', pa.int64()),             # 리뷰 id
+    ('topicCode', pa.string()),     # 토픽 (unit='review'이면 null)
+    ('topicCodeName', pa.string()),
+    ('sentence', pa.string()),      # 분류한 문장
+    ('label', pa.string()),         # 예측 라벨명 (문장이 없으면 null)
+    ('score', pa.float32()),        # 예측 라벨의 확률
+    ('scored_at', pa.timestamp('s')),
+])
+
+class ScoreCache:
+    """
+    모델별 점수 폴더의 part 파일에 저장된 리뷰 id를 가지고 있다가, 이미 분류한 리뷰를 제외하고 새로운 점수를 저장한다.
+    점수를 part 파일로 저장한 뒤에 id를 추가하므로, 중간에 실패해도 저장되지 않은 리뷰는 다시 분류된다.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        ScoreCache의 생성자로, 저장된 part 파일들의 id 컬럼만 읽는다.
+
+        Args:
+            path (str): 모델별 점수 폴더. ex) '.scores/checkpoint-594/'
+        """
+
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        ids = [pq.read_table(part_path, columns=['id'])['id'] for part_path in self.part_paths()]
+        self._ids = pc.unique(pa.chunked_array(ids, pa.int64())) if len(ids)>0 else pa.array([], pa.int64())
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def part_paths(self) -> list[str]:
+        return sorted(glob.glob(os.path.join(self.path, 'part-*.parquet')))
+
+    def filter(self, batch: pa.RecordBatch|pa.Table) -> pa.Table:
+        """
+        분류하지 않은 리뷰만 남기며, 같은 id가 여러 번 있으면(여러 키워드에서 수집된 리뷰) 처음 나온 행만 남긴다.
+
+        Args:
+            batch (pa.RecordBatch|pa.Table): id 컬럼이 있는 리뷰.
+
+        Returns:
+            pa.Table: 분류하지 않은 리뷰.
+        """
+
+        table = pa.Table.from_batches([batch]) if isinstance(batch, pa.RecordBatch) else batch
+        table = table.filter(pc.and_(pc.is_valid(table['id']), pc.invert(pc.is_in(table['id'], value_set=self._ids))))
+        if table.num_rows==0:
+            return table
+
+        _, first = np.unique(table['id'].to_numpy(), return_index=True)
+        return table.take(pa.array(np.sort(first)))
+
+    def write(self, table: pa.Table) -> str:
+        """
+        점수를 새로운 part 파일로 저장하고, 저장한 리뷰 id를 추가한다.
+
+        Args:
+            table (pa.Table): SCORE_SCHEMA의 점수.
+
+        Returns:
+            str: 저장한 part 파일 경로.
+        """
+
+        path = os.path.join(self.path, f'part-{time.time_ns()}-{os.getpid()}.parquet')
+        tmp_path = os.path.join(self.path, f'.{os.path.basename(path)}.tmp')
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+
+        self._ids = pa.concat_arrays([self._ids, pc.unique(table['id'])])
+        return path
+
+    def read(self) -> pa.Table:
+        """저장된 모든 점수를 읽는다."""
+
+        paths = self.part_paths()
+        return pa.concat_tables([pq.read_table(path) for path in paths]) if len(paths)>0 else SCORE_SCHEMA.empty_table()
+
+def _score_rows(classifier: ReviewClassifier, reviews: pa.Table, unit: str) -> pa.Table:
+    """리뷰를 분류 단위(토픽 문장 또는 리뷰 본문)의 행으로 만들어 분류한다."""
+
+    if unit=='topic':
+        rows = extract_topic_sentences(reviews, columns=['id'], keep_empty=True)
+        topic_code, topic_code_name, sentence = rows['topicCode'], rows['topicCodeName'], rows['topicSentence']
+    elif unit=='review':
+        rows = reviews.select(['id'])
+        topic_code = topic_code_name = pa.nulls(rows.num_rows, pa.string())
+        sentence = reviews['reviewContent']
+    else:
+        raise ValueError(f'unit must be one of [topic, review]: {unit}')
+
+    # 문장이 없는 행은 분류하지 않고 label=null로 저장한다.
+    valid = pc.fill_null(pc.greater(pc.utf8_length(pc.utf8_trim_whitespace(sentence)), 0), False).to_numpy(zero_copy_only=False)
+    rows_valid = np.flatnonzero(valid)
+    pred_labels, pred_scores = classifier.predict(sentence.take(pa.array(rows_valid)).to_pylist())
+
+    labels = np.full(rows.num_rows, None, dtype=object)
+    scores = np.full(rows.num_rows, np.nan, dtype=np.float32)
+    labels[rows_valid] = pred_labels
+    scores[rows_valid] = pred_scores
+
+    return pa.Table.from_arrays([
+        rows['id'],
+        topic_code,
+        topic_code_name,
+        sentence,
+        pa.array(labels, pa.string()),
+        pa.array(scores, pa.float32(), mask=~valid),
+        pa.array(np.full(rows.num_rows, datetime.datetime.now().replace(microsecond=0)), pa.timestamp('s')),
+    ], schema=SCORE_SCHEMA)
+
+def score(checkpoint_dir: str,
+          keywords: list[str]|None = None,
+          source: str = 'runs',
+          unit: str = 'topic',
+          result_dir: str = RESULT_DIR,
+          dataset_dir: str = DATASET_DIR,
+          score_dir: str = SCORE_DIR,
+          chunk_size: int = CHUNK_SIZE,
+          max_memory: int = MAX_MEMORY,
+          trace_func: Callable = print,
+          **classifier_kwargs) -> int:
+    """
+    리뷰를 chunk_size개 이하씩 읽어서, 분류하지 않은 리뷰만 분류하여 `{score_dir}/{checkpoint 이름}/`에 저장한다.
+
+    Args:
+        checkpoint_dir (str): 모델 checkpoint 폴더.
+        keywords (list[str]|None, optional): 분류할 키워드 목록으로, None이면 모든 키워드를 분류한다. default=None.
+        source (str, optional): 'runs'이면 실행폴더, 'dataset'이면 합친 데이터셋의 리뷰를 분류한다. default='runs'.
+        unit (str, optional): 'topic'이면 토픽별 문장, 'review'이면 리뷰 본문을 분류한다. default='topic'.
+        result_dir (str, optional): 실행결과 저장폴더. default=RESULT_DIR.
+        dataset_dir (str, optional): 합친 데이터셋 저장폴더. default=DATASET_DIR.
+        score_dir (str, optional): 분류결과 저장폴더. default=SCORE_DIR.
+        chunk_size (int, optional): 한 번에 읽어서 분류하고 저장할 최대 리뷰 수. default=CHUNK_SIZE.
+        max_memory (int, optional): 리뷰를 읽는 중에 사용할 메모리의 한도(byte)로, 넘지 않도록 chunk 크기를 줄인다. default=MAX_MEMORY.
+        trace_func (Callable, optional): 진행 경과를 출력 할 함수. default=print.
+        **classifier_kwargs: `ReviewClassifier`의 인자. (backend, quantize, n_workers, num_threads, labels, ...)
+
+    Returns:
+        int: 저장한 행 수.
+    """
+
+    cache = ScoreCache(os.path.join(score_dir, os.path.basename(os.path.normpath(checkpoint_dir)), ''))
+    trace_func(f'[score] checkpoint={checkpoint_dir}, cached reviews={len(cache):,}')
+
+    if source not in ('runs', 'dataset'):
+        raise ValueError(f'source must be one of [runs, dataset]: {source}')
+    reader = ReviewReader(
+        result_dir if source=='runs' else dataset_dir,
+        columns=['id','reviewContent','reviewTopics'],
+        keywords=keywords,
+        max_memory=max_memory,
+        batch_size=chunk_size,
+        trace_func=trace_func,
+    )
+    n_reviews = n_rows = n_skipped = 0
+    s = time.time()
+    with ReviewClassifier(checkpoint_dir, **classifier_kwargs) as classifier:
+        for batch in reader:
+            reviews = cache.filter(batch)
+            n_skipped += batch.num_rows - reviews.num_rows
+            if reviews.num_rows==0:
+                continue
+
+            scores = _score_rows(classifier, reviews, unit)
+            cache.write(scores)
+            n_reviews += reviews.num_rows
+            n_rows += scores.num_rows
+
+            elapsed = time.time() - s
+            trace_func(f'[score] reviews={n_reviews:,}, rows={n_rows:,}, skipped={n_skipped:,}, {n_rows/elapsed:,.1f} rows/s')
+
+    trace_func(f'[score] done: reviews={n_reviews:,}, rows={n_rows:,}, skipped={n_skipped:,}, elapsed={time.time()-s:.1f}s')
+    return n_rows
+
+if __name__=='__main__':
+    parser = argparse.ArgumentParser(description="Score crawled reviews with a saved classification checkpoint on CPU")
+    parser.add_argument('--checkpoint', type=str, required=True, help="모델 checkpoint 폴더를 입력하세요.")
+    parser.add_argument('--keywords', type=str, default=None, help="분류할 키워드명을 ','로 나눠서 입력하세요. 입력하지 않으면 모든 키워드를 분류합니다.")
+    parser.add_argument('--source', type=str, default='runs', choices=['runs','dataset'], help="실행폴더(runs) 또는 합친 데이터셋(dataset)의 리뷰를 분류합니다.")
+    parser.add_argument('--unit', type=str, default='topic', choices=['topic','review'], help="토픽별 문장(topic) 또는 리뷰 본문(review)을 분류합니다.")
+    parser.add_argument('--labels', type=str, default=None, help="라벨 번호 순서의 라벨명을 ','로 나눠서 입력하세요. 입력하지 않으면 checkpoint의 id2label을 사용합니다.")
+    parser.add_argument('--backend', type=str, default='torch', choices=['torch','onnx'], help="모델을 실행할 방식을 입력하세요.")
+    parser.add_argument('--quantize', action='store_true', help="int8로 양자화한 모델을 사용합니다.")
+    parser.add_argument('--n_workers', type=int, default=1, help="배치를 처리할 프로세스 수를 입력하세요.")
+    parser.add_argument('--num_threads', type=int, default=None, help="프로세스별 연산 thread 수를 입력하세요. 입력하지 않으면 CPU 코어를 n_workers로 나눕니다.")
+    parser.add_argument('--max_tokens', type=int, default=MAX_TOKENS, help="배치별 최대 토큰 수를 입력하세요.")
+    parser.add_argument('--chunk_size', type=int, default=CHUNK_SIZE, help="한 번에 읽어서 분류하고 저장할 리뷰 수를 입력하세요.")
+    parser.add_argument('--max_memory', type=int, default=MAX_MEMORY, help="리뷰를 읽는 중에 사용할 메모리의 한도(byte)를 입력하세요.")
+    parser.add_argument('--result_dir', type=str, default=RESULT_DIR, help="실행결과 저장폴더를 입력하세요.")
+    parser.add_argument('--dataset_dir', type=str, default=DATASET_DIR, help="합친 데이터셋 저장폴더를 입력하세요.")
+    parser.add_argument('--score_dir', type=str, default=SCORE_DIR, help="분류결과 저장폴더를 입력하세요.")
+    args = parser.parse_args()
+
+    score(
+        args.checkpoint,
+        keywords=args.keywords.replace(' ','').split(',') if args.keywords else None,
+        source=args.source,
+        unit=args.unit,
+        result_dir=args.result_dir,
+        dataset_dir=args.dataset_dir,
+        score_dir=args.score_dir,
+        chunk_size=args.chunk_size,
+        max_memory=args.max_memory,
+        backend=args.backend,
+        quantize=args.quantize,
+        n_workers=args.n_workers,
+        num_threads=args.num_threads,
+        labels=args.labels.split(',') if args.labels else None,
+        max_tokens=args.max_tokens,
+    )
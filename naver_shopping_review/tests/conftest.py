@@ -0,0 +1,24 @@
+"""
+pytest 설정으로, 저장소 root(`crawling/`의 상위 폴더)를 import 경로에 추가하고 공용 fixture를 제공한다.
+
+실행 예시
+```
+python -m pytest crawling/naver_shopping_review/tests
+```
+"""
+
+# root경로를 추가
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
+
+# default
+import pytest
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """저장경로('crawling/naver_shopping_review/.result/' 등)가 실행위치 기준이므로, 임시폴더에서 실행한다."""
+
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,78 @@
+"""`CheckpointManifest`의 상태별 요약, 상품 목록, 실패 기록을 확인한다."""
+
+# crawling
+from crawling.naver_shopping_review.utils.checkpoint import CheckpointManifest, write_complete_marker, read_complete_marker
+
+# default
+import pytest
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    with CheckpointManifest(str(tmp_path / 'checkpoint.sqlite')) as checkpoint:
+        yield checkpoint
+
+def test_summary_pending(checkpoint):
+    assert checkpoint.summary()=={'pending': 0}
+
+    checkpoint.set_last_page(1, 3)
+    checkpoint.set_last_page(2, 2)
+    assert checkpoint.summary()=={'pending': 5}
+
+    checkpoint.mark_done([(1,1), (1,2), (2,1)], 'review_product1.parquet')
+    checkpoint.mark_failed(2, 2, 'blocked')
+    assert checkpoint.summary()=={'done': 3, 'failed': 1, 'pending': 1}
+
+def test_summary_ignores_pages_past_last_page(checkpoint):
+    # 실제 마지막 리뷰페이지가 계획보다 작으면 last_page를 줄이며, 그 뒤의 페이지는 pending을 음수로 만들지 않는다.
+    checkpoint.mark_done([(1,1), (1,2), (1,3)])
+    checkpoint.set_last_page(1, 2)
+    assert checkpoint.summary()=={'done': 3, 'pending': 0}
+
+def test_products(checkpoint):
+    checkpoint.set_last_page(1, 2)
+    checkpoint.mark_failed(3, 1, 'probe failed')
+    checkpoint.mark_done([(5,1)])
+    assert checkpoint.products()=={1, 3, 5}
+
+def test_mark_failed_never_overwrites_done(checkpoint):
+    checkpoint.set_last_page(1, 2)
+    checkpoint.mark_done([(1,1)], 'review_product1.parquet')
+    checkpoint.mark_failed(1, 1, 'late failure')
+    checkpoint.mark_failed(1, 2, 'blocked')
+
+    assert checkpoint.summary()=={'done': 1, 'failed': 1, 'pending': 0}
+    assert checkpoint.pending_pages(1, 2)==[2]
+    assert checkpoint.paths()=={'review_product1.parquet'}
+
+    # 실패한 페이지를 다시 수집하면 완료로 바뀐다.
+    checkpoint.mark_done([(1,2)], 'review_product1.parquet')
+    assert checkpoint.summary()=={'done': 2, 'pending': 0}
+    assert checkpoint.pending_pages(1, 2)==[]
+
+def test_reset_product(checkpoint):
+    checkpoint.set_last_page(1, 2)
+    checkpoint.mark_done([(1,1)])
+    checkpoint.mark_failed(1, 2, 'blocked')
+    checkpoint.set_last_page(2, 1)
+
+    checkpoint.reset_product(1)
+    assert checkpoint.get_last_page(1) is None
+    assert checkpoint.products()=={2}
+    assert checkpoint.summary()=={'pending': 1}
+
+def test_reopen_keeps_records(tmp_path):
+    path = str(tmp_path / 'checkpoint.sqlite')
+    with CheckpointManifest(path) as checkpoint:
+        checkpoint.set_last_page(1, 2)
+        checkpoint.mark_done([(1,1)])
+
+    with CheckpointManifest(path) as checkpoint:
+        assert checkpoint.get_last_page(1)==2
+        assert checkpoint.pending_pages(1, 2)==[2]
+
+def test_complete_marker(tmp_path):
+    save_dir = str(tmp_path) + '/'
+    assert read_complete_marker(save_dir) is None
+
+    write_complete_marker(save_dir, {'done': 10, 'failed': 1, 'pending': 0})
+    assert read_complete_marker(save_dir)=={'done': 10, 'failed': 1, 'pending': 0}
@@ -0,0 +1,141 @@
+"""`find_runs`의 완료 여부 판단(실패, 수집 중, 분산 크롤링)과 `compact`의 중복 제거를 mock 서버의 응답으로 만든 실행폴더로 확인한다."""
+
+# default
+import json
+import os
+import pytest
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+pytest.importorskip('lib.python.crawl')
+
+# crawling
+from crawling.naver_shopping_review.benchmarks.mock_server import MockNaverServer
+from crawling.naver_shopping_review.compact import PARTITIONING, compact, find_runs
+from crawling.naver_shopping_review.utils.cache import CachedResponse
+from crawling.naver_shopping_review.utils.checkpoint import CheckpointManifest, write_complete_marker
+from crawling.naver_shopping_review.utils.crawl import add_keyword_column, get_review_tasks, preprocess_products_info, product_response_to_data
+from crawling.naver_shopping_review.utils.schema import reviews_to_record_batch
+
+KEYWORD = '오메가3'
+REVIEW_PAGES = 2
+
+@pytest.fixture(scope='module')
+def server():
+    # 응답을 만드는 메서드만 사용하므로 서버는 시작하지 않는다.
+    server = MockNaverServer(review_pages=REVIEW_PAGES)
+    yield server
+    server._server.server_close()
+
+def _make_run(server: MockNaverServer, result_dir: str, run: str, checkpoint: bool = True) -> tuple[str, list[int]]:
+    """상품 페이지 하나와 상품별 리뷰 파일을 저장한 실행폴더를 만들고, (저장폴더, 상품순위 리스트)를 반환한다. checkpoint이면 모든 리뷰페이지를 완료로 기록한다."""
+
+    save_dir = os.path.join(result_dir, run, '')
+    os.makedirs(save_dir)
+
+    products_info = add_keyword_column(pa.Table.from_batches([product_response_to_data(CachedResponse(server.search_page(KEYWORD, 1)), 1)]), KEYWORD)
+    pq.write_table(products_info, save_dir + 'product_page1.parquet')
+
+    tasks = get_review_tasks(preprocess_products_info(products_info))
+    for task in tasks:
+        batches = []
+        for page in range(1, REVIEW_PAGES+1):
+            body = json.loads(server.review_page({'page': page, 'originProductNo': task.review_args[2], 'checkoutMerchantNo': task.review_args[0]}))
+            batches.append(reviews_to_record_batch(body['contents'], task.product_ranking, (page-1)*20+1))
+        path = save_dir + f'review_product{task.product_ranking}.parquet'
+        pq.write_table(pa.Table.from_batches(batches), path)
+
+        if checkpoint:
+            with CheckpointManifest(save_dir + 'checkpoint.sqlite') as manifest:
+                manifest.set_last_page(task.product_ranking, REVIEW_PAGES)
+                manifest.mark_done([(task.product_ranking, page) for page in range(1, REVIEW_PAGES+1)], path)
+
+    return save_dir, [task.product_ranking for task in tasks]
+
+def _found(result_dir: str, **kwargs) -> list[str]:
+    return [run['run'] for run in find_runs(result_dir, **kwargs)]
+
+def test_find_runs_complete(server, tmp_path):
+    result_dir = str(tmp_path)
+    _make_run(server, result_dir, f'20240701_{KEYWORD}_1_{REVIEW_PAGES}')
+
+    runs = find_runs(result_dir)
+    assert [run['run'] for run in runs]==[f'20240701_{KEYWORD}_1_{REVIEW_PAGES}']
+    assert runs[0]['keyword']==KEYWORD and runs[0]['date']=='2024-07-01'
+    assert runs[0]['done_pages']==40*REVIEW_PAGES and runs[0]['failed_pages']==0
+
+def test_find_runs_failed(server, tmp_path):
+    result_dir = str(tmp_path)
+    save_dir, ranks = _make_run(server, result_dir, f'20240701_{KEYWORD}_1_{REVIEW_PAGES}')
+    with CheckpointManifest(save_dir + 'checkpoint.sqlite') as checkpoint:
+        checkpoint.reset_product(ranks[0])
+        checkpoint.mark_failed(ranks[0], 1, 'probe failed')
+
+    assert _found(result_dir)==[]
+    runs = find_runs(result_dir, allow_failed=True)
+    assert [run['failed_pages'] for run in runs]==[1]
+
+def test_find_runs_pending(server, tmp_path):
+    result_dir = str(tmp_path)
+    save_dir, ranks = _make_run(server, result_dir, f'20240701_{KEYWORD}_1_{REVIEW_PAGES}')
+
+    # 마지막 리뷰페이지를 늘리면 결과가 기록되지 않은 페이지가 생긴다(수집 중이거나 중단된 실행).
+    with CheckpointManifest(save_dir + 'checkpoint.sqlite') as checkpoint:
+        checkpoint.set_last_page(ranks[0], REVIEW_PAGES+1)
+    assert _found(result_dir, allow_failed=True)==[]
+
+def test_find_runs_products_not_started(server, tmp_path):
+    result_dir = str(tmp_path)
+    save_dir, ranks = _make_run(server, result_dir, f'20240701_{KEYWORD}_1_{REVIEW_PAGES}')
+    with CheckpointManifest(save_dir + 'checkpoint.sqlite') as checkpoint:
+        checkpoint.reset_product(ranks[-1])
+
+    assert _found(result_dir, allow_failed=True)==[]
+
+def test_find_runs_distributed(server, tmp_path):
+    # 분산 크롤링은 checkpoint를 쓰지 않으므로, coordinator의 완료 marker가 있어야 완료된 것으로 본다.
+    result_dir = str(tmp_path)
+    save_dir, _ = _make_run(server, result_dir, f'20240701_{KEYWORD}_1_{REVIEW_PAGES}', checkpoint=False)
+    assert _found(result_dir, allow_failed=True)==[]
+
+    write_complete_marker(save_dir, {'done': 81, 'failed': 1, 'pending': 0})
+    assert _found(result_dir)==[]
+    assert _found(result_dir, allow_failed=True)==[f'20240701_{KEYWORD}_1_{REVIEW_PAGES}']
+
+    write_complete_marker(save_dir, {'done': 82, 'failed': 0, 'pending': 0})
+    assert [run['done_pages'] for run in find_runs(result_dir)]==[82]
+
+def test_find_runs_skips_unreadable_review_file(server, tmp_path):
+    result_dir = str(tmp_path)
+    save_dir, _ = _make_run(server, result_dir, f'20240701_{KEYWORD}_1_{REVIEW_PAGES}')
+    with open(save_dir + 'review_product1_1.parquet', 'wb') as f:
+        f.write(b'PAR1')
+
+    runs = find_runs(result_dir)
+    assert runs[0]['invalid_paths']==[save_dir + 'review_product1_1.parquet']
+    assert save_dir + 'review_product1_1.parquet' not in runs[0]['review_paths']
+
+def test_compact_deduplicates(server, tmp_path):
+    # 같은 키워드, 수집일자의 두 실행은 같은 상품과 리뷰를 가지므로, 합친 파티션에는 한 번씩만 남는다.
+    result_dir, dataset_dir = str(tmp_path / 'result'), str(tmp_path / 'dataset')
+    _make_run(server, result_dir, f'20240701_{KEYWORD}_1_{REVIEW_PAGES}')
+    _make_run(server, result_dir, f'20240701_{KEYWORD}_2_{REVIEW_PAGES}')
+
+    index = compact(result_dir, dataset_dir, trace_func=lambda *args: None)
+    assert index.num_rows==2
+    assert index['n_reviews'].to_pylist()==[40*REVIEW_PAGES*20]*2
+
+    reviews = ds.dataset(os.path.join(dataset_dir, 'reviews'), partitioning=PARTITIONING).to_table()
+    ids = reviews['id'].to_pylist()
+    assert len(ids)==40*REVIEW_PAGES*20
+    assert ids==sorted(set(ids))
+    assert set(reviews['keyword'].to_pylist())=={KEYWORD}
+
+    products = ds.dataset(os.path.join(dataset_dir, 'products'), partitioning=PARTITIONING).to_table()
+    assert products.num_rows==40
+
+    # 다시 실행해도 이미 합친 실행폴더는 건너뛰고, 데이터가 늘어나지 않는다.
+    index = compact(result_dir, dataset_dir, trace_func=lambda *args: None)
+    assert index.num_rows==2
+    assert ds.dataset(os.path.join(dataset_dir, 'reviews'), partitioning=PARTITIONING).count_rows()==40*REVIEW_PAGES*20
@@ -0,0 +1,63 @@
+"""incremental 수집을 mock 서버로 반복 실행하여, 이전 실행에서 수집한 리뷰가 사라지지 않는지 확인한다."""
+
+# default
+import glob
+import pytest
+import pyarrow.parquet as pq
+
+pytest.importorskip('lib.python.log')
+
+# crawling
+from crawling.naver_shopping_review.benchmarks.mock_server import MockNaverServer
+from crawling.naver_shopping_review.compact import RESULT_DIR, find_runs
+from crawling.naver_shopping_review.pipeline import NaverShoppingReviewGetter
+from crawling.naver_shopping_review.utils import NoProxyPool
+from crawling.naver_shopping_review.utils.ratelimit import AdaptiveRateLimiter
+
+KEYWORD = '오메가3'
+
+def _run(server: MockNaverServer, resume: bool = False, keyword: str = KEYWORD) -> NaverShoppingReviewGetter:
+    getter = NaverShoppingReviewGetter(keyword, 1, 5, 4, 'thread', resume=resume, incremental=True, proxy_pool=NoProxyPool())
+    rate_limiter = AdaptiveRateLimiter(initial_rate=1000, max_rate=1000, proxy_rate=1000, proxy_max_rate=1000)
+    for extractor, url in ((getter.product_extractor, server.search_url), (getter.review_extractor, server.review_url)):
+        extractor.url = url
+        extractor.rate_limiter = rate_limiter
+    getter.run()
+    return getter
+
+def _review_ids(save_dir: str) -> set[int]:
+    return {id for path in glob.glob(save_dir + 'review_*.parquet') for id in pq.read_table(path, columns=['id'])['id'].to_pylist()}
+
+def test_incremental_twice_keeps_reviews(workdir):
+    with MockNaverServer(review_pages=2) as server:
+        first = _run(server)
+        collected = _review_ids(first.save_dir)
+        assert len(collected)==40*2*20
+
+        # 같은 날 다시 실행하면 새로운 리뷰가 없지만, 이전 실행의 리뷰는 남아 있어야 한다.
+        second = _run(server)
+        assert second.save_dir==first.save_dir
+        assert _review_ids(second.save_dir)==collected
+
+        # resume으로 이어서 실행해도 이전 실행의 리뷰 파일을 덮어쓰지 않는다.
+        third = _run(server, resume=True)
+        assert _review_ids(third.save_dir)==collected
+
+def test_incremental_watermark_per_keyword(workdir):
+    # mock 서버는 키워드와 관계없이 같은 상품을 검색결과로 주므로, 두 키워드가 모든 상품을 공유한다.
+    with MockNaverServer(review_pages=2) as server:
+        first = _run(server, keyword=KEYWORD)
+        second = _run(server, keyword='밀크씨슬')
+        assert _review_ids(second.save_dir)==_review_ids(first.save_dir)
+
+def test_incremental_run_is_complete(workdir):
+    # incremental 수집도 checkpoint에 기록되어, compact가 완료된 실행폴더로 합칠 수 있어야 한다.
+    with MockNaverServer(review_pages=2) as server:
+        first = _run(server)
+        assert first.checkpoint.summary()=={'done': 40*2, 'pending': 0}
+        assert [run['path'] for run in find_runs(RESULT_DIR)]==[first.save_dir]
+
+        # 새로운 리뷰가 없는 실행은 상품마다 마지막 리뷰페이지를 0으로 기록한다.
+        second = _run(server)
+        assert second.checkpoint.summary()=={'pending': 0}
+        assert [run['path'] for run in find_runs(RESULT_DIR)]==[second.save_dir]
@@ -0,0 +1,54 @@
+"""중단된 실행을 resume으로 이어서 수집할 때, 완료된 리뷰페이지는 다시 요청하지 않고 완료되지 않은 리뷰 파일은 격리하는지 mock 서버로 확인한다."""
+
+# default
+import glob
+import os
+import pytest
+import pyarrow.parquet as pq
+
+pytest.importorskip('lib.python.log')
+
+# crawling
+from crawling.naver_shopping_review.benchmarks.mock_server import MockNaverServer
+from crawling.naver_shopping_review.compact import RESULT_DIR, find_runs
+from crawling.naver_shopping_review.pipeline import NaverShoppingReviewGetter
+from crawling.naver_shopping_review.utils import NoProxyPool
+from crawling.naver_shopping_review.utils.ratelimit import AdaptiveRateLimiter
+
+KEYWORD = '오메가3'
+REVIEW_PAGES = 2
+
+def _getter(server: MockNaverServer, engine: str, resume: bool) -> NaverShoppingReviewGetter:
+    getter = NaverShoppingReviewGetter(KEYWORD, 1, 5, 4, engine, resume=resume, proxy_pool=NoProxyPool())
+    rate_limiter = AdaptiveRateLimiter(initial_rate=1000, max_rate=1000, proxy_rate=1000, proxy_max_rate=1000)
+    for extractor, url in ((getter.product_extractor, server.search_url), (getter.review_extractor, server.review_url)):
+        extractor.url = url
+        extractor.rate_limiter = rate_limiter
+    return getter
+
+def _review_ids(save_dir: str) -> list[int]:
+    return sorted(id for path in glob.glob(save_dir + 'review_*.parquet') for id in pq.read_table(path, columns=['id'])['id'].to_pylist())
+
+@pytest.mark.parametrize('engine', ['thread', 'async', 'stream'])
+def test_resume_skips_done_pages(workdir, engine):
+    with MockNaverServer(review_pages=REVIEW_PAGES) as server:
+        first = _getter(server, engine, resume=False)
+        first.run()
+        collected = _review_ids(first.save_dir)
+        assert len(collected)==40*REVIEW_PAGES*20
+
+        # 상품 하나가 기록되기 전에 중단된 것처럼 만든다: checkpoint에는 없고, 리뷰 파일만 남아 있다.
+        first.checkpoint.reset_product(3)
+        first.checkpoint.close()
+
+        n_requests = server.n_requests
+        second = _getter(server, engine, resume=True)
+        assert second.save_dir==first.save_dir
+        assert os.path.exists(second.save_dir + '.unfinished/')
+        second.run()
+
+        # 저장된 상품정보를 사용하고, 기록되지 않은 상품의 리뷰페이지만 다시 요청한다.
+        assert server.n_requests-n_requests==REVIEW_PAGES
+        assert _review_ids(second.save_dir)==collected
+        assert second.checkpoint.summary()=={'done': 40*REVIEW_PAGES, 'pending': 0}
+        assert [run['path'] for run in find_runs(RESULT_DIR)]==[second.save_dir]
@@ -4,30 +4,91 @@
 함수 목록
 1. `add_headers_randomly`
     기본 headers에 additional_headers를 추가로 1~n개 선택하여 추가한다.
-2. `get_proxies_1`
+2. `register_proxy_source`
+    프록시 목록을 제공하는 사이트와 그 응답을 파싱하는 함수를 `PROXY_SOURCES`에 등록하는 decorator.
+3. `parse_free_proxy_list`
+    `https://free-proxy-list.net`의 HTML에서 프록시 테이블을 한 번만 순회하며 프록시서버 URL을 yield한다.
+4. `parse_proxyscrape`
+    `https://proxyscrape.com/free-proxy-list?ref=ymmxztq&tm_subid1=free-proxy-server-list`의 text 응답에서 프록시서버 URL을 yield한다.
+5. `get_proxies_1`
     `https://free-proxy-list.net`로부터 프록시서버 URL을 가져온다.
-3. `get_proxies_2`
+6. `get_proxies_2`
     `https://proxyscrape.com/free-proxy-list?ref=ymmxztq&tm_subid1=free-proxy-server-list`로부터 프록시서버 URL을 가져온다.
+7. `get_proxies`
+    `PROXY_SOURCES`에 등록된 모든 사이트로부터 프록시 서버를 URL을 가져온다.
+8. `proxy_url`
+    프로토콜이 없는 프록시서버 URL에 'http://'를 붙인다.
+9. `validate_proxies`
+    프록시서버들이 살아있는지 동시에 검사하여, 살아있는 프록시를 왕복시간이 빠른 순서로 가져온다.
+10. `get_validated_proxies`
+    검증된 프록시서버 목록을 가져오며, 검증결과는 TTL동안 디스크에 캐싱한다.
+
+클래스 목록
+1. `ProxyPool`
+    프록시별 성공률과 지연시간(p50/p95)을 기록하여 빠르고 건강한 프록시를 골라주는 thread-safe 프록시 풀.
+2. `NoProxyPool`
+    프록시 없이 직접 요청하도록 항상 None을 주는 프록시 풀로, 로컬 mock 서버 벤치마크나 프록시가 필요없는 환경에서 사용한다.
 """
 
 # lib
 from lib.python.decorators import retry_with_delay
 
+# crawling
+from crawling.naver_shopping_review.utils.useragent import HeaderProfilePool
+
+# parallel
+from concurrent.futures import ThreadPoolExecutor
+
 # default
+from typing import Callable, Iterator
+import os
+import json
 import random
+import threading
+import time
+import heapq
+from collections import deque
 import numpy as np
 import requests
 from bs4 import BeautifulSoup as bs
-import random
+
+# optional
+try:
+    import lxml.html as lxml_html
+except ImportError:
+    lxml_html = None
 
 RETRY_COUNT = 10
 DELAY_SECONDS = (7,10)
 VERBOSE = 2
 VERBOSE_PERIOD = 1
 
+# additional_headers의 id를 key로, (additional_headers, 미리 만들어둔 HeaderProfilePool)을 value로 가지는 딕셔너리.
+_HEADER_PROFILES = {}
+
+# 프록시 사이트 이름을 key로, {'url','parser'}를 value로 가지는 딕셔너리로, `register_proxy_source`로 등록한다.
+PROXY_SOURCES = {}
+
+# proxy validation setting
+VALIDATION_URL = 'https://search.shopping.naver.com/'                     # 프록시 검증 시 요청을 보낼 URL.
+VALIDATION_TIMEOUT = 3                                                     # 프록시 검증 요청의 timeout(초).
+VALIDATION_WORKERS = 64                                                    # 프록시를 동시에 검증할 thread 수.
+VALIDATION_CACHE_PATH = 'crawling/naver_shopping_review/.cache/proxies.json' # 검증결과 캐시 경로.
+VALIDATION_CACHE_TTL = 60*60*24                                            # 검증결과 캐시의 유효시간(초).
+
+# proxy pool setting
+MIN_POOL_SIZE = 20              # 건강한 프록시가 이 수보다 적어지면 백그라운드에서 다시 채운다.
+TOP_K = 10                      # 점수가 좋은 상위 k개의 프록시 중에서 무작위로 고른다.
+MAX_FAILURES = 3                # 연속으로 이 횟수만큼 실패하면 풀에서 제거한다.
+QUARANTINE_SECONDS = (5, 300)   # 격리시간의 (최소, 최대)로, 연속 실패마다 2배씩 늘어난다.
+LATENCY_WINDOW = 50             # p50/p95 계산에 사용할 최근 지연시간의 수.
+UNKNOWN_LATENCY = 1.0           # 아직 사용되지 않은 프록시의 지연시간 추정치(초).
+REFILL_INTERVAL = 60            # 건강한 프록시가 남아있을 때, 백그라운드 보충 사이의 최소 간격(초).
+
 def add_headers_randomly(headers: dict, additional_headers: dict) -> dict:
     """
     기본 headers에 additional_headers를 추가로 1~n개 선택하여 추가한다.
+    additional_headers별로 미리 만들어둔 조합(`HeaderProfilePool`)에서 하나를 뽑으므로, additional_headers는 호출 사이에 바뀌지 않아야 한다.
     
     Args:
         headers (dict): 기본 headers.
@@ -37,100 +98,554 @@ def add_headers_randomly(headers: dict, additional_headers: dict) -> dict:
         dict: 기본 headers에 additional_headers를 추가로 1~n개 선택하여 추가 된 딕셔너리.
     """
     
-    # 몇 개를 추가할지 정하고, 추가할 additional_headers에서의 인덱스를 가져온다.
-    add_n = random.choice(range(1,len(additional_headers)+1))
-    add_idx = np.random.choice(range(len(additional_headers)), size=add_n, replace=False)
+    # additional_headers의 조합을 처음 사용할 때 한 번만 만든다.
+    entry = _HEADER_PROFILES.get(id(additional_headers))
+    if entry is None or entry[0] is not additional_headers:
+        entry = _HEADER_PROFILES[id(additional_headers)] = (additional_headers, HeaderProfilePool({}, additional_headers))
     
-    # headers에 추가할 additional_headers를 넣어준다.
-    for idx in add_idx:
-        key = [k for k,v in additional_headers.items()][idx]
-        val = [v for k,v in additional_headers.items()][idx]
-        headers[key] = val
+    # headers에 미리 만들어둔 조합 하나를 넣어준다.
+    headers.update(entry[1].random)
         
     return headers
 
-@retry_with_delay(retry_count=RETRY_COUNT, delay_seconds=DELAY_SECONDS, verbose=VERBOSE, verbose_period=VERBOSE_PERIOD)
-def _get_proxies_1(verify: bool = True) -> list[str]:
+def register_proxy_source(name: str, url: str) -> Callable:
     """
-    `https://free-proxy-list.net`로부터 프록시서버 URL을 가져온다.
-    
+    프록시 목록을 제공하는 사이트와 그 응답을 파싱하는 함수를 `PROXY_SOURCES`에 등록하는 decorator.
+    등록된 사이트는 `get_proxies`에서 모두 사용되므로, 새로운 사이트는 `get_proxies`를 수정하지 않고 추가할 수 있다.
+
+    Args:
+        name (str): 프록시 사이트의 이름.
+        url (str): 프록시 목록을 요청할 URL.
+
+    Returns:
+        Callable: 응답 text를 받아 프록시서버 URL을 하나씩 yield하는 parser를 등록하는 decorator.
+    """
+
+    def decorator(parser: Callable[[str], Iterator[str]]) -> Callable[[str], Iterator[str]]:
+        PROXY_SOURCES[name] = {'url': url, 'parser': parser}
+        return parser
+
+    return decorator
+
+@register_proxy_source('free-proxy-list', 'https://free-proxy-list.net')
+def parse_free_proxy_list(text: str) -> Iterator[str]:
+    """
+    `https://free-proxy-list.net`의 HTML에서 프록시 테이블을 한 번만 순회하며 프록시서버 URL을 yield한다.
+    lxml이 설치되어 있으면 lxml의 xpath로, 없으면 BeautifulSoup(html.parser)으로 파싱한다.
+
     **참조**
     1. https://jaehyojjang.dev/python/free-proxy-server/
-    
+
     Args:
-        verify (bool, optional): HTTPS 요청을 보낼 때 서버의 SSL 인증서를 검증할지 여부. default=True.
-    
+        text (str): `https://free-proxy-list.net`의 HTML.
+
     Returns:
-        list[str]: 프록시서버 URL로 이루어진 리스트.
+        Iterator[str]: 'ip:port' 형태의 프록시서버 URL.
     """
-    
-    free_proxy_server_url = 'https://free-proxy-list.net'
-    
-    resp = requests.get(url=free_proxy_server_url, verify=verify)
-    soup = bs(resp.text,'html.parser')
-    proxies_length = len(soup.select('table.table.table-striped.table-bordered > tbody > tr'))
-    
-    proxies_url = []
-    for index in range(proxies_length):            
-        proxies = soup.select('table.table.table-striped.table-bordered > tbody > tr')
+
+    if lxml_html is not None:
+        tree = lxml_html.fromstring(text)
+        rows = tree.xpath('//table[contains(@class,"table-striped") and contains(@class,"table-bordered")]/tbody/tr')
+        for row in rows:
+            cells = row.xpath('./td[position()<=2]/text()')
+            if len(cells)==2:
+                ip, port = cells
+                yield f'{ip.strip()}:{port.strip()}'
+        return
+
+    soup = bs(text, 'html.parser')
+    for row in soup.select('table.table.table-striped.table-bordered > tbody > tr'):
+        cells = row.find_all('td', limit=2)
 
         ## Code (한국만 가져올 경우)
-        # code = proxies[index].select('td')[2].text.strip()
+        # code = row.select('td')[2].text.strip()
         # if code == 'KR':
-        
-        # Port
-        port = proxies[index].select('td')[1].text.strip()
-
-        # IP
-        ip = proxies[index].select('td')[0].text.strip()
 
-        # Proxy set
-        proxies_url.append(f'{ip}:{port}')
-        
-    return proxies_url
+        if len(cells)==2:
+            ip, port = cells
+            yield f'{ip.text.strip()}:{port.text.strip()}'
 
-@retry_with_delay(retry_count=RETRY_COUNT, delay_seconds=DELAY_SECONDS, verbose=VERBOSE, verbose_period=VERBOSE_PERIOD)
-def _get_proxies_2(verify: bool = True):
+@register_proxy_source('proxyscrape', 'https://api.proxyscrape.com/v3/free-proxy-list/get?request=displayproxies&proxy_format=protocolipport&format=text')
+def parse_proxyscrape(text: str) -> Iterator[str]:
     """
-    `https://proxyscrape.com/free-proxy-list?ref=ymmxztq&tm_subid1=free-proxy-server-list`로부터 프록시서버 URL을 가져온다.
-    
+    `https://proxyscrape.com/free-proxy-list?ref=ymmxztq&tm_subid1=free-proxy-server-list`의 text 응답에서 프록시서버 URL을 yield한다.
+
     **참조**
     1. https://www.guru99.com/ko/free-proxy-server-list.html
 
+    Args:
+        text (str): 줄마다 'protocol://ip:port'가 적힌 text.
+
+    Returns:
+        Iterator[str]: 'protocol://ip:port' 형태의 프록시서버 URL.
+    """
+
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            yield line
+
+@retry_with_delay(retry_count=RETRY_COUNT, delay_seconds=DELAY_SECONDS, verbose=VERBOSE, verbose_period=VERBOSE_PERIOD)
+def _get_proxies_from_source(name: str, verify: bool = True) -> list[str]:
+    """
+    `PROXY_SOURCES`에 등록된 사이트로부터 프록시서버 URL을 가져온다.
+
+    Args:
+        name (str): `register_proxy_source`로 등록한 프록시 사이트의 이름.
+        verify (bool, optional): HTTPS 요청을 보낼 때 서버의 SSL 인증서를 검증할지 여부. default=True.
+
+    Returns:
+        list[str]: 프록시서버 URL로 이루어진 리스트.
+    """
+
+    source = PROXY_SOURCES[name]
+    response = requests.get(source['url'], verify=verify)
+    return list(source['parser'](response.text))
+
+def _get_proxies_1(verify: bool = True) -> list[str]:
+    """
+    `https://free-proxy-list.net`로부터 프록시서버 URL을 가져온다.
+    
     Args:
         verify (bool, optional): HTTPS 요청을 보낼 때 서버의 SSL 인증서를 검증할지 여부. default=True.
     
     Returns:
         list[str]: 프록시서버 URL로 이루어진 리스트.
     """
+    
+    return _get_proxies_from_source('free-proxy-list', verify)
 
+def _get_proxies_2(verify: bool = True) -> list[str]:
+    """
+    `https://proxyscrape.com/free-proxy-list?ref=ymmxztq&tm_subid1=free-proxy-server-list`로부터 프록시서버 URL을 가져온다.
 
-    url = 'https://api.proxyscrape.com/v3/free-proxy-list/get?request=displayproxies&proxy_format=protocolipport&format=text'
-    response = requests.get(url, verify=verify)
-    proxies = response.text.split('\r\n')
-    return proxies
+    Args:
+        verify (bool, optional): HTTPS 요청을 보낼 때 서버의 SSL 인증서를 검증할지 여부. default=True.
+    
+    Returns:
+        list[str]: 프록시서버 URL로 이루어진 리스트.
+    """
 
-def get_proxies(verify: bool = True):
+    return _get_proxies_from_source('proxyscrape', verify)
+
+def get_proxies(verify: bool = True, sources: list[str]|None = None) -> list[str]:
     """
     프록시 서버를 URL을 가져온다.
     
     Args:
         verify (bool, optional): HTTPS 요청을 보낼 때 서버의 SSL 인증서를 검증할지 여부. default=True.
+        sources (list[str]|None, optional): 사용할 프록시 사이트의 이름으로, None이면 `PROXY_SOURCES`에 등록된 모든 사이트를 사용한다. default=None.
     
     Returns:
         list[str]: 프록시서버 URL로 이루어진 리스트.
     """
 
     # get proxies
-    proxies_1 = _get_proxies_1(verify)
-    proxies_2 = _get_proxies_2(verify)
-    proxies = proxies_1 + proxies_2
+    sources = sources if sources is not None else list(PROXY_SOURCES)
+    proxies = []
+    for name in sources:
+        proxies += _get_proxies_from_source(name, verify)
+    proxies = list(dict.fromkeys(proxies))
 
     # shuffle
     random.shuffle(proxies)
 
     return proxies
 
+def proxy_url(proxy: str) -> str:
+    """
+    프로토콜이 없는 프록시서버 URL에 'http://'를 붙인다.
+
+    Args:
+        proxy (str): 프록시서버 URL. ex) '1.2.3.4:80', 'socks4://1.2.3.4:80'
+
+    Returns:
+        str: 프로토콜이 포함된 프록시서버 URL.
+    """
+
+    return proxy if '://' in proxy else 'http://'+proxy
+
+def _probe_proxy(proxy: str, target_url: str, timeout: float, verify: bool) -> float|None:
+    """프록시를 통해 target_url에 요청을 보내고, 성공하면 왕복시간(초)을, 실패하면 None을 반환한다."""
+
+    url = proxy_url(proxy)
+    s = time.time()
+    try:
+        response = requests.get(target_url, proxies={'http':url, 'https':url}, timeout=timeout, verify=verify)
+    except requests.RequestException:
+        return None
+
+    if response.status_code!=200:
+        return None
+    return time.time() - s
+
+def validate_proxies(proxies: list[str],
+                     target_url: str = VALIDATION_URL,
+                     timeout: float = VALIDATION_TIMEOUT,
+                     max_workers: int = VALIDATION_WORKERS,
+                     verify: bool = True) -> list[tuple[str, float]]:
+    """
+    프록시서버들이 살아있는지 동시에 검사하여, 살아있는 프록시를 왕복시간이 빠른 순서로 가져온다.
+
+    Args:
+        proxies (list[str]): 프록시서버 URL로 이루어진 리스트.
+        target_url (str, optional): 검증 요청을 보낼 URL. default=VALIDATION_URL.
+        timeout (float, optional): 검증 요청의 timeout(초). default=VALIDATION_TIMEOUT.
+        max_workers (int, optional): 프록시를 동시에 검증할 thread 수. default=VALIDATION_WORKERS.
+        verify (bool, optional): HTTPS 요청을 보낼 때 서버의 SSL 인증서를 검증할지 여부. default=True.
+
+    Returns:
+        list[tuple[str, float]]: (프록시서버 URL, 왕복시간)으로 이루어진, 왕복시간 오름차순의 리스트.
+    """
+
+    proxies = list(dict.fromkeys(proxy for proxy in proxies if proxy))
+    if len(proxies)==0:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(proxies))) as executor:
+        rtts = list(executor.map(lambda proxy: _probe_proxy(proxy, target_url, timeout, verify), proxies))
+
+    alive = [(proxy, rtt) for proxy, rtt in zip(proxies, rtts) if rtt is not None]
+    alive.sort(key=lambda x: x[1])
+
+    return alive
+
+def get_validated_proxies(verify: bool = True,
+                          target_url: str = VALIDATION_URL,
+                          timeout: float = VALIDATION_TIMEOUT,
+                          max_workers: int = VALIDATION_WORKERS,
+                          cache_path: str|None = VALIDATION_CACHE_PATH,
+                          cache_ttl: float = VALIDATION_CACHE_TTL,
+                          use_cache: bool = True) -> list[tuple[str, float]]:
+    """
+    검증된 프록시서버 목록을 가져오며, 검증결과는 TTL동안 디스크에 캐싱한다.
+
+    Args:
+        verify (bool, optional): HTTPS 요청을 보낼 때 서버의 SSL 인증서를 검증할지 여부. default=True.
+        target_url (str, optional): 검증 요청을 보낼 URL. default=VALIDATION_URL.
+        timeout (float, optional): 검증 요청의 timeout(초). default=VALIDATION_TIMEOUT.
+        max_workers (int, optional): 프록시를 동시에 검증할 thread 수. default=VALIDATION_WORKERS.
+        cache_path (str|None, optional): 검증결과 캐시 경로로, None이면 캐시를 사용하지 않는다. default=VALIDATION_CACHE_PATH.
+        cache_ttl (float, optional): 검증결과 캐시의 유효시간(초). default=VALIDATION_CACHE_TTL.
+        use_cache (bool, optional): 캐시를 읽을지 여부로, False여도 새로운 검증결과는 캐시에 저장한다. default=True.
+
+    Returns:
+        list[tuple[str, float]]: (프록시서버 URL, 왕복시간)으로 이루어진, 왕복시간 오름차순의 리스트.
+    """
+
+    # 캐시가 유효하면 그대로 사용 (비어있거나 깨진 캐시는 없는 것으로 본다)
+    if use_cache and cache_path is not None and os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'r') as f:
+                cache = json.load(f)
+            if cache['target_url']==target_url and time.time()-cache['validated_at']<cache_ttl:
+                return [(proxy, float(rtt)) for proxy, rtt in cache['proxies']]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    # 검증
+    proxies = validate_proxies(get_proxies(verify), target_url, timeout, max_workers, verify)
+
+    # 캐시 저장 (다른 프로세스가 쓰는 중인 파일을 읽지 않도록 임시파일에 쓴 뒤 교체)
+    if cache_path is not None:
+        os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+        tmp_path = f'{cache_path}.tmp{os.getpid()}'
+        with open(tmp_path, 'w') as f:
+            json.dump({'target_url':target_url, 'validated_at':time.time(), 'proxies':proxies}, f)
+        os.replace(tmp_path, cache_path)
+
+    return proxies
+
+class ProxyPool:
+    """
+    프록시별 성공률과 지연시간(p50/p95)을 기록하여 빠르고 건강한 프록시를 골라주는 thread-safe 프록시 풀.
+
+    - 실패한 프록시는 연속 실패 횟수에 따라 지수적으로 늘어나는 시간만큼 격리되고, `max_failures`번 연속 실패하면 제거된다.
+    - 건강한 프록시가 `min_size`보다 적어지면, 크롤링을 멈추지 않고 백그라운드에서 다시 채운다.
+    - `validate=True`이면 `get_validated_proxies`로 살아있는 프록시만 넣고, 검증 시의 왕복시간을 첫 지연시간으로 기록한다.
+    - `lazy=True`이면 생성자는 처음 프록시 목록을 백그라운드에서 가져오기 시작하고 바로 반환하며, 첫 `acquire`만 목록이 채워질 때까지 기다린다.
+
+    점수는 기록이 바뀔 때(`add`, `report`) 한 번만 계산하여 건강한 프록시의 heap에 넣고, 격리된 프록시는 격리가 끝나는 시각의 heap에 둔다.
+    `acquire`는 heap에서 상위 `top_k`개만 꺼내므로, lock을 잡는 시간이 프록시 수에 비례하지 않는다(O(k log n)).
+    기록이 바뀌면 프록시의 version이 바뀌며, heap에 남은 이전 version의 항목은 꺼낼 때 버린다.
+    """
+
+    def __init__(self,
+                 verify: bool = True,
+                 min_size: int = MIN_POOL_SIZE,
+                 top_k: int = TOP_K,
+                 max_failures: int = MAX_FAILURES,
+                 quarantine_seconds: tuple[float, float] = QUARANTINE_SECONDS,
+                 latency_window: int = LATENCY_WINDOW,
+                 proxies: list[str]|None = None,
+                 validate: bool = True,
+                 lazy: bool = True) -> None:
+        """
+        ProxyPool의 생성자.
+
+        Args:
+            verify (bool, optional): 프록시 목록을 가져올 때 서버의 SSL 인증서를 검증할지 여부. default=True.
+            min_size (int, optional): 건강한 프록시가 이 수보다 적어지면 백그라운드에서 다시 채운다. default=MIN_POOL_SIZE.
+            top_k (int, optional): 점수가 좋은 상위 k개의 프록시 중에서 무작위로 고른다. default=TOP_K.
+            max_failures (int, optional): 연속으로 이 횟수만큼 실패하면 풀에서 제거한다. default=MAX_FAILURES.
+            quarantine_seconds (tuple[float, float], optional): 격리시간의 (최소, 최대). default=QUARANTINE_SECONDS.
+            latency_window (int, optional): p50/p95 계산에 사용할 최근 지연시간의 수. default=LATENCY_WINDOW.
+            proxies (list[str]|None, optional): 처음 풀에 넣을 프록시 목록. None이면 `get_proxies`로 가져온다. default=None.
+            validate (bool, optional): 프록시를 가져올 때 `get_validated_proxies`로 검증할지 여부. default=True.
+            lazy (bool, optional): 처음 프록시 목록을 백그라운드에서 가져올지 여부로, False이면 생성자에서 가져올 때까지 기다린다. default=True.
+        """
+
+        self.verify = verify
+        self.min_size = min_size
+        self.top_k = top_k
+        self.max_failures = max_failures
+        self.quarantine_seconds = quarantine_seconds
+        self.latency_window = latency_window
+        self.validate = validate
+
+        self._stats = {}
+        self._ranking = []      # 건강한 프록시의 (점수, version, 프록시) heap
+        self._quarantine = []   # 격리된 프록시의 (격리종료시각, version, 프록시) heap
+        self._quarantined = set()
+        self._version = 0
+        self._lock = threading.Condition()
+        self._refilling = False
+        self._last_refill = time.time()
+
+        if proxies is not None:
+            self.add(proxies)
+        elif lazy:
+            with self._lock:
+                self._refill(use_cache=True)
+        else:
+            self.add(*self._fetch(use_cache=True))
+
+    def __len__(self) -> int:
+        """격리되지 않은 건강한 프록시의 수."""
+
+        with self._lock:
+            return self._n_healthy(time.time())
+
+    def add(self, proxies: list[str], latencies: list[float]|None = None) -> None:
+        """
+        프록시를 풀에 추가한다. 이미 있는 프록시는 기록을 유지한다.
+
+        Args:
+            proxies (list[str]): 프록시서버 URL로 이루어진 리스트.
+            latencies (list[float]|None, optional): 프록시별 첫 지연시간(초)으로, 검증 시의 왕복시간을 넣는다. default=None.
+
+        Returns:
+            None.
+        """
+
+        latencies = latencies if latencies is not None else [None]*len(proxies)
+        with self._lock:
+            for proxy, latency in zip(proxies, latencies):
+                if proxy and proxy not in self._stats:
+                    self._stats[proxy] = {
+                        'success': 0,
+                        'failure': 0,
+                        'consecutive_failures': 0,
+                        'quarantined_until': 0.0,
+                        'latencies': deque(maxlen=self.latency_window),
+                    }
+                    if latency is not None:
+                        self._stats[proxy]['latencies'].append(latency)
+                    self._rank(proxy)
+            self._lock.notify_all()
+
+    def acquire(self) -> str:
+        """
+        점수가 좋은 상위 `top_k`개의 건강한 프록시 중에서 하나를 무작위로 고른다.
+        건강한 프록시가 없으면, 백그라운드 보충이 끝날 때까지 기다린다.
+
+        Returns:
+            str: 프록시서버 URL.
+        """
+
+        with self._lock:
+            while True:
+                now = time.time()
+                n_healthy = self._n_healthy(now)
+                if n_healthy==0 or (n_healthy<self.min_size and now-self._last_refill>=REFILL_INTERVAL):
+                    self._refill()
+                if n_healthy>0:
+                    break
+                self._lock.wait(timeout=1)
+
+            # 상위 top_k개를 꺼내서 하나를 고른 뒤 다시 넣는다.
+            top = []
+            while len(top)<self.top_k and len(self._ranking)>0:
+                entry = heapq.heappop(self._ranking)
+                if self._is_current(entry):
+                    top.append(entry)
+            for entry in top:
+                heapq.heappush(self._ranking, entry)
+            return random.choice(top)[2]
+
+    def report(self, proxy: str, ok: bool, latency: float|None = None) -> None:
+        """
+        프록시의 요청 결과를 기록한다. 실패하면 격리하고, 연속 실패가 `max_failures`번이면 제거한다.
+
+        Args:
+            proxy (str): 프록시서버 URL.
+            ok (bool): 요청 성공 여부.
+            latency (float|None, optional): 요청의 왕복시간(초). default=None.
+
+        Returns:
+            None.
+        """
+
+        with self._lock:
+            stat = self._stats.get(proxy)
+            if stat is None:
+                return
+
+            if ok:
+                stat['success'] += 1
+                stat['consecutive_failures'] = 0
+                stat['quarantined_until'] = 0.0
+                if latency is not None:
+                    stat['latencies'].append(latency)
+                self._quarantined.discard(proxy)
+                self._rank(proxy)
+                return
+
+            stat['failure'] += 1
+            stat['consecutive_failures'] += 1
+            if stat['consecutive_failures']>=self.max_failures:
+                del self._stats[proxy]
+                self._quarantined.discard(proxy)
+            else:
+                min_seconds, max_seconds = self.quarantine_seconds
+                backoff = min(min_seconds * 2**(stat['consecutive_failures']-1), max_seconds)
+                stat['quarantined_until'] = time.time() + backoff
+                self._quarantined.add(proxy)
+                self._rank(proxy)
+
+    def stats(self) -> dict[str, dict]:
+        """
+        프록시별 성공률과 지연시간(p50/p95)을 가져온다.
+
+        Returns:
+            dict[str, dict]: 프록시서버 URL을 key로, {'success_rate','p50','p95','quarantined'}를 value로 가지는 딕셔너리.
+        """
+
+        with self._lock:
+            now = time.time()
+            return {
+                proxy: {
+                    'success_rate': self._success_rate(stat),
+                    'p50': self._percentile(stat, 50),
+                    'p95': self._percentile(stat, 95),
+                    'quarantined': stat['quarantined_until']>now,
+                }
+                for proxy, stat in self._stats.items()
+            }
+
+    def _n_healthy(self, now: float) -> int:
+        """격리가 끝난 프록시를 건강한 프록시의 heap으로 옮기고, 건강한 프록시의 수를 반환한다. lock을 잡은 상태에서 호출해야 한다."""
+
+        while len(self._quarantine)>0 and self._quarantine[0][0]<=now:
+            entry = heapq.heappop(self._quarantine)
+            if self._is_current(entry):
+                proxy = entry[2]
+                self._quarantined.discard(proxy)
+                heapq.heappush(self._ranking, (self._stats[proxy]['score'], entry[1], proxy))
+        return len(self._stats) - len(self._quarantined)
+
+    def _is_current(self, entry: tuple[float, int, str]) -> bool:
+        """heap의 (점수 또는 격리종료시각, version, 프록시) 항목이 프록시의 최신 기록인지 여부."""
+
+        stat = self._stats.get(entry[2])
+        return stat is not None and stat['version']==entry[1]
+
+    def _rank(self, proxy: str) -> None:
+        """
+        기록이 바뀐 프록시의 점수를 다시 계산하여, 격리 중이면 격리 heap에, 아니면 건강한 프록시의 heap에 넣는다.
+        이전 version의 항목이 쌓여 heap이 프록시 수의 2배를 넘으면 최신 항목만으로 다시 만든다. lock을 잡은 상태에서 호출해야 한다.
+        """
+
+        stat = self._stats[proxy]
+        self._version += 1
+        stat['version'] = self._version
+        stat['score'] = self._score(stat)
+        if proxy in self._quarantined:
+            heapq.heappush(self._quarantine, (stat['quarantined_until'], stat['version'], proxy))
+        else:
+            heapq.heappush(self._ranking, (stat['score'], stat['version'], proxy))
+
+        if len(self._ranking)+len(self._quarantine) > 2*len(self._stats)+self.top_k:
+            self._ranking = [(stat['score'], stat['version'], proxy) for proxy, stat in self._stats.items() if proxy not in self._quarantined]
+            self._quarantine = [(stat['quarantined_until'], stat['version'], proxy) for proxy, stat in self._stats.items() if proxy in self._quarantined]
+            heapq.heapify(self._ranking)
+            heapq.heapify(self._quarantine)
+
+    @staticmethod
+    def _success_rate(stat: dict) -> float:
+        """라플라스 스무딩을 적용한 성공률로, 사용 이력이 없으면 0.5."""
+
+        return (stat['success']+1) / (stat['success']+stat['failure']+2)
+
+    @staticmethod
+    def _percentile(stat: dict, q: int) -> float|None:
+        """최근 지연시간의 백분위수로, 사용 이력이 없으면 None."""
+
+        if len(stat['latencies'])==0:
+            return None
+        return float(np.percentile(stat['latencies'], q))
+
+    def _score(self, stat: dict) -> float:
+        """낮을수록 좋은 점수로, 성공률로 나눈 p50 지연시간."""
+
+        p50 = self._percentile(stat, 50)
+        p50 = UNKNOWN_LATENCY if p50 is None else p50
+        return p50 / self._success_rate(stat)
+
+    def _fetch(self, use_cache: bool) -> tuple[list[str], list[float]|None]:
+        """풀에 넣을 (프록시 목록, 첫 지연시간 목록)을 가져온다."""
+
+        if not self.validate:
+            return get_proxies(verify=self.verify), None
+
+        validated = get_validated_proxies(verify=self.verify, use_cache=use_cache)
+        return [proxy for proxy, _ in validated], [rtt for _, rtt in validated]
+
+    def _refill(self, use_cache: bool = False) -> None:
+        """백그라운드 thread에서 풀을 다시 채운다. lock을 잡은 상태에서 호출해야 한다."""
+
+        if self._refilling:
+            return
+        self._refilling = True
+        self._last_refill = time.time()
+
+        def target():
+            try:
+                self.add(*self._fetch(use_cache=use_cache))
+            finally:
+                with self._lock:
+                    self._refilling = False
+                    self._lock.notify_all()
+
+        threading.Thread(target=target, daemon=True).start()
+
+class NoProxyPool:
+    """프록시 없이 직접 요청하도록 항상 None을 주는 프록시 풀로, 로컬 mock 서버 벤치마크나 프록시가 필요없는 환경에서 사용한다."""
+
+    def __len__(self) -> int:
+        return 1
+
+    def acquire(self) -> None:
+        """프록시 대신 None을 반환하며, extractor는 프록시 없는 session으로 요청한다."""
+        return None
+
+    def report(self, proxy: str|None, ok: bool, latency: float|None = None) -> None:
+        """기록할 프록시가 없으므로 아무것도 하지 않는다."""
+        return None
+
+    def stats(self) -> dict[str, dict]:
+        return {}
+
 # import requests
 # from bs4 import BeautifulSoup
 # from tqdm import trange
@@ -0,0 +1,231 @@
+"""
+네이버쇼핑 리뷰데이터 수집과 관련하여, 반복 실행과 키워드 사이의 중복 요청을 줄이기 위한 HTTP 응답 캐시를 제공한다.
+
+클래스 목록
+1. `CachedResponse`
+    캐시에서 가져온 응답으로, extractor가 반환하는 requests.Response에서 사용하는 속성(status_code, content, text, json)을 가진다.
+2. `ResponseCache`
+    (endpoint, 정규화된 params/payload)의 hash를 key로 응답 본문을 SQLite 파일에 저장하는 thread-safe 캐시로, TTL과 크기 기준의 LRU 삭제를 지원한다.
+"""
+
+# default
+from typing import Callable
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# optional
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# global setting
+CACHE_PATH = 'crawling/naver_shopping_review/.cache/responses.sqlite' # 응답 캐시 저장경로.
+CACHE_TTL = 6*60*60         # 캐시된 응답의 유효시간(초)으로, 지나면 다시 요청한다.
+CACHE_MAX_BYTES = 2*1024**3 # 캐시의 최대 크기(byte)로, 넘으면 가장 오래 사용하지 않은 응답부터 삭제한다.
+
+class CachedResponse:
+    """캐시에서 가져온 응답으로, extractor가 반환하는 requests.Response에서 사용하는 속성(status_code, content, text, json)을 가진다."""
+
+    from_cache = True
+
+    def __init__(self, content: bytes, encoding: str|None = None, status_code: int = 200) -> None:
+        """
+        CachedResponse의 생성자.
+
+        Args:
+            content (bytes): 응답 본문.
+            encoding (str|None, optional): 본문의 인코딩으로, None이면 'utf-8'. default=None.
+            status_code (int, optional): 응답 상태코드. default=200.
+        """
+
+        self.content = content
+        self.encoding = encoding
+        self.status_code = status_code
+        self._json = None
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def json(self) -> dict:
+        # 같은 응답을 여러 번 파싱하지 않도록, 처음 파싱한 결과를 재사용한다.
+        if self._json is None:
+            self._json = json_loads(self.content)
+        return self._json
+
+class ResponseCache:
+    """
+    (endpoint, 정규화된 params/payload)의 hash를 key로 응답 본문을 SQLite 파일에 저장하는 thread-safe 캐시로, TTL과 크기 기준의 LRU 삭제를 지원한다.
+
+    같은 key의 요청이 동시에 들어오면 하나만 실제로 요청하고, 나머지는 그 결과를 캐시에서 가져온다(single-flight).
+    따라서 여러 키워드에서 같은 상품(originProductNo)이 검색되어도 리뷰페이지는 실행 중에 한 번만 요청되고,
+    각 키워드는 자신의 상품순위로 같은 응답을 저장한다.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, ttl: float = CACHE_TTL, max_bytes: int = CACHE_MAX_BYTES) -> None:
+        """
+        ResponseCache의 생성자.
+
+        Args:
+            path (str, optional): 캐시로 사용할 SQLite 파일 경로. default=CACHE_PATH.
+            ttl (float, optional): 캐시된 응답의 유효시간(초). default=CACHE_TTL.
+            max_bytes (int, optional): 캐시의 최대 크기(byte). default=CACHE_MAX_BYTES.
+        """
+
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                content BLOB NOT NULL,
+                encoding TEXT,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+        ''')
+
+        # 저장된 응답의 전체 크기로, 저장할 때마다 전체를 합산하지 않도록 처음에 한 번만 계산하고 저장/삭제할 때 갱신한다.
+        self._size = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+
+    @staticmethod
+    def make_key(endpoint: str, payload: dict) -> str:
+        """
+        요청의 캐시 key를 만든다. 값은 문자열로 바꾸고 key 순서로 정렬하므로, page=1과 page='1'은 같은 key가 된다.
+
+        Args:
+            endpoint (str): 요청 URL.
+            payload (dict): 요청의 params 또는 JSON payload.
+
+        Returns:
+            str: sha256 hex digest.
+        """
+
+        normalized = json.dumps([endpoint, {str(k): str(v) for k, v in payload.items()}], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> CachedResponse|None:
+        """
+        유효시간 안의 응답을 가져오며, 없거나 유효시간이 지났으면 None을 반환한다.
+
+        Args:
+            key (str): `make_key`로 만든 캐시 key.
+
+        Returns:
+            CachedResponse|None: 캐시된 응답.
+        """
+
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT content, encoding, created_at FROM responses WHERE key=?', (key,)).fetchone()
+            if row is None or row[2]+self.ttl<now:
+                self.misses += 1
+                return None
+            self._conn.execute('UPDATE responses SET accessed_at=? WHERE key=?', (now, key))
+            self.hits += 1
+        return CachedResponse(row[0], row[1])
+
+    def put(self, key: str, endpoint: str, response) -> None:
+        """
+        응답을 저장하고, 캐시가 최대 크기를 넘으면 유효시간이 지난 응답과 가장 오래 사용하지 않은 응답부터 삭제한다.
+        200이 아닌 응답은 저장하지 않으며, 본문이 기대한 형식인지는 저장하기 전에 extractor가 확인한다.
+
+        Args:
+            key (str): `make_key`로 만든 캐시 key.
+            endpoint (str): 요청 URL.
+            response (requests.Response): 저장할 응답.
+
+        Returns:
+            None.
+        """
+
+        if getattr(response, 'status_code', 200)!=200:
+            return
+
+        now = time.time()
+        content = response.content
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            row = self._conn.execute('SELECT size FROM responses WHERE key=?', (key,)).fetchone()
+            self._conn.execute(
+                'INSERT OR REPLACE INTO responses (key, endpoint, content, encoding, size, created_at, accessed_at) VALUES (?,?,?,?,?,?,?)',
+                (key, endpoint, content, response.encoding, len(content), now, now),
+            )
+            self._size += len(content) - (row[0] if row is not None else 0)
+            if self._size>self.max_bytes:
+                expired = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses WHERE created_at<?', (now-self.ttl,)).fetchone()[0]
+                self._conn.execute('DELETE FROM responses WHERE created_at<?', (now-self.ttl,))
+                self._size -= expired
+                for old_key, size in self._conn.execute('SELECT key, size FROM responses ORDER BY accessed_at').fetchall():
+                    if self._size<=self.max_bytes:
+                        break
+                    self._conn.execute('DELETE FROM responses WHERE key=?', (old_key,))
+                    self._size -= size
+            self._conn.execute('COMMIT')
+
+    def fetch(self, endpoint: str, payload: dict, send: Callable[[], object]):
+        """
+        캐시된 응답이 있으면 반환하고, 없으면 send로 요청하여 결과를 저장한 뒤 반환한다.
+        같은 key를 요청 중인 thread가 있으면, 그 요청이 끝날 때까지 기다렸다가 캐시에서 가져온다.
+
+        Args:
+            endpoint (str): 요청 URL.
+            payload (dict): 요청의 params 또는 JSON payload.
+            send (Callable[[], requests.Response]): 실제로 요청을 보내는 함수로, 실패하면 예외를 발생시켜야 한다.
+
+        Returns:
+            requests.Response|CachedResponse: 응답.
+        """
+
+        key = self.make_key(endpoint, payload)
+        with self._lock:
+            key_lock = self._inflight.setdefault(key, threading.Lock())
+
+        try:
+            with key_lock:
+                response = self.get(key)
+                if response is None:
+                    response = send()
+                    self.put(key, endpoint, response)
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is key_lock and not key_lock.locked():
+                    del self._inflight[key]
+
+        return response
+
+    def stats(self) -> dict[str, int]:
+        """
+        캐시 적중/미적중 수와 저장된 응답 수, 크기를 가져온다.
+
+        Returns:
+            dict[str, int]: {'hits', 'misses', 'entries', 'bytes'}.
+        """
+
+        with self._lock:
+            entries, size = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        return {'hits':self.hits, 'misses':self.misses, 'entries':entries, 'bytes':size}
+
+    def close(self) -> None:
+        """SQLite 연결을 닫는다."""
+
+        with self._lock:
+            self._conn.close()
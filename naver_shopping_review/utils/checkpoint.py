@@ -0,0 +1,264 @@
+"""
+네이버쇼핑 리뷰데이터 수집과 관련하여, 중단된 크롤링을 이어서 진행하기 위한 checkpoint manifest를 제공한다.
+
+클래스 목록
+1. `CheckpointManifest`
+    (상품순위, 리뷰페이지) 단위의 수집 결과를 저장폴더의 SQLite 파일에 기록하는 thread-safe manifest.
+
+함수 목록
+1. `write_complete_marker`
+    checkpoint를 쓰지 않는 실행(분산 크롤링)이 끝났을 때, 저장폴더에 작업 결과 요약을 완료 marker로 저장한다.
+2. `read_complete_marker`
+    저장폴더의 완료 marker를 읽는다.
+
+변수 목록
+1. `COMPLETE_MARKER`
+    완료 marker 파일 이름.
+"""
+
+# default
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# global setting
+COMPLETE_MARKER = '_complete.json'  # 분산 크롤링의 저장폴더에 coordinator가 모든 작업이 끝난 뒤 남기는 완료 marker.
+
+def write_complete_marker(save_dir: str, summary: dict[str, int]) -> None:
+    """
+    checkpoint를 쓰지 않는 실행(분산 크롤링)이 끝났을 때, 저장폴더에 작업 결과 요약을 완료 marker로 저장한다.
+
+    Args:
+        save_dir (str): 저장폴더.
+        summary (dict[str, int]): 상태('done','failed','pending')별 작업 수로, `CheckpointManifest.summary`와 같은 형식이다.
+
+    Returns:
+        None.
+    """
+
+    os.makedirs(save_dir, exist_ok=True)
+    path = os.path.join(save_dir, COMPLETE_MARKER)
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    with open(tmp_path, 'w') as f:
+        json.dump(summary, f)
+    os.replace(tmp_path, path)
+
+def read_complete_marker(save_dir: str) -> dict[str, int]|None:
+    """
+    저장폴더의 완료 marker를 읽는다.
+
+    Args:
+        save_dir (str): 저장폴더.
+
+    Returns:
+        dict[str, int]|None: `write_complete_marker`로 저장한 요약으로, marker가 없으면(수집 중이거나 중단된 실행) None.
+    """
+
+    path = os.path.join(save_dir, COMPLETE_MARKER)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+class CheckpointManifest:
+    """
+    (상품순위, 리뷰페이지) 단위의 수집 결과를 저장폴더의 SQLite 파일에 기록하는 thread-safe manifest.
+
+    리뷰페이지는 writer의 버퍼가 Parquet 파일에 저장되고 파일이 닫힌 뒤에 완료('done')로 기록되므로,
+    중간에 프로세스가 종료되더라도 완료로 기록된 페이지는 실제로 읽을 수 있는 파일에 저장되어 있다.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        CheckpointManifest의 생성자.
+
+        Args:
+            path (str): manifest를 저장할 SQLite 파일 경로. 파일이 있으면 기존 기록을 이어서 사용한다.
+        """
+
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS products (
+                product INTEGER PRIMARY KEY,
+                last_page INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                product INTEGER NOT NULL,
+                page INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                path TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (product, page)
+            );
+        ''')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def get_last_page(self, product: int) -> int|None:
+        """
+        상품의 수집 대상 마지막 리뷰페이지를 가져온다.
+
+        Args:
+            product (int): 상품순위.
+
+        Returns:
+            int|None: 기록된 마지막 리뷰페이지로, 기록이 없으면 None.
+        """
+
+        with self._lock:
+            row = self._conn.execute('SELECT last_page FROM products WHERE product=?', (product,)).fetchone()
+        return row[0] if row is not None else None
+
+    def set_last_page(self, product: int, last_page: int) -> None:
+        """
+        상품의 수집 대상 마지막 리뷰페이지를 기록한다.
+
+        Args:
+            product (int): 상품순위.
+            last_page (int): 수집 대상 마지막 리뷰페이지.
+
+        Returns:
+            None.
+        """
+
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO products (product, last_page, updated_at) VALUES (?,?,?)',
+                (product, last_page, time.time()),
+            )
+
+    def reset_product(self, product: int) -> None:
+        """
+        상품의 마지막 리뷰페이지와 리뷰페이지 결과 기록을 지운다. incremental 수집처럼 상품을 처음부터 다시 수집할 때 사용한다.
+
+        Args:
+            product (int): 상품순위.
+
+        Returns:
+            None.
+        """
+
+        with self._lock:
+            self._conn.execute('BEGIN')
+            self._conn.execute('DELETE FROM products WHERE product=?', (product,))
+            self._conn.execute('DELETE FROM pages WHERE product=?', (product,))
+            self._conn.execute('COMMIT')
+
+    def pending_pages(self, product: int, last_page: int) -> list[int]:
+        """
+        상품의 1 ~ last_page 리뷰페이지 중 완료되지 않은(기록이 없거나 실패한) 페이지를 가져온다.
+
+        Args:
+            product (int): 상품순위.
+            last_page (int): 수집 대상 마지막 리뷰페이지.
+
+        Returns:
+            list[int]: 수집해야 하는 리뷰페이지 리스트.
+        """
+
+        with self._lock:
+            rows = self._conn.execute("SELECT page FROM pages WHERE product=? AND status='done'", (product,)).fetchall()
+        done = {page for page, in rows}
+        return [page for page in range(1,last_page+1,1) if page not in done]
+
+    def mark_done(self, units: list[tuple[int, int]], path: str|None = None) -> None:
+        """
+        (상품순위, 리뷰페이지)들을 완료로 기록한다. writer가 파일을 닫은 뒤에 호출한다.
+
+        Args:
+            units (list[tuple[int, int]]): 완료된 (상품순위, 리뷰페이지) 리스트.
+            path (str|None, optional): 리뷰가 저장된 파일 경로. default=None.
+
+        Returns:
+            None.
+        """
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN')
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages (product, page, status, path, error, updated_at) VALUES (?,?,'done',?,NULL,?)",
+                [(product, page, path, now) for product, page in units],
+            )
+            self._conn.execute('COMMIT')
+
+    def mark_failed(self, product: int, page: int, error: Exception|str) -> None:
+        """
+        (상품순위, 리뷰페이지)를 실패로 기록한다. 이미 완료로 기록된 페이지는 바꾸지 않는다.
+
+        Args:
+            product (int): 상품순위.
+            page (int): 리뷰페이지.
+            error (Exception|str): 실패 원인.
+
+        Returns:
+            None.
+        """
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO pages (product, page, status, path, error, updated_at) VALUES (?,?,'failed',NULL,?,?) "
+                "ON CONFLICT (product, page) DO UPDATE SET error=excluded.error, updated_at=excluded.updated_at, "
+                "status=CASE WHEN pages.status='done' THEN 'done' ELSE 'failed' END",
+                (product, page, str(error), time.time()),
+            )
+
+    def summary(self) -> dict[str, int]:
+        """
+        상태별 리뷰페이지 수를 가져온다. 'pending'은 마지막 리뷰페이지까지 중 아직 결과가 기록되지 않은(수집 중이거나 중단된) 페이지 수이다.
+
+        Returns:
+            dict[str, int]: 상태('done','failed','pending')를 key로, 리뷰페이지 수를 value로 가지는 딕셔너리.
+        """
+
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM pages GROUP BY status').fetchall()
+            pending = self._conn.execute(
+                'SELECT COALESCE(SUM(last_page), 0) '
+                '- (SELECT COUNT(*) FROM pages JOIN products USING (product) WHERE pages.page<=products.last_page) FROM products'
+            ).fetchone()[0]
+        return {**dict(rows), 'pending': pending}
+
+    def products(self) -> set[int]:
+        """
+        마지막 리뷰페이지나 리뷰페이지 결과가 기록된 상품순위를 가져온다. 기록이 없는 상품은 아직 수집을 시작하지 않은 상품이다.
+
+        Returns:
+            set[int]: 상품순위 집합.
+        """
+
+        with self._lock:
+            rows = self._conn.execute('SELECT product FROM products UNION SELECT product FROM pages').fetchall()
+        return {product for product, in rows}
+
+    def paths(self) -> set[str]:
+        """
+        완료로 기록된 리뷰페이지가 저장된 파일 경로를 가져온다. 여기에 없는 리뷰 파일은 이전 실행이 쓰는 중에 종료된 파일이다.
+
+        Returns:
+            set[str]: 파일 경로 집합.
+        """
+
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT path FROM pages WHERE status='done' AND path IS NOT NULL").fetchall()
+        return {path for path, in rows}
+
+    def close(self) -> None:
+        """SQLite 연결을 닫는다."""
+
+        with self._lock:
+            self._conn.close()
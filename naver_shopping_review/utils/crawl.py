@@ -3,9 +3,29 @@
 
 함수 목록
 1. `product_response_to_data`
-    크롤링 해온 상품정보 response를 pd.DataFrame 형태로 변환한다.
+    크롤링 해온 상품정보 response를 PRODUCT_SCHEMA의 pa.RecordBatch 형태로 변환한다.
 2. `get_products_info`
     입력된 키워드에 대해 입력된 페이지수까지 상품정보를 크롤링해온다.
+3. `add_keyword_column`
+    상품정보의 첫번째 컬럼으로 keyword를 추가한다.
+4. `normalize_products_info`
+    상품정보에 판매자번호(merchantNo)와 리뷰 수집 가능 여부(isReviewable) 컬럼을 한 번에 계산하여 추가한다.
+5. `preprocess_products_info`
+    상품정보에서 리뷰를 가져올 수 없는 상품(스마트스토어가 아니거나 리뷰가 0인 상품)을 제거한다.
+6. `get_review_tasks`
+    전처리된 상품정보를 리뷰 크롤링 작업(ReviewTask) 리스트로 변환한다.
+7. `plan_last_page`
+    상품정보의 리뷰 수(reviewCount)로 크롤링할 마지막 리뷰페이지를 계산한다.
+8. `get_reviews`
+    크롤링 해온 리뷰정보 response를 pa.RecordBatch 형태로 변환하여 저장한다.
+9. `get_new_reviews`
+    리뷰를 최신순으로 가져오면서, 상품별 high-water mark에 도달하면 중단하여 새로운 리뷰만 저장한다.
+
+클래스 목록
+1. `ReviewTask`
+    상품 하나의 리뷰 크롤링 작업으로, 상품순위와 리뷰 API에 필요한 인자를 가진다.
+2. `IncompleteListingError`
+    재시도 후에도 가져오지 못한 상품 페이지가 있어, 상품정보를 완전한 것으로 저장할 수 없을 때 발생하는 에러.
 """
 
 # root경로를 추가
@@ -13,76 +33,127 @@ import os, sys
 sys.path.append(os.path.abspath(''))
 
 # crawling
-from crawling.naver_shopping_review.utils.extractor import NaverShoppingExtractor, NaverShoppingReviewExtractor
+from crawling.naver_shopping_review.utils.extractor import NaverShoppingExtractor, NaverShoppingReviewExtractor, NEXT_DATA_MARKER
+from crawling.naver_shopping_review.utils.writer import BufferedParquetWriter
+from crawling.naver_shopping_review.utils.schema import products_to_record_batch, reviews_to_record_batch, PRODUCT_SCHEMA, REVIEW_SCHEMA, _to_timestamp
+from crawling.naver_shopping_review.utils.checkpoint import CheckpointManifest
+from crawling.naver_shopping_review.utils.watermark import ReviewWatermark, watermark_key
+from crawling.naver_shopping_review.utils.metrics import METRICS
 
 # parallel
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # default
-from typing import Callable
+from typing import Callable, NamedTuple
 import requests
 from bs4 import BeautifulSoup
+import datetime
 import json
+import threading
 import time
 import numpy as np
-import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 
-# global setting
-DELAY_SECONDS = (0.1,0.3)
+# optional
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# 리뷰페이지당 리뷰 수로, 이보다 적은 페이지가 마지막 페이지이다.
+REVIEW_PAGE_SIZE = 20
+
+def _extract_next_data(content: bytes) -> dict:
+    """
+    검색결과 HTML 전체를 파싱하지 않고, `__NEXT_DATA__` script 태그의 위치를 byte 단위로 찾아 그 안의 JSON만 파싱한다.
+    태그를 찾지 못하거나 JSON이 올바르지 않으면 ValueError가 발생한다.
+    """
+
+    marker = content.find(NEXT_DATA_MARKER)
+    if marker<0:
+        raise ValueError('__NEXT_DATA__ not found')
+    start = content.index(b'>', marker) + 1
+    end = content.index(b'</script>', start)
+    return json_loads(content[start:end])
+
+def _parse_next_data_slow(text: str) -> dict:
+    """HTML 전체를 BeautifulSoup으로 파싱하고, 마지막 script 태그의 JSON을 파싱한다."""
+
+    # 바로 json이 안되므로, select로 필요한 부분 가져오기
+    soup = BeautifulSoup(text, 'html.parser')
+    return json.loads(soup.select("script")[-1].contents[0])
 
 def product_response_to_data(response: requests.models.Response,
-                             page: int|str) -> pd.DataFrame:
+                             page: int|str) -> pa.RecordBatch:
     """
-    크롤링 해온 상품정보 response를 pd.DataFrame 형태로 변환한다.
+    크롤링 해온 상품정보 response를 PRODUCT_SCHEMA의 pa.RecordBatch 형태로 변환한다.
     
     Args:
         response (requests.models.Response): 크롤링 response.
         page (int|str): 페이지 정보.
         
     Returns:
-        pd.DataFrame: 데이터프레임 형태로 변환된 네이버 상품정보.
+        pa.RecordBatch: PRODUCT_SCHEMA의 타입으로 변환된 네이버 상품정보.
     """
 
-    # 바로 json이 안되므로, select로 필요한 부분 가져오기
-    soup = BeautifulSoup(response.text, 'html.parser')
-    json_data = json.loads(soup.select("script")[-1].contents[0])
-    list_data = json_data['props']['pageProps']['initialState']['products']['list']
+    with METRICS.timer('parse_seconds', kind='product'):
+        # `__NEXT_DATA__` JSON만 byte 단위로 잘라서 파싱하고, 실패하면 BeautifulSoup으로 HTML 전체를 파싱
+        try:
+            json_data = _extract_next_data(response.content)
+            list_data = json_data['props']['pageProps']['initialState']['products']['list']
+        except (ValueError, KeyError, TypeError):
+            METRICS.inc('parse_fallbacks_total', kind='product')
+            json_data = _parse_next_data_slow(response.text)
+            list_data = json_data['props']['pageProps']['initialState']['products']['list']
+
+        # 페이지의 순위에 맞춰서 광고상품 제거하고 가져오기
+        batch = products_to_record_batch([ele['item'] for ele in list_data])
+        return _remove_ads(batch, 40*(int(page)-1) + 1)
+
+def _remove_ads(batch: pa.RecordBatch, start_rank: int, page_size: int = 40) -> pa.RecordBatch:
+    """
+    상품 페이지에서 광고상품을 한 번에 제거한다.
+    광고가 아니면서(adId가 없음) 페이지의 순위 범위(start_rank ~ start_rank+page_size-1)에 있는 상품 중, 같은 순위는 처음 나온 상품만 남긴다.
+    """
 
-    # 페이지의 순위에 맞춰서 광고상품 제거하고 가져오기
-    rank = 40*(page-1) + 1
-    product_data = []
-    
-    for i, ele in enumerate(list_data):
-        ele = ele['item']
-        if ele['rank']==rank:
-            rank += 1
-            for key in ele.keys():
-                ele[key] = str(ele[key])
-            d = pd.DataFrame(ele, index=[0])
-            product_data.append(d)
-
-            # raise
-            if len(d)!=1:
-                raise ValueError(f'{i}th value is not unique')
+    ranks = batch.column('rank').to_numpy(zero_copy_only=False)
+    ranks = np.where(np.isnan(ranks.astype(float)), -1, ranks).astype(np.int64)
+    mask = batch.column('adId').is_null().to_numpy(zero_copy_only=False) & (ranks>=start_rank) & (ranks<start_rank+page_size)
 
-    # concat
-    product_data = pd.concat(product_data, axis=0).reset_index(drop=True)
+    # 같은 순위가 여러 번 나오면 처음 나온 상품만 남김
+    candidates = np.flatnonzero(mask)
+    _, first = np.unique(ranks[candidates], return_index=True)
+    return batch.take(pa.array(np.sort(candidates[first])))
+
+class IncompleteListingError(RuntimeError):
+    """재시도 후에도 가져오지 못한 상품 페이지가 있어, 상품정보를 완전한 것으로 저장할 수 없을 때 발생하는 에러."""
 
-    return product_data
+    def __init__(self, keyword: str, pages: list[int]) -> None:
+        super().__init__(f'[{keyword}] product pages not fetched: {pages}')
+        self.keyword = keyword
+        self.pages = pages
 
 def get_products_info(keyword: str,
                       n_page: str|int,
-                      trace_func: Callable = print) -> list[str]:
+                      trace_func: Callable = print,
+                      extractor: NaverShoppingExtractor|None = None,
+                      max_workers: int = 1) -> pa.Table:
     """
     입력된 키워드에 대해 입력된 페이지수까지 상품정보를 크롤링해온다.
+    재시도 후에도 가져오지 못한 상품 페이지가 있으면, 일부 상품이 빠진 상품정보가 저장되지 않도록 IncompleteListingError를 발생시킨다.
     
     Args:
         keyword (str): 수집을 원하는 키워드명.
         n_page (str|int): 수집을 원하는 페이지 수.
         trace_func (Callable, optional): 진행 경과를 출력 할 함수. default=print.
+        extractor (NaverShoppingExtractor|None, optional): 상품정보 크롤링에 사용할 extractor로, None이면 새로 생성한다.
+            여러 키워드에서 같은 extractor를 사용하면 프록시 풀과 session이 공유된다. default=None.
+        max_workers (int, optional): 상품 페이지를 동시에 크롤링할 최대 worker의 수. default=1.
         
     Returns:
-        list[str]: 상품번호로 이루어진 리스트.
+        pa.Table: 첫번째 컬럼이 keyword이고, 나머지는 PRODUCT_SCHEMA를 따르는 상품정보.
     """
 
     trace_func('')
@@ -91,32 +162,171 @@ def get_products_info(keyword: str,
     trace_func('')
 
     # extractor 정의
-    extractor = NaverShoppingExtractor()
-
-    # 크롤링
-    data = []
-    for page in range(1,n_page+1):
+    extractor = extractor if extractor is not None else NaverShoppingExtractor()
+
+    def crawl_page(page: int) -> pa.RecordBatch|None:
+        # 네이버쇼핑 extractor를 통해 크롤링해온다. (재시도를 포기한 페이지는 None)
+        try:
+            response = extractor.crawl(keyword, page)
+        except Exception as e:
+            trace_func(f"An error occurred: [Products] page={page}, {e}")
+            METRICS.inc('errors_total', stage='products')
+            return None
+
+        # 크롤링해온 response를 pa.RecordBatch 형태로 변환한다.
+        d = product_response_to_data(response, page)
         trace_func(f'[Products] {page}/{n_page}')
+        return d
 
-        # 네이버쇼핑 extractor를 통해 크롤링해온다.
-        response = extractor.crawl(keyword, page)
-
-        # 크롤링해온 response를 pd.DataFrame 형태로 변환한다.
-        d = product_response_to_data(response, page)
-        data.append(d)
+    # 크롤링 (페이지 순서는 유지)
+    pages = range(1,int(n_page)+1)
+    if max_workers==1:
+        data = [crawl_page(page) for page in pages]
+    else:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            data = list(executor.map(crawl_page, pages))
 
-        # random sleep
-        time.sleep(np.random.uniform(DELAY_SECONDS[0],DELAY_SECONDS[1]))
+    # 가져오지 못한 페이지가 있으면 그 페이지의 상품은 리뷰를 수집할 수 없으므로 중단
+    missing = [page for page, d in zip(pages, data) if d is None]
+    if len(missing)>0:
+        raise IncompleteListingError(keyword, missing)
 
     # concat
-    data = pd.concat(data, axis=0).reset_index(drop=True)
-    data.insert(0, 'keyword', keyword)
+    data = add_keyword_column(pa.Table.from_batches(data, schema=PRODUCT_SCHEMA), keyword)
 
     trace_func('')
     trace_func('크롤링 종료')
 
     return data
 
+def add_keyword_column(products_info: pa.Table, keyword: str) -> pa.Table:
+    """
+    상품정보의 첫번째 컬럼으로 keyword를 추가한다.
+
+    Args:
+        products_info (pa.Table): PRODUCT_SCHEMA를 따르는 상품정보.
+        keyword (str): 상품정보를 수집한 키워드명.
+
+    Returns:
+        pa.Table: 첫번째 컬럼이 keyword인 상품정보.
+    """
+
+    return products_info.add_column(0, 'keyword', pa.array([keyword]*products_info.num_rows, pa.string()))
+
+def normalize_products_info(products_info: pa.Table) -> pa.Table:
+    """
+    상품정보에 판매자번호(merchantNo)와 리뷰 수집 가능 여부(isReviewable) 컬럼을 한 번에 계산하여 추가한다.
+
+    Args:
+        products_info (pa.Table): `get_products_info`로 수집한 상품정보.
+
+    Returns:
+        pa.Table: merchantNo, isReviewable 컬럼이 추가된 상품정보.
+    """
+
+    if 'isReviewable' in products_info.column_names:
+        return products_info
+
+    # 리뷰 API의 checkoutMerchantNo
+    merchant_no = pc.struct_field(products_info['mallInfoCache'], 'npaySellerNo')
+
+    # 스마트스토어 상품이면서 리뷰가 있고, 판매자번호가 있어야 리뷰를 가져올 수 있다.
+    is_smartstore = pc.match_substring(products_info['mallProductUrl'], 'https://smartstore.naver.com/main/products')
+    has_review = pc.greater(products_info['reviewCount'], 0)
+    is_reviewable = pc.fill_null(pc.and_(pc.and_(is_smartstore, has_review), pc.is_valid(merchant_no)), False)
+
+    return products_info.append_column('merchantNo', merchant_no).append_column('isReviewable', is_reviewable)
+
+def preprocess_products_info(products_info: pa.Table) -> pa.Table:
+    """
+    상품정보에서 리뷰를 가져올 수 없는 상품(스마트스토어가 아니거나 리뷰가 0인 상품)을 제거한다.
+
+    Args:
+        products_info (pa.Table): `get_products_info`로 수집한 상품정보.
+
+    Returns:
+        pa.Table: 리뷰를 가져올 수 있는 상품만 남긴, merchantNo, isReviewable 컬럼이 추가된 상품정보.
+    """
+
+    products_info = normalize_products_info(products_info)
+    return products_info.filter(products_info['isReviewable'])
+
+class ReviewTask(NamedTuple):
+    """상품 하나의 리뷰 크롤링 작업으로, 상품순위와 리뷰 API에 필요한 인자를 가진다."""
+
+    product_ranking: int        # 상품순위로, 리뷰 파일의 key.
+    merchant_no: str            # checkoutMerchantNo (mallInfoCache.npaySellerNo)
+    mall_product_no: str        # mallProductId
+    org_mall_product_no: str    # originProductNo (originalMallProductId)
+    mall_pc_url: str            # mallPcUrl
+    review_count: int|None = None   # reviewCount로, 모르면 첫번째 페이지의 totalPages로 마지막 페이지를 찾는다.
+
+    @property
+    def review_args(self) -> tuple:
+        """(merchant_no, mall_product_no, org_mall_product_no, mall_pc_url)."""
+        return tuple(self[1:5])
+
+def get_review_tasks(products_info: pa.Table) -> list[ReviewTask]:
+    """
+    전처리된 상품정보를 리뷰 크롤링 작업(ReviewTask) 리스트로 변환한다. 필요한 컬럼만 한 번에 파이썬 리스트로 가져온다.
+    상품순위는 검색결과의 순위(`rank`)로, 실행 방식(엔진, 재개 여부)과 관계없이 같은 상품은 같은 checkpoint key와 `product_ranking`을 가진다.
+
+    Args:
+        products_info (pa.Table): `preprocess_products_info`로 전처리된 상품정보.
+
+    Returns:
+        list[ReviewTask]: 상품정보 순서의 리뷰 크롤링 작업 리스트.
+    """
+
+    products_info = normalize_products_info(products_info)
+
+    return list(map(
+        ReviewTask,
+        products_info['rank'].to_pylist(),
+        products_info['merchantNo'].to_pylist(),
+        products_info['mallProductId'].to_pylist(),
+        products_info['originalMallProductId'].to_pylist(),
+        products_info['mallPcUrl'].to_pylist(),
+        products_info['reviewCount'].to_pylist(),
+    ))
+
+def plan_last_page(review_count: int|None, max_page: int = 1000) -> int|None:
+    """
+    상품정보의 리뷰 수(reviewCount)로 크롤링할 마지막 리뷰페이지를 계산한다.
+
+    Args:
+        review_count (int|None): 상품의 리뷰 수.
+        max_page (int, optional): 리뷰를 가져올 최대 페이지 수. default=1000.
+
+    Returns:
+        int|None: 마지막 리뷰페이지로, 리뷰 수를 모르면 None.
+    """
+
+    if review_count is None or review_count<=0:
+        return None
+    last_page = -(-int(review_count) // REVIEW_PAGE_SIZE)
+    return min(last_page, 1000, max_page) # 최대 1,000페이지까지만 크롤링 가능
+
+class _ReviewEnd:
+    """
+    상품 하나의 실제 마지막 리뷰페이지를 추적한다. 리뷰가 REVIEW_PAGE_SIZE보다 적은 페이지를 받으면 그 페이지를(비어있으면 이전 페이지를)
+    마지막 페이지로 줄이고, 그 뒤의 페이지는 요청하지 않는다.
+    """
+
+    def __init__(self, last_page: int) -> None:
+        self.planned_page = last_page
+        self.last_page = last_page
+        self._lock = threading.Lock()
+
+    def is_past(self, page: int) -> bool:
+        return page>self.last_page
+
+    def reached(self, page: int, n_reviews: int) -> None:
+        if n_reviews>=REVIEW_PAGE_SIZE:
+            return
+        with self._lock:
+            self.last_page = min(self.last_page, page if n_reviews>0 else page-1)
+
 def _get_reviews_iter(extractor: NaverShoppingReviewExtractor,
                       iter: int,
                       page: int,
@@ -124,9 +334,11 @@ def _get_reviews_iter(extractor: NaverShoppingReviewExtractor,
                       mall_product_no: str|int,
                       org_mall_product_no: str|int,
                       mall_pc_url: str|int,
-                      save_path_format: str = 'product{}_page{}.parquet'):
+                      writer: BufferedParquetWriter,
+                      end: _ReviewEnd|None = None):
     """
-    크롤링 해온 리뷰정보 iteration에 대한 response를 pd.DataFrame 형태로 저장한다.
+    크롤링 해온 리뷰정보 iteration에 대한 response를 pa.RecordBatch 형태로 변환하여 writer에 넣는다.
+    end가 있으면, 마지막 페이지를 넘은 페이지는 요청하지 않는다.
     
     Args:
         extractor (crawling.naver_shopping_reviw.utils.extractor.NaverShoppingReviewExtractor)
@@ -136,48 +348,77 @@ def _get_reviews_iter(extractor: NaverShoppingReviewExtractor,
         mall_product_no (str|int): 수집을 원하는 상품의 mall product no.
         org_mall_product_no (str|int): 수집을 원하는 상품의 original mall product no.
         mall_pc_url (str): 수집을 원하는 상품의 mall pc url.
-        save_path_format (str, optional): 리뷰를 저장할 경로에 대한 포맷. default='product{}_page{}.parquet'.
+        writer (BufferedParquetWriter): 리뷰를 저장할 writer로, 상품순위(iter+1)를 key로, (상품순위, 리뷰페이지)를 tag로 저장한다.
+        end (_ReviewEnd|None, optional): 상품의 실제 마지막 리뷰페이지를 추적하는 객체. default=None.
 
     Returns:
         None.
     """
 
+    if end is not None and end.is_past(page):
+        return
+
     # 크롤링
-    response = extractor.crawl(merchant_no, mall_product_no, org_mall_product_no, mall_pc_url, page)
-    json_data = response.json()
+    with METRICS.timer('crawl_seconds', kind='review'):
+        response = extractor.crawl(merchant_no, mall_product_no, org_mall_product_no, mall_pc_url, page)
 
-    # dataframe으로 변환 후, str로 변환
-    d = pd.DataFrame(json_data['contents'])
-    for col in d.columns:
-        d[col] = d[col].astype(str)
+    _write_reviews_page(response.json(), iter, page, writer, end)
 
-    # 상품순위, 리뷰순위 추가
-    start = (page-1)*20 + 1
-    end   = (page-1)*20 + 1 + len(d)
-    d.insert(0, 'product_ranking', iter+1)
-    d.insert(1, 'review_ranking', np.arange(start,end))
+def _write_reviews_page(json_data: dict, iter: int, page: int, writer: BufferedParquetWriter, end: _ReviewEnd|None = None) -> int:
+    """
+    리뷰페이지 JSON에 상품순위, 리뷰순위를 추가하고 REVIEW_SCHEMA의 타입으로 변환하여 writer에 넣는다.
+    end가 있으면 리뷰 수로 실제 마지막 페이지를 갱신한다.
+
+    Returns:
+        int: 페이지의 리뷰 수.
+    """
+
+    # 상품순위, 리뷰순위를 추가하고 REVIEW_SCHEMA의 타입으로 변환
+    with METRICS.timer('parse_seconds', kind='review'):
+        contents = json_data.get('contents') or []
+        start = (page-1)*REVIEW_PAGE_SIZE + 1
+        batch = reviews_to_record_batch(contents, iter+1, start)
+    METRICS.inc('reviews_total', batch.num_rows)
+    if end is not None:
+        end.reached(page, len(contents))
 
     # 저장
-    d.to_parquet(save_path_format.format(iter+1,page))
+    writer.write(iter+1, batch, tag=(iter+1, page))
+    return len(contents)
 
-    # random sleep
-    time.sleep(np.random.uniform(DELAY_SECONDS[0],DELAY_SECONDS[1]))
+def _make_writer(save_path_format: str, checkpoint: CheckpointManifest|None = None) -> BufferedParquetWriter:
+    """
+    리뷰를 저장할 writer를 만든다. checkpoint가 있으면, 파일이 닫힌 뒤 저장된 리뷰페이지를 완료로 기록하고
+    이전 실행에서 저장된 파일을 덮어쓰지 않는다.
+    """
 
+    if checkpoint is None:
+        return BufferedParquetWriter(save_path_format, REVIEW_SCHEMA)
+    return BufferedParquetWriter(
+        save_path_format, REVIEW_SCHEMA,
+        on_close=lambda path, units: checkpoint.mark_done(units, path),
+        overwrite=False,
+    )
 
-def get_reviews(products_info: pd.DataFrame,
-                save_path_format: str = 'product{}_page{}.parquet',
+def get_reviews(products_info: pa.Table,
+                save_path_format: str = 'product{}.parquet',
                 max_page: int = 1000,
                 trace_func: Callable = print,
-                max_workers: int = os.cpu_count()//2) -> pd.DataFrame:
+                max_workers: int = os.cpu_count()//2,
+                checkpoint: CheckpointManifest|None = None,
+                extractor: NaverShoppingReviewExtractor|None = None) -> None:
     """
-    크롤링 해온 리뷰정보 response를 pd.DataFrame 형태로 변환하여 저장한다.
+    크롤링 해온 리뷰정보 response를 pa.RecordBatch 형태로 변환하여 저장한다.
     
     Args:
-        products_info (pd.DataFrame): 상품정보.
-        save_path_format (str, optional): 리뷰를 저장할 경로에 대한 포맷. default='product{}_page{}.parquet'.
+        products_info (pa.Table): `get_products_info`로 수집한 상품정보.
+        save_path_format (str, optional): 리뷰를 저장할 경로에 대한 포맷으로, `{}`에 상품순위가 들어간다.
+            `{}`가 없으면 모든 상품의 리뷰를 하나의 파일에 저장한다. default='product{}.parquet'.
         max_page (int, optional): 리뷰를 가져올 최대 페이지 수로, 1000을 넘길 수 없다. default=1000.
         trace_func (Callable, optional): 진행 경과를 출력 할 함수. default=print.
         max_workers (int, optional): 병렬 처리를 위한 최대 worker의 수. default=os.cpu_count()//2.
+        checkpoint (CheckpointManifest|None, optional): 수집 결과를 기록할 manifest로, 있으면 완료된 리뷰페이지는 건너뛴다. default=None.
+        extractor (NaverShoppingReviewExtractor|None, optional): 리뷰 크롤링에 사용할 extractor로, None이면 새로 생성한다. default=None.
 
     Returns:
         None.
@@ -191,65 +432,250 @@ def get_reviews(products_info: pd.DataFrame,
     trace_func('')
 
     # 네이버쇼핑 상품정보 전처리
-    # (1) 스마트스토어가 아닌 상품은 리뷰를 가져올수없으므로 제거
-    products_info['is_smartstore'] = products_info['mallProductUrl'].str.contains('https://smartstore.naver.com/main/products').astype(int)
-    products_info = products_info[products_info['is_smartstore']==1].reset_index(drop=True)
+    tasks = get_review_tasks(preprocess_products_info(products_info))
 
-    # (2) 리뷰가 0인 상품들 제거
-    products_info = products_info[products_info['reviewCount']!='0'].reset_index(drop=True)
-
-    # extractor 정의
-    extractor = NaverShoppingReviewExtractor()
+    # extractor, writer 정의
+    extractor = extractor if extractor is not None else NaverShoppingReviewExtractor()
+    writer = _make_writer(save_path_format, checkpoint)
 
     s_total = time.time()
-    for iter in range(len(products_info)):
+    for n, task in enumerate(tasks):
         s_iter = time.time()
+        iter = task.product_ranking-1 # 상품순위(rank)를 key로 사용
 
-        merchant_no = eval(products_info['mallInfoCache'][iter])['npaySellerNo']
-        mall_product_no = products_info['mallProductId'][iter]
-        org_mall_product_no = products_info['originalMallProductId'][iter]
-        mall_pc_url = products_info['mallPcUrl'][iter]
+        merchant_no, mall_product_no, org_mall_product_no, mall_pc_url = task.review_args
 
         # 리뷰페이지별 iteration
 
-        # (1) 첫번째 페이지 크롤링 후, 마지막 페이지 탐색
-        response = extractor.crawl(merchant_no, mall_product_no, org_mall_product_no, mall_pc_url, page=1)
-        json_data = response.json()
-
-        # (2) 두번째 페이지부터 마지막 페이지까지 가져오기
-        last_page = min(json_data['totalPages'], 1000) # 최대 1,000페이지까지만 크롤링 가능
-        last_page = min(max_page, last_page)
+        # (1) 마지막 페이지 탐색 (checkpoint에 기록되어 있으면 생략)
+        #     상품정보의 reviewCount로 계산하고, 모르면 첫번째 페이지를 크롤링하여 totalPages를 사용한다.
+        last_page = checkpoint.get_last_page(iter+1) if checkpoint is not None else None
+        probe = None
+        if last_page is None:
+            last_page = plan_last_page(task.review_count, max_page)
+            if last_page is None:
+                try:
+                    response = extractor.crawl(merchant_no, mall_product_no, org_mall_product_no, mall_pc_url, 1)
+                    probe = response.json()
+                except Exception as e:
+                    trace_func(f"An error occurred: [Reviews] {n+1}/{len(tasks)}, {e}")
+                    METRICS.inc('errors_total', stage='reviews')
+                    if checkpoint is not None:
+                        checkpoint.mark_failed(iter+1, 1, e)
+                    continue
+
+                last_page = min(probe['totalPages'], 1000) # 최대 1,000페이지까지만 크롤링 가능
+                last_page = min(max_page, last_page)
+            if checkpoint is not None:
+                checkpoint.set_last_page(iter+1, last_page)
+
+        # (2) 완료되지 않은 페이지만 가져오기 (첫번째 페이지를 크롤링했으면, 그 response를 그대로 저장)
+        pages = checkpoint.pending_pages(iter+1, last_page) if checkpoint is not None else list(range(1,last_page+1,1))
+        if len(pages)==0:
+            trace_func(f'[Reviews] {n+1}/{len(tasks)}, skipped (already done)')
+            continue
+
+        end = _ReviewEnd(last_page)
+        if probe is not None and 1 in pages:
+            _write_reviews_page(probe, iter, 1, writer, end)
+            pages.remove(1)
 
         # 상품별 iteration
         if max_workers==1:
-            for page in range(1,last_page+1,1):
-                _get_reviews_iter(extractor, iter, page, merchant_no, mall_product_no, org_mall_product_no, mall_pc_url, save_path_format)
+            for page in pages:
+                _get_reviews_iter(extractor, iter, page, merchant_no, mall_product_no, org_mall_product_no, mall_pc_url, writer, end)
         else:
             with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = [
+                futures = {
                     executor.submit(
                         _get_reviews_iter,
-                        extractor, iter, page, merchant_no, mall_product_no, org_mall_product_no, mall_pc_url, save_path_format,
-                    )
-                    for page in range(1,last_page+1,1)
-                ]
+                        extractor, iter, page, merchant_no, mall_product_no, org_mall_product_no, mall_pc_url, writer, end,
+                    ): page
+                    for page in pages
+                }
 
                 # 모든 작업이 완료될 때까지 기다림
                 for future in as_completed(futures):
                     try:
                         future.result()
                     except Exception as e:
-                        print(f"An error occurred: {e}")
+                        trace_func(f"An error occurred: {e}")
+                        METRICS.inc('errors_total', stage='reviews')
+                        if checkpoint is not None:
+                            checkpoint.mark_failed(iter+1, futures[future], e)
+
+        # 실제 마지막 페이지가 계획보다 앞이면, 이후 실행에서 그 뒤의 페이지를 다시 요청하지 않도록 기록
+        if checkpoint is not None and end.last_page<end.planned_page:
+            checkpoint.set_last_page(iter+1, end.last_page)
 
-        # progress
+        # 상품의 리뷰를 모두 수집했으므로 저장
+        writer.finish(iter+1)
+
+        # progress (남은 시간은 지금까지의 상품별 평균 소요시간으로 추정)
         e_iter = time.time()
         elapsed = e_iter - s_iter
         total = e_iter-s_total
-        remainings = (len(products_info)-iter-1)*elapsed
+        remainings = (len(tasks)-n-1) * total/(n+1)
+        METRICS.observe('product_seconds', elapsed)
+        METRICS.inc('products_total')
+
+        trace_func(f'[Reviews] {n+1}/{len(tasks)}, {elapsed=:.2f}s, {total=:.2f}s, {remainings=:.2f}s')
 
-        trace_func(f'[Reviews] {iter+1}/{len(products_info)}, {elapsed=:.2f}s, {total=:.2f}s, {remainings=:.2f}s')
+    writer.close()
 
     trace_func('')
     trace_func('크롤링 종료')
 
+    return None
+
+def _review_key(review: dict) -> tuple[datetime.datetime, int]|None:
+    """리뷰의 최신순 정렬기준인 (createDate, 리뷰 id)를 가져오며, createDate를 변환할 수 없으면 None."""
+
+    create_date = _to_timestamp(review.get('createDate'))
+    if create_date is None:
+        return None
+    return create_date, int(review.get('id') or 0)
+
+def _get_new_reviews_product(extractor: NaverShoppingReviewExtractor,
+                             iter: int,
+                             key: str,
+                             review_args: tuple,
+                             writer: BufferedParquetWriter,
+                             watermark: ReviewWatermark,
+                             max_page: int,
+                             checkpoint: CheckpointManifest|None = None) -> int:
+    """
+    상품 하나의 리뷰를 최신순으로 한 페이지씩 가져오면서, high-water mark에 도달하면 중단한다.
+    새로운 리뷰는 (상품순위, 리뷰페이지, (high-water mark key, createDate, 리뷰 id) 또는 None)을 tag로 writer에 넣는다.
+    checkpoint가 있으면, 새로운 리뷰를 저장한 페이지 수를 마지막 리뷰페이지로 기록하고, 실패한 페이지를 실패로 기록한다.
+
+    Returns:
+        int: 새로 수집한 리뷰 수.
+    """
+
+    mark = watermark.get(key)
+
+    n_new, n_pages, page, last_page = 0, 0, 1, max_page
+    while page<=last_page:
+        try:
+            response = extractor.crawl(*review_args, page, 'REVIEW_CREATE_DATE_DESC')
+            json_data = response.json()
+        except Exception as e:
+            if checkpoint is not None:
+                checkpoint.mark_failed(iter+1, page, e)
+            raise
+        last_page = min(json_data['totalPages'], 1000, max_page) # 최대 1,000페이지까지만 크롤링 가능
+
+        # createDate를 변환할 수 없는 리뷰는 high-water mark와 비교할 수 없으므로 새로운 리뷰로 보고, mark로는 사용하지 않는다.
+        contents = json_data['contents']
+        new = [review for review in contents if mark is None or _review_key(review) is None or _review_key(review)>mark]
+        if len(new)>0:
+            batch = reviews_to_record_batch(new, iter+1, (page-1)*20+1)
+            keyed = [review for review in new if _review_key(review) is not None]
+            latest = max(keyed, key=_review_key) if len(keyed)>0 else None
+            writer.write(iter+1, batch, tag=(iter+1, page, (key, latest['createDate'], int(latest['id'])) if latest is not None else None))
+            n_new += len(new)
+            n_pages += 1
+
+        # 이미 수집한 리뷰가 나오면, 이후 페이지는 모두 이미 수집한 리뷰
+        if len(new)<len(contents) or len(contents)==0:
+            break
+        page += 1
+
+    # 새로운 리뷰는 첫번째 페이지부터 연속된 페이지에 있으므로, 저장한 페이지 수가 이번 실행의 마지막 리뷰페이지이다.
+    if checkpoint is not None:
+        checkpoint.set_last_page(iter+1, n_pages)
+
+    return n_new
+
+def get_new_reviews(products_info: pa.Table,
+                    save_path_format: str = 'product{}.parquet',
+                    max_page: int = 1000,
+                    trace_func: Callable = print,
+                    max_workers: int = os.cpu_count()//2,
+                    watermark: ReviewWatermark|None = None,
+                    extractor: NaverShoppingReviewExtractor|None = None,
+                    scope: str|None = None,
+                    checkpoint: CheckpointManifest|None = None) -> None:
+    """
+    리뷰를 최신순으로 가져오면서, 상품별 high-water mark에 도달하면 중단하여 새로운 리뷰만 저장한다.
+    상품 안에서는 high-water mark에 도달할 때까지 페이지를 순서대로 가져오고, 상품 사이에서 병렬로 진행한다.
+    high-water mark는 리뷰가 파일에 저장된 뒤에 갱신되므로, 중간에 종료되더라도 다음 실행에서 빠진 리뷰를 다시 가져온다.
+
+    Args:
+        products_info (pa.Table): `get_products_info`로 수집한 상품정보.
+        save_path_format (str, optional): 리뷰를 저장할 경로에 대한 포맷으로, `{}`에 상품순위가 들어간다.
+            `{}`가 없으면 모든 상품의 리뷰를 하나의 파일에 저장한다. default='product{}.parquet'.
+        max_page (int, optional): 상품별로 리뷰를 가져올 최대 페이지 수로, 1000을 넘길 수 없다. default=1000.
+        trace_func (Callable, optional): 진행 경과를 출력 할 함수. default=print.
+        max_workers (int, optional): 동시에 수집할 최대 상품 수. default=os.cpu_count()//2.
+        watermark (ReviewWatermark|None, optional): 상품별 high-water mark 저장소로, None이면 기본 경로의 저장소를 사용한다. default=None.
+        extractor (NaverShoppingReviewExtractor|None, optional): 리뷰 크롤링에 사용할 extractor로, None이면 새로 생성한다. default=None.
+        scope (str|None, optional): high-water mark를 나누는 범위로, 같은 상품이라도 범위마다 따로 기록한다.
+            저장폴더마다 다른 값을 사용해야, 다른 키워드의 저장폴더에 저장한 리뷰를 이미 수집한 것으로 보지 않는다.
+            ex) '{키워드}_{상품페이지수}_{최대리뷰페이지수}'. None이면 상품(originProductNo)으로만 나눈다. default=None.
+        checkpoint (CheckpointManifest|None, optional): 수집 결과를 기록할 manifest로, 새로운 리뷰를 저장한 리뷰페이지와 실패한 리뷰페이지를 기록하여
+            수집이 끝났는지 확인할 수 있다. 상품마다 이전 실행의 기록을 지우고 다시 기록하며, 완료된 페이지를 건너뛰지는 않는다. default=None.
+
+    Returns:
+        None.
+    """
+
+    assert max_page<=1000, "maximum page is 1000."
+
+    trace_func('')
+    trace_func('<네이버쇼핑 네이버페이 상품 리뷰 크롤링 (incremental)>')
+    trace_func('크롤링 시작')
+    trace_func('')
+
+    # 네이버쇼핑 상품정보 전처리
+    tasks = get_review_tasks(preprocess_products_info(products_info))
+
+    # extractor, watermark, writer 정의 (파일이 닫힌 뒤 high-water mark 갱신)
+    # 중간에 실패한 상품은 가져오지 못한 리뷰가 있으므로, 끝까지 수집한 상품의 mark만 갱신하고 실패한 상품은 이전 mark를 유지한다.
+    # 이전 실행의 리뷰 파일은 이미 high-water mark에 반영되어 다시 수집하지 않으므로, 덮어쓰지 않고 '{이름}_{n}.parquet'에 저장한다.
+    extractor = extractor if extractor is not None else NaverShoppingReviewExtractor()
+    watermark = watermark if watermark is not None else ReviewWatermark()
+    finished = set()
+
+    def on_close(path: str, tags: list[tuple]) -> None:
+        if checkpoint is not None:
+            checkpoint.mark_done([(product, page) for product, page, _ in tags], path)
+        watermark.update([mark for _, _, mark in tags if mark is not None and mark[0] in finished])
+
+    writer = BufferedParquetWriter(save_path_format, REVIEW_SCHEMA, on_close=on_close, overwrite=False)
+
+    def crawl_product(task: ReviewTask) -> int:
+        iter = task.product_ranking-1 # 상품순위(rank)를 key로 사용
+        key = watermark_key(task.review_args[2], scope) # originProductNo
+        if checkpoint is not None:
+            checkpoint.reset_product(iter+1)
+        n_new = _get_new_reviews_product(extractor, iter, key, task.review_args, writer, watermark, max_page, checkpoint)
+        finished.add(key)
+        writer.finish(iter+1)
+        return n_new
+
+    s_total = time.time()
+    n_done, n_total = 0, 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(crawl_product, task): task for task in tasks}
+        for future in as_completed(futures):
+            n_done += 1
+            try:
+                n_new = future.result()
+            except Exception as e:
+                trace_func(f"An error occurred: {e}")
+                METRICS.inc('errors_total', stage='reviews')
+                continue
+            n_total += n_new
+
+            # progress
+            total = time.time() - s_total
+            trace_func(f'[Reviews] {n_done}/{len(tasks)}, product={futures[future].product_ranking}, {n_new=}, {total=:.2f}s')
+
+    writer.close()
+
+    trace_func('')
+    trace_func(f'크롤링 종료 (new reviews={n_total})')
+
     return None
\ No newline at end of file
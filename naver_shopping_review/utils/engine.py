@@ -0,0 +1,303 @@
+"""
+네이버쇼핑 리뷰데이터 수집과 관련하여, asyncio 기반의 리뷰 크롤링 엔진을 제공한다.
+
+클래스 목록
+1. `KeywordJob`
+    `AsyncReviewEngine.run_keywords`에 넣을 키워드별 작업.
+2. `AsyncReviewEngine`
+    상품, 키워드에 관계없이 하나의 전역 요청 풀(pool)로 리뷰페이지를 동시에 크롤링하는 엔진.
+"""
+
+# root경로를 추가
+import os, sys
+sys.path.append(os.path.abspath(''))
+
+# crawling
+from crawling.naver_shopping_review.utils.extractor import NaverShoppingExtractor, NaverShoppingReviewExtractor
+from crawling.naver_shopping_review.utils.crawl import product_response_to_data, add_keyword_column, preprocess_products_info, get_review_tasks, plan_last_page, ReviewTask, IncompleteListingError, _ReviewEnd, _get_reviews_iter, _write_reviews_page, _make_writer
+from crawling.naver_shopping_review.utils.schema import PRODUCT_SCHEMA
+from crawling.naver_shopping_review.utils.checkpoint import CheckpointManifest
+from crawling.naver_shopping_review.utils.writer import BufferedParquetWriter
+from crawling.naver_shopping_review.utils.metrics import METRICS
+
+# parallel
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+# default
+from typing import Callable, NamedTuple
+import time
+import pyarrow as pa
+
+class KeywordJob(NamedTuple):
+    """`AsyncReviewEngine.run_keywords`에 넣을 키워드별 작업."""
+
+    keyword: str                                        # 수집 대상 키워드.
+    save_path_format: str                               # 리뷰를 저장할 경로에 대한 포맷으로, `{}`에 상품순위가 들어간다.
+    checkpoint: CheckpointManifest|None = None          # 수집 결과를 기록할 manifest.
+    products_info: pa.Table|None = None                 # 이미 수집한 상품정보로, 있으면 상품 페이지를 다시 크롤링하지 않는다.
+    on_products: Callable[[pa.Table], None]|None = None # 키워드의 상품정보 수집이 끝났을 때 호출할 함수. ex) 상품정보 저장
+
+class AsyncReviewEngine:
+    """
+    상품, 키워드에 관계없이 하나의 전역 요청 풀(pool)로 리뷰페이지를 동시에 크롤링하는 엔진.
+
+    상품별로 ThreadPoolExecutor를 새로 여는 `get_reviews`와 달리, 모든 상품과 키워드의 리뷰페이지 요청을
+    하나의 asyncio.Semaphore로 관리하므로, 특정 상품의 마지막 페이지들을 기다리는 동안에도 다른 상품의 요청이 계속 진행된다.
+    """
+
+    def __init__(self,
+                 extractor: NaverShoppingReviewExtractor|None = None,
+                 max_concurrency: int = os.cpu_count()//2,
+                 trace_func: Callable = print,
+                 product_extractor: NaverShoppingExtractor|None = None) -> None:
+        """
+        AsyncReviewEngine의 생성자.
+
+        Args:
+            extractor (NaverShoppingReviewExtractor|None, optional): 리뷰 크롤링에 사용할 extractor. None이면 새로 생성한다. default=None.
+            product_extractor (NaverShoppingExtractor|None, optional): `run_keywords`에서 상품정보 크롤링에 사용할 extractor.
+                None이면 리뷰 extractor와 같은 프록시 풀을 사용하도록 새로 생성한다. default=None.
+            max_concurrency (int, optional): 동시에 진행할 최대 요청 수. default=os.cpu_count()//2.
+            trace_func (Callable, optional): 진행 경과를 출력 할 함수. default=print.
+        """
+
+        assert max_concurrency>=1, "max_concurrency must be greater than or equal to 1."
+
+        self.extractor = extractor if extractor is not None else NaverShoppingReviewExtractor()
+        self.product_extractor = product_extractor if product_extractor is not None else NaverShoppingExtractor(proxy_pool=self.extractor.proxy_pool)
+        self.max_concurrency = max_concurrency
+        self.trace_func = trace_func
+
+    def run(self, jobs: list[tuple[pa.Table, str, CheckpointManifest|None]], max_page: int = 1000) -> None:
+        """
+        입력된 작업들의 리뷰를 하나의 전역 요청 풀로 크롤링하여 저장한다.
+
+        Args:
+            jobs (list[tuple[pa.Table, str, CheckpointManifest|None]]): (상품정보, 리뷰를 저장할 경로에 대한 포맷, checkpoint)로 이루어진 리스트.
+                포맷의 `{}`에는 상품순위가 들어가며, `{}`가 없으면 작업별로 하나의 파일에 저장한다.
+                checkpoint가 있으면 완료된 리뷰페이지는 건너뛴다.
+                키워드별 상품정보를 한 번에 넣으면, 키워드 사이에서도 요청 풀이 공유된다.
+            max_page (int, optional): 리뷰를 가져올 최대 페이지 수로, 1000을 넘길 수 없다. default=1000.
+
+        Returns:
+            None.
+        """
+
+        assert max_page<=1000, "maximum page is 1000."
+
+        self.trace_func('')
+        self.trace_func('<네이버쇼핑 네이버페이 상품 리뷰 크롤링 (async)>')
+        self.trace_func('크롤링 시작')
+        self.trace_func('')
+
+        asyncio.run(self._run(jobs, max_page))
+
+        self.trace_func('')
+        self.trace_func('크롤링 종료')
+
+    def run_keywords(self, jobs: list[KeywordJob], n_page: int, max_page: int = 1000) -> dict[str, pa.Table]:
+        """
+        여러 키워드의 상품 페이지와 리뷰페이지를 하나의 전역 요청 풀로 크롤링하여 저장한다.
+
+        모든 키워드의 모든 상품 페이지를 동시에 요청하고, 상품 페이지가 파싱되는 즉시 그 페이지의 상품들의 리뷰 크롤링을 시작하므로,
+        리뷰 크롤링이 `n_page`개의 상품 페이지가 모두 끝나기를 기다리지 않는다.
+        상품 페이지가 도착하는 순서와 관계없이 같은 상품은 같은 파일에 저장되도록, 상품순위는 검색결과의 순위(`rank`)를 사용한다.
+
+        Args:
+            jobs (list[KeywordJob]): 키워드별 작업 리스트.
+            n_page (int): 키워드별로 수집할 상품 페이지 수.
+            max_page (int, optional): 상품별로 리뷰를 가져올 최대 페이지 수로, 1000을 넘길 수 없다. default=1000.
+
+        Returns:
+            dict[str, pa.Table]: 키워드를 key로, 수집한 상품정보를 value로 가지는 딕셔너리.
+        """
+
+        assert max_page<=1000, "maximum page is 1000."
+
+        self.trace_func('')
+        self.trace_func('<네이버쇼핑 네이버페이 상품, 리뷰 크롤링 (async)>')
+        self.trace_func('크롤링 시작')
+        self.trace_func('')
+
+        self._missing = {}
+        products = asyncio.run(self._run_keywords(jobs, n_page, max_page))
+
+        self.trace_func('')
+        self.trace_func('크롤링 종료')
+
+        # 가져오지 못한 상품 페이지가 있는 키워드는 상품정보를 저장하지 않았으므로, 재개(resume)할 때 상품 페이지부터 다시 수집한다.
+        for keyword, pages in self._missing.items():
+            raise IncompleteListingError(keyword, pages)
+
+        return products
+
+    def _start(self) -> None:
+        """전역 Semaphore와 ThreadPoolExecutor, 진행상황 카운터를 만든다."""
+
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+        self._n_done = 0
+        self._n_products = 0
+        self._s_total = time.time()
+
+    async def _run(self, jobs: list[tuple[pa.Table, str, CheckpointManifest|None]], max_page: int) -> None:
+        """전역 Semaphore와 ThreadPoolExecutor를 만들고, 모든 상품의 크롤링 코루틴을 동시에 실행한다."""
+
+        self._start()
+
+        products, writers = [], []
+        for products_info, save_path_format, checkpoint in jobs:
+            tasks = get_review_tasks(preprocess_products_info(products_info))
+            writer = _make_writer(save_path_format, checkpoint)
+            products += [(task, writer, checkpoint) for task in tasks]
+            writers.append(writer)
+        self._n_products = len(products)
+
+        try:
+            await asyncio.gather(*[
+                self._crawl_product(task, writer, checkpoint, max_page)
+                for task, writer, checkpoint in products
+            ])
+        finally:
+            self._executor.shutdown(wait=True)
+            for writer in writers:
+                writer.close()
+
+    async def _run_keywords(self, jobs: list[KeywordJob], n_page: int, max_page: int) -> dict[str, pa.Table]:
+        """모든 키워드의 상품 페이지 크롤링 코루틴을 동시에 실행하고, 상품 페이지마다 리뷰 크롤링 코루틴을 바로 시작한다."""
+
+        self._start()
+        writers = []
+
+        try:
+            results = await asyncio.gather(*[self._crawl_keyword(job, n_page, max_page, writers) for job in jobs])
+        finally:
+            self._executor.shutdown(wait=True)
+            for writer in writers:
+                writer.close()
+
+        return {job.keyword: products_info for job, products_info in zip(jobs, results)}
+
+    async def _crawl_keyword(self, job: KeywordJob, n_page: int, max_page: int, writers: list) -> pa.Table:
+        """키워드 하나의 상품 페이지를 동시에 크롤링하면서, 파싱된 상품 페이지부터 리뷰 크롤링을 시작한다."""
+
+        writer = _make_writer(job.save_path_format, job.checkpoint)
+        writers.append(writer)
+        review_tasks = []
+
+        def start_reviews(products_info: pa.Table) -> None:
+            tasks = get_review_tasks(preprocess_products_info(products_info))
+            self._n_products += len(tasks)
+            for task in tasks:
+                review_tasks.append(asyncio.create_task(
+                    self._crawl_product(task, writer, job.checkpoint, max_page)
+                ))
+
+        async def crawl_page(page: int) -> pa.RecordBatch:
+            try:
+                response = await self._call(self.product_extractor.crawl, job.keyword, page)
+                batch = await self._call(product_response_to_data, response, page)
+            except Exception as e:
+                self.trace_func(f"An error occurred: [{job.keyword}] page={page}, {e}")
+                METRICS.inc('errors_total', stage='products')
+                return None
+            self.trace_func(f'[Products] {job.keyword} {page}/{n_page}')
+            start_reviews(pa.Table.from_batches([batch]))
+            return batch
+
+        # (1) 상품 페이지를 동시에 크롤링하고, 파싱된 페이지부터 리뷰 크롤링 시작
+        if job.products_info is not None:
+            products_info = job.products_info
+            start_reviews(products_info)
+        else:
+            batches = await asyncio.gather(*[crawl_page(page) for page in range(1,n_page+1)])
+            products_info = pa.Table.from_batches([batch for batch in batches if batch is not None], schema=PRODUCT_SCHEMA)
+            products_info = add_keyword_column(products_info, job.keyword)
+
+            missing = [page for page, batch in zip(range(1,n_page+1), batches) if batch is None]
+            if len(missing)>0:
+                self._missing[job.keyword] = missing
+
+        # (2) 상품정보 수집이 끝났으므로, 리뷰 크롤링이 끝나기 전에 저장
+        #     가져오지 못한 상품 페이지가 있으면, 일부 상품이 빠진 상품정보를 완전한 것으로 저장하지 않는다.
+        if job.keyword in self._missing:
+            self.trace_func(f"An error occurred: [{job.keyword}] product pages not fetched: {self._missing[job.keyword]}, products not saved")
+        elif job.on_products is not None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, job.on_products, products_info)
+
+        # (3) 리뷰 크롤링이 끝날 때까지 기다림
+        await asyncio.gather(*review_tasks)
+
+        return products_info
+
+    async def _call(self, func: Callable, *args):
+        """전역 Semaphore의 허용 범위 안에서, 동기 함수를 ThreadPoolExecutor에서 실행한다."""
+
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+
+    async def _crawl_product(self,
+                             task: ReviewTask,
+                             writer: BufferedParquetWriter,
+                             checkpoint: CheckpointManifest|None,
+                             max_page: int) -> None:
+        """
+        상품 하나의 마지막 리뷰페이지를 reviewCount로 계산(모르면 첫번째 페이지로 탐색)한 후, 완료되지 않은 리뷰페이지 요청을 전역 풀에 넣는다.
+        상품순위를 key로 저장하고, 리뷰가 20개보다 적은 페이지를 받으면 그 뒤의 페이지는 요청하지 않는다.
+        """
+
+        iter, review_args = task.product_ranking-1, task.review_args
+        loop = asyncio.get_running_loop()
+        try:
+            # (1) 마지막 페이지 탐색 (checkpoint에 기록되어 있으면 생략)
+            #     checkpoint(SQLite) 호출은 event loop를 막지 않도록 executor에서 진행
+            last_page = await loop.run_in_executor(self._executor, checkpoint.get_last_page, iter+1) if checkpoint is not None else None
+            probe = None
+            if last_page is None:
+                last_page = plan_last_page(task.review_count, max_page)
+                if last_page is None:
+                    response = await self._call(self.extractor.crawl, *review_args, 1)
+                    probe = response.json()
+                    last_page = min(probe['totalPages'], 1000) # 최대 1,000페이지까지만 크롤링 가능
+                    last_page = min(max_page, last_page)
+                if checkpoint is not None:
+                    await loop.run_in_executor(self._executor, checkpoint.set_last_page, iter+1, last_page)
+
+            # (2) 첫번째 페이지를 크롤링했으면 그 response를 그대로 저장하고,
+            #     완료되지 않은 나머지 페이지를 전역 풀에 넣고, 완료될 때까지 기다림
+            pages = await loop.run_in_executor(self._executor, checkpoint.pending_pages, iter+1, last_page) if checkpoint is not None else list(range(1,last_page+1,1))
+            end = _ReviewEnd(last_page)
+            if probe is not None and 1 in pages:
+                await loop.run_in_executor(self._executor, _write_reviews_page, probe, iter, 1, writer, end)
+                pages.remove(1)
+            results = await asyncio.gather(*[
+                self._call(_get_reviews_iter, self.extractor, iter, page, *review_args, writer, end)
+                for page in pages
+            ], return_exceptions=True)
+            for page, result in zip(pages, results):
+                if isinstance(result, Exception):
+                    self.trace_func(f"An error occurred: {result}")
+                    METRICS.inc('errors_total', stage='reviews')
+                    if checkpoint is not None:
+                        await loop.run_in_executor(self._executor, checkpoint.mark_failed, iter+1, page, result)
+
+            # 실제 마지막 페이지가 계획보다 앞이면, 이후 실행에서 그 뒤의 페이지를 다시 요청하지 않도록 기록
+            if checkpoint is not None and end.last_page<end.planned_page:
+                await loop.run_in_executor(self._executor, checkpoint.set_last_page, iter+1, end.last_page)
+        except Exception as e:
+            # 마지막 페이지 탐색이 실패한 상품도 실패로 기록하여, 수집을 시작하지 않은 상품과 구분한다.
+            self.trace_func(f"An error occurred: {e}")
+            METRICS.inc('errors_total', stage='reviews')
+            if checkpoint is not None:
+                await loop.run_in_executor(self._executor, checkpoint.mark_failed, iter+1, 1, e)
+
+        # 상품의 리뷰를 모두 수집했으므로 저장 (파일 쓰기는 event loop를 막지 않도록 executor에서 진행)
+        await loop.run_in_executor(self._executor, writer.finish, iter+1)
+
+        # progress
+        self._n_done += 1
+        total = time.time() - self._s_total
+        remainings = total / self._n_done * (self._n_products - self._n_done)
+        self.trace_func(f'[Reviews] {self._n_done}/{self._n_products}, {total=:.2f}s, {remainings=:.2f}s')
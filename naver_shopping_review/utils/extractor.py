@@ -2,6 +2,8 @@
 네이버쇼핑 리뷰데이터 수집과 관련하여, extractor 관련 클래스를 제공한다.
 
 클래스 목록
+0. `PooledSessionExtractor`
+    프록시별로 커넥션 풀과 keep-alive를 가지는 requests.Session을 재사용하는 extractor의 부모 클래스. lib.python.crawler.BaseExtractor를 상속받아 만들어진다.
 1. `NaverShoppingExtractor`
     네이버쇼핑에서 키워드를 검색했을 때 나오는 네이버페이 정보를 API를 통해 크롤링하는 클래스. lib.python.crawler.BaseExtractor를 상속받아 만들어진다.
 2. `NaverShoppingReviewExtractor`
@@ -10,35 +12,247 @@
 
 # lib
 from lib.python.crawl import BaseExtractor
-from lib.python.decorators import retry_with_delay
 
 # crawling
-from crawling.naver_shopping_review.utils import add_headers_randomly, get_proxies
+from crawling.naver_shopping_review.utils import proxy_url, ProxyPool
+from crawling.naver_shopping_review.utils.ratelimit import AdaptiveRateLimiter, RATE_LIMITER
+from crawling.naver_shopping_review.utils.cache import ResponseCache, json_loads
+from crawling.naver_shopping_review.utils.metrics import METRICS
+from crawling.naver_shopping_review.utils.retry import RetryPolicy, RETRY_POLICY, HTTPStatusError, InvalidBodyError, with_retry
+from crawling.naver_shopping_review.utils.useragent import UserAgentPool
 
 # default
+from typing import Callable
 import json
-import random
+import threading
+import time
 import requests
-import urllib
-from fake_useragent import UserAgent
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
 
 # global setting
-RETRY_COUNT = -1
-DELAY_SECONDS = (0.1,0.3)
-VERBOSE = 0
-VERBOSE_PERIOD = 1
+POOL_SIZE = 10
+KEEP_ALIVE = True
+REVIEW_SORT_TYPE = 'REVIEW_RANKING'             # 리뷰 정렬기준으로, 랭킹순('REVIEW_RANKING') 또는 최신순('REVIEW_CREATE_DATE_DESC').
+SEARCH_URL = 'https://search.shopping.naver.com/search/all'                     # 상품 검색결과 페이지 URL.
+REVIEW_URL = 'https://smartstore.naver.com/i/v1/contents/reviews/query-pages'   # 리뷰 API URL.
+NEXT_DATA_MARKER = b'id="__NEXT_DATA__"'        # 검색결과 HTML에 포함된 Next.js 상태 JSON의 script 태그.
 
-UA = UserAgent()
+# 디스크에 저장된 user-agent 목록에서 뽑으며, 목록은 처음 요청할 때 불러온다.
+UA = UserAgentPool()
 
-class NaverShoppingExtractor(BaseExtractor):
+# 요청마다 변하지 않는 cookies, headers 템플릿으로, 요청마다 referer, user-agent만 바뀐다.
+SEARCH_COOKIES = {
+    'NNB': 'FQTBKMTQEV3WG',
+    'NID_AUT': 'gvJsXPhQYqbFr2Pq0LzEnlIkcpV/4DvZ2Nv9xVUdBlQUljF6/sFp4YxHEfgSTiYB',
+    'NID_JKL': 'eyNNuWCuSajGhKc58q5w9Eb0cZRvI9BY0JXFrH65O4A=',
+    'NAC': 'EzcXBMgVB4leB',
+    'ASID': '1b2313bc000001903bd7270000000043',
+    'SHP_BUCKET_ID': '1',
+    'spage_uid': '',
+    'NID_SES': 'AAABrfWOhcv9S1022b1lNHa69zvAlKYeyl2JkpcjFNsRQE+ARI9uZgBlxBlCrLDooL0W9S6U75gYYgX1xhozXZsuUKo2wzTnmT8iVrYDTVSOMFQjAQzOZlc4HF9mbnrTpBt94ljBdL4JBihFCcAXyZzBuFjlD9xOY3/lHqlsu1C7Wf8gXjgKDpV1dHYO2WXyd9oH6yJuQCWh+XInbG81sWOBZStzghKzPeP6ryp1BqxtN27lg8baiDyk5rVvP5JxOKDrZNkLGMvhg4gGOwc3pR+6W4WhBA6w6BsYKdk/JCxt4AHm0J8GLt14W8OR8qKdDFPycamIis9onqXfpKEAmmhS/N30Iw9sTlH3ShHP4c73mGsvt2uuGQj0USgZGHxiQlmDTL81g9VcZnh3wyFVjEg5ITEGWB7ZXplGAGA98fyFIRs3D4cBgG5kd+DVgCC5CW3gSy4Z13lf49J66j7UxZ59qukun7ven2nmnPwV4DgXtxy05sh59kHaLqEGOvEJjzjfxG0/qEj8jhsDODvJ/jA+D9AaTokaIgn45t13K+YEz5UezbgFsQZjsMWZ8XvxHgDeyQ==',
+    'ncpa': '701151|lxyyjyc8|6a313a2c31ab6fd18377ff9ab24deb6c99117292|s_f0de38c92f99|88e42eaa26504f30064bbe068639fff37bbb5ce8:849040|lxyym49s|eb371934ddc9838867ecfd28f01a59dc397cfaa8|s_23a46a96bc6f1|3301a48a00e8c859583a5f7317cea8acfd0b2244:425796|lxz63iko|46e9c2c1311ee50011db18c9b937f2921e83f44c|s_591787468346782261|c01c3f49c9b44df468cfe8ea4272d48e14827c6b:3316929|lxz6g5tk|d7cdbf7a890101b8c0e465c3e0601dbb2aa5bd40|s_25d12ee472e4|fe16356a046bf6fa0e83c918e91711e9ef359f6e:5278144|lxz705q8|61178200b73d1faa4c99d1b1dbb47f34fe5a6056|s_1094171d5a3ed|4332edf748139d2f24fe6ca43767261e23cc3a62',
+}
+
+SEARCH_HEADERS = {
+    'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+    'accept-language': 'ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7',
+    'cache-control': 'max-age=0',
+    'priority': 'u=0, i',
+    'referer': 'https://shopping.naver.com/home',
+    'sec-ch-ua': '"Not/A)Brand";v="8", "Chromium";v="126", "Google Chrome";v="126"',
+    'sec-ch-ua-arch': '"x86"',
+    'sec-ch-ua-bitness': '"64"',
+    'sec-ch-ua-form-factors': '"Desktop"',
+    'sec-ch-ua-full-version-list': '"Not/A)Brand";v="8.0.0.0", "Chromium";v="126.0.6478.127", "Google Chrome";v="126.0.6478.127"',
+    'sec-ch-ua-mobile': '?0',
+    'sec-ch-ua-model': '""',
+    'sec-ch-ua-platform': '"Windows"',
+    'sec-ch-ua-platform-version': '"10.0.0"',
+    'sec-ch-ua-wow64': '?0',
+    'sec-fetch-dest': 'document',
+    'sec-fetch-mode': 'navigate',
+    'sec-fetch-site': 'same-origin',
+    'sec-fetch-user': '?1',
+    'upgrade-insecure-requests': '1',
+}
+
+REVIEW_COOKIES = {
+    'NNB': 'FQTBKMTQEV3WG',
+    'NID_AUT': 'gvJsXPhQYqbFr2Pq0LzEnlIkcpV/4DvZ2Nv9xVUdBlQUljF6/sFp4YxHEfgSTiYB',
+    'NID_JKL': 'eyNNuWCuSajGhKc58q5w9Eb0cZRvI9BY0JXFrH65O4A=',
+    'NAC': 'EzcXBMgVB4leB',
+    'ASID': '1b2313bc000001903bd7270000000043',
+    'NACT': '1',
+    'CRF_TOOLTIP': 'true',
+    'NID_SES': 'AAABrfWOhcv9S1022b1lNHa69zvAlKYeyl2JkpcjFNsRQE+ARI9uZgBlxBlCrLDooL0W9S6U75gYYgX1xhozXZsuUKo2wzTnmT8iVrYDTVSOMFQjAQzOZlc4HF9mbnrTpBt94ljBdL4JBihFCcAXyZzBuFjlD9xOY3/lHqlsu1C7Wf8gXjgKDpV1dHYO2WXyd9oH6yJuQCWh+XInbG81sWOBZStzghKzPeP6ryp1BqxtN27lg8baiDyk5rVvP5JxOKDrZNkLGMvhg4gGOwc3pR+6W4WhBA6w6BsYKdk/JCxt4AHm0J8GLt14W8OR8qKdDFPycamIis9onqXfpKEAmmhS/N30Iw9sTlH3ShHP4c73mGsvt2uuGQj0USgZGHxiQlmDTL81g9VcZnh3wyFVjEg5ITEGWB7ZXplGAGA98fyFIRs3D4cBgG5kd+DVgCC5CW3gSy4Z13lf49J66j7UxZ59qukun7ven2nmnPwV4DgXtxy05sh59kHaLqEGOvEJjzjfxG0/qEj8jhsDODvJ/jA+D9AaTokaIgn45t13K+YEz5UezbgFsQZjsMWZ8XvxHgDeyQ==',
+}
+
+REVIEW_HEADERS = {
+    'accept': 'application/json, text/plain, */*',
+    'accept-language': 'ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7',
+    'content-type': 'application/json',
+    'origin': 'https://smartstore.naver.com',
+    'priority': 'u=1, i',
+    'sec-ch-ua': '"Not/A)Brand";v="8", "Chromium";v="126", "Google Chrome";v="126"',
+    'sec-ch-ua-mobile': '?0',
+    'sec-ch-ua-platform': '"Windows"',
+    'sec-fetch-dest': 'empty',
+    'sec-fetch-mode': 'cors',
+    'sec-fetch-site': 'same-origin',
+    'x-client-version': '20240626111623',
+}
+
+class PooledSessionExtractor(BaseExtractor):
+    """프록시별로 커넥션 풀과 keep-alive를 가지는 requests.Session을 재사용하는 extractor의 부모 클래스. lib.python.crawler.BaseExtractor를 상속받아 만들어진다."""
+
+    def __init__(self, cookies: dict, headers: dict, pool_size: int = POOL_SIZE, keep_alive: bool = KEEP_ALIVE, proxy_pool: ProxyPool|None = None, rate_limiter: AdaptiveRateLimiter|None = None, cache: ResponseCache|None = None, retry_policy: RetryPolicy|None = None):
+        """
+        PooledSessionExtractor의 생성자로, lib.python.crawler.BaseExtractor를 상속받아 만들어진다.
+
+        Args:
+            cookies (dict): 모든 요청에 공통으로 사용할 cookies 템플릿.
+            headers (dict): 모든 요청에 공통으로 사용할 headers 템플릿.
+            pool_size (int, optional): 프록시별 session이 유지할 최대 커넥션 수. default=POOL_SIZE.
+            keep_alive (bool, optional): 요청 후 커넥션을 닫지 않고 재사용할지 여부. default=KEEP_ALIVE.
+            proxy_pool (ProxyPool|None, optional): 사용할 프록시 풀. None이면 새로 만든다. default=None.
+            rate_limiter (AdaptiveRateLimiter|None, optional): 요청 속도를 조절할 rate limiter. None이면 모든 extractor가 공유하는 RATE_LIMITER를 사용한다. default=None.
+            cache (ResponseCache|None, optional): 성공한 응답을 저장하고 재사용할 응답 캐시. None이면 캐시를 사용하지 않는다. default=None.
+            retry_policy (RetryPolicy|None, optional): `crawl`의 재시도 정책. None이면 모든 extractor가 공유하는 RETRY_POLICY를 사용한다. default=None.
+        """
+
+        self.proxy_pool = proxy_pool if proxy_pool is not None else ProxyPool(verify=True)
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RATE_LIMITER
+        self.cache = cache
+        self.retry_policy = retry_policy if retry_policy is not None else RETRY_POLICY
+        self.cookies = cookies
+        self.headers = headers
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+
+        self.sessions = {}
+        self._sessions_lock = threading.Lock()
+
+    def _get_session(self, proxy: str|None) -> requests.Session:
+        """
+        프록시에 해당하는 session을 가져오고, 없으면 새로 만든다.
+
+        Args:
+            proxy (str|None): 프록시서버 URL. None이면 프록시 없이 직접 요청하는 session을 가져온다.
+
+        Returns:
+            requests.Session: cookies, headers 템플릿과 프록시가 설정된 session.
+        """
+
+        with self._sessions_lock:
+            session = self.sessions.get(proxy)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.cookies.update(self.cookies)
+                session.headers.update(self.headers)
+                session.headers['connection'] = 'keep-alive' if self.keep_alive else 'close'
+                session.proxies = {'http':proxy_url(proxy), 'https':proxy_url(proxy)} if proxy is not None else {}
+                self.sessions[proxy] = session
+
+        return session
+
+    def _close_session(self, proxy: str) -> None:
+        """
+        차단된 프록시의 session을 닫고 제거한다.
+
+        Args:
+            proxy (str): 프록시서버 URL.
+
+        Returns:
+            None.
+        """
+
+        with self._sessions_lock:
+            session = self.sessions.pop(proxy, None)
+        if session is not None:
+            session.close()
+
+    def _send(self, proxy: str, method: Callable, url: str, **kwargs) -> requests.Response:
+        """
+        rate limiter의 허용 속도에 맞춰 session으로 요청을 보내고, 결과를 프록시 풀과 rate limiter에 기록한다.
+
+        Args:
+            proxy (str): 요청에 사용할 프록시서버 URL.
+            method (Callable): 요청을 보낼 session의 메서드(session.get, session.post).
+            url (str): 요청을 보낼 URL.
+            **kwargs: method에 전달할 인자.
+
+        Returns:
+            requests.Response: 요청에 대한 응답.
+        """
+
+        host = urlsplit(url).netloc
+        METRICS.observe('ratelimit_wait_seconds', self.rate_limiter.acquire(host, proxy), host=host)
+
+        s = time.time()
+        try:
+            response = method(url, **kwargs)
+        except requests.RequestException as e:
+            METRICS.observe('request_seconds', time.time()-s, host=host)
+            METRICS.inc('requests_total', host=host, status='error')
+            METRICS.inc('proxy_failures_total', host=host, status=type(e).__name__)
+            self.proxy_pool.report(proxy, ok=False)
+            self._close_session(proxy)
+            raise
+
+        latency = time.time() - s
+        ok = response.status_code==200
+        METRICS.observe('request_seconds', latency, host=host)
+        METRICS.inc('requests_total', host=host, status=response.status_code)
+        METRICS.inc('bytes_downloaded_total', len(response.content), host=host)
+        self.proxy_pool.report(proxy, ok=ok, latency=latency)
+        self.rate_limiter.feedback(host, proxy, response.status_code)
+        if not ok:
+            METRICS.inc('proxy_failures_total', host=host, status=response.status_code)
+            self._close_session(proxy)
+
+        return response
+
+    def _fetch(self, url: str, payload: dict, send: Callable[[], requests.Response]) -> requests.Response:
+        """
+        응답 캐시가 있으면 (url, payload)에 대한 캐시된 응답을 반환하고, 없으면 send로 요청한다.
+
+        Args:
+            url (str): 요청을 보낼 URL.
+            payload (dict): 캐시 key를 만들 요청의 params 또는 JSON payload.
+            send (Callable[[], requests.Response]): 실제로 요청을 보내는 함수로, 실패하면 예외를 발생시킨다.
+
+        Returns:
+            requests.Response: 요청에 대한 응답 또는 캐시된 응답(CachedResponse).
+        """
+
+        if self.cache is None:
+            return send()
+        return self.cache.fetch(url, payload, send)
+
+class NaverShoppingExtractor(PooledSessionExtractor):
     """네이버쇼핑에서 키워드를 검색했을 때 나오는 네이버페이 정보를 API를 통해 크롤링하는 클래스. lib.python.crawler.BaseExtractor를 상속받아 만들어진다."""
     
-    def __init__(self):
-        """NaverShoppingExtractor의 생성자로, lib.python.crawler.BaseExtractor를 상속받아 만들어진다."""
+    def __init__(self, pool_size: int = POOL_SIZE, keep_alive: bool = KEEP_ALIVE, proxy_pool: ProxyPool|None = None, cache: ResponseCache|None = None, url: str = SEARCH_URL, retry_policy: RetryPolicy|None = None):
+        """
+        NaverShoppingExtractor의 생성자로, PooledSessionExtractor를 상속받아 만들어진다.
+
+        Args:
+            pool_size (int, optional): 프록시별 session이 유지할 최대 커넥션 수. default=POOL_SIZE.
+            keep_alive (bool, optional): 요청 후 커넥션을 닫지 않고 재사용할지 여부. default=KEEP_ALIVE.
+            proxy_pool (ProxyPool|None, optional): 사용할 프록시 풀. None이면 새로 만든다. default=None.
+            cache (ResponseCache|None, optional): 상품 페이지 응답을 재사용할 응답 캐시. None이면 캐시를 사용하지 않는다. default=None.
+            url (str, optional): 상품 검색결과 페이지 URL로, 벤치마크에서는 로컬 mock 서버의 URL을 넣는다. default=SEARCH_URL.
+            retry_policy (RetryPolicy|None, optional): `crawl`의 재시도 정책. None이면 RETRY_POLICY를 사용한다. default=None.
+        """
         
-        self.proxies_list = get_proxies(verify=True)
+        super().__init__(SEARCH_COOKIES, SEARCH_HEADERS, pool_size, keep_alive, proxy_pool, cache=cache, retry_policy=retry_policy)
+        self.url = url
     
-    @retry_with_delay(retry_count=RETRY_COUNT, delay_seconds=DELAY_SECONDS, verbose=VERBOSE, verbose_period=VERBOSE_PERIOD)
+    @with_retry
     def crawl(self, keyword: str, page: str|int) -> json:
         """
         Queue에 들어온 메시지를 기반으로 크롤링을 진행하는 함수로, extractor의 진입함수.
@@ -65,47 +279,7 @@ class NaverShoppingExtractor(BaseExtractor):
             json: 수집 API로부터 전달받은 Parsing된 결과 데이터.
         """
         
-        # get proxies
-        if len(self.proxies_list)==0:
-            self.proxies_list = get_proxies(verify=True)
-        
-        url = 'https://search.shopping.naver.com/search/all'
-
-        cookies = {
-            'NNB': 'FQTBKMTQEV3WG',
-            'NID_AUT': 'gvJsXPhQYqbFr2Pq0LzEnlIkcpV/4DvZ2Nv9xVUdBlQUljF6/sFp4YxHEfgSTiYB',
-            'NID_JKL': 'eyNNuWCuSajGhKc58q5w9Eb0cZRvI9BY0JXFrH65O4A=',
-            'NAC': 'EzcXBMgVB4leB',
-            'ASID': '1b2313bc000001903bd7270000000043',
-            'SHP_BUCKET_ID': '1',
-            'spage_uid': '',
-            'NID_SES': 'AAABrfWOhcv9S1022b1lNHa69zvAlKYeyl2JkpcjFNsRQE+ARI9uZgBlxBlCrLDooL0W9S6U75gYYgX1xhozXZsuUKo2wzTnmT8iVrYDTVSOMFQjAQzOZlc4HF9mbnrTpBt94ljBdL4JBihFCcAXyZzBuFjlD9xOY3/lHqlsu1C7Wf8gXjgKDpV1dHYO2WXyd9oH6yJuQCWh+XInbG81sWOBZStzghKzPeP6ryp1BqxtN27lg8baiDyk5rVvP5JxOKDrZNkLGMvhg4gGOwc3pR+6W4WhBA6w6BsYKdk/JCxt4AHm0J8GLt14W8OR8qKdDFPycamIis9onqXfpKEAmmhS/N30Iw9sTlH3ShHP4c73mGsvt2uuGQj0USgZGHxiQlmDTL81g9VcZnh3wyFVjEg5ITEGWB7ZXplGAGA98fyFIRs3D4cBgG5kd+DVgCC5CW3gSy4Z13lf49J66j7UxZ59qukun7ven2nmnPwV4DgXtxy05sh59kHaLqEGOvEJjzjfxG0/qEj8jhsDODvJ/jA+D9AaTokaIgn45t13K+YEz5UezbgFsQZjsMWZ8XvxHgDeyQ==',
-            'ncpa': '701151|lxyyjyc8|6a313a2c31ab6fd18377ff9ab24deb6c99117292|s_f0de38c92f99|88e42eaa26504f30064bbe068639fff37bbb5ce8:849040|lxyym49s|eb371934ddc9838867ecfd28f01a59dc397cfaa8|s_23a46a96bc6f1|3301a48a00e8c859583a5f7317cea8acfd0b2244:425796|lxz63iko|46e9c2c1311ee50011db18c9b937f2921e83f44c|s_591787468346782261|c01c3f49c9b44df468cfe8ea4272d48e14827c6b:3316929|lxz6g5tk|d7cdbf7a890101b8c0e465c3e0601dbb2aa5bd40|s_25d12ee472e4|fe16356a046bf6fa0e83c918e91711e9ef359f6e:5278144|lxz705q8|61178200b73d1faa4c99d1b1dbb47f34fe5a6056|s_1094171d5a3ed|4332edf748139d2f24fe6ca43767261e23cc3a62',
-        }
-
-        headers = {
-            'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-            'accept-language': 'ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7',
-            'cache-control': 'max-age=0',
-            'priority': 'u=0, i',
-            'referer': 'https://shopping.naver.com/home',
-            'sec-ch-ua': '"Not/A)Brand";v="8", "Chromium";v="126", "Google Chrome";v="126"',
-            'sec-ch-ua-arch': '"x86"',
-            'sec-ch-ua-bitness': '"64"',
-            'sec-ch-ua-form-factors': '"Desktop"',
-            'sec-ch-ua-full-version-list': '"Not/A)Brand";v="8.0.0.0", "Chromium";v="126.0.6478.127", "Google Chrome";v="126.0.6478.127"',
-            'sec-ch-ua-mobile': '?0',
-            'sec-ch-ua-model': '""',
-            'sec-ch-ua-platform': '"Windows"',
-            'sec-ch-ua-platform-version': '"10.0.0"',
-            'sec-ch-ua-wow64': '?0',
-            'sec-fetch-dest': 'document',
-            'sec-fetch-mode': 'navigate',
-            'sec-fetch-site': 'same-origin',
-            'sec-fetch-user': '?1',
-            'upgrade-insecure-requests': '1',
-            'user-agent': str(UA.random),
-        }
+        url = self.url
 
         params = {
             'adQuery': keyword,
@@ -119,34 +293,46 @@ class NaverShoppingExtractor(BaseExtractor):
             'viewType': 'list',
         }
 
-        # request
-        idx = random.choice(range(len(self.proxies_list)))
-        proxies = self.proxies_list[idx]
-        response = requests.get(url, headers=headers, params=params, cookies=cookies, proxies={'http':'http://'+proxies})
-        
-        # check request
-        if response.status_code!=200:
-            self.proxies_list.pop(idx)
-            raise ConnectionError(f"[{response.status_code}] IP has been blocked (ip={proxies}, remaining={len(self.proxies_list)})")
-        
-        return response
+        def send():
+            # request (요청 간격은 rate limiter가 조절한다)
+            proxies = self.proxy_pool.acquire()
+            session = self._get_session(proxies)
+            response = self._send(proxies, session.get, url, headers={'user-agent': str(UA.random)}, params=params)
+
+            # check request
+            if response.status_code!=200:
+                raise HTTPStatusError(response.status_code, f"[{response.status_code}] IP has been blocked (ip={proxies}, remaining={len(self.proxy_pool)})")
+
+            # 200이지만 상품정보(__NEXT_DATA__)가 없는 응답(차단 안내, captcha 페이지 등)은 캐시하지 않고, 제한된 횟수만 재시도한다.
+            if NEXT_DATA_MARKER not in response.content:
+                raise InvalidBodyError(f"invalid search response (ip={proxies}, keyword={keyword}, page={page})")
+
+            return response
+
+        return self._fetch(url, params, send)
         
-class NaverShoppingReviewExtractor(BaseExtractor):
+class NaverShoppingReviewExtractor(PooledSessionExtractor):
     """네이버쇼핑에서 네이버페이 상품페이지의 리뷰에 대한 정보를 API를 통해 크롤링하는 클래스. lib.python.crawler.BaseExtractor를 상속받아 만들어진다."""
     
-    def __init__(self, verbose: bool = True):
+    def __init__(self, pool_size: int = POOL_SIZE, keep_alive: bool = KEEP_ALIVE, proxy_pool: ProxyPool|None = None, cache: ResponseCache|None = None, url: str = REVIEW_URL, retry_policy: RetryPolicy|None = None):
         """
-        NaverShoppingReviewExtractor의 생성자로, lib.python.crawler.BaseExtractor를 상속받아 만들어진다.
+        NaverShoppingReviewExtractor의 생성자로, PooledSessionExtractor를 상속받아 만들어진다.
         
         Args:
-            verbose (bool, optional): IP차단 발생 시 에러 텍스트를 출력할지 여부. default=True.
+            pool_size (int, optional): 프록시별 session이 유지할 최대 커넥션 수. default=POOL_SIZE.
+            keep_alive (bool, optional): 요청 후 커넥션을 닫지 않고 재사용할지 여부. default=KEEP_ALIVE.
+            proxy_pool (ProxyPool|None, optional): 사용할 프록시 풀. None이면 새로 만든다. default=None.
+            cache (ResponseCache|None, optional): 리뷰페이지 응답을 재사용할 응답 캐시로, 여러 키워드에서 검색된 같은 상품의 리뷰페이지는 한 번만 요청한다.
+                None이면 캐시를 사용하지 않는다. default=None.
+            url (str, optional): 리뷰 API URL로, 벤치마크에서는 로컬 mock 서버의 URL을 넣는다. default=REVIEW_URL.
+            retry_policy (RetryPolicy|None, optional): `crawl`의 재시도 정책. None이면 RETRY_POLICY를 사용한다. default=None.
         """
         
-        self.verbose = verbose
-        self.proxies_list = get_proxies(verify=True)
+        super().__init__(REVIEW_COOKIES, REVIEW_HEADERS, pool_size, keep_alive, proxy_pool, cache=cache, retry_policy=retry_policy)
+        self.url = url
     
-    @retry_with_delay(retry_count=RETRY_COUNT, delay_seconds=DELAY_SECONDS, verbose=VERBOSE, verbose_period=VERBOSE_PERIOD)
-    def crawl(self, merchant_no: str|int, mall_product_no: str|int, org_mall_product_no: str|int, mall_pc_url: str, page: str|int) -> json:
+    @with_retry
+    def crawl(self, merchant_no: str|int, mall_product_no: str|int, org_mall_product_no: str|int, mall_pc_url: str, page: str|int, sort_type: str = REVIEW_SORT_TYPE) -> json:
         """
         Queue에 들어온 메시지를 기반으로 크롤링을 진행하는 함수로, extractor의 진입함수.
         
@@ -156,14 +342,15 @@ class NaverShoppingReviewExtractor(BaseExtractor):
             org_mall_product_no (str|int): 수집을 원하는 상품의 original mall product no.
             mall_pc_url (str): 수집을 원하는 상품의 mall pc url.
             page (str|int): 수집을 원하는 리뷰페이지.
+            sort_type (str, optional): 리뷰 정렬기준으로, 'REVIEW_RANKING'(랭킹순) 또는 'REVIEW_CREATE_DATE_DESC'(최신순). default=REVIEW_SORT_TYPE.
             
         Returns:
             json: 수집 API로부터 전달받은 Parsing된 결과 데이터.
         """
         
-        return self.request(merchant_no, mall_product_no, org_mall_product_no, mall_pc_url, page)
+        return self.request(merchant_no, mall_product_no, org_mall_product_no, mall_pc_url, page, sort_type)
     
-    def request(self, merchant_no: str|int, mall_product_no: str|int, org_mall_product_no: str|int, mall_pc_url: str, page: str|int) -> json:
+    def request(self, merchant_no: str|int, mall_product_no: str|int, org_mall_product_no: str|int, mall_pc_url: str, page: str|int, sort_type: str = REVIEW_SORT_TYPE) -> json:
         """
         수집 API에 크롤링 요청을 보내는 함수.
         
@@ -173,6 +360,7 @@ class NaverShoppingReviewExtractor(BaseExtractor):
             mall_product_no (str|int): 수집을 원하는 상품의 original mall product no.
             mall_pc_url (str): 수집을 원하는 상품의 mall pc url.
             page (str|int): 수집을 원하는 리뷰페이지.
+            sort_type (str, optional): 리뷰 정렬기준으로, 'REVIEW_RANKING'(랭킹순) 또는 'REVIEW_CREATE_DATE_DESC'(최신순). default=REVIEW_SORT_TYPE.
             
         Returns:
             json: 수집 API로부터 전달받은 Parsing된 결과 데이터.
@@ -180,57 +368,38 @@ class NaverShoppingReviewExtractor(BaseExtractor):
 
         assert page<=1000, "maximum page is 1000."
         
-        # get proxies
-        if len(self.proxies_list)==0:
-            self.proxies_list = get_proxies(verify=True)
-        
-        url = 'https://smartstore.naver.com/i/v1/contents/reviews/query-pages'
+        url = self.url
         referer = f'{mall_pc_url}/products/{mall_product_no}'
 
-        cookies = {
-            'NNB': 'FQTBKMTQEV3WG',
-            'NID_AUT': 'gvJsXPhQYqbFr2Pq0LzEnlIkcpV/4DvZ2Nv9xVUdBlQUljF6/sFp4YxHEfgSTiYB',
-            'NID_JKL': 'eyNNuWCuSajGhKc58q5w9Eb0cZRvI9BY0JXFrH65O4A=',
-            'NAC': 'EzcXBMgVB4leB',
-            'ASID': '1b2313bc000001903bd7270000000043',
-            'NACT': '1',
-            'CRF_TOOLTIP': 'true',
-            'NID_SES': 'AAABrfWOhcv9S1022b1lNHa69zvAlKYeyl2JkpcjFNsRQE+ARI9uZgBlxBlCrLDooL0W9S6U75gYYgX1xhozXZsuUKo2wzTnmT8iVrYDTVSOMFQjAQzOZlc4HF9mbnrTpBt94ljBdL4JBihFCcAXyZzBuFjlD9xOY3/lHqlsu1C7Wf8gXjgKDpV1dHYO2WXyd9oH6yJuQCWh+XInbG81sWOBZStzghKzPeP6ryp1BqxtN27lg8baiDyk5rVvP5JxOKDrZNkLGMvhg4gGOwc3pR+6W4WhBA6w6BsYKdk/JCxt4AHm0J8GLt14W8OR8qKdDFPycamIis9onqXfpKEAmmhS/N30Iw9sTlH3ShHP4c73mGsvt2uuGQj0USgZGHxiQlmDTL81g9VcZnh3wyFVjEg5ITEGWB7ZXplGAGA98fyFIRs3D4cBgG5kd+DVgCC5CW3gSy4Z13lf49J66j7UxZ59qukun7ven2nmnPwV4DgXtxy05sh59kHaLqEGOvEJjzjfxG0/qEj8jhsDODvJ/jA+D9AaTokaIgn45t13K+YEz5UezbgFsQZjsMWZ8XvxHgDeyQ==',
-        }
-
-        headers = {
-            'accept': 'application/json, text/plain, */*',
-            'accept-language': 'ko-KR,ko;q=0.9,en-US;q=0.8,en;q=0.7',
-            'content-type': 'application/json',
-            'origin': 'https://smartstore.naver.com',
-            'priority': 'u=1, i',
-            'referer' : referer,
-            'sec-ch-ua': '"Not/A)Brand";v="8", "Chromium";v="126", "Google Chrome";v="126"',
-            'sec-ch-ua-mobile': '?0',
-            'sec-ch-ua-platform': '"Windows"',
-            'sec-fetch-dest': 'empty',
-            'sec-fetch-mode': 'cors',
-            'sec-fetch-site': 'same-origin',
-            'user-agent': str(UA.random),
-            'x-client-version': '20240626111623',
-        }
-
         json_data = {
             'checkoutMerchantNo': merchant_no,
             'originProductNo': org_mall_product_no,
             'page': str(page),
             'pageSize': 20,
-            'reviewSearchSortType': 'REVIEW_RANKING',
+            'reviewSearchSortType': sort_type,
         }
         
-        # request
-        idx = random.choice(range(len(self.proxies_list)))
-        proxies = self.proxies_list[idx]
-        response = requests.post(url, cookies=cookies, headers=headers, json=json_data, proxies={'http':'http://'+proxies})
-        
-        # check request
-        if response.status_code!=200:
-            self.proxies_list.pop(idx)
-            raise ConnectionError(f"[{response.status_code}] IP has been blocked (ip={proxies}, remaining={len(self.proxies_list)}, site={referer}")
-        
-        return response
\ No newline at end of file
+        def send():
+            # request (요청 간격은 rate limiter가 조절한다)
+            proxies = self.proxy_pool.acquire()
+            session = self._get_session(proxies)
+            response = self._send(proxies, session.post, url, headers={'referer': referer, 'user-agent': str(UA.random)}, json=json_data)
+
+            # check request
+            if response.status_code!=200:
+                raise HTTPStatusError(response.status_code, f"[{response.status_code}] IP has been blocked (ip={proxies}, remaining={len(self.proxy_pool)}, site={referer}")
+
+            # 200이지만 리뷰 JSON이 아닌 응답(차단 안내 페이지 등)은 캐시하지 않고, 제한된 횟수만 재시도한다.
+            try:
+                body = json_loads(response.content)
+            except ValueError:
+                body = None
+            if not isinstance(body, dict) or 'contents' not in body:
+                raise InvalidBodyError(f"invalid review response (ip={proxies}, site={referer})")
+
+            # 검증하며 파싱한 본문을 `response.json()`이 그대로 반환하도록 하여, 사용하는 쪽에서 다시 파싱하지 않는다.
+            response.json = lambda **kwargs: body
+            return response
+
+        # 리뷰는 referer가 아닌 payload(checkoutMerchantNo, originProductNo, page, 정렬기준)로 결정되므로, payload만 캐시 key로 사용한다.
+        return self._fetch(url, json_data, send)
\ No newline at end of file
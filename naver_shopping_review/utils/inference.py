@@ -0,0 +1,350 @@
+"""
+네이버쇼핑 리뷰데이터 수집과 관련하여, `modeling.ipynb`에서 학습한 리뷰 분류모델(BartForSequenceClassification)로 GPU 없이 CPU에서 문장을 분류하는 클래스와 함수를 제공한다.
+
+- 동적 배치 : 문장을 토큰 길이로 정렬한 뒤, (배치 크기 x 배치 안의 최대 토큰 길이)가 max_tokens를 넘지 않고 비슷한 길이끼리 묶이도록 나누므로 padding이 거의 없다.
+- 멀티 프로세스 : n_workers>1이면 프로세스마다 모델을 한 번만 불러오고, CPU 코어를 프로세스별로 나눠서 배치를 처리한다.
+- CPU 최적화 : backend='torch'이면 quantize=True로 Linear 레이어를 int8로 동적 양자화하고,
+  backend='onnx'이면 ONNX로 내보낸(quantize=True이면 int8로 양자화한) 모델을 onnxruntime으로 실행한다.
+
+torch, transformers, onnxruntime은 선택 의존성으로, 모델을 불러올 때 import한다.
+checkpoint 폴더에는 `Trainer`가 저장한 config.json과 모델 가중치(model.safetensors 또는 pytorch_model.bin)가 있어야 한다.
+
+함수 목록
+1. `length_batches`
+    토큰 길이로 정렬한 뒤, 토큰 수 기준으로 나눈 배치별 행 번호를 가져온다.
+2. `export_onnx`
+    checkpoint의 모델을 ONNX로 내보내고, quantize=True이면 int8로 양자화한다.
+
+클래스 목록
+1. `ReviewClassifier`
+    checkpoint의 모델로 문장 리스트를 분류하며, 동적 배치와 멀티 프로세스로 처리한다.
+"""
+
+# parallel
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
+# default
+from typing import Iterator
+import os
+import numpy as np
+
+# global setting
+TOKENIZER_NAME = 'gogamza/kobart-base-v1'   # checkpoint에 tokenizer가 없을 때 사용할 tokenizer. (modeling.ipynb의 기반 모델)
+MAX_LENGTH = 256        # 문장별 최대 토큰 수로, 넘으면 자른다.
+MAX_TOKENS = 8192       # 배치별 최대 토큰 수(배치 크기 x 배치 안의 최대 토큰 길이).
+MAX_BATCH_SIZE = 128    # 배치별 최대 문장 수.
+MAX_PADDING = 0.25      # 배치 안의 문장별 padding 비율의 최대값.
+ONNX_NAME = 'model.onnx'            # checkpoint 폴더 안에 저장할 ONNX 파일 이름.
+ONNX_INT8_NAME = 'model.int8.onnx'  # checkpoint 폴더 안에 저장할 int8 양자화 ONNX 파일 이름.
+
+# 프로세스별로 불러온 모델 (멀티 프로세스에서 worker마다 한 번만 불러온다.)
+_WORKER_MODEL = None
+
+def length_batches(lengths: np.ndarray,
+                   max_tokens: int = MAX_TOKENS,
+                   max_batch_size: int = MAX_BATCH_SIZE,
+                   max_padding: float = MAX_PADDING) -> list[np.ndarray]:
+    """
+    토큰 길이로 정렬한 뒤, (배치 크기 x 배치 안의 최대 토큰 길이)가 max_tokens를 넘지 않도록 나눈 배치별 행 번호를 가져온다.
+    비슷한 길이의 문장끼리 묶이므로 padding이 거의 없고, 짧은 문장은 큰 배치로, 긴 문장은 작은 배치로 처리된다.
+    긴 문장의 배치가 먼저 오므로, 메모리가 부족하면 처음에 실패한다.
+
+    Args:
+        lengths (np.ndarray): 문장별 토큰 길이 배열.
+        max_tokens (int, optional): 배치별 최대 토큰 수로, 한 문장이 넘으면 그 문장만 배치가 된다. default=MAX_TOKENS.
+        max_batch_size (int, optional): 배치별 최대 문장 수. default=MAX_BATCH_SIZE.
+        max_padding (float, optional): 문장별 padding 비율의 최대값으로, 배치에서 가장 긴 문장보다 이 비율 이상 짧은 문장은 다음 배치로 넘긴다. default=MAX_PADDING.
+
+    Returns:
+        list[np.ndarray]: 배치별 행 번호 배열 리스트.
+    """
+
+    lengths = np.asarray(lengths, dtype=np.int64)
+    order = np.argsort(-lengths, kind='stable')
+    sorted_lengths = -lengths[order]    # 오름차순 (searchsorted)
+
+    batches, start = [], 0
+    while start<len(order):
+        # 내림차순이므로 배치의 첫 문장이 가장 길다.
+        longest = max(int(-sorted_lengths[start]), 1)
+        size = max(1, min(max_batch_size, max_tokens//longest))
+        end = np.searchsorted(sorted_lengths, -np.ceil(longest*(1-max_padding)), side='right')
+        end = max(start+1, min(start+size, int(end)))
+        batches.append(order[start:end])
+        start = end
+    return batches
+
+def _pad(input_ids: list[list[int]], pad_token_id: int) -> tuple[np.ndarray, np.ndarray]:
+    """토큰 id 리스트를 가장 긴 길이로 padding한 (input_ids, attention_mask) 배열을 만든다."""
+
+    max_length = max(len(ids) for ids in input_ids)
+    ids = np.full((len(input_ids), max_length), pad_token_id, dtype=np.int64)
+    mask = np.zeros((len(input_ids), max_length), dtype=np.int64)
+    for i, row in enumerate(input_ids):
+        ids[i, :len(row)] = row
+        mask[i, :len(row)] = 1
+    return ids, mask
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    logits = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+def _check_checkpoint(checkpoint_dir: str) -> None:
+    """checkpoint 폴더에 config.json이 있는지 확인한다. (training_args.bin만 있는 checkpoint는 모델을 불러올 수 없다.)"""
+
+    if not os.path.exists(os.path.join(checkpoint_dir, 'config.json')):
+        raise FileNotFoundError(f'config.json not found in checkpoint: {checkpoint_dir}')
+
+class _TorchModel:
+    """torch 모델로, (input_ids, attention_mask) 배열을 받아서 logits 배열을 반환한다."""
+
+    def __init__(self, checkpoint_dir: str, quantize: bool = False, num_threads: int|None = None) -> None:
+        import torch
+        from transformers import AutoModelForSequenceClassification
+
+        _check_checkpoint(checkpoint_dir)
+        if num_threads is not None:
+            torch.set_num_threads(num_threads)
+
+        model = AutoModelForSequenceClassification.from_pretrained(checkpoint_dir)
+        model.eval()
+        if quantize:
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+        self.torch = torch
+        self.model = model
+
+    def __call__(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        with self.torch.inference_mode():
+            outputs = self.model(input_ids=self.torch.from_numpy(input_ids), attention_mask=self.torch.from_numpy(attention_mask))
+        return outputs.logits.float().numpy()
+
+class _OnnxModel:
+    """onnxruntime 모델로, (input_ids, attention_mask) 배열을 받아서 logits 배열을 반환한다."""
+
+    def __init__(self, checkpoint_dir: str, quantize: bool = False, num_threads: int|None = None) -> None:
+        import onnxruntime as ort
+
+        path = _onnx_path(checkpoint_dir, quantize)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.inter_op_num_threads = 1
+        if num_threads is not None:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+
+    def __call__(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        return self.session.run(['logits'], {'input_ids': input_ids, 'attention_mask': attention_mask})[0]
+
+def _onnx_path(checkpoint_dir: str, quantize: bool = False) -> str:
+    """checkpoint 폴더 안의 ONNX 파일 경로로, 없으면 내보낸다."""
+
+    path = os.path.join(checkpoint_dir, ONNX_INT8_NAME if quantize else ONNX_NAME)
+    return path if os.path.exists(path) else export_onnx(checkpoint_dir, quantize=quantize)
+
+def _load_model(backend: str, checkpoint_dir: str, quantize: bool = False, num_threads: int|None = None) -> _TorchModel|_OnnxModel:
+    if backend=='torch':
+        return _TorchModel(checkpoint_dir, quantize, num_threads)
+    if backend=='onnx':
+        return _OnnxModel(checkpoint_dir, quantize, num_threads)
+    raise ValueError(f'backend must be one of [torch, onnx]: {backend}')
+
+def _init_worker(model_kwargs: dict) -> None:
+    global _WORKER_MODEL
+    _WORKER_MODEL = _load_model(**model_kwargs)
+
+def _predict_worker(arrays: tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+    return _softmax(_WORKER_MODEL(*arrays))
+
+def export_onnx(checkpoint_dir: str, path: str|None = None, quantize: bool = False, opset: int = 17) -> str:
+    """
+    checkpoint의 모델을 (batch, sequence)가 가변인 ONNX로 내보내고, quantize=True이면 가중치를 int8로 동적 양자화한다.
+
+    Args:
+        checkpoint_dir (str): 모델 checkpoint 폴더.
+        path (str|None, optional): 저장할 ONNX 파일 경로로, None이면 checkpoint 폴더 안에 저장한다. default=None.
+        quantize (bool, optional): int8로 양자화할지 여부. default=False.
+        opset (int, optional): ONNX opset 버전. default=17.
+
+    Returns:
+        str: 저장한 ONNX 파일 경로.
+    """
+
+    import torch
+    from transformers import AutoModelForSequenceClassification
+
+    _check_checkpoint(checkpoint_dir)
+    fp32_path = os.path.join(checkpoint_dir, ONNX_NAME)
+    path = path or os.path.join(checkpoint_dir, ONNX_INT8_NAME if quantize else ONNX_NAME)
+
+    if not os.path.exists(fp32_path) or not quantize:
+        class LogitsOnly(torch.nn.Module):
+            def __init__(self, model):
+                super().__init__()
+                self.model = model
+            def forward(self, input_ids, attention_mask):
+                return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+        model = AutoModelForSequenceClassification.from_pretrained(checkpoint_dir)
+        model.eval()
+        model.config.return_dict = True
+        example = torch.full((2, 8), model.config.eos_token_id, dtype=torch.int64)
+        dynamic_axes = {'input_ids': {0:'batch', 1:'sequence'}, 'attention_mask': {0:'batch', 1:'sequence'}, 'logits': {0:'batch'}}
+        export_path = fp32_path if quantize else path
+        with torch.inference_mode():
+            torch.onnx.export(
+                LogitsOnly(model), (example, torch.ones_like(example)), export_path,
+                input_names=['input_ids','attention_mask'], output_names=['logits'],
+                dynamic_axes=dynamic_axes, opset_version=opset, dynamo=False,
+            )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(fp32_path, path, weight_type=QuantType.QInt8)
+
+    return path
+
+class ReviewClassifier:
+    """
+    checkpoint의 모델로 문장 리스트를 분류한다. 문장을 한 번에 토큰화하고, `length_batches`로 나눈 배치를 현재 프로세스 또는 worker 프로세스에서 처리한다.
+    n_workers>1이면 worker 프로세스가 유지되므로, 사용이 끝나면 `close`하거나 with문으로 사용한다.
+    """
+
+    def __init__(self,
+                 checkpoint_dir: str,
+                 backend: str = 'torch',
+                 quantize: bool = False,
+                 n_workers: int = 1,
+                 num_threads: int|None = None,
+                 labels: list[str]|None = None,
+                 tokenizer_name: str = TOKENIZER_NAME,
+                 max_length: int = MAX_LENGTH,
+                 max_tokens: int = MAX_TOKENS,
+                 max_batch_size: int = MAX_BATCH_SIZE,
+                 max_padding: float = MAX_PADDING) -> None:
+        """
+        ReviewClassifier의 생성자.
+
+        Args:
+            checkpoint_dir (str): 모델 checkpoint 폴더. ex) 'crawling/naver_shopping_review/.model_checkpoints/checkpoint-594'
+            backend (str, optional): 모델을 실행할 방식으로, 'torch' 또는 'onnx'. default='torch'.
+            quantize (bool, optional): int8로 양자화한 모델을 사용할지 여부. default=False.
+            n_workers (int, optional): 배치를 처리할 프로세스 수로, 1이면 현재 프로세스에서 처리한다. default=1.
+            num_threads (int|None, optional): 프로세스별 연산 thread 수로, None이면 CPU 코어를 n_workers로 나눈 수. default=None.
+            labels (list[str]|None, optional): 라벨 번호 순서의 라벨명으로, None이면 checkpoint config의 id2label. default=None.
+            tokenizer_name (str, optional): checkpoint에 tokenizer가 없을 때 사용할 tokenizer. default=TOKENIZER_NAME.
+            max_length (int, optional): 문장별 최대 토큰 수. default=MAX_LENGTH.
+            max_tokens (int, optional): 배치별 최대 토큰 수. default=MAX_TOKENS.
+            max_batch_size (int, optional): 배치별 최대 문장 수. default=MAX_BATCH_SIZE.
+            max_padding (float, optional): 배치 안의 문장별 padding 비율의 최대값. default=MAX_PADDING.
+        """
+
+        from transformers import AutoConfig, AutoTokenizer
+
+        _check_checkpoint(checkpoint_dir)
+        config = AutoConfig.from_pretrained(checkpoint_dir)
+        has_tokenizer = any(os.path.exists(os.path.join(checkpoint_dir, name)) for name in ('tokenizer.json', 'tokenizer_config.json'))
+        self.tokenizer = AutoTokenizer.from_pretrained(checkpoint_dir if has_tokenizer else tokenizer_name)
+
+        self.checkpoint_dir = checkpoint_dir
+        self.labels = list(labels) if labels is not None else [config.id2label[i] for i in range(config.num_labels)]
+        self.eos_token_id = config.eos_token_id
+        self.pad_token_id = config.pad_token_id if config.pad_token_id is not None else self.tokenizer.pad_token_id
+        self.max_length = max_length
+        self.max_tokens = max_tokens
+        self.max_batch_size = max_batch_size
+        self.max_padding = max_padding
+        if len(self.labels)!=config.num_labels:
+            raise ValueError(f'len(labels)={len(self.labels)} does not match num_labels={config.num_labels}')
+
+        n_workers = max(1, n_workers)
+        num_threads = num_threads or max(1, (os.cpu_count() or 1)//n_workers)
+        model_kwargs = {'backend':backend, 'checkpoint_dir':checkpoint_dir, 'quantize':quantize, 'num_threads':num_threads}
+        if backend=='onnx':
+            # worker들이 동시에 내보내지 않도록, ONNX 파일은 현재 프로세스에서 먼저 만든다.
+            _onnx_path(checkpoint_dir, quantize)
+        if n_workers==1:
+            self._model = _load_model(**model_kwargs)
+            self._executor = None
+        else:
+            # fork하면 부모 프로세스의 tokenizer, BLAS thread 상태가 복사되므로 spawn으로 worker를 만든다.
+            self._model = None
+            self._executor = ProcessPoolExecutor(
+                max_workers=n_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(model_kwargs,),
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def tokenize(self, texts: list[str]) -> list[list[int]]:
+        """
+        문장 리스트를 토큰화한다. BartForSequenceClassification은 마지막 eos 토큰의 hidden state로 분류하므로, 문장 끝에 eos 토큰이 없으면 붙인다.
+
+        Args:
+            texts (list[str]): 문장 리스트.
+
+        Returns:
+            list[list[int]]: 문장별 토큰 id 리스트.
+        """
+
+        encoded = self.tokenizer(list(texts), truncation=True, max_length=self.max_length-1, return_attention_mask=False, return_token_type_ids=False)
+        return [ids if len(ids)>0 and ids[-1]==self.eos_token_id else ids+[self.eos_token_id] for ids in encoded['input_ids']]
+
+    def iter_batches(self, input_ids: list[list[int]]) -> Iterator[tuple[np.ndarray, tuple[np.ndarray, np.ndarray]]]:
+        """토큰 id 리스트를 `length_batches`로 나눠서, (행 번호, (input_ids, attention_mask))를 yield한다."""
+
+        lengths = np.fromiter((len(ids) for ids in input_ids), dtype=np.int64, count=len(input_ids))
+        for rows in length_batches(lengths, self.max_tokens, self.max_batch_size, self.max_padding):
+            yield rows, _pad([input_ids[i] for i in rows], self.pad_token_id)
+
+    def predict_proba(self, texts: list[str]) -> np.ndarray:
+        """
+        문장 리스트의 라벨별 확률을 가져온다.
+
+        Args:
+            texts (list[str]): 문장 리스트.
+
+        Returns:
+            np.ndarray: (문장 수, 라벨 수)의 확률 배열로, 입력 순서를 유지한다.
+        """
+
+        probs = np.zeros((len(texts), len(self.labels)), dtype=np.float32)
+        if len(texts)==0:
+            return probs
+
+        batches = list(self.iter_batches(self.tokenize(texts)))
+        if self._executor is None:
+            results = (_softmax(self._model(*arrays)) for _, arrays in batches)
+        else:
+            results = self._executor.map(_predict_worker, [arrays for _, arrays in batches])
+        for (rows, _), result in zip(batches, results):
+            probs[rows] = result
+        return probs
+
+    def predict(self, texts: list[str]) -> tuple[list[str], np.ndarray]:
+        """
+        문장 리스트를 분류한다.
+
+        Args:
+            texts (list[str]): 문장 리스트.
+
+        Returns:
+            tuple[list[str], np.ndarray]: (문장별 예측 라벨명, 예측 라벨의 확률 배열).
+        """
+
+        probs = self.predict_proba(texts)
+        index = probs.argmax(axis=1)
+        return [self.labels[i] for i in index], probs[np.arange(len(index)), index]
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,296 @@
+"""
+네이버쇼핑 리뷰데이터 수집과 관련하여, 크롤링 중의 counter, gauge, latency histogram을 모으고 내보내는 metrics 관련 클래스와 함수를 제공한다.
+
+클래스 목록
+1. `Histogram`
+    고정된 bucket 경계로 관측값의 분포를 기록하는 histogram.
+2. `MetricsRegistry`
+    이름과 label로 구분되는 counter, gauge, histogram을 모으는 thread-safe 저장소.
+3. `MetricsReporter`
+    일정 간격으로 metrics snapshot을 JSON Lines 파일에 추가하는 background thread.
+
+함수 목록
+1. `start_prometheus_server`
+    metrics를 Prometheus text 형식으로 내보내는 HTTP 서버를 background thread로 시작한다.
+
+변수 목록
+1. `METRICS`
+    extractor, 크롤링 함수, writer, 파이프라인이 공유하는 기본 MetricsRegistry.
+"""
+
+# default
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import bisect
+import json
+import os
+import threading
+import time
+
+# global setting
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)   # histogram bucket 경계(초).
+REPORT_INTERVAL = 60.0  # metrics snapshot을 파일에 추가하는 간격(초).
+
+class Histogram:
+    """고정된 bucket 경계로 관측값의 분포를 기록하는 histogram."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        """
+        Histogram의 생성자.
+
+        Args:
+            buckets (tuple[float, ...], optional): 오름차순의 bucket 상한 경계. default=LATENCY_BUCKETS.
+        """
+
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets)+1)    # 마지막은 +Inf bucket
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """
+        bucket 안에서 선형보간하여 분위수를 추정한다.
+
+        Args:
+            q (float): 0~1 사이의 분위.
+
+        Returns:
+            float: 추정한 분위수로, 관측값이 없으면 0.
+        """
+
+        if self.count==0:
+            return 0.0
+
+        rank = q * self.count
+        cumulative = 0
+        for i, n in enumerate(self.counts):
+            if cumulative+n>=rank and n>0:
+                lower = self.buckets[i-1] if i>0 else 0.0
+                upper = min(self.buckets[i], self.max) if i<len(self.buckets) else self.max
+                return lower + (upper-lower) * (rank-cumulative) / n
+            cumulative += n
+        return self.max
+
+    def summary(self) -> dict[str, float]:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum/self.count, 6) if self.count>0 else 0.0,
+            'p50': round(self.quantile(0.5), 6),
+            'p95': round(self.quantile(0.95), 6),
+            'p99': round(self.quantile(0.99), 6),
+            'max': round(self.max, 6),
+        }
+
+class MetricsRegistry:
+    """
+    이름과 label로 구분되는 counter, gauge, histogram을 모으는 thread-safe 저장소.
+
+    ex) `METRICS.inc('requests_total', host='smartstore.naver.com', status='200')`,
+        `with METRICS.timer('parse_seconds', kind='review'): ...`
+    """
+
+    def __init__(self) -> None:
+        """MetricsRegistry의 생성자."""
+
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    @staticmethod
+    def _series(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """counter를 value만큼 늘린다."""
+
+        series = self._series(name, labels)
+        with self._lock:
+            self._counters[series] = self._counters.get(series, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        """gauge를 value로 바꾼다. ex) queue 크기"""
+
+        series = self._series(name, labels)
+        with self._lock:
+            self._gauges[series] = value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """histogram에 관측값을 기록한다."""
+
+        series = self._series(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(series)
+            if histogram is None:
+                histogram = self._histograms[series] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """with 블록의 실행시간(초)을 histogram에 기록한다. 예외가 발생해도 기록한다."""
+
+        s = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter()-s, **labels)
+
+    def snapshot(self) -> dict:
+        """
+        현재 metrics를 JSON으로 저장할 수 있는 딕셔너리로 가져온다. histogram은 count, sum, mean, p50, p95, p99, max로 요약한다.
+
+        Returns:
+            dict: {'time', 'uptime', 'counters', 'gauges', 'histograms'}.
+        """
+
+        def key(series):
+            name, labels = series
+            return name + ('{' + ','.join(f'{k}={v}' for k, v in labels) + '}' if labels else '')
+
+        with self._lock:
+            return {
+                'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'uptime': round(time.time()-self.started_at, 3),
+                'counters': {key(s): v for s, v in sorted(self._counters.items())},
+                'gauges': {key(s): v for s, v in sorted(self._gauges.items())},
+                'histograms': {key(s): h.summary() for s, h in sorted(self._histograms.items())},
+            }
+
+    def to_prometheus(self, prefix: str = 'naver_shopping_') -> str:
+        """
+        현재 metrics를 Prometheus text exposition 형식으로 가져온다.
+
+        Args:
+            prefix (str, optional): metric 이름 앞에 붙일 문자열. default='naver_shopping_'.
+
+        Returns:
+            str: Prometheus text 형식의 문자열.
+        """
+
+        def labels_text(labels, extra=()):
+            items = list(labels) + list(extra)
+            if len(items)==0:
+                return ''
+            return '{' + ','.join('{}="{}"'.format(k, str(v).replace('\\','\\\\').replace('"','\\"')) for k, v in items) + '}'
+
+        lines, typed = [], set()
+        with self._lock:
+            for kind, metrics in (('counter', self._counters), ('gauge', self._gauges)):
+                for (name, labels), value in sorted(metrics.items()):
+                    if name not in typed:
+                        lines.append(f'# TYPE {prefix}{name} {kind}')
+                        typed.add(name)
+                    lines.append(f'{prefix}{name}{labels_text(labels)} {value}')
+
+            for (name, labels), h in sorted(self._histograms.items()):
+                if name not in typed:
+                    lines.append(f'# TYPE {prefix}{name} histogram')
+                    typed.add(name)
+                cumulative = 0
+                for bound, n in zip(list(h.buckets)+['+Inf'], h.counts):
+                    cumulative += n
+                    lines.append(f'{prefix}{name}_bucket{labels_text(labels, [("le", bound)])} {cumulative}')
+                lines.append(f'{prefix}{name}_sum{labels_text(labels)} {h.sum}')
+                lines.append(f'{prefix}{name}_count{labels_text(labels)} {h.count}')
+
+        return '\n'.join(lines) + '\n'
+
+    def reset(self) -> None:
+        """모든 metrics를 지운다."""
+
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+            self.started_at = time.time()
+
+METRICS = MetricsRegistry()
+
+class MetricsReporter:
+    """일정 간격으로 metrics snapshot을 JSON Lines 파일에 추가하는 background thread."""
+
+    def __init__(self, path: str, interval: float = REPORT_INTERVAL, registry: MetricsRegistry = METRICS) -> None:
+        """
+        MetricsReporter의 생성자.
+
+        Args:
+            path (str): snapshot을 추가할 JSON Lines 파일 경로.
+            interval (float, optional): snapshot을 추가하는 간격(초). default=REPORT_INTERVAL.
+            registry (MetricsRegistry, optional): 내보낼 metrics 저장소. default=METRICS.
+        """
+
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='metrics-reporter', daemon=True)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self) -> None:
+        """snapshot을 추가하는 thread를 시작한다."""
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """thread를 종료하고, 마지막 snapshot을 추가한다."""
+
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.report()
+
+    def report(self) -> None:
+        """현재 snapshot을 파일에 한 줄로 추가한다."""
+
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(self.registry.snapshot(), ensure_ascii=False) + '\n')
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.report()
+
+def start_prometheus_server(port: int, host: str = '0.0.0.0', registry: MetricsRegistry = METRICS) -> ThreadingHTTPServer:
+    """
+    metrics를 Prometheus text 형식으로 내보내는 HTTP 서버를 background thread로 시작한다. 모든 경로에 대해 같은 metrics를 응답한다.
+
+    Args:
+        port (int): 서버 포트.
+        host (str, optional): 서버 주소. default='0.0.0.0'.
+        registry (MetricsRegistry, optional): 내보낼 metrics 저장소. default=METRICS.
+
+    Returns:
+        ThreadingHTTPServer: 시작된 서버로, `shutdown()`으로 종료한다.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = registry.to_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
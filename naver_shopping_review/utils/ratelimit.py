@@ -0,0 +1,202 @@
+"""
+네이버쇼핑 리뷰데이터 수집과 관련하여, 요청 속도를 조절하는 rate limiter 클래스를 제공한다.
+
+클래스 목록
+1. `TokenBucket`
+    초당 `rate`개의 토큰이 채워지는 thread-safe token bucket.
+2. `AdaptiveRateLimiter`
+    host별, 프록시별 token bucket으로 요청 속도를 조절하며, 응답 상태코드에 따라 AIMD 방식으로 속도를 바꾼다.
+
+변수 목록
+1. `RATE_LIMITER`
+    모든 extractor와 worker thread가 공유하는 기본 AdaptiveRateLimiter.
+"""
+
+# default
+import threading
+import time
+
+# global setting
+INITIAL_RATE = 5.0              # host별 초기 초당 요청 수.
+MIN_RATE = 0.5                  # host별 최소 초당 요청 수.
+MAX_RATE = 50.0                 # host별 최대 초당 요청 수.
+PROXY_RATE = 2.0                # 프록시별 초기 초당 요청 수.
+PROXY_MAX_RATE = 10.0           # 프록시별 최대 초당 요청 수.
+ADDITIVE_INCREASE = 0.5         # 200 응답이 1초 동안 이어질 때 늘어나는 초당 요청 수.
+MULTIPLICATIVE_DECREASE = 0.5   # 429/403 응답을 받았을 때 곱해지는 비율.
+BACKOFF_STATUS_CODES = (403, 429)
+DECREASE_INTERVAL = 1.0         # 동시에 들어온 429/403 응답으로 속도가 연쇄적으로 줄어들지 않도록, 감소 사이의 최소 간격(초).
+
+class TokenBucket:
+    """초당 `rate`개의 토큰이 채워지는 thread-safe token bucket."""
+
+    def __init__(self, rate: float, capacity: float|None = None) -> None:
+        """
+        TokenBucket의 생성자.
+
+        Args:
+            rate (float): 초당 채워지는 토큰 수.
+            capacity (float|None, optional): 최대로 쌓일 수 있는 토큰 수로, None이면 max(1, rate). default=None.
+        """
+
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self.decreased_at = 0.0
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate: float) -> None:
+        """
+        초당 채워지는 토큰 수를 바꾼다.
+
+        Args:
+            rate (float): 새로운 초당 토큰 수.
+
+        Returns:
+            None.
+        """
+
+        with self._lock:
+            self._refill()
+            self.rate = rate
+            self.capacity = max(1.0, rate)
+            self._tokens = min(self._tokens, self.capacity)
+
+    def acquire(self) -> float:
+        """
+        토큰을 하나 가져오며, 토큰이 없으면 채워질 때까지 기다린다.
+
+        Returns:
+            float: 토큰을 기다린 시간(초).
+        """
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens>=1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+            waited += wait
+
+    def _refill(self) -> None:
+        """지난 시간만큼 토큰을 채운다. lock을 잡은 상태에서 호출해야 한다."""
+
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now-self._updated_at)*self.rate)
+        self._updated_at = now
+
+class AdaptiveRateLimiter:
+    """
+    host별, 프록시별 token bucket으로 요청 속도를 조절하며, 응답 상태코드에 따라 AIMD 방식으로 속도를 바꾼다.
+
+    - 200 응답이 오면 속도를 조금씩(additive) 올린다.
+    - 429/403 응답이 오면 속도를 비율로(multiplicative) 크게 줄인다.
+    """
+
+    def __init__(self,
+                 initial_rate: float = INITIAL_RATE,
+                 min_rate: float = MIN_RATE,
+                 max_rate: float = MAX_RATE,
+                 proxy_rate: float = PROXY_RATE,
+                 proxy_max_rate: float = PROXY_MAX_RATE,
+                 additive_increase: float = ADDITIVE_INCREASE,
+                 multiplicative_decrease: float = MULTIPLICATIVE_DECREASE) -> None:
+        """
+        AdaptiveRateLimiter의 생성자.
+
+        Args:
+            initial_rate (float, optional): host별 초기 초당 요청 수. default=INITIAL_RATE.
+            min_rate (float, optional): host별, 프록시별 최소 초당 요청 수. default=MIN_RATE.
+            max_rate (float, optional): host별 최대 초당 요청 수. default=MAX_RATE.
+            proxy_rate (float, optional): 프록시별 초기 초당 요청 수. default=PROXY_RATE.
+            proxy_max_rate (float, optional): 프록시별 최대 초당 요청 수. default=PROXY_MAX_RATE.
+            additive_increase (float, optional): 200 응답이 1초 동안 이어질 때 늘어나는 초당 요청 수. default=ADDITIVE_INCREASE.
+            multiplicative_decrease (float, optional): 429/403 응답을 받았을 때 곱해지는 비율. default=MULTIPLICATIVE_DECREASE.
+        """
+
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.proxy_rate = proxy_rate
+        self.proxy_max_rate = proxy_max_rate
+        self.additive_increase = additive_increase
+        self.multiplicative_decrease = multiplicative_decrease
+
+        self._host_buckets = {}
+        self._proxy_buckets = {}
+        self._lock = threading.RLock()
+
+    def acquire(self, host: str, proxy: str|None = None) -> float:
+        """
+        host와 프록시의 token bucket에서 토큰을 하나씩 가져오며, 토큰이 없으면 기다린다.
+
+        Args:
+            host (str): 요청을 보낼 host. ex) 'smartstore.naver.com'
+            proxy (str|None, optional): 요청에 사용할 프록시서버 URL. default=None.
+
+        Returns:
+            float: 토큰을 기다린 시간(초).
+        """
+
+        waited = self._bucket(self._host_buckets, host, self.initial_rate).acquire()
+        if proxy is not None:
+            waited += self._bucket(self._proxy_buckets, proxy, self.proxy_rate).acquire()
+        return waited
+
+    def feedback(self, host: str, proxy: str|None, status_code: int) -> None:
+        """
+        응답 상태코드에 따라 host와 프록시의 속도를 AIMD 방식으로 바꾼다.
+
+        Args:
+            host (str): 요청을 보낸 host.
+            proxy (str|None): 요청에 사용한 프록시서버 URL.
+            status_code (int): 응답 상태코드.
+
+        Returns:
+            None.
+        """
+
+        targets = [(self._host_buckets, host, self.initial_rate, self.max_rate)]
+        if proxy is not None:
+            targets.append((self._proxy_buckets, proxy, self.proxy_rate, self.proxy_max_rate))
+
+        now = time.monotonic()
+        with self._lock:
+            for buckets, key, initial_rate, max_rate in targets:
+                bucket = self._bucket(buckets, key, initial_rate)
+                if status_code==200:
+                    # 1초 동안 rate개의 성공이 오면 additive_increase만큼 올라간다.
+                    rate = min(max_rate, bucket.rate + self.additive_increase/bucket.rate)
+                elif status_code in BACKOFF_STATUS_CODES and now-bucket.decreased_at>=DECREASE_INTERVAL:
+                    rate = max(self.min_rate, bucket.rate * self.multiplicative_decrease)
+                    bucket.decreased_at = now
+                else:
+                    continue
+                bucket.set_rate(rate)
+
+    def rates(self) -> dict[str, float]:
+        """
+        host별 현재 초당 요청 수를 가져온다.
+
+        Returns:
+            dict[str, float]: host를 key로, 초당 요청 수를 value로 가지는 딕셔너리.
+        """
+
+        with self._lock:
+            return {host: bucket.rate for host, bucket in self._host_buckets.items()}
+
+    def _bucket(self, buckets: dict, key: str, rate: float) -> TokenBucket:
+        """key에 해당하는 token bucket을 가져오고, 없으면 새로 만든다."""
+
+        with self._lock:
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = TokenBucket(rate)
+            return bucket
+
+RATE_LIMITER = AdaptiveRateLimiter()
@@ -0,0 +1,247 @@
+"""
+네이버쇼핑 리뷰데이터 수집과 관련하여, 수집한 리뷰를 메모리에 모두 올리지 않고 Arrow RecordBatch로 나눠서 읽는 클래스를 제공한다.
+
+`modeling.ipynb`처럼 리뷰 파일을 모두 읽어서 합치면, 전체 리뷰와 중간 복사본이 한 번에 메모리에 올라간다.
+여기서는 필요한 컬럼만, 필터에 맞는 파일과 row group만 읽고, 배치 크기를 메모리 한도(max_memory)에 맞춰서 정한다.
+- 파일 : memory_map=True이면 파일을 메모리에 복사하지 않고 mmap으로 읽으며, row group 전체를 미리 읽지 않고 buffer_size씩 읽는다.
+- 필터 : keyword, date(수집일자)는 파일 단위로, reviewScore, createDate는 row group의 min/max 통계로 먼저 건너뛴 뒤 행 단위로 적용한다.
+- 배치 : 첫 파일의 앞부분을 읽어서 행당 메모리를 추정하고, (배치 크기 x 행당 메모리 x MEMORY_FACTOR)가 max_memory를 넘지 않도록 한다.
+         row group 단위가 아닌 배치 단위로 디코딩하며, 작은 파일의 배치는 배치 크기 이하로 모아서 합친다.
+
+`utils.topics.topic_sentence_batches(ReviewReader(...))`처럼 배치 단위로 처리하는 함수에 그대로 넣을 수 있다.
+
+클래스 목록
+1. `ReviewReader`
+    실행결과 저장폴더, 실행폴더 또는 `compact.py`로 합친 데이터셋의 리뷰를, 컬럼과 필터를 적용하여 RecordBatch로 나눠서 읽는다.
+"""
+
+# crawling
+from crawling.naver_shopping_review.compact import PARTITIONING, RESULT_DIR, find_runs, parse_run_dir
+from crawling.naver_shopping_review.utils.schema import KST, REVIEW_SCHEMA
+
+# default
+from typing import Callable, Iterator
+import datetime
+import os
+import re
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+# global setting
+MAX_MEMORY = 256*1024**2    # 읽는 중에 사용할 메모리의 한도(byte).
+MEMORY_FACTOR = 4           # 배치 하나의 메모리에 곱할 수로, 디코딩 중인 배치, 모아둔 배치와 합친 배치, 사용 중인 배치를 고려한다.
+BUFFER_SIZE = 1024**2       # 파일에서 한 번에 읽을 byte 수.
+SAMPLE_ROWS = 1024          # 행당 메모리를 추정할 때 읽을 행 수.
+
+# 리뷰 컬럼에 수집키워드, 수집일자(YYYY-MM-DD)를 더한 schema
+READER_SCHEMA = pa.schema(list(REVIEW_SCHEMA) + [pa.field('keyword', pa.string()), pa.field('date', pa.string())])
+
+def _field_names(expression: ds.Expression) -> list[str]:
+    """필터에서 사용하는 컬럼 이름 목록."""
+
+    tokens = set(re.findall(r'\w+', str(expression)))
+    return [name for name in READER_SCHEMA.names if name in tokens]
+
+def _to_timestamp(date: str) -> pa.Scalar:
+    """'YYYY-MM-DD'를 한국시간 0시의 createDate 타입 scalar로 바꾼다."""
+
+    value = datetime.datetime.strptime(date, '%Y-%m-%d').replace(tzinfo=KST)
+    return pa.scalar(value, REVIEW_SCHEMA.field('createDate').type)
+
+class ReviewReader:
+    """
+    실행결과 저장폴더, 실행폴더 또는 `compact.py`로 합친 데이터셋의 리뷰를, 컬럼과 필터를 적용하여 RecordBatch로 나눠서 읽는다.
+    여러 번 반복할 수 있으며, 반복할 때마다 파일을 다시 읽는다.
+
+    ex)
+    >>> reader = ReviewReader(columns=['id','keyword','reviewScore','reviewContent'], keywords=['오메가3'], max_score=2)
+    >>> for batch in reader:
+    ...     ...
+    """
+
+    def __init__(self,
+                 source: str = RESULT_DIR,
+                 columns: list[str]|None = None,
+                 keywords: list[str]|None = None,
+                 dates: list[str]|None = None,
+                 min_score: int|None = None,
+                 max_score: int|None = None,
+                 start_date: str|None = None,
+                 end_date: str|None = None,
+                 filter: ds.Expression|None = None,
+                 max_memory: int = MAX_MEMORY,
+                 batch_size: int|None = None,
+                 memory_map: bool = True,
+                 allow_failed: bool = True,
+                 trace_func: Callable|None = print) -> None:
+        """
+        ReviewReader의 생성자로, 읽을 파일 목록을 만들고 배치 크기를 정한다.
+
+        Args:
+            source (str, optional): 실행결과 저장폴더(`.result/`), 실행폴더(`.result/{수집일자}_{키워드}_{상품페이지수}_{최대리뷰페이지수}/`)
+                                    또는 합친 데이터셋 폴더(`.dataset/`). default=RESULT_DIR.
+            columns (list[str]|None, optional): 읽을 컬럼으로, None이면 READER_SCHEMA의 모든 컬럼. default=None.
+            keywords (list[str]|None, optional): 읽을 수집키워드 목록으로, None이면 모든 키워드. default=None.
+            dates (list[str]|None, optional): 읽을 수집일자('YYYY-MM-DD') 목록으로, None이면 모든 수집일자. default=None.
+            min_score (int|None, optional): 리뷰점수(reviewScore)의 최소값. default=None.
+            max_score (int|None, optional): 리뷰점수(reviewScore)의 최대값. default=None.
+            start_date (str|None, optional): 리뷰작성일자(createDate)의 시작일('YYYY-MM-DD', 포함). default=None.
+            end_date (str|None, optional): 리뷰작성일자(createDate)의 종료일('YYYY-MM-DD', 포함). default=None.
+            filter (ds.Expression|None, optional): 추가로 적용할 행 필터. ex) ds.field('repurchase')==True. default=None.
+            max_memory (int, optional): 읽는 중에 사용할 메모리의 한도(byte). default=MAX_MEMORY.
+            batch_size (int|None, optional): 배치의 최대 행 수로, None이면 max_memory로 정한다. default=None.
+            memory_map (bool, optional): 파일을 mmap으로 읽을지 여부. default=True.
+            allow_failed (bool, optional): 실행결과 저장폴더에서 실패한 리뷰페이지가 있는 실행폴더도 읽을지 여부.
+                수집 중이거나 중단된 실행폴더와 읽을 수 없는 리뷰 파일은 allow_failed와 관계없이 읽지 않는다. default=True.
+            trace_func (Callable|None, optional): 읽지 않는 실행폴더와 파일을 출력 할 함수로, None이면 출력하지 않는다. default=print.
+        """
+
+        self.source = source
+        self.columns = list(columns) if columns is not None else READER_SCHEMA.names
+        self.max_memory = max_memory
+        self.memory_map = memory_map
+        self.allow_failed = allow_failed
+        self.trace_func = trace_func
+        self.invalid_paths = []     # 읽을 수 없어서 제외한 리뷰 파일 목록
+
+        unknown = [column for column in self.columns if column not in READER_SCHEMA.names]
+        if len(unknown)>0:
+            raise ValueError(f'unknown columns: {unknown}')
+
+        # 필터
+        filters = [] if filter is None else [filter]
+        if keywords is not None:
+            filters.append(ds.field('keyword').isin(list(keywords)))
+        if dates is not None:
+            filters.append(ds.field('date').isin(list(dates)))
+        if min_score is not None:
+            filters.append(ds.field('reviewScore')>=min_score)
+        if max_score is not None:
+            filters.append(ds.field('reviewScore')<=max_score)
+        if start_date is not None:
+            filters.append(ds.field('createDate')>=_to_timestamp(start_date))
+        if end_date is not None:
+            end = (datetime.datetime.strptime(end_date, '%Y-%m-%d')+datetime.timedelta(days=1)).strftime('%Y-%m-%d')
+            filters.append(ds.field('createDate')<_to_timestamp(end))
+        self.filter = None
+        for expression in filters:
+            self.filter = expression if self.filter is None else self.filter & expression
+
+        self.dataset = self._open()
+        self.row_bytes = self._estimate_row_bytes()
+        memory_batch_size = max(1, int(max_memory // (self.row_bytes*MEMORY_FACTOR)))
+        self.batch_size = min(batch_size, memory_batch_size) if batch_size is not None else memory_batch_size
+
+    def __iter__(self) -> Iterator[pa.RecordBatch]:
+        return self.iter_batches()
+
+    @property
+    def schema(self) -> pa.Schema:
+        return pa.schema([READER_SCHEMA.field(column) for column in self.columns])
+
+    @property
+    def files(self) -> list[str]:
+        """필터(keyword, date)에 맞는 파일 목록."""
+
+        return [fragment.path for fragment in self.dataset.get_fragments(filter=self.filter)]
+
+    def _open(self) -> ds.FileSystemDataset:
+        """
+        source의 리뷰 파일로 dataset을 만든다. 실행폴더의 파일에는 수집키워드, 수집일자를 파일 단위의 값으로 붙인다.
+        실행폴더는 `find_runs`로 완료된 실행폴더만 가져오므로, 읽는 중에 footer가 없는 파일 때문에 중단되지 않는다.
+        """
+
+        filesystem = pafs.LocalFileSystem(use_mmap=self.memory_map)
+        format = ds.ParquetFileFormat(default_fragment_scan_options=ds.ParquetFragmentScanOptions(pre_buffer=False, buffer_size=BUFFER_SIZE))
+
+        # 합친 데이터셋
+        reviews_dir = os.path.join(self.source, 'reviews')
+        if os.path.isdir(reviews_dir):
+            return ds.dataset(reviews_dir, schema=READER_SCHEMA, format=format, filesystem=filesystem, partitioning=PARTITIONING)
+
+        # 실행폴더 또는 실행결과 저장폴더
+        run = parse_run_dir(self.source)
+        if run is not None:
+            result_dir = os.path.dirname(os.path.normpath(self.source))
+            runs = [found for found in find_runs(result_dir, [run['keyword']], self.allow_failed, self.trace_func) if found['run']==run['run']]
+        else:
+            runs = find_runs(self.source, allow_failed=self.allow_failed, trace_func=self.trace_func)
+        self.invalid_paths = [path for run in runs for path in run['invalid_paths']]
+
+        paths, partitions = [], []
+        for run in runs:
+            for path in run['review_paths']:
+                paths.append(os.path.abspath(path))
+                partitions.append((ds.field('keyword')==run['keyword']) & (ds.field('date')==run['date']))
+        return ds.FileSystemDataset.from_paths(paths, schema=READER_SCHEMA, format=format, filesystem=filesystem, partitions=partitions)
+
+    def _read_fragment(self, fragment: ds.ParquetFileFragment, batch_size: int, filter: ds.Expression|None) -> Iterator[pa.RecordBatch]:
+        """
+        파일 하나를 batch_size행씩 읽는다. 수집키워드, 수집일자는 파일 단위의 값으로 채우고, row group의 통계로 필터에 맞지 않는 row group은 건너뛴다.
+        `pyarrow.dataset`의 scanner는 batch_size와 관계없이 row group 단위로 디코딩하므로, 배치 단위로 디코딩하는 `ParquetFile.iter_batches`로 읽는다.
+        """
+
+        row_groups = [row_group.row_groups[0].id for row_group in fragment.split_by_row_group(filter, schema=READER_SCHEMA)] if filter is not None else None
+        if row_groups is not None and len(row_groups)==0:
+            return
+
+        partition = ds.get_partition_keys(fragment.partition_expression)
+        parquet_file = pq.ParquetFile(fragment.path, memory_map=self.memory_map, buffer_size=BUFFER_SIZE, pre_buffer=False)
+        names = parquet_file.schema_arrow.names
+
+        # 필터에 사용하는 컬럼도 읽은 뒤, 필터를 적용하고 제외한다.
+        needed = list(self.columns) + [name for name in (_field_names(filter) if filter is not None else []) if name not in self.columns]
+        read_columns = [name for name in needed if name in names and name not in partition]
+        for batch in parquet_file.iter_batches(batch_size=batch_size, row_groups=row_groups, columns=read_columns, use_threads=False):
+            arrays = []
+            for name in needed:
+                dtype = READER_SCHEMA.field(name).type
+                if name in partition:
+                    arrays.append(pa.repeat(pa.scalar(partition[name], dtype), batch.num_rows))
+                elif name in names:
+                    column = batch.column(name)
+                    arrays.append(column if column.type==dtype else column.cast(dtype))
+                else:
+                    arrays.append(pa.nulls(batch.num_rows, dtype))
+
+            table = pa.Table.from_arrays(arrays, schema=pa.schema([READER_SCHEMA.field(name) for name in needed]))
+            if filter is not None:
+                table = table.filter(filter)
+            for batch in table.select(self.columns).to_batches():
+                if batch.num_rows>0:
+                    yield batch
+
+    def _estimate_row_bytes(self) -> float:
+        """첫 파일의 앞부분(SAMPLE_ROWS행)을 읽어서, 읽을 컬럼의 행당 메모리(byte)를 추정한다."""
+
+        for fragment in self.dataset.get_fragments(filter=self.filter):
+            for batch in self._read_fragment(fragment, SAMPLE_ROWS, None):
+                return max(batch.nbytes/batch.num_rows, 1.0)
+        return 1.0
+
+    def iter_batches(self) -> Iterator[pa.RecordBatch]:
+        """
+        필터를 적용한 리뷰를 batch_size행 이하의 RecordBatch로 나눠서 yield한다. 파일을 하나씩, 배치 단위로 디코딩하여 읽고,
+        리뷰 파일은 대부분 batch_size보다 작으므로 여러 파일의 배치를 batch_size행 이하로 모아서 하나로 합친다.
+
+        Returns:
+            Iterator[pa.RecordBatch]: columns 순서의 RecordBatch.
+        """
+
+        buffer, n_rows = [], 0
+        for fragment in self.dataset.get_fragments(filter=self.filter):
+            for batch in self._read_fragment(fragment, self.batch_size, self.filter):
+                if n_rows+batch.num_rows>self.batch_size:
+                    yield pa.Table.from_batches(buffer, schema=self.schema).combine_chunks().to_batches()[0]
+                    buffer, n_rows = [], 0
+                buffer.append(batch)
+                n_rows += batch.num_rows
+        if n_rows>0:
+            yield pa.Table.from_batches(buffer, schema=self.schema).combine_chunks().to_batches()[0]
+
+    def count_rows(self) -> int:
+        """필터를 적용한 리뷰 수로, 행 필터가 없으면 파일의 metadata만 읽는다."""
+
+        return self.dataset.count_rows(filter=self.filter)
@@ -0,0 +1,333 @@
+"""
+네이버쇼핑 리뷰데이터 수집과 관련하여, 요청 재시도 정책(지수 backoff + jitter, 에러 분류, 전역 재시도 예산, dead-letter 기록)을 제공한다.
+
+클래스 목록
+1. `HTTPStatusError`
+    200이 아닌 응답을 받았을 때 발생하는 에러로, 상태코드를 가진다. 기존 코드와의 호환을 위해 ConnectionError를 상속한다.
+2. `InvalidBodyError`
+    200 응답의 본문이 기대한 형식(JSON, `__NEXT_DATA__`)이 아닐 때 발생하는 에러.
+3. `RetryBudget`
+    성공한 요청 수에 비례하여 재시도를 허용하는 전역 재시도 예산으로, 실패 비율이 급증하면 재시도를 늦춘다.
+4. `DeadLetterLog`
+    재시도를 포기한 요청을 JSON Lines 파일에 기록하는 thread-safe dead-letter 기록.
+5. `RetryPolicy`
+    최대 시도 횟수, 지수 backoff와 jitter, 에러 분류, 재시도 예산, dead-letter 기록을 가지는 재시도 정책.
+
+함수 목록
+1. `with_retry`
+    extractor의 메서드를 extractor의 `retry_policy`로 재시도하도록 감싸는 decorator.
+
+변수 목록
+1. `RETRY_POLICY`
+    모든 extractor가 공유하는 기본 RetryPolicy.
+"""
+
+# crawling
+from crawling.naver_shopping_review.utils.metrics import METRICS
+
+# default
+from typing import Callable
+import datetime
+import functools
+import json
+import os
+import random
+import threading
+import time
+import requests
+
+# global setting
+MAX_ATTEMPTS = 8                # 요청별 최대 시도 횟수.
+MAX_DECODE_ATTEMPTS = 3         # 본문이 기대한 형식이 아닐 때의 최대 시도 횟수.
+BASE_DELAY = 0.2                # 첫번째 재시도의 최대 대기시간(초)으로, 재시도마다 2배씩 늘어난다.
+MAX_DELAY = 30.0                # 재시도 대기시간의 상한(초).
+FATAL_STATUS_CODES = (400, 401, 404, 410)   # 다시 요청해도 결과가 같은 상태코드.
+BUDGET_RATIO = 0.2              # 성공한 요청 1개당 허용되는 재시도 수.
+BUDGET_MIN_PER_SECOND = 2.0     # 성공이 없어도 초당 허용되는 재시도 수로, 예산이 바닥나도 크롤링이 멈추지 않게 한다.
+BUDGET_CAPACITY = 100.0         # 쌓아둘 수 있는 최대 재시도 수.
+DEAD_LETTER_PATH = 'crawling/naver_shopping_review/.cache/dead_letters.jsonl' # 재시도를 포기한 요청의 기록 경로.
+
+class HTTPStatusError(ConnectionError):
+    """200이 아닌 응답을 받았을 때 발생하는 에러로, 상태코드를 가진다. 기존 코드와의 호환을 위해 ConnectionError를 상속한다."""
+
+    def __init__(self, status_code: int, message: str) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+class InvalidBodyError(ValueError):
+    """200 응답의 본문이 기대한 형식(JSON, `__NEXT_DATA__`)이 아닐 때 발생하는 에러. ex) 차단 안내 HTML"""
+
+class RetryBudget:
+    """
+    성공한 요청 수에 비례하여 재시도를 허용하는 전역 재시도 예산으로, 실패 비율이 급증하면 재시도를 늦춘다.
+
+    성공한 요청마다 `ratio`개, 시간이 지나면 초당 `min_per_second`개의 재시도가 쌓이고, 재시도할 때 1개씩 사용한다.
+    차단이 몰려서 예산이 바닥나면 재시도는 예산이 쌓일 때까지 기다리므로, 모든 worker가 동시에 재시도를 쏟아내지 않는다.
+    """
+
+    def __init__(self, ratio: float = BUDGET_RATIO, min_per_second: float = BUDGET_MIN_PER_SECOND, capacity: float = BUDGET_CAPACITY) -> None:
+        """
+        RetryBudget의 생성자.
+
+        Args:
+            ratio (float, optional): 성공한 요청 1개당 허용되는 재시도 수. default=BUDGET_RATIO.
+            min_per_second (float, optional): 성공이 없어도 초당 허용되는 재시도 수. default=BUDGET_MIN_PER_SECOND.
+            capacity (float, optional): 쌓아둘 수 있는 최대 재시도 수. default=BUDGET_CAPACITY.
+        """
+
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = capacity
+
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now-self._updated_at)*self.min_per_second)
+        self._updated_at = now
+
+    def record_success(self) -> None:
+        """성공한 요청을 기록하여 재시도 예산을 늘린다."""
+
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def acquire(self) -> float:
+        """
+        재시도 1개의 예산을 가져오며, 예산이 없으면 쌓일 때까지 기다린다.
+
+        Returns:
+            float: 예산을 기다린 시간(초).
+        """
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens>=1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1-self._tokens) / self.min_per_second if self.min_per_second>0 else 0.1
+            time.sleep(wait)
+            waited += wait
+
+    @property
+    def available(self) -> float:
+        """현재 남아있는 재시도 예산."""
+
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+class DeadLetterLog:
+    """
+    재시도를 포기한 요청을 JSON Lines 파일에 기록하는 thread-safe dead-letter 기록.
+    한 줄이 {'time', 'func', 'args', 'kwargs', 'attempts', 'error', 'status_code'}이므로, 실패한 요청만 골라서 다시 실행할 수 있다.
+    """
+
+    def __init__(self, path: str = DEAD_LETTER_PATH) -> None:
+        """
+        DeadLetterLog의 생성자.
+
+        Args:
+            path (str, optional): 기록할 JSON Lines 파일 경로. default=DEAD_LETTER_PATH.
+        """
+
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, func: str, args: tuple, kwargs: dict, attempts: int, error: Exception) -> None:
+        """재시도를 포기한 요청 하나를 기록한다."""
+
+        record = {
+            'time': datetime.datetime.now().isoformat(timespec='seconds'),
+            'func': func,
+            'args': list(args),
+            'kwargs': kwargs,
+            'attempts': attempts,
+            'error': f'{type(error).__name__}: {error}',
+            'status_code': getattr(error, 'status_code', None),
+        }
+        line = json.dumps(record, ensure_ascii=False, default=str) + '\n'
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(line)
+
+    def load(self, func: str|None = None) -> list[dict]:
+        """
+        기록된 요청을 가져온다.
+
+        Args:
+            func (str|None, optional): 이 함수 이름의 기록만 가져온다. ex) 'NaverShoppingReviewExtractor.crawl'. None이면 모두 가져온다. default=None.
+
+        Returns:
+            list[dict]: 기록 리스트.
+        """
+
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, 'r') as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        return [record for record in records if func is None or record['func']==func]
+
+    def discard(self, records: list[dict]) -> int:
+        """
+        다시 수집하기로 한 기록들을 기록 파일에서 지우고, '{path}.replayed'에 옮겨 적는다.
+        다시 수집하는 요청이 또 실패하면 새로 기록되므로, 같은 요청을 두 번 다시 수집하지 않는다.
+        지우지 않은 기록(다른 키워드나 저장폴더의 요청 등)은 그대로 남아서, 다음에 이어서 수집할 때 다시 사용할 수 있다.
+
+        Args:
+            records (list[dict]): `load`로 가져온 기록 중 다시 수집하기로 한 기록 리스트.
+
+        Returns:
+            int: 지운 기록 수.
+        """
+
+        targets = {json.dumps(record, ensure_ascii=False, sort_keys=True, default=str) for record in records}
+        if len(targets)==0:
+            return 0
+
+        with self._lock:
+            if not os.path.exists(self.path):
+                return 0
+            with open(self.path, 'r') as f:
+                lines = [line for line in f if line.strip()]
+
+            keep, replayed = [], []
+            for line in lines:
+                key = json.dumps(json.loads(line), ensure_ascii=False, sort_keys=True, default=str)
+                (replayed if key in targets else keep).append(line)
+            if len(replayed)==0:
+                return 0
+
+            with open(self.path + '.replayed', 'a') as f:
+                f.writelines(replayed)
+            tmp_path = f'{self.path}.tmp{os.getpid()}'
+            with open(tmp_path, 'w') as f:
+                f.writelines(keep)
+            os.replace(tmp_path, self.path)
+        return len(replayed)
+
+class RetryPolicy:
+    """
+    최대 시도 횟수, 지수 backoff와 jitter, 에러 분류, 재시도 예산, dead-letter 기록을 가지는 재시도 정책.
+
+    에러 분류
+    - 재시도: 403(차단), 429, 5xx, 연결/timeout 에러
+    - 제한된 재시도: 본문이 기대한 형식이 아님(JSON decode 실패 등)으로, `max_decode_attempts`번까지만 시도한다.
+    - 재시도하지 않음: 400/401/404/410 응답과 그 외의 에러(잘못된 인자 등)
+    """
+
+    def __init__(self,
+                 max_attempts: int = MAX_ATTEMPTS,
+                 base_delay: float = BASE_DELAY,
+                 max_delay: float = MAX_DELAY,
+                 max_decode_attempts: int = MAX_DECODE_ATTEMPTS,
+                 budget: RetryBudget|None = None,
+                 dead_letter: DeadLetterLog|None = None) -> None:
+        """
+        RetryPolicy의 생성자.
+
+        Args:
+            max_attempts (int, optional): 요청별 최대 시도 횟수. default=MAX_ATTEMPTS.
+            base_delay (float, optional): 첫번째 재시도의 최대 대기시간(초)으로, 재시도마다 2배씩 늘어난다. default=BASE_DELAY.
+            max_delay (float, optional): 재시도 대기시간의 상한(초). default=MAX_DELAY.
+            max_decode_attempts (int, optional): 본문이 기대한 형식이 아닐 때의 최대 시도 횟수. default=MAX_DECODE_ATTEMPTS.
+            budget (RetryBudget|None, optional): 재시도 예산으로, None이면 예산 없이 재시도한다. default=None.
+            dead_letter (DeadLetterLog|None, optional): 재시도를 포기한 요청의 기록으로, None이면 기록하지 않는다. default=None.
+        """
+
+        assert max_attempts>=1, "max_attempts must be greater than or equal to 1."
+
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_decode_attempts = max_decode_attempts
+        self.budget = budget
+        self.dead_letter = dead_letter
+
+    def classify(self, error: Exception) -> str:
+        """
+        에러를 분류한다.
+
+        Args:
+            error (Exception): 요청 중 발생한 에러.
+
+        Returns:
+            str: 'retry'(재시도), 'decode'(제한된 재시도), 'fatal'(재시도하지 않음) 중 하나.
+        """
+
+        if isinstance(error, HTTPStatusError):
+            return 'fatal' if error.status_code in FATAL_STATUS_CODES else 'retry'
+        if isinstance(error, (requests.RequestException, ConnectionError, TimeoutError)):
+            return 'retry'
+        if isinstance(error, ValueError): # InvalidBodyError, json.JSONDecodeError
+            return 'decode'
+        return 'fatal'
+
+    def backoff(self, attempt: int) -> float:
+        """
+        재시도 전 대기시간으로, 0 ~ min(max_delay, base_delay*2^(attempt-1)) 사이에서 무작위로 정한다(full jitter).
+
+        Args:
+            attempt (int): 실패한 시도 횟수(1부터).
+
+        Returns:
+            float: 대기시간(초).
+        """
+
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**(attempt-1)))
+
+    def call(self, func: Callable, *args, **kwargs):
+        """
+        func를 정책에 따라 재시도하며 실행한다. 재시도하지 않는 에러이거나 최대 시도 횟수를 넘으면 dead-letter에 기록하고 에러를 다시 발생시킨다.
+
+        Args:
+            func (Callable): 실행할 함수.
+            *args, **kwargs: func에 전달할 인자.
+
+        Returns:
+            func의 반환값.
+        """
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                kind = self.classify(e)
+                limit = self.max_decode_attempts if kind=='decode' else self.max_attempts
+                if kind=='fatal' or attempt>=limit:
+                    METRICS.inc('retry_giveups_total', kind=kind)
+                    if self.dead_letter is not None:
+                        self.dead_letter.write(getattr(func, '__qualname__', str(func)), _serializable(args), kwargs, attempt, e)
+                    raise
+
+                METRICS.inc('retry_attempts_total', kind=kind, status=getattr(e, 'status_code', type(e).__name__))
+                if self.budget is not None:
+                    METRICS.observe('retry_budget_wait_seconds', self.budget.acquire())
+                time.sleep(self.backoff(attempt))
+                continue
+
+            if self.budget is not None:
+                self.budget.record_success()
+            return result
+
+def _serializable(args: tuple) -> tuple:
+    """dead-letter에 기록할 인자로, 메서드의 self(extractor)는 제외한다."""
+
+    return tuple(arg for arg in args if isinstance(arg, (str, int, float, bool, type(None), list, tuple, dict)))
+
+def with_retry(func: Callable) -> Callable:
+    """extractor의 메서드를 extractor의 `retry_policy`로 재시도하도록 감싸는 decorator."""
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        return self.retry_policy.call(func, self, *args, **kwargs)
+    return wrapper
+
+RETRY_POLICY = RetryPolicy(budget=RetryBudget(), dead_letter=DeadLetterLog())
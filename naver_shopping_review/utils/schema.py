@@ -0,0 +1,317 @@
+"""
+네이버쇼핑 리뷰데이터 수집과 관련하여, 상품정보와 리뷰정보의 Arrow schema와 변환 함수를 제공한다.
+
+변수 목록
+1. `PRODUCT_SCHEMA`
+    검색결과(search/all)의 상품정보(products.list[].item)에 대한 Arrow schema.
+2. `REVIEW_SCHEMA`
+    리뷰 API(query-pages)의 리뷰정보(contents[])에 상품순위, 리뷰순위를 더한 Arrow schema.
+3. `OVERFLOW_FIELD`
+    schema에 없는 필드를 JSON 문자열로 모아두는 컬럼 이름.
+
+함수 목록
+1. `to_record_batch`
+    JSON에서 파싱된 딕셔너리 리스트를 schema의 타입으로 변환하여, 중간 DataFrame 없이 바로 pa.RecordBatch로 만든다.
+2. `products_to_record_batch`
+    상품정보 딕셔너리 리스트를 PRODUCT_SCHEMA의 pa.RecordBatch로 변환한다.
+3. `reviews_to_record_batch`
+    리뷰정보 딕셔너리 리스트를 REVIEW_SCHEMA의 pa.RecordBatch로 변환한다.
+"""
+
+# default
+import ast
+import datetime
+import json
+import pyarrow as pa
+
+TIMESTAMP = pa.timestamp('ms', tz='Asia/Seoul')
+KST = datetime.timezone(datetime.timedelta(hours=9))
+
+# schema에 없는 필드(네이버에서 새로 추가되거나 이름이 바뀐 필드)를 {필드명: 값}의 JSON 문자열로 모아두는 컬럼
+OVERFLOW_FIELD = 'extra_fields'
+
+# 리뷰에서 토픽에 해당하는 문장의 위치(patternStartNo ~ patternEndNo)
+REVIEW_TOPIC_TYPE = pa.struct([
+    ('topicCode', pa.string()),
+    ('topicCodeName', pa.string()),
+    ('patternStartNo', pa.int32()),
+    ('patternEndNo', pa.int32()),
+])
+
+# 상품의 판매몰 정보로, npaySellerNo가 리뷰 API의 checkoutMerchantNo가 된다.
+MALL_INFO_TYPE = pa.struct([
+    ('npaySellerNo', pa.string()),
+    ('mallNo', pa.string()),
+    ('mallName', pa.string()),
+    ('mallGrade', pa.string()),
+])
+
+PRODUCT_SCHEMA = pa.schema([
+    ('collection', pa.string()),
+    ('rank', pa.int32()),
+    ('id', pa.string()),
+    ('parentId', pa.string()),
+    ('productTitle', pa.string()),
+    ('productName', pa.string()),
+    ('price', pa.int64()),
+    ('lowPrice', pa.int64()),
+    ('highPrice', pa.int64()),
+    ('mobilePrice', pa.int64()),
+    ('hasLowestCardPrice', pa.bool_()),
+    ('hasAddInFee', pa.bool_()),
+    ('scoreInfo', pa.float64()),
+    ('reviewCount', pa.int64()),
+    ('reviewCountSum', pa.int64()),
+    ('purchaseCnt', pa.int64()),
+    ('keepCnt', pa.int64()),
+    ('category1Id', pa.string()),
+    ('category2Id', pa.string()),
+    ('category3Id', pa.string()),
+    ('category4Id', pa.string()),
+    ('category1Name', pa.string()),
+    ('category2Name', pa.string()),
+    ('category3Name', pa.string()),
+    ('category4Name', pa.string()),
+    ('categoryLevel', pa.int32()),
+    ('openDate', TIMESTAMP),
+    ('maker', pa.string()),
+    ('makerNo', pa.string()),
+    ('brand', pa.string()),
+    ('brandNo', pa.string()),
+    ('imageUrl', pa.string()),
+    ('crUrl', pa.string()),
+    ('mallName', pa.string()),
+    ('mallNo', pa.string()),
+    ('mallPcUrl', pa.string()),
+    ('mallProductUrl', pa.string()),
+    ('mallProductId', pa.string()),
+    ('originalMallProductId', pa.string()),
+    ('mallInfoCache', MALL_INFO_TYPE),
+    ('isNaverPay', pa.bool_()),
+    ('adId', pa.string()),
+    (OVERFLOW_FIELD, pa.string()),                    # JSON
+])
+
+REVIEW_SCHEMA = pa.schema([
+    ('product_ranking', pa.int32()),
+    ('review_ranking', pa.int32()),
+    ('id', pa.int64()),
+    ('reviewType', pa.string()),
+    ('reviewServiceType', pa.string()),
+    ('reviewContentClassType', pa.string()),
+    ('reviewScore', pa.int8()),
+    ('reviewContent', pa.string()),
+    ('contentsStatusType', pa.string()),
+    ('createDate', TIMESTAMP),
+    ('freeTrial', pa.bool_()),
+    ('repurchase', pa.bool_()),
+    ('reviewRankingScore', pa.float64()),
+    ('writerId', pa.string()),
+    ('maskedWriterId', pa.string()),
+    ('writerIdNo', pa.int64()),
+    ('writerMemberNo', pa.int64()),
+    ('writerProfileImageUrl', pa.string()),
+    ('storeType', pa.string()),
+    ('storeNo', pa.int64()),
+    ('checkoutMerchantId', pa.string()),
+    ('checkoutMerchantNo', pa.int64()),
+    ('orderNo', pa.string()),
+    ('productOrderNo', pa.string()),
+    ('productNo', pa.string()),
+    ('productName', pa.string()),
+    ('productUrl', pa.string()),
+    ('largeCategorizeCategoryId', pa.string()),
+    ('middleCategorizeCategoryId', pa.string()),
+    ('smallCategorizeCategoryId', pa.string()),
+    ('productOptionContentNoDisplay', pa.bool_()),
+    ('knowledgeShoppingMallProductId', pa.string()),
+    ('originProductNo', pa.string()),
+    ('reviewAttaches', pa.string()),                  # JSON
+    ('reviewCommentIds', pa.list_(pa.int64())),
+    ('reviewComments', pa.string()),                  # JSON
+    ('reviewEvaluationValueIds', pa.list_(pa.int64())),
+    ('reviewUserInfoValues', pa.string()),            # JSON
+    ('reviewTopics', pa.list_(REVIEW_TOPIC_TYPE)),
+    ('eventTitle', pa.string()),
+    ('profileImageSourceType', pa.string()),
+    ('repThumbnailAttach', pa.string()),              # JSON
+    ('repThumbnailTagNameDescription', pa.string()),
+    ('helpCount', pa.int32()),
+    ('parentReviewId', pa.int64()),
+    ('bestReview', pa.bool_()),
+    ('bestReviewSelectDate', TIMESTAMP),
+    ('benefitPaymentDate', TIMESTAMP),
+    ('modifyDate', TIMESTAMP),
+    ('reviewInspectionPolicyReason', pa.string()),
+    ('productOptionContent', pa.string()),
+    ('standardPurchaseConditionText', pa.string()),
+    (OVERFLOW_FIELD, pa.string()),                    # JSON
+])
+
+def _to_int(value) -> int|None:
+    """정수로 변환하며, 변환할 수 없으면 None."""
+
+    if value is None or value=='':
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_float(value) -> float|None:
+    """실수로 변환하며, 변환할 수 없으면 None."""
+
+    if value is None or value=='':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _to_bool(value) -> bool|None:
+    """bool로 변환하며, 문자열은 'true','y','1'을 True로 본다."""
+
+    if value is None or value=='':
+        return None
+    if isinstance(value, str):
+        return value.lower() in ('true','y','1')
+    return bool(value)
+
+def _to_str(value) -> str|None:
+    """문자열로 변환하며, dict와 list는 JSON 문자열로 변환한다."""
+
+    if value is None:
+        return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+def _to_timestamp(value) -> datetime.datetime|None:
+    """ISO 8601 문자열, 'YYYYMMDDHHMMSS' 문자열, epoch milliseconds를 datetime으로 변환한다."""
+
+    if value is None or value=='':
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            return datetime.datetime.fromtimestamp(value/1000, tz=KST)
+        if value.isdigit() and len(value)==14:
+            return datetime.datetime.strptime(value, '%Y%m%d%H%M%S').replace(tzinfo=KST)
+        timestamp = datetime.datetime.fromisoformat(value)
+        return timestamp if timestamp.tzinfo is not None else timestamp.replace(tzinfo=KST)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+def _parse_mapping(value: str) -> dict|None:
+    """
+    JSON 문자열 또는 파이썬 dict 표현(repr) 문자열을 eval 없이 dict로 변환하며, 변환할 수 없으면 None.
+    이전 버전에서 str(dict)로 저장된 mallInfoCache 같은 값도 읽을 수 있다.
+    """
+
+    try:
+        return json.loads(value)
+    except ValueError:
+        pass
+    try:
+        value = ast.literal_eval(value)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        return None
+    return value if isinstance(value, dict) else None
+
+def _converter(dtype: pa.DataType):
+    """Arrow 타입에 맞는 값 변환 함수를 가져온다."""
+
+    if pa.types.is_integer(dtype):
+        return _to_int
+    if pa.types.is_floating(dtype):
+        return _to_float
+    if pa.types.is_boolean(dtype):
+        return _to_bool
+    if pa.types.is_timestamp(dtype):
+        return _to_timestamp
+    if pa.types.is_string(dtype):
+        return _to_str
+    if pa.types.is_struct(dtype):
+        fields = [(dtype.field(i).name, _converter(dtype.field(i).type)) for i in range(dtype.num_fields)]
+        def convert_struct(value):
+            if isinstance(value, str):
+                value = _parse_mapping(value)
+            if not isinstance(value, dict):
+                return None
+            return {name: convert(value.get(name)) for name, convert in fields}
+        return convert_struct
+    if pa.types.is_list(dtype):
+        convert_value = _converter(dtype.value_type)
+        def convert_list(value):
+            if not isinstance(value, list):
+                return None
+            return [convert_value(v) for v in value]
+        return convert_list
+    raise TypeError(f'unsupported type: {dtype}')
+
+# schema별 (필드명, 변환 함수) 캐시
+_CONVERTERS = {}
+
+def to_record_batch(rows: list[dict], schema: pa.Schema) -> pa.RecordBatch:
+    """
+    JSON에서 파싱된 딕셔너리 리스트를 schema의 타입으로 변환하여, 중간 DataFrame 없이 바로 pa.RecordBatch로 만든다.
+    변환할 수 없는 값은 null로 둔다. schema에 없는 필드는, schema에 OVERFLOW_FIELD 컬럼이 있으면 그 컬럼에 JSON 문자열로 모으고
+    (없는 행은 null) 없으면 버린다.
+    ex) schema에 없는 'newField'가 있으면 `extra_fields`는 '{"newField": 1}'
+
+    Args:
+        rows (list[dict]): JSON에서 파싱된 딕셔너리 리스트.
+        schema (pa.Schema): 변환할 Arrow schema.
+
+    Returns:
+        pa.RecordBatch: schema를 따르는 RecordBatch.
+    """
+
+    converters = _CONVERTERS.get(schema)
+    if converters is None:
+        converters = _CONVERTERS[schema] = [(field.name, _converter(field.type)) for field in schema if field.name!=OVERFLOW_FIELD]
+
+    columns = {name: [convert(row.get(name)) for row in rows] for name, convert in converters}
+    if OVERFLOW_FIELD in schema.names:
+        names = frozenset(schema.names)
+        columns[OVERFLOW_FIELD] = [_overflow(row, names) for row in rows]
+    return pa.RecordBatch.from_pydict(columns, schema=schema)
+
+def _overflow(row: dict, names: frozenset) -> str|None:
+    """schema에 없는 필드를 JSON 문자열로 모으며, 없으면 None."""
+
+    extra = {key: row[key] for key in row.keys() - names}
+    if len(extra)==0:
+        return None
+    return json.dumps(extra, ensure_ascii=False, sort_keys=True, default=str)
+
+def products_to_record_batch(items: list[dict]) -> pa.RecordBatch:
+    """
+    상품정보 딕셔너리 리스트를 PRODUCT_SCHEMA의 pa.RecordBatch로 변환한다.
+
+    Args:
+        items (list[dict]): 검색결과의 products.list[].item 리스트.
+
+    Returns:
+        pa.RecordBatch: PRODUCT_SCHEMA를 따르는 RecordBatch.
+    """
+
+    return to_record_batch(items, PRODUCT_SCHEMA)
+
+def reviews_to_record_batch(contents: list[dict], product_ranking: int, start_ranking: int) -> pa.RecordBatch:
+    """
+    리뷰정보 딕셔너리 리스트를 REVIEW_SCHEMA의 pa.RecordBatch로 변환한다.
+
+    Args:
+        contents (list[dict]): 리뷰 API의 contents 리스트.
+        product_ranking (int): 상품순위.
+        start_ranking (int): 첫번째 리뷰의 리뷰순위.
+
+    Returns:
+        pa.RecordBatch: REVIEW_SCHEMA를 따르는 RecordBatch.
+    """
+
+    rows = [
+        {**review, 'product_ranking': product_ranking, 'review_ranking': start_ranking+i}
+        for i, review in enumerate(contents)
+    ]
+    return to_record_batch(rows, REVIEW_SCHEMA)
@@ -0,0 +1,432 @@
+"""
+네이버쇼핑 리뷰데이터 수집과 관련하여, bounded queue로 연결된 단계별(stage) 파이프라인을 제공한다.
+
+클래스 목록
+1. `Stage`
+    입력 queue에서 항목을 꺼내 처리하고, 결과를 다음 stage의 queue에 넣는 worker thread들의 묶음.
+2. `StagePipeline`
+    여러 Stage를 bounded queue로 연결하여, 단계별 worker 수와 backpressure를 가지는 producer/consumer 파이프라인.
+3. `StreamingReviewEngine`
+    상품 페이지(list) → 상품 탐색(discover) → 리뷰페이지 요청(fetch) → 파싱(parse) → 저장(write)을 각각의 stage로 나누어 크롤링하는 엔진.
+"""
+
+# root경로를 추가
+import os, sys
+sys.path.append(os.path.abspath(''))
+
+# crawling
+from crawling.naver_shopping_review.utils.extractor import NaverShoppingExtractor, NaverShoppingReviewExtractor
+from crawling.naver_shopping_review.utils.crawl import product_response_to_data, add_keyword_column, preprocess_products_info, get_review_tasks, plan_last_page, IncompleteListingError, _ReviewEnd, _make_writer, REVIEW_PAGE_SIZE
+from crawling.naver_shopping_review.utils.engine import KeywordJob
+from crawling.naver_shopping_review.utils.schema import PRODUCT_SCHEMA, reviews_to_record_batch
+from crawling.naver_shopping_review.utils.metrics import METRICS
+
+# default
+from typing import Callable, Iterable, NamedTuple
+import queue
+import threading
+import time
+import pyarrow as pa
+
+# global setting
+QUEUE_SIZE = 1000       # stage 사이 queue의 최대 항목 수로, 앞 stage가 빠르면 queue가 찰 때까지만 진행한다.
+LIST_WORKERS = 2        # 상품 페이지를 크롤링할 worker 수.
+DISCOVER_WORKERS = None # 상품별 마지막 리뷰페이지를 탐색할 worker 수로, None이면 fetch worker 수와 같다.
+PARSE_WORKERS = 2       # 리뷰 JSON을 파싱하여 RecordBatch로 변환할 worker 수.
+
+_STOP = object()
+
+class Stage:
+    """입력 queue에서 항목을 꺼내 처리하고, 결과를 다음 stage의 queue에 넣는 worker thread들의 묶음."""
+
+    def __init__(self, name: str, func: Callable[[object], Iterable|None], n_workers: int = 1, maxsize: int = QUEUE_SIZE) -> None:
+        """
+        Stage의 생성자.
+
+        Args:
+            name (str): stage 이름.
+            func (Callable[[object], Iterable|None]): 입력 항목 하나를 처리하여, 다음 stage에 넘길 항목들을 반환하는 함수.
+            n_workers (int, optional): worker thread 수. default=1.
+            maxsize (int, optional): 입력 queue의 최대 항목 수. default=QUEUE_SIZE.
+        """
+
+        assert n_workers>=1, "n_workers must be greater than or equal to 1."
+
+        self.name = name
+        self.func = func
+        self.n_workers = n_workers
+        self.queue = queue.Queue(maxsize=maxsize)
+
+        self.n_processed = 0
+        self.n_errors = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+
+class StagePipeline:
+    """
+    여러 Stage를 bounded queue로 연결하여, 단계별 worker 수와 backpressure를 가지는 producer/consumer 파이프라인.
+
+    다음 stage의 queue가 가득 차면 앞 stage의 worker는 자리가 날 때까지 기다리므로, 느린 stage가 있어도 메모리 사용량은 queue 크기로 제한된다.
+    """
+
+    def __init__(self, stages: list[Stage], trace_func: Callable = print) -> None:
+        """
+        StagePipeline의 생성자.
+
+        Args:
+            stages (list[Stage]): 순서대로 연결할 stage 리스트.
+            trace_func (Callable, optional): 에러를 출력 할 함수. default=print.
+        """
+
+        self.stages = stages
+        self.trace_func = trace_func
+
+    def run(self, items: Iterable) -> None:
+        """
+        입력 항목들을 첫번째 stage에 넣고, 모든 stage의 처리가 끝날 때까지 기다린다.
+
+        Args:
+            items (Iterable): 첫번째 stage에 넣을 항목들.
+
+        Returns:
+            None.
+        """
+
+        threads = []
+        for i, stage in enumerate(self.stages):
+            next_stage = self.stages[i+1] if i+1<len(self.stages) else None
+            alive = [stage.n_workers]
+            for _ in range(stage.n_workers):
+                thread = threading.Thread(target=self._work, args=(stage, next_stage, alive), name=f'{stage.name}-worker', daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        for item in items:
+            self.stages[0].queue.put(item)
+        for _ in range(self.stages[0].n_workers):
+            self.stages[0].queue.put(_STOP)
+
+        for thread in threads:
+            thread.join()
+
+    def stats(self) -> dict[str, dict]:
+        """
+        stage별 처리 수, 에러 수, 처리시간, 현재 queue 크기를 가져온다.
+
+        Returns:
+            dict[str, dict]: stage 이름을 key로 가지는 딕셔너리.
+        """
+
+        return {
+            stage.name: {'processed':stage.n_processed, 'errors':stage.n_errors, 'busy_seconds':round(stage.busy_seconds, 3), 'queued':stage.queue.qsize()}
+            for stage in self.stages
+        }
+
+    def _work(self, stage: Stage, next_stage: Stage|None, alive: list[int]) -> None:
+        """stage의 worker로, 종료 신호를 받을 때까지 항목을 처리하며, 마지막 worker가 종료되면 다음 stage에 종료 신호를 보낸다."""
+
+        while True:
+            item = stage.queue.get()
+            METRICS.set('queue_depth', stage.queue.qsize(), stage=stage.name)
+            if item is _STOP:
+                break
+
+            s = time.time()
+            try:
+                outputs = stage.func(item)
+                if next_stage is not None and outputs is not None:
+                    for output in outputs:
+                        next_stage.queue.put(output)
+                error = False
+            except Exception as e:
+                self.trace_func(f"An error occurred: [{stage.name}] {e}")
+                METRICS.inc('errors_total', stage=stage.name)
+                error = True
+
+            METRICS.observe('stage_seconds', time.time()-s, stage=stage.name)
+            with stage._lock:
+                stage.n_processed += 1
+                stage.n_errors += error
+                stage.busy_seconds += time.time() - s
+
+        with stage._lock:
+            alive[0] -= 1
+            last = alive[0]==0
+        if last and next_stage is not None:
+            for _ in range(next_stage.n_workers):
+                next_stage.queue.put(_STOP)
+
+class _ReviewUnit(NamedTuple):
+    """stage 사이를 이동하는 리뷰페이지 단위의 작업."""
+
+    job: int                        # 작업(키워드) index.
+    key: int                        # 상품순위로, 리뷰 파일의 key.
+    page: int                       # 리뷰페이지.
+    review_args: tuple              # `ReviewTask.review_args`.
+    body: dict|None = None          # fetch stage에서 파싱된 응답 JSON.
+    batch: pa.RecordBatch|None = None   # parse stage의 결과.
+    error: Exception|None = None    # 앞 stage에서 발생한 에러.
+    skipped: bool = False           # 실제 마지막 리뷰페이지를 넘어서 요청하지 않은 페이지.
+
+class StreamingReviewEngine:
+    """
+    상품 페이지(list) → 상품 탐색(discover) → 리뷰페이지 요청(fetch) → 파싱(parse) → 저장(write)을 각각의 stage로 나누어 크롤링하는 엔진.
+
+    - list: 상품 페이지를 크롤링하여(또는 저장된 상품정보에서) 상품을 하나씩 discover로 넘긴다.
+    - discover: 상품별 마지막 리뷰페이지를 reviewCount로 계산한다. reviewCount를 모르면 첫번째 리뷰페이지로 탐색하고,
+      탐색에 사용한 첫번째 리뷰페이지는 바로 parse로 넘긴다. 탐색도 네트워크 요청이므로 worker 수는 기본적으로 fetch와 같다.
+    - fetch: 리뷰페이지를 요청하여 응답 본문만 넘긴다. 리뷰가 20개보다 적은 페이지가 파싱된 상품은 그 뒤의 페이지를 요청하지 않는다. (네트워크)
+    - parse: JSON을 파싱하여 REVIEW_SCHEMA의 RecordBatch로 변환한다. (CPU)
+    - write: 하나의 worker가 writer에 넣고, 상품의 모든 리뷰페이지가 도착하면 파일을 닫는다. (디스크)
+
+    stage마다 worker 수가 따로 있고 bounded queue로 연결되어 있으므로, 디스크 쓰기나 파싱이 느려도 네트워크 worker가 그 작업을 대신하며 멈추지 않는다.
+    `AsyncReviewEngine.run_keywords`와 같이, 상품순위는 검색결과의 순위(`rank`)를 사용한다.
+    """
+
+    def __init__(self,
+                 extractor: NaverShoppingReviewExtractor|None = None,
+                 fetch_workers: int = os.cpu_count()//2,
+                 trace_func: Callable = print,
+                 product_extractor: NaverShoppingExtractor|None = None,
+                 discover_workers: int|None = DISCOVER_WORKERS,
+                 parse_workers: int = PARSE_WORKERS,
+                 queue_size: int = QUEUE_SIZE,
+                 list_workers: int = LIST_WORKERS) -> None:
+        """
+        StreamingReviewEngine의 생성자.
+
+        Args:
+            extractor (NaverShoppingReviewExtractor|None, optional): 리뷰 크롤링에 사용할 extractor. None이면 새로 생성한다. default=None.
+            fetch_workers (int, optional): 리뷰페이지를 요청할 worker 수. default=os.cpu_count()//2.
+            trace_func (Callable, optional): 진행 경과를 출력 할 함수. default=print.
+            product_extractor (NaverShoppingExtractor|None, optional): 상품정보 크롤링에 사용할 extractor.
+                None이면 리뷰 extractor와 같은 프록시 풀을 사용하도록 새로 생성한다. default=None.
+            discover_workers (int|None, optional): 상품별 마지막 리뷰페이지를 탐색할 worker 수로, None이면 fetch_workers와 같다. default=DISCOVER_WORKERS.
+            parse_workers (int, optional): 리뷰 JSON을 파싱할 worker 수. default=PARSE_WORKERS.
+            queue_size (int, optional): stage 사이 queue의 최대 항목 수. default=QUEUE_SIZE.
+            list_workers (int, optional): 상품 페이지를 크롤링할 worker 수. default=LIST_WORKERS.
+        """
+
+        self.extractor = extractor if extractor is not None else NaverShoppingReviewExtractor()
+        self.product_extractor = product_extractor if product_extractor is not None else NaverShoppingExtractor(proxy_pool=self.extractor.proxy_pool)
+        self.fetch_workers = max(fetch_workers, 1)
+        self.discover_workers = max(discover_workers, 1) if discover_workers is not None else self.fetch_workers
+        self.parse_workers = parse_workers
+        self.list_workers = max(list_workers, 1)
+        self.queue_size = queue_size
+        self.trace_func = trace_func
+
+    def run_keywords(self, jobs: list[KeywordJob], n_page: int, max_page: int = 1000) -> dict[str, pa.Table]:
+        """
+        여러 키워드의 상품 페이지와 리뷰페이지를 stage 파이프라인으로 크롤링하여 저장한다.
+
+        Args:
+            jobs (list[KeywordJob]): 키워드별 작업 리스트.
+            n_page (int): 키워드별로 수집할 상품 페이지 수.
+            max_page (int, optional): 상품별로 리뷰를 가져올 최대 페이지 수로, 1000을 넘길 수 없다. default=1000.
+
+        Returns:
+            dict[str, pa.Table]: 키워드를 key로, 수집한 상품정보를 value로 가지는 딕셔너리.
+        """
+
+        assert max_page<=1000, "maximum page is 1000."
+
+        self.trace_func('')
+        self.trace_func('<네이버쇼핑 네이버페이 상품, 리뷰 크롤링 (stream)>')
+        self.trace_func('크롤링 시작')
+        self.trace_func('')
+
+        self._jobs = jobs
+        self._n_page = n_page
+        self._max_page = max_page
+        self._writers = [_make_writer(job.save_path_format, job.checkpoint) for job in jobs]
+        self._batches = [[] for _ in jobs]        # 작업별 상품 페이지 RecordBatch
+        self._n_listed = [0 for _ in jobs]        # 작업별 처리된 상품 페이지 수
+        self._missing = [[] for _ in jobs]        # 작업별 가져오지 못한 상품 페이지
+        self._remaining = {}                      # (작업, 상품순위)별 아직 저장되지 않은 리뷰페이지 수
+        self._ends = {}                           # (작업, 상품순위)별 실제 마지막 리뷰페이지
+        self._lock = threading.Lock()
+        self._n_done, self._n_products = 0, 0
+        self._s_total = time.time()
+
+        # 상품 페이지(또는 저장된 상품정보)를 list stage에 넣는다.
+        items = []
+        for i, job in enumerate(jobs):
+            if job.products_info is not None:
+                items.append((i, None, job.products_info))
+            else:
+                items += [(i, page, None) for page in range(1,n_page+1)]
+
+        pipeline = StagePipeline([
+            Stage('list', self._list, self.list_workers, self.queue_size),
+            Stage('discover', self._discover, self.discover_workers, self.queue_size),
+            Stage('fetch', self._fetch, self.fetch_workers, self.queue_size),
+            Stage('parse', self._parse, self.parse_workers, self.queue_size),
+            Stage('write', self._write, 1, self.queue_size),
+        ], self.trace_func)
+
+        try:
+            pipeline.run(items)
+        finally:
+            for writer in self._writers:
+                writer.close()
+
+        self.trace_func(f'[stages] {pipeline.stats()}')
+        self.trace_func('')
+        self.trace_func('크롤링 종료')
+
+        # 가져오지 못한 상품 페이지가 있는 키워드는 상품정보를 저장하지 않았으므로, 재개(resume)할 때 상품 페이지부터 다시 수집한다.
+        for job, pages in zip(jobs, self._missing):
+            if len(pages)>0:
+                raise IncompleteListingError(job.keyword, sorted(pages))
+
+        products = {}
+        for i, job in enumerate(jobs):
+            if job.products_info is not None:
+                products[job.keyword] = job.products_info
+            else:
+                products[job.keyword] = self._products_info(i)
+        return products
+
+    def _products_info(self, i: int) -> pa.Table:
+        """작업의 상품 페이지들을 상품순위 순서의 상품정보로 합친다."""
+
+        with self._lock:
+            batches = list(self._batches[i])
+        table = pa.Table.from_batches(batches, schema=PRODUCT_SCHEMA)
+        if table.num_rows>0:
+            table = table.sort_by('rank')
+        return add_keyword_column(table, self._jobs[i].keyword)
+
+    def _list(self, item: tuple) -> list[tuple]:
+        """상품 페이지를 크롤링하고, 상품을 하나씩 discover stage에 넘긴다."""
+
+        i, page, products_info = item
+        job = self._jobs[i]
+
+        if products_info is None:
+            try:
+                response = self.product_extractor.crawl(job.keyword, page)
+                batch = product_response_to_data(response, page)
+            except Exception as e:
+                self.trace_func(f"An error occurred: [{job.keyword}] page={page}, {e}")
+                METRICS.inc('errors_total', stage='products')
+                batch = None
+            self.trace_func(f'[Products] {job.keyword} {page}/{self._n_page}')
+
+            with self._lock:
+                if batch is not None:
+                    self._batches[i].append(batch)
+                else:
+                    self._missing[i].append(page)
+                self._n_listed[i] += 1
+                listed = self._n_listed[i]==self._n_page
+                missing = sorted(self._missing[i])
+
+            # 가져오지 못한 상품 페이지가 있으면, 일부 상품이 빠진 상품정보를 완전한 것으로 저장하지 않는다.
+            if listed and len(missing)>0:
+                self.trace_func(f"An error occurred: [{job.keyword}] product pages not fetched: {missing}, products not saved")
+            elif listed and job.on_products is not None:
+                job.on_products(self._products_info(i))
+            if batch is None:
+                return []
+            products_info = pa.Table.from_batches([batch])
+
+        return [(i, task) for task in get_review_tasks(preprocess_products_info(products_info))]
+
+    def _discover(self, item: tuple) -> list[_ReviewUnit]:
+        """
+        상품의 마지막 리뷰페이지를 탐색하고(checkpoint에 기록되어 있으면 생략), 수집해야 하는 리뷰페이지를 fetch stage에 넘긴다.
+        reviewCount로 계산하고, 모르면 첫번째 리뷰페이지를 크롤링하여 totalPages를 사용한다.
+        """
+
+        i, task = item
+        job = self._jobs[i]
+        key, review_args = task.product_ranking, task.review_args
+
+        probe, last_page = None, job.checkpoint.get_last_page(key) if job.checkpoint is not None else None
+        if last_page is None:
+            last_page = plan_last_page(task.review_count, self._max_page)
+            if last_page is None:
+                try:
+                    response = self.extractor.crawl(*review_args, 1)
+                    probe = response.json()
+                    last_page = min(probe['totalPages'], 1000, self._max_page) # 최대 1,000페이지까지만 크롤링 가능
+                except Exception as e:
+                    # 마지막 페이지 탐색이 실패한 상품도 실패로 기록하여, 수집을 시작하지 않은 상품과 구분한다.
+                    self.trace_func(f"An error occurred: [{job.keyword}] product={key}, {e}")
+                    METRICS.inc('errors_total', stage='reviews')
+                    if job.checkpoint is not None:
+                        job.checkpoint.mark_failed(key, 1, e)
+                    return []
+            if job.checkpoint is not None:
+                job.checkpoint.set_last_page(key, last_page)
+
+        pages = job.checkpoint.pending_pages(key, last_page) if job.checkpoint is not None else list(range(1,last_page+1))
+        if len(pages)==0:
+            return []
+
+        with self._lock:
+            self._remaining[(i, key)] = len(pages)
+            self._ends[(i, key)] = _ReviewEnd(last_page)
+            self._n_products += 1
+
+        # 탐색에 사용한 첫번째 리뷰페이지는 다시 요청하지 않는다.
+        return [_ReviewUnit(i, key, page, review_args, body=probe if page==1 else None) for page in pages]
+
+    def _fetch(self, unit: _ReviewUnit) -> list[_ReviewUnit]:
+        """리뷰페이지를 요청하여 파싱된 응답 JSON을 parse stage에 넘긴다. 상품의 실제 마지막 리뷰페이지를 넘은 페이지는 요청하지 않는다."""
+
+        if unit.body is not None:
+            return [unit]
+        if self._ends[(unit.job, unit.key)].is_past(unit.page):
+            return [unit._replace(skipped=True)]
+        try:
+            response = self.extractor.crawl(*unit.review_args, unit.page)
+            return [unit._replace(body=response.json())]
+        except Exception as e:
+            return [unit._replace(error=e)]
+
+    def _parse(self, unit: _ReviewUnit) -> list[_ReviewUnit]:
+        """응답 JSON을 REVIEW_SCHEMA의 RecordBatch로 변환하여 write stage에 넘긴다."""
+
+        if unit.error is not None or unit.skipped:
+            return [unit]
+        try:
+            contents = unit.body.get('contents') or []
+            self._ends[(unit.job, unit.key)].reached(unit.page, len(contents))
+            batch = reviews_to_record_batch(contents, unit.key, (unit.page-1)*REVIEW_PAGE_SIZE+1)
+            return [unit._replace(body=None, batch=batch)]
+        except Exception as e:
+            return [unit._replace(body=None, error=e)]
+
+    def _write(self, unit: _ReviewUnit) -> None:
+        """RecordBatch를 writer에 넣고, 상품의 모든 리뷰페이지가 도착하면 파일을 닫는다."""
+
+        job, writer = self._jobs[unit.job], self._writers[unit.job]
+        if unit.error is not None:
+            self.trace_func(f"An error occurred: {unit.error}")
+            if job.checkpoint is not None:
+                job.checkpoint.mark_failed(unit.key, unit.page, unit.error)
+        elif not unit.skipped:
+            writer.write(unit.key, unit.batch, tag=(unit.key, unit.page))
+
+        with self._lock:
+            self._remaining[(unit.job, unit.key)] -= 1
+            finished = self._remaining[(unit.job, unit.key)]==0
+        if not finished:
+            return
+
+        # 실제 마지막 페이지가 계획보다 앞이면, 이후 실행에서 그 뒤의 페이지를 다시 요청하지 않도록 기록
+        with self._lock:
+            end = self._ends.pop((unit.job, unit.key))
+        if job.checkpoint is not None and end.last_page<end.planned_page:
+            job.checkpoint.set_last_page(unit.key, end.last_page)
+
+        # 상품의 리뷰를 모두 수집했으므로 저장
+        writer.finish(unit.key)
+
+        # progress
+        self._n_done += 1
+        total = time.time() - self._s_total
+        self.trace_func(f'[Reviews] {self._n_done}/{self._n_products}, {job.keyword} product={unit.key}, {total=:.2f}s')
@@ -0,0 +1,194 @@
+"""
+네이버쇼핑 리뷰데이터 수집과 관련하여, 리뷰의 토픽(reviewTopics)별 문장을 추출하여 토픽 단위의 행으로 펼치는 함수를 제공한다.
+
+수집한 리뷰의 reviewTopics는 REVIEW_SCHEMA에서 list<struct> 컬럼이므로, 문자열로 바꿔서 다시 파싱하지 않고 Arrow 배열을 그대로 사용한다.
+- 토픽 행 : `list_flatten`, `list_parent_indices`로 모든 리뷰의 토픽을 한 번에 펼친다.
+- 토픽 문장 : 리뷰 본문의 문자 위치(patternStartNo ~ patternEndNo)를 UTF-8 byte 위치로 바꾼 뒤, numpy로 모든 문장을 한 번에 잘라낸다.
+
+함수 목록
+1. `slice_strings`
+    문자열 배열의 행별 문자 위치 [start, stop)을 한 번에 잘라낸 문자열 배열을 만든다.
+2. `topic_sentence_batches`
+    리뷰 RecordBatch를 하나씩 토픽 단위의 RecordBatch로 펼쳐서 yield한다.
+3. `extract_topic_sentences`
+    리뷰 테이블을 토픽 단위의 테이블로 펼치며, 여러 프로세스로 나누어 처리할 수 있다.
+"""
+
+# crawling
+from crawling.naver_shopping_review.utils.schema import REVIEW_TOPIC_TYPE, _converter
+
+# parallel
+from concurrent.futures import ProcessPoolExecutor
+
+# default
+from typing import Iterable, Iterator
+from functools import partial
+import ast
+import json
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# global setting
+BATCH_SIZE = 100_000    # 한 번에(프로세스 하나에서) 처리할 리뷰 수.
+TOPIC_COLUMNS = [       # 펼친 행에 추가되는 토픽 컬럼.
+    ('topicCode', pa.string()),
+    ('topicCodeName', pa.string()),
+    ('topicSentence', pa.string()),
+]
+
+def slice_strings(strings: pa.Array, rows: np.ndarray, start: np.ndarray, stop: np.ndarray) -> pa.Array:
+    """
+    문자열 배열의 행별 문자 위치 [start, stop)을 한 번에 잘라낸 문자열 배열을 만든다. 파이썬의 `text[start:stop]`과 같은 결과이다.
+    UTF-8 byte 중 문자의 시작 byte만 세어서 문자 위치를 byte 위치로 바꾸므로, 파이썬 반복문 없이 numpy 연산만 사용한다.
+
+    Args:
+        strings (pa.Array): 원본 문자열 배열. (pa.string())
+        rows (np.ndarray): 잘라낼 문자열의 행 번호 배열.
+        start (np.ndarray): 잘라낼 시작 문자 위치 배열로, 문자열 범위로 맞춘다.
+        stop (np.ndarray): 잘라낼 끝 문자 위치(포함하지 않음) 배열로, 문자열 범위로 맞춘다.
+
+    Returns:
+        pa.Array: rows와 같은 길이의 문자열 배열로, 원본이 null이면 null.
+    """
+
+    strings = strings.cast(pa.string())
+    _, offsets_buffer, data_buffer = strings.buffers()
+    offsets = np.frombuffer(offsets_buffer, dtype=np.int32)[strings.offset:strings.offset+len(strings)+1].astype(np.int64)
+    data = np.frombuffer(data_buffer, dtype=np.uint8) if data_buffer is not None else np.empty(0, np.uint8)
+    data = data[offsets[0]:offsets[-1]]
+    offsets = offsets - offsets[0]
+
+    # byte 위치별 앞에 있는 문자 수와, 문자별 시작 byte 위치 (continuation byte는 0b10xxxxxx)
+    is_char = (data & 0xC0) != 0x80
+    chars_before = np.concatenate([[0], np.cumsum(is_char)])
+    char_pos = np.append(np.flatnonzero(is_char), len(data))
+
+    # 행별 문자 수로 범위를 맞춘 뒤, 전체 문자 위치를 byte 위치로 바꾼다.
+    rows = np.asarray(rows, dtype=np.int64)
+    row_start = chars_before[offsets[rows]]
+    row_length = chars_before[offsets[rows+1]] - row_start
+    start = np.clip(np.asarray(start, dtype=np.int64), 0, row_length)
+    stop = np.clip(np.asarray(stop, dtype=np.int64), start, row_length)
+    byte_start = char_pos[row_start+start]
+    byte_stop = char_pos[row_start+stop]
+
+    # 잘라낼 byte 범위를 이어붙여서 새로운 문자열 배열을 만든다.
+    lengths = byte_stop - byte_start
+    new_offsets = np.concatenate([[0], np.cumsum(lengths)])
+    index = np.repeat(byte_start-new_offsets[:-1], lengths) + np.arange(new_offsets[-1])
+    sliced = pa.StringArray.from_buffers(
+        len(rows),
+        pa.py_buffer(new_offsets.astype(np.int32)),
+        pa.py_buffer(data[index]),
+    )
+
+    valid = strings.is_valid().to_numpy(zero_copy_only=False)[rows]
+    return sliced if valid.all() else pc.if_else(pa.array(valid), sliced, pa.scalar(None, pa.string()))
+
+def _parse_topics(value) -> list|None:
+    """이전 버전에서 str(list)로 저장된 reviewTopics를 list로 변환하며, 변환할 수 없으면 None."""
+
+    if not isinstance(value, str):
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        pass
+    try:
+        value = ast.literal_eval(value)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        return None
+    return value if isinstance(value, list) else None
+
+def _topics_array(topics: pa.Array) -> pa.Array:
+    """reviewTopics 컬럼을 list<REVIEW_TOPIC_TYPE> 배열로 가져온다. 문자열로 저장된 이전 버전의 컬럼은 한 번만 파싱한다."""
+
+    if pa.types.is_string(topics.type) or pa.types.is_large_string(topics.type):
+        convert = _converter(pa.list_(REVIEW_TOPIC_TYPE))
+        return pa.array([convert(_parse_topics(value)) for value in topics.to_pylist()], pa.list_(REVIEW_TOPIC_TYPE))
+    return topics
+
+def _explode_batch(batch: pa.RecordBatch, columns: list[str], keep_empty: bool) -> pa.RecordBatch:
+    """리뷰 RecordBatch 하나를 토픽 단위의 RecordBatch로 펼친다."""
+
+    topics = _topics_array(batch.column('reviewTopics'))
+    rows = pc.list_parent_indices(topics).to_numpy(zero_copy_only=False).astype(np.int64)
+    flat = pc.list_flatten(topics)
+
+    start = pc.fill_null(pc.struct_field(flat, 'patternStartNo'), 0).to_numpy(zero_copy_only=False)
+    stop = pc.fill_null(pc.struct_field(flat, 'patternEndNo'), -1).to_numpy(zero_copy_only=False) + 1 # patternEndNo를 포함
+    topic_columns = [
+        pc.struct_field(flat, 'topicCode'),
+        pc.struct_field(flat, 'topicCodeName'),
+        slice_strings(batch.column('reviewContent'), rows, start, stop),
+    ]
+
+    # 토픽이 없는 리뷰도 토픽 컬럼을 null로 두고 남기며, 원래 리뷰 순서를 유지한다.
+    if keep_empty:
+        empty = np.flatnonzero(pc.fill_null(pc.list_value_length(topics), 0).to_numpy(zero_copy_only=False)==0)
+        if len(empty)>0:
+            order = np.argsort(np.concatenate([rows, empty]), kind='stable')
+            rows = np.concatenate([rows, empty])[order]
+            topic_columns = [
+                pa.concat_arrays([column, pa.nulls(len(empty), dtype)]).take(pa.array(order))
+                for column, (_, dtype) in zip(topic_columns, TOPIC_COLUMNS)
+            ]
+
+    selected = batch.select(columns).take(pa.array(rows))
+    return pa.RecordBatch.from_arrays(
+        list(selected.columns) + topic_columns,
+        names=list(columns) + [name for name, _ in TOPIC_COLUMNS],
+    )
+
+def topic_sentence_batches(batches: Iterable[pa.RecordBatch], columns: list[str]|None = None, keep_empty: bool = False) -> Iterator[pa.RecordBatch]:
+    """
+    리뷰 RecordBatch를 하나씩 토픽 단위의 RecordBatch로 펼쳐서 yield한다. 리뷰 파일을 나눠서 읽으면서 처리할 때 사용한다.
+
+    Args:
+        batches (Iterable[pa.RecordBatch]): reviewContent, reviewTopics 컬럼이 있는 리뷰 RecordBatch.
+        columns (list[str]|None, optional): 펼친 행에 남길 리뷰 컬럼으로, None이면 reviewTopics를 제외한 모든 컬럼. default=None.
+        keep_empty (bool, optional): 토픽이 없는 리뷰도 토픽 컬럼을 null로 두고 남길지 여부. default=False.
+
+    Returns:
+        Iterator[pa.RecordBatch]: 리뷰 컬럼에 topicCode, topicCodeName, topicSentence 컬럼이 추가된 RecordBatch.
+    """
+
+    for batch in batches:
+        names = columns if columns is not None else [name for name in batch.schema.names if name!='reviewTopics']
+        yield _explode_batch(batch, names, keep_empty)
+
+def extract_topic_sentences(reviews: pa.Table|pa.RecordBatch,
+                            columns: list[str]|None = None,
+                            keep_empty: bool = False,
+                            n_jobs: int = 1,
+                            batch_size: int = BATCH_SIZE) -> pa.Table:
+    """
+    리뷰 테이블을 토픽 단위의 테이블로 펼친다. 리뷰 하나에 토픽이 3개 있으면 행이 3개가 되고, 토픽에 해당하는 문장을 topicSentence에 넣는다.
+
+    Args:
+        reviews (pa.Table|pa.RecordBatch): reviewContent, reviewTopics 컬럼이 있는 리뷰 테이블.
+        columns (list[str]|None, optional): 펼친 행에 남길 리뷰 컬럼으로, None이면 reviewTopics를 제외한 모든 컬럼. default=None.
+        keep_empty (bool, optional): 토픽이 없는 리뷰도 토픽 컬럼을 null로 두고 남길지 여부. default=False.
+        n_jobs (int, optional): 처리할 프로세스 수로, 1이면 현재 프로세스에서 처리한다. default=1.
+        batch_size (int, optional): 한 번에(프로세스 하나에서) 처리할 리뷰 수. default=BATCH_SIZE.
+
+    Returns:
+        pa.Table: 리뷰 컬럼에 topicCode, topicCodeName, topicSentence 컬럼이 추가된, 리뷰 순서를 유지한 테이블.
+    """
+
+    if isinstance(reviews, pa.RecordBatch):
+        reviews = pa.Table.from_batches([reviews])
+    columns = columns if columns is not None else [name for name in reviews.column_names if name!='reviewTopics']
+    batches = reviews.combine_chunks().to_batches(max_chunksize=batch_size)
+
+    if n_jobs==1 or len(batches)<=1:
+        results = list(topic_sentence_batches(batches, columns, keep_empty))
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = list(executor.map(partial(_explode_batch, columns=columns, keep_empty=keep_empty), batches))
+
+    if len(results)==0:
+        schema = pa.schema([reviews.schema.field(name) for name in columns] + TOPIC_COLUMNS)
+        return schema.empty_table()
+    return pa.Table.from_batches(results)
@@ -0,0 +1,165 @@
+"""
+네이버쇼핑 리뷰데이터 수집과 관련하여, 요청마다 사용할 user-agent와 header 조합을 미리 만들어두고 O(1)로 뽑는 클래스를 제공한다.
+
+`fake_useragent.UserAgent`는 생성할 때 브라우저 목록 전체를 읽고, `UserAgent().random`도 매번 목록을 필터링하므로 요청마다 수 ms가 걸린다.
+여기서는 user-agent 목록을 한 번만 만들어 디스크에 저장하고, 이후에는 저장된 목록에서 무작위로 고른다.
+
+클래스 목록
+1. `UserAgentPool`
+    처음 사용할 때 디스크에 저장된 user-agent 목록을 읽고(없으면 백그라운드에서 `fake_useragent`로 만들어 저장하고), 그 중에서 무작위로 고르는 thread-safe 풀.
+2. `HeaderProfilePool`
+    기본 headers에 additional_headers를 1~n개 추가한 header 조합을 미리 만들어두고, 그 중에서 무작위로 고르는 풀.
+"""
+
+# default
+import json
+import os
+import random
+import threading
+
+# global setting
+USER_AGENT_PATH = 'crawling/naver_shopping_review/.cache/user_agents.json'   # user-agent 목록 저장경로.
+USER_AGENT_POOL_SIZE = 500      # 저장할 user-agent 수.
+USER_AGENT_MAX_DRAWS = 1000     # user-agent 목록을 만들 때 `fake_useragent`에서 뽑는 최대 횟수로, 중복이 많아 size개를 채우지 못해도 여기서 멈춘다.
+HEADER_PROFILE_POOL_SIZE = 256  # 미리 만들어둘 header 조합의 수.
+
+# fake_useragent를 사용할 수 없을 때의 user-agent 목록
+FALLBACK_USER_AGENTS = [
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36 Edg/125.0.0.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:127.0) Gecko/20100101 Firefox/127.0',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36',
+]
+
+class UserAgentPool:
+    """
+    처음 사용할 때 디스크에 저장된 user-agent 목록을 읽고(없으면 `fake_useragent`로 만들어 저장하고), 그 중에서 무작위로 고르는 thread-safe 풀.
+    `fake_useragent.UserAgent`와 같이 `str(UA.random)`으로 사용할 수 있으며, import할 때는 아무것도 읽지 않는다.
+    저장된 목록이 없으면 첫 요청을 기다리게 하지 않도록, 목록을 만드는 동안에는 FALLBACK_USER_AGENTS에서 고르고 만들어지면 교체한다.
+    """
+
+    def __init__(self, path: str = USER_AGENT_PATH, size: int = USER_AGENT_POOL_SIZE, max_draws: int = USER_AGENT_MAX_DRAWS) -> None:
+        """
+        UserAgentPool의 생성자.
+
+        Args:
+            path (str, optional): user-agent 목록을 저장할 JSON 파일 경로. default=USER_AGENT_PATH.
+            size (int, optional): 저장할 user-agent 수. default=USER_AGENT_POOL_SIZE.
+            max_draws (int, optional): 목록을 만들 때 `fake_useragent`에서 뽑는 최대 횟수. default=USER_AGENT_MAX_DRAWS.
+        """
+
+        self.path = path
+        self.size = size
+        self.max_draws = max(max_draws, size)
+
+        self._agents = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.agents)
+
+    @property
+    def agents(self) -> list[str]:
+        """user-agent 목록으로, 처음 사용할 때 불러온다."""
+
+        if self._agents is None:
+            with self._lock:
+                if self._agents is None:
+                    self._agents = self._load()
+        return self._agents
+
+    @property
+    def random(self) -> str:
+        """user-agent 하나를 무작위로 고른다."""
+
+        return random.choice(self.agents)
+
+    def refresh(self) -> list[str]:
+        """
+        `fake_useragent`로 user-agent 목록을 새로 만들어 저장한다. `fake_useragent`를 사용할 수 없으면 FALLBACK_USER_AGENTS를 사용한다.
+        서로 다른 user-agent가 size개가 되거나 max_draws번 뽑으면 멈춘다.
+
+        Returns:
+            list[str]: 새로 만든 user-agent 목록.
+        """
+
+        try:
+            from fake_useragent import UserAgent
+            ua = UserAgent()
+            agents = {}
+            for _ in range(self.max_draws):
+                agents[str(ua.random)] = None
+                if len(agents)>=self.size:
+                    break
+            agents = list(agents)
+        except Exception:
+            agents = list(FALLBACK_USER_AGENTS)
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f'{self.path}.tmp{os.getpid()}'
+        with open(tmp_path, 'w') as f:
+            json.dump(agents, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+        with self._lock:
+            self._agents = agents
+        return agents
+
+    def _load(self) -> list[str]:
+        """저장된 user-agent 목록을 읽고, 없거나 읽을 수 없으면 백그라운드에서 새로 만들며 그동안 FALLBACK_USER_AGENTS를 사용한다."""
+
+        try:
+            with open(self.path) as f:
+                agents = json.load(f)
+            if isinstance(agents, list) and len(agents)>0:
+                return agents
+        except (OSError, ValueError):
+            pass
+        threading.Thread(target=self._refresh_in_background, daemon=True).start()
+        return list(FALLBACK_USER_AGENTS)
+
+    def _refresh_in_background(self) -> None:
+        """백그라운드 thread에서 목록을 새로 만들며, 저장에 실패하면 FALLBACK_USER_AGENTS를 계속 사용한다."""
+
+        try:
+            self.refresh()
+        except OSError:
+            pass
+
+class HeaderProfilePool:
+    """
+    기본 headers에 additional_headers를 1~n개 추가한 header 조합을 미리 만들어두고, 그 중에서 무작위로 고르는 풀.
+    `add_headers_randomly`를 요청마다 호출하는 대신 사용하며, 뽑은 딕셔너리는 여러 요청이 공유하므로 수정하지 않아야 한다.
+    """
+
+    def __init__(self, headers: dict, additional_headers: dict, size: int = HEADER_PROFILE_POOL_SIZE, seed: int|None = None) -> None:
+        """
+        HeaderProfilePool의 생성자.
+
+        Args:
+            headers (dict): 기본 headers.
+            additional_headers (dict): 기본 headers 이외에, 추가입력되는 headers.
+            size (int, optional): 미리 만들어둘 header 조합의 수. default=HEADER_PROFILE_POOL_SIZE.
+            seed (int|None, optional): 조합을 만드는 난수의 seed. default=None.
+        """
+
+        rng = random.Random(seed)
+        items = list(additional_headers.items())
+
+        self.profiles = []
+        for _ in range(size):
+            profile = dict(headers)
+            if len(items)>0:
+                profile.update(rng.sample(items, rng.randint(1, len(items))))
+            self.profiles.append(profile)
+
+    def __len__(self) -> int:
+        return len(self.profiles)
+
+    @property
+    def random(self) -> dict:
+        """header 조합 하나를 무작위로 고른다."""
+
+        return random.choice(self.profiles)
@@ -0,0 +1,110 @@
+"""
+네이버쇼핑 리뷰데이터 수집과 관련하여, 증분(incremental) 수집을 위한 상품별 high-water mark 저장소를 제공한다.
+
+함수 목록
+1. `watermark_key`
+    high-water mark의 key로, 상품(originProductNo)과 수집 범위(저장폴더)로 나눈다.
+
+클래스 목록
+1. `ReviewWatermark`
+    상품별로 지금까지 수집한 가장 최근 리뷰의 (createDate, id)를 JSON 파일에 기록하는 thread-safe 저장소.
+"""
+
+# crawling
+from crawling.naver_shopping_review.utils.schema import _to_timestamp
+
+# default
+import datetime
+import json
+import os
+import threading
+
+# global setting
+WATERMARK_PATH = 'crawling/naver_shopping_review/.cache/review_watermarks.json' # 상품별 high-water mark 저장경로.
+
+def watermark_key(origin_product_no: str|int, scope: str|None = None) -> str:
+    """
+    high-water mark의 key로, 상품(originProductNo)과 수집 범위(저장폴더)로 나눈다.
+    같은 상품이 여러 키워드에서 검색되어도 리뷰는 키워드별 저장폴더에 따로 저장되므로, 범위마다 따로 기록해야 한다.
+
+    Args:
+        origin_product_no (str|int): 상품의 originProductNo.
+        scope (str|None, optional): 수집 범위. ex) '{키워드}_{상품페이지수}_{최대리뷰페이지수}'. None이면 상품으로만 나눈다. default=None.
+
+    Returns:
+        str: '{scope}/{originProductNo}' 또는 '{originProductNo}'.
+    """
+
+    return str(origin_product_no) if scope is None else f'{scope}/{origin_product_no}'
+
+class ReviewWatermark:
+    """
+    상품별로 지금까지 수집한 가장 최근 리뷰의 (createDate, id)를 JSON 파일에 기록하는 thread-safe 저장소.
+
+    리뷰를 최신순으로 가져올 때, high-water mark보다 오래된(같거나 작은) 리뷰가 나오면 이후 페이지는 모두 이미 수집한 리뷰이다.
+    파일이 없으면 모든 상품을 처음 수집하는 것으로 본다.
+    """
+
+    def __init__(self, path: str = WATERMARK_PATH) -> None:
+        """
+        ReviewWatermark의 생성자.
+
+        Args:
+            path (str, optional): high-water mark를 저장할 JSON 파일 경로. default=WATERMARK_PATH.
+        """
+
+        self.path = path
+        self._lock = threading.Lock()
+
+        self._marks = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self._marks = json.load(f)
+
+    def get(self, key: str) -> tuple[datetime.datetime, int]|None:
+        """
+        상품의 high-water mark를 가져온다.
+
+        Args:
+            key (str): `watermark_key`로 만든 상품 key. ex) '오메가3_5_100/4000000001'
+
+        Returns:
+            tuple[datetime.datetime, int]|None: (createDate, 리뷰 id)로, 기록이 없으면 None.
+        """
+
+        with self._lock:
+            mark = self._marks.get(key)
+        if mark is None:
+            return None
+        create_date = _to_timestamp(mark['createDate'])
+        if create_date is None:
+            return None
+        return create_date, mark['id']
+
+    def update(self, marks: list[tuple[str, str, int]]) -> None:
+        """
+        상품별 high-water mark를 더 최근 값으로 바꾸고 파일에 저장한다. 리뷰가 파일에 저장된 뒤에 호출한다.
+
+        Args:
+            marks (list[tuple[str, str, int]]): (`watermark_key`로 만든 상품 key, createDate, 리뷰 id)로 이루어진 리스트.
+                createDate를 변환할 수 없는 항목은 비교할 수 없으므로 건너뛴다.
+
+        Returns:
+            None.
+        """
+
+        with self._lock:
+            for key, create_date, review_id in marks:
+                timestamp = _to_timestamp(create_date)
+                if timestamp is None:
+                    continue
+                mark = self._marks.get(key)
+                previous = _to_timestamp(mark['createDate']) if mark is not None else None
+                if previous is None or (timestamp, review_id) > (previous, mark['id']):
+                    self._marks[key] = {'createDate': create_date, 'id': review_id}
+
+            # 저장 중에 종료되어도 기존 파일이 깨지지 않도록 임시파일에 쓴 뒤 교체
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path + '.tmp', 'w') as f:
+                json.dump(self._marks, f)
+            os.replace(self.path + '.tmp', self.path)
@@ -0,0 +1,232 @@
+"""
+네이버쇼핑 리뷰데이터 수집과 관련하여, 여러 프로세스/호스트가 작업을 나눠 가지는 분산 크롤링용 work queue를 제공한다.
+
+함수 목록
+1. `register_queue_backend`
+    URL scheme에 대한 work queue 구현을 등록하는 decorator.
+2. `open_queue`
+    URL의 scheme에 해당하는 work queue를 연다. ex) 'sqlite:///path/to/queue.sqlite'
+
+클래스 목록
+1. `WorkQueue`
+    work queue backend의 인터페이스.
+2. `SQLiteWorkQueue`
+    하나의 SQLite 파일을 queue로 사용하는 WorkQueue로, 한 대의 서버 안의 여러 worker 프로세스만 사용할 수 있다.
+
+변수 목록
+1. `QUEUE_BACKENDS`
+    URL scheme을 key로, WorkQueue 클래스를 value로 가지는 딕셔너리.
+"""
+
+# default
+from typing import Callable
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# global setting
+LEASE_SECONDS = 300.0   # 작업을 가져간 worker가 이 시간(초) 안에 완료를 보고하지 않으면, 다른 worker가 가져갈 수 있다.
+MAX_ATTEMPTS = 5        # 작업별 최대 시도 횟수로, 넘으면 실패('failed')로 둔다.
+
+QUEUE_BACKENDS = {}
+
+def register_queue_backend(scheme: str) -> Callable:
+    """
+    URL scheme에 대한 work queue 구현을 등록하는 decorator.
+
+    Args:
+        scheme (str): URL scheme. ex) 'sqlite'
+
+    Returns:
+        Callable: 클래스를 그대로 반환하는 decorator.
+    """
+
+    def decorator(cls):
+        QUEUE_BACKENDS[scheme] = cls
+        return cls
+    return decorator
+
+def open_queue(url: str) -> 'WorkQueue':
+    """
+    URL의 scheme에 해당하는 work queue를 연다.
+
+    Args:
+        url (str): '{scheme}://{위치}' 형태의 URL. ex) 'sqlite:///path/to/queue.sqlite', 'sqlite://relative/queue.sqlite'
+
+    Returns:
+        WorkQueue: 열린 work queue.
+    """
+
+    scheme, _, location = url.partition('://')
+    if scheme not in QUEUE_BACKENDS:
+        raise ValueError(f"unknown queue backend: {scheme} (available={list(QUEUE_BACKENDS)})")
+    return QUEUE_BACKENDS[scheme](location)
+
+class WorkQueue:
+    """
+    work queue backend의 인터페이스.
+
+    작업은 (kind, key, payload)로 이루어지며, 같은 key의 작업은 한 번만 들어간다.
+    worker는 `lease`로 작업을 가져가고, 결과를 저장한 뒤 `ack`(완료) 또는 `nack`(실패)로 보고한다.
+    보고하지 않은 작업은 lease가 끝나면 다른 worker가 다시 가져간다.
+    """
+
+    def put(self, units: list[tuple[str, str, dict]]) -> int:
+        """(kind, key, payload) 작업들을 넣고, 새로 들어간 작업 수를 반환한다. 이미 있는 key는 무시한다."""
+        raise NotImplementedError
+
+    def lease(self, worker_id: str, n: int, lease_seconds: float = LEASE_SECONDS) -> list[tuple[int, str, dict]]:
+        """대기 중이거나 lease가 끝난 작업을 최대 n개 가져가서 (id, kind, payload) 리스트로 반환한다."""
+        raise NotImplementedError
+
+    def ack(self, worker_id: str, ids: list[int]) -> int:
+        """
+        worker_id가 가져간 작업들을 완료로 보고하고, 완료된 작업 수를 반환한다.
+        lease가 끝나 다른 worker가 다시 가져간 작업은 완료되지 않는다(lease를 잃은 작업).
+        """
+        raise NotImplementedError
+
+    def nack(self, worker_id: str, id: int, error: Exception|str) -> bool:
+        """
+        worker_id가 가져간 작업을 실패로 보고하며, 최대 시도 횟수 전까지는 다시 대기 상태가 된다.
+        lease를 잃은 작업이면 아무것도 바꾸지 않고 False를 반환한다.
+        """
+        raise NotImplementedError
+
+    def requeue_failed(self) -> int:
+        """최대 시도 횟수를 넘어 실패한 작업을 시도 횟수를 초기화하여 다시 대기 상태로 두고, 그 작업 수를 반환한다."""
+        raise NotImplementedError
+
+    def stats(self, key_contains: str|None = None) -> dict[str, int]:
+        """상태('pending','leased','done','failed')별 작업 수를 반환한다. key_contains가 있으면 key에 그 문자열이 포함된 작업만 센다."""
+        raise NotImplementedError
+
+    def is_drained(self) -> bool:
+        """대기 중이거나 진행 중인 작업이 없으면 True."""
+
+        stats = self.stats()
+        return stats.get('pending', 0)==0 and stats.get('leased', 0)==0
+
+@register_queue_backend('sqlite')
+class SQLiteWorkQueue(WorkQueue):
+    """
+    하나의 SQLite 파일을 queue로 사용하는 WorkQueue로, 한 대의 서버 안의 여러 worker 프로세스만 사용할 수 있다.
+    작업을 가져갈 때는 `BEGIN IMMEDIATE`로 쓰기 lock을 잡으므로, 같은 작업을 두 worker가 동시에 가져가지 않는다.
+
+    WAL 모드의 SQLite는 NFS 등 네트워크/공유 파일시스템에서 lock이 보장되지 않아 파일이 깨질 수 있으므로,
+    queue 파일은 반드시 로컬 디스크에 두어야 한다. 여러 호스트에서 worker를 실행하려면 Redis, PostgreSQL 등
+    실제 queue 서버를 사용하는 WorkQueue를 `register_queue_backend`로 등록하여 사용한다.
+    """
+
+    def __init__(self, path: str, max_attempts: int = MAX_ATTEMPTS) -> None:
+        """
+        SQLiteWorkQueue의 생성자.
+
+        Args:
+            path (str): queue로 사용할 SQLite 파일 경로.
+            max_attempts (int, optional): 작업별 최대 시도 횟수. default=MAX_ATTEMPTS.
+        """
+
+        self.path = path
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS units (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL UNIQUE,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                leased_by TEXT,
+                lease_until REAL,
+                error TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS units_status ON units (status, lease_until);
+        ''')
+
+    def put(self, units: list[tuple[str, str, dict]]) -> int:
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            before = self._conn.total_changes
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO units (kind, key, payload, updated_at) VALUES (?,?,?,?)',
+                [(kind, key, json.dumps(payload, ensure_ascii=False), now) for kind, key, payload in units],
+            )
+            n = self._conn.total_changes - before
+            self._conn.execute('COMMIT')
+        return n
+
+    def lease(self, worker_id: str, n: int, lease_seconds: float = LEASE_SECONDS) -> list[tuple[int, str, dict]]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            # 최대 시도 횟수까지 lease가 끝난 작업은 실패로 둔다.
+            self._conn.execute(
+                "UPDATE units SET status='failed', error='lease expired', updated_at=? "
+                "WHERE status='leased' AND lease_until<? AND attempts>=?",
+                (now, now, self.max_attempts),
+            )
+            rows = self._conn.execute(
+                "SELECT id, kind, payload FROM units "
+                "WHERE status='pending' OR (status='leased' AND lease_until<?) ORDER BY id LIMIT ?",
+                (now, n),
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE units SET status='leased', leased_by=?, lease_until=?, attempts=attempts+1, updated_at=? WHERE id=?",
+                [(worker_id, now+lease_seconds, now, id) for id, _, _ in rows],
+            )
+            self._conn.execute('COMMIT')
+        return [(id, kind, json.loads(payload)) for id, kind, payload in rows]
+
+    def ack(self, worker_id: str, ids: list[int]) -> int:
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "UPDATE units SET status='done', lease_until=NULL, error=NULL, updated_at=? "
+                "WHERE id=? AND status='leased' AND leased_by=?",
+                [(now, id, worker_id) for id in ids],
+            )
+            n = self._conn.total_changes - before
+            self._conn.execute('COMMIT')
+        return n
+
+    def nack(self, worker_id: str, id: int, error: Exception|str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE units SET status=CASE WHEN attempts>=? THEN 'failed' ELSE 'pending' END, "
+                "lease_until=NULL, error=?, updated_at=? WHERE id=? AND status='leased' AND leased_by=?",
+                (self.max_attempts, str(error), time.time(), id, worker_id),
+            )
+        return cursor.rowcount>0
+
+    def requeue_failed(self) -> int:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE units SET status='pending', attempts=0, leased_by=NULL, lease_until=NULL, error=NULL, updated_at=? "
+                "WHERE status='failed' OR (status='leased' AND lease_until<? AND attempts>=?)",
+                (now, now, self.max_attempts),
+            )
+        return cursor.rowcount
+
+    def stats(self, key_contains: str|None = None) -> dict[str, int]:
+        now = time.time()
+        with self._lock:
+            # LIKE는 '_', '%'를 wildcard로 해석하므로, 저장폴더 이름이 들어가는 key는 instr로 찾는다.
+            rows = self._conn.execute(
+                "SELECT CASE WHEN status='leased' AND lease_until<? THEN (CASE WHEN attempts>=? THEN 'failed' ELSE 'pending' END) "
+                "ELSE status END AS s, COUNT(*) FROM units WHERE ? IS NULL OR instr(key, ?)>0 GROUP BY s",
+                (now, self.max_attempts, key_contains, key_contains),
+            ).fetchall()
+        return dict(rows)
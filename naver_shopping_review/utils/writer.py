@@ -0,0 +1,189 @@
+"""
+네이버쇼핑 리뷰데이터 수집과 관련하여, 수집한 데이터를 버퍼링하여 저장하는 writer 클래스를 제공한다.
+
+클래스 목록
+1. `BufferedParquetWriter`
+    리뷰페이지를 메모리에 모았다가, 크기나 시간 기준을 넘으면 하나의 Parquet 파일에 row group으로 저장하는 thread-safe writer.
+"""
+
+# crawling
+from crawling.naver_shopping_review.utils.metrics import METRICS
+
+# default
+from typing import Callable
+import os
+import threading
+import time
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# global setting
+ROW_GROUP_SIZE = 10_000     # 버퍼에 쌓인 행이 이 수를 넘으면 row group으로 저장한다.
+FLUSH_INTERVAL = 60.0       # 버퍼에 처음 쌓인 뒤 이 시간(초)이 지나면 row group으로 저장한다.
+
+class BufferedParquetWriter:
+    """
+    리뷰페이지를 메모리에 모았다가, 크기나 시간 기준을 넘으면 하나의 Parquet 파일에 row group으로 저장하는 thread-safe writer.
+
+    저장경로는 `path_format.format(key)`로 정해지므로,
+    - 'review_product{}.parquet'처럼 `{}`가 있으면 상품별로 하나의 파일에,
+    - 'review.parquet'처럼 `{}`가 없으면 키워드(저장폴더)별로 하나의 파일에 저장된다.
+
+    Parquet 파일은 닫혀야 footer가 기록되어 읽을 수 있으므로, `write`의 tag는 파일이 닫힌 뒤에 `on_close`로 전달된다.
+    """
+
+    def __init__(self,
+                 path_format: str,
+                 schema: pa.Schema,
+                 row_group_size: int = ROW_GROUP_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL,
+                 on_close: Callable[[str, list], None]|None = None,
+                 overwrite: bool = True) -> None:
+        """
+        BufferedParquetWriter의 생성자.
+
+        Args:
+            path_format (str): 저장할 경로에 대한 포맷으로, `{}`에 key가 들어간다.
+            schema (pa.Schema): 저장할 데이터의 고정 schema.
+            row_group_size (int, optional): 버퍼에 쌓인 행이 이 수를 넘으면 row group으로 저장한다. default=ROW_GROUP_SIZE.
+            flush_interval (float, optional): 버퍼에 처음 쌓인 뒤 이 시간(초)이 지나면 row group으로 저장한다. default=FLUSH_INTERVAL.
+            on_close (Callable[[str, list], None]|None, optional): 파일이 닫힌 뒤 (실제 저장경로, 저장된 tag 리스트)로 호출할 함수. default=None.
+            overwrite (bool, optional): False이면 저장경로에 파일이 이미 있을 때 덮어쓰지 않고 '{이름}_{n}.parquet'에 저장한다. default=True.
+        """
+
+        self.path_format = path_format
+        self.schema = schema
+        self.row_group_size = row_group_size
+        self.flush_interval = flush_interval
+        self.on_close = on_close
+        self.overwrite = overwrite
+
+        # 경로별 {'batches','n_rows','buffered_at','tags','writer','written_path','written_tags','lock'}
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, key, batch: pa.RecordBatch|pa.Table, tag=None) -> None:
+        """
+        데이터를 버퍼에 넣고, 크기나 시간 기준을 넘은 파일의 버퍼를 저장한다.
+
+        Args:
+            key: 저장경로 포맷에 들어갈 key. ex) 상품순위
+            batch (pa.RecordBatch|pa.Table): 저장할 데이터로, schema가 `self.schema`와 같아야 한다.
+            tag (optional): 파일이 닫힌 뒤 `on_close`로 전달할 값. ex) (상품순위, 리뷰페이지). default=None.
+
+        Returns:
+            None.
+        """
+
+        path = self.path_format.format(key)
+        now = time.time()
+
+        with self._lock:
+            file = self._files.get(path)
+            if file is None:
+                file = self._files[path] = {
+                    'batches':[], 'n_rows':0, 'buffered_at':None, 'tags':[],
+                    'writer':None, 'written_path':None, 'written_tags':[], 'lock':threading.Lock(),
+                }
+            if file['buffered_at'] is None:
+                file['buffered_at'] = now
+            file['batches'].append(batch)
+            file['n_rows'] += batch.num_rows
+            if tag is not None:
+                file['tags'].append(tag)
+
+            # 크기 기준을 넘은 현재 파일과, 시간 기준을 넘은 모든 파일
+            paths = [
+                p for p, f in self._files.items()
+                if f['n_rows']>0 and (f['n_rows']>=self.row_group_size or now-f['buffered_at']>=self.flush_interval)
+            ]
+
+        for p in paths:
+            self._flush(p)
+
+    def flush(self) -> None:
+        """모든 파일의 버퍼를 저장한다."""
+
+        with self._lock:
+            paths = list(self._files)
+        for path in paths:
+            self._flush(path)
+
+    def finish(self, key) -> None:
+        """
+        key에 해당하는 파일의 버퍼를 저장하고 파일을 닫는다. 상품의 리뷰를 모두 수집했을 때 호출한다.
+        `{}`가 없는 저장경로 포맷이면, 다른 key들도 같은 파일을 쓰므로 닫지 않고 버퍼만 저장한다.
+
+        Args:
+            key: 저장경로 포맷에 들어갈 key.
+
+        Returns:
+            None.
+        """
+
+        path = self.path_format.format(key)
+        if path==self.path_format:
+            self._flush(path)
+        else:
+            self._flush(path, close=True)
+
+    def close(self) -> None:
+        """모든 파일의 버퍼를 저장하고 파일을 닫는다."""
+
+        with self._lock:
+            paths = list(self._files)
+        for path in paths:
+            self._flush(path, close=True)
+
+    def _flush(self, path: str, close: bool = False) -> None:
+        """경로에 해당하는 파일의 버퍼를 하나의 row group으로 저장한다."""
+
+        with self._lock:
+            file = self._files.get(path)
+            if file is None:
+                return
+            batches, file['batches'] = file['batches'], []
+            tags, file['tags'] = file['tags'], []
+            file['n_rows'], file['buffered_at'] = 0, None
+            if close:
+                del self._files[path]
+
+        with file['lock']:
+            if len(batches)>0:
+                if file['writer'] is None:
+                    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                    file['written_path'] = path if self.overwrite else self._available_path(path)
+                    file['writer'] = pq.ParquetWriter(file['written_path'], self.schema)
+                with METRICS.timer('write_seconds'):
+                    table = pa.Table.from_batches(
+                        [b for batch in batches for b in (batch.to_batches() if isinstance(batch, pa.Table) else [batch])],
+                        schema=self.schema,
+                    )
+                    file['writer'].write_table(table, row_group_size=max(table.num_rows, 1))
+                METRICS.inc('rows_written_total', table.num_rows)
+                METRICS.inc('row_groups_written_total')
+            file['written_tags'] += tags
+            if close and file['writer'] is not None:
+                file['writer'].close()
+                file['writer'] = None
+                METRICS.inc('files_written_total')
+                written_tags, file['written_tags'] = file['written_tags'], []
+                if self.on_close is not None:
+                    self.on_close(file['written_path'], written_tags)
+
+    @staticmethod
+    def _available_path(path: str) -> str:
+        """저장경로에 파일이 이미 있으면, 비어있는 '{이름}_{n}{확장자}' 경로를 가져온다."""
+
+        root, ext = os.path.splitext(path)
+        n = 0
+        while os.path.exists(path):
+            n += 1
+            path = f'{root}_{n}{ext}'
+        return path